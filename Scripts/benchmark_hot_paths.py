@@ -0,0 +1,263 @@
+"""
+Micro-benchmarks of the data loading and comparison hot paths on synthetic data.
+
+Datasets shaped like a configured table are generated once per size (deterministically, from a seed)
+under `benchmark_data/`, then every benchmark case runs in a fresh process so its peak memory can be
+measured with `ru_maxrss`. Results are written as JSON for comparison across commits. Runs fully
+offline.
+
+Usage:
+    python Scripts/benchmark_hot_paths.py --sizes 10k 1m
+    python Scripts/benchmark_hot_paths.py --sizes 1m --functions compare_dataframes --baseline results.json
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import platform
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+import polars as pl  # noqa: E402
+import pyarrow as pa  # noqa: E402
+import pyarrow.parquet as pq  # noqa: E402
+
+from utils.commons.file_convert_util import convert_to_parquet  # noqa: E402
+from utils.commons.file_util import load_yaml_file  # noqa: E402
+from utils.commons.polars_comp_util import compare_dataframes  # noqa: E402
+from utils.commons.polars_util import align_to_schema, convert_df_to_string, polars_df_parquet  # noqa: E402
+from utils.framework.batch_runner import normalize_for_comparison  # noqa: E402
+from utils.framework.path_util import get_conf_base_path, get_team_folder_path_with_key  # noqa: E402
+from utils.framework.synthetic_data import DATASET_SIZES, build_synthetic_schema, write_synthetic_dataset  # noqa: E402
+
+LOGGER = logging.getLogger(__name__)
+
+BENCHMARK_FUNCTIONS = ['polars_df_parquet', 'convert_df_to_string', 'align_to_schema', 'compare_dataframes',
+                       'string_comparison', 'convert_to_parquet']
+ROWS_PER_FILE = 1_000_000
+# Fraction of the rows changed in the second dataset of the comparison benchmark
+MISMATCH_FRACTION = 0.001
+
+
+def load_table_schema(team_key: str, table_name: str) -> pa.Schema:
+    """
+    Build the synthetic schema of a configured table.
+    """
+    team_path, _ = get_team_folder_path_with_key(get_conf_base_path(), team_key)
+    return build_synthetic_schema(load_yaml_file(team_path / 'tables' / f"{table_name}.yaml"))
+
+
+def prepare_dataset(schema: pa.Schema, rows: int, dataset_path: Path, seed: int) -> None:
+    """
+    Generate a dataset unless an identical one (same schema, rows and seed) already exists.
+    """
+    marker_path = dataset_path / 'dataset.json'
+    marker = {'schema': schema.to_string(), 'rows': rows, 'seed': seed}
+    if marker_path.exists() and json.loads(marker_path.read_text()) == marker:
+        return
+    shutil.rmtree(dataset_path, ignore_errors=True)
+    write_synthetic_dataset(schema, rows, dataset_path, seed=seed, rows_per_file=ROWS_PER_FILE)
+    marker_path.write_text(json.dumps(marker))
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is reported in kilobytes on Linux and in bytes on macOS
+    divisor = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    usage = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    return usage / divisor
+
+
+def _run_case(function_name: str, dataset_path: Path, repeat: int, workers: int) -> Dict[str, Any]:
+    """
+    Run one benchmark case in the current (freshly spawned) process.
+
+    Inputs are prepared before the timed runs; peak memory is the process high-water mark after the
+    runs, and `peak_rss_delta_mb` the part of it reached during the timed runs.
+    """
+    parquet_files = sorted((dataset_path / 'parquet').glob('*.parquet'))
+    csv_files = sorted((dataset_path / 'csv').glob('*.csv'))
+    input_bytes = sum(file.stat().st_size for file in parquet_files)
+    key_column = next(iter(pl.read_parquet_schema(parquet_files[0])))
+
+    if function_name == 'polars_df_parquet':
+        def run() -> None:
+            polars_df_parquet(parquet_files)
+    elif function_name == 'convert_df_to_string':
+        df = polars_df_parquet(parquet_files)
+
+        def run() -> None:
+            convert_df_to_string(df)
+    elif function_name == 'align_to_schema':
+        df = polars_df_parquet(parquet_files, exact_decimals=True)
+        schema = pq.read_schema(parquet_files[0])
+
+        def run() -> None:
+            align_to_schema(df, schema)
+    elif function_name == 'compare_dataframes':
+        df1 = polars_df_parquet(parquet_files).select(pl.all().cast(pl.Utf8))
+        changed_column = df1.columns[-1]
+        step = max(int(1 / MISMATCH_FRACTION), 1)
+        df2 = df1.with_columns(pl.when(pl.int_range(0, pl.len()) % step == 0).then(pl.lit('changed'))
+                               .otherwise(pl.col(changed_column)).alias(changed_column))
+
+        def run() -> None:
+            compare_dataframes(df1, df2, 'stage', 'edwp', key_columns=[key_column])
+    elif function_name == 'string_comparison':
+        # Both sides of a string-mode table comparison, as run by `validate_table`, in different row orders
+        df1 = polars_df_parquet(parquet_files)
+        df2 = df1.reverse()
+
+        def run() -> None:
+            stage_df, edwp_df, rules = normalize_for_comparison({}, df1, df2)
+            compare_dataframes(stage_df, edwp_df, 'stage', 'edwp', rules=rules)
+    elif function_name == 'convert_to_parquet':
+        input_bytes = sum(file.stat().st_size for file in csv_files)
+        work_path = dataset_path / 'convert_work'
+
+        def run() -> None:
+            convert_to_parquet(work_path, 'csv', workers=workers)
+    else:
+        raise ValueError(f"Unknown benchmark function: {function_name}")
+
+    rows = sum(pl.scan_parquet(file).select(pl.len()).collect().item() for file in parquet_files)
+    setup_peak = _peak_rss_mb()
+    durations = []
+    for _ in range(repeat):
+        if function_name == 'convert_to_parquet':
+            # Copying the inputs is not timed; the conversion deletes them
+            shutil.rmtree(work_path, ignore_errors=True)
+            work_path.mkdir()
+            for csv_file in csv_files:
+                shutil.copyfile(csv_file, work_path / csv_file.name)
+        start_time = time.perf_counter()
+        run()
+        durations.append(time.perf_counter() - start_time)
+    if function_name == 'convert_to_parquet':
+        shutil.rmtree(work_path, ignore_errors=True)
+
+    peak = _peak_rss_mb()
+    best = min(durations)
+    return {
+        'function': function_name,
+        'rows': rows,
+        'input_mb': round(input_bytes / (1024 * 1024), 2),
+        'repeat': repeat,
+        'seconds_min': round(best, 4),
+        'seconds_median': round(statistics.median(durations), 4),
+        'rows_per_sec': round(rows / best, 1),
+        'mb_per_sec': round(input_bytes / (1024 * 1024) / best, 2),
+        'peak_rss_mb': round(peak, 1),
+        'peak_rss_delta_mb': round(max(peak - setup_peak, 0.0), 1),
+    }
+
+
+def run_benchmarks(team_key: str, table_name: str, sizes: List[str], functions: List[str], repeat: int, seed: int,
+                   data_path: Path, workers: int) -> Dict[str, Any]:
+    """
+    Generate the datasets and run every benchmark case in its own process.
+
+    Returns:
+        Dict[str, Any]: Run metadata and one result per function and dataset size.
+    """
+    schema = load_table_schema(team_key, table_name)
+    results = []
+    for size in sizes:
+        rows = DATASET_SIZES[size]
+        dataset_path = data_path / table_name / f"{size}_seed{seed}"
+        LOGGER.info(f"Preparing {size} dataset of {table_name} at {dataset_path}")
+        prepare_dataset(schema, rows, dataset_path, seed)
+        for function_name in functions:
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+                result = executor.submit(_run_case, function_name, dataset_path, repeat, workers).result()
+            result['size'] = size
+            LOGGER.info(f"{function_name} [{size}]: {result['seconds_min']}s, {result['rows_per_sec']:.0f} rows/sec, "
+                        f"peak {result['peak_rss_mb']} MB")
+            results.append(result)
+
+    return {
+        'commit': _git_commit(),
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'table': table_name,
+        'seed': seed,
+        'python': platform.python_version(),
+        'polars': pl.__version__,
+        'pyarrow': pa.__version__,
+        'platform': platform.platform(),
+        'cpu_count': multiprocessing.cpu_count(),
+        'results': results,
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=PROJECT_ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare_with_baseline(report: Dict[str, Any], baseline: Dict[str, Any]) -> List[str]:
+    """
+    Compare the results with a previous run, matching cases by function and dataset size.
+
+    Returns:
+        List[str]: One line per case present in both runs, with the speedup and memory change.
+    """
+    baseline_results = {(result['function'], result['size']): result for result in baseline['results']}
+    lines = []
+    for result in report['results']:
+        previous = baseline_results.get((result['function'], result['size']))
+        if previous is None:
+            continue
+        speedup = previous['seconds_min'] / max(result['seconds_min'], 1e-9)
+        lines.append(f"{result['function']:<22} {result['size']:>4}: {speedup:6.2f}x speed, "
+                     f"peak {previous['peak_rss_mb']} -> {result['peak_rss_mb']} MB "
+                     f"(baseline {baseline.get('commit')})")
+    return lines
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the data loading and comparison hot paths offline.")
+    parser.add_argument('--team', default='seed_intl_pgm', help="Team key of the table configuration")
+    parser.add_argument('--table', default='out_trff_lght_mstr_rdx_gb_fact', help="Table whose schema is mimicked")
+    parser.add_argument('--sizes', nargs='+', default=['10k'], choices=list(DATASET_SIZES))
+    parser.add_argument('--functions', nargs='+', default=BENCHMARK_FUNCTIONS, choices=BENCHMARK_FUNCTIONS)
+    parser.add_argument('--repeat', type=int, default=3, help="Timed runs per case; the fastest is reported")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=1, help="Worker processes of convert_to_parquet")
+    parser.add_argument('--data-dir', type=Path, default=PROJECT_ROOT / 'benchmark_data')
+    parser.add_argument('--output', type=Path, default=None,
+                        help="Result file (default: benchmark_results/<timestamp>_<commit>.json)")
+    parser.add_argument('--baseline', type=Path, default=None, help="Previous result file to compare with")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)8s] %(message)s")
+    report = run_benchmarks(args.team, args.table, args.sizes, args.functions, args.repeat, args.seed,
+                            args.data_dir, args.workers)
+
+    output_path = args.output or PROJECT_ROOT / 'benchmark_results' / \
+        f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{report['commit'] or 'nocommit'}.json"
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    output_path.write_text(json.dumps(report, indent=2))
+    LOGGER.info(f"Wrote benchmark results to {output_path}")
+
+    if args.baseline:
+        for line in compare_with_baseline(report, json.loads(args.baseline.read_text())):
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
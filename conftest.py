@@ -2,16 +2,23 @@ import sys
 import os
 import json
 from datetime import datetime
+from pathlib import Path
 import pytest
 import logging
-from custom_conf.initialization import initialize_config
+from custom_conf.conf_manager import ConfManager
+from custom_conf.initialization import DEFAULT_INIT_WORKERS, config_key, initialize_config, initialize_configs
 from tenacity import retry, stop_after_attempt, wait_exponential
 from sqlalchemy.engine import Engine
 
 from utils.commons.cloud_connection import get_s3_client
 from utils.commons.file_util import load_yaml_file, file_exists
 from utils.commons.db_connection import create_db_engine, close_db_engine
+from utils.commons.perf_util import get_spans, merge_span_reports, table_context, write_spans
+from utils.commons.profile_util import profile_block, summarize_profiles
+from utils.framework.batch_runner import BatchRunner
 from utils.framework.path_util import get_team_folder_path, get_team_folder_path_with_key, get_input_params_path
+from utils.framework.shared_dataset import (SHARED_DATASET_DIR_ENV, SharedDatasetRegistry, create_session_path,
+                                            remove_session)
 
 LOGGER = logging.getLogger(__name__)
 
@@ -27,6 +34,8 @@ def pytest_configure(config):
         os.makedirs(logs_dir, exist_ok=True)
         # Store the logs directory path in an environment variable for workers
         os.environ["LOGS_DIR"] = logs_dir
+        # Datasets shared by the tests and workers of this session, removed when it finishes
+        os.environ[SHARED_DATASET_DIR_ENV] = str(create_session_path())
     else:
         # Workers read the logs directory path from the environment variable
         logs_dir = os.environ["LOGS_DIR"]
@@ -45,6 +54,53 @@ def pytest_configure(config):
 
     # Store the logs directory path in the config object for use in tests if needed
     config.logs_dir = logs_dir
+    config.addinivalue_line("markers", "batch_runner: table test run through the shared `BatchRunner`, "
+                                       "selected with --batch_runner instead of the per-table tests")
+
+
+def _runs_integration_tests(config) -> bool:
+    """
+    Tell whether the session runs tests of the `tests` folder, which need the team configurations.
+    """
+    tests_path = Path(config.rootpath) / 'tests'
+    for arg in config.args:
+        path = Path(arg.split('::')[0])
+        path = (path if path.is_absolute() else Path(config.invocation_params.dir) / path).resolve()
+        if path == tests_path or tests_path in path.parents or path in tests_path.parents:
+            return True
+    return False
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_sessionstart(session):
+    """
+    Initialize every team and environment configuration of main_conf.json once, concurrently, before any
+    test runs. xdist workers receive the resolved settings from the controller instead of initializing
+    them again. A configuration that cannot be initialized stops the session.
+    """
+    config = session.config
+    if hasattr(config, 'workerinput'):
+        config.bootstrapped_configs = {
+            key: ConfManager.from_settings(settings)
+            for key, settings in json.loads(config.workerinput.get('bootstrapped_configs', '{}')).items()}
+        return
+
+    config.bootstrapped_configs = {}
+    if not _runs_integration_tests(config):
+        return
+    try:
+        config.bootstrapped_configs = initialize_configs(load_configs(),
+                                                         max_workers=config.getoption("config_init_workers"))
+    except Exception as e:
+        LOGGER.error(f"Configuration bootstrap failed: {e}")
+        pytest.exit(f"Configuration bootstrap failed: {e}", returncode=pytest.ExitCode.INTERNAL_ERROR)
+
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_configure_node(node):
+    # Runs in the xdist controller for each worker, after the bootstrap
+    node.workerinput['bootstrapped_configs'] = json.dumps(
+        {key: conf_manager.settings for key, conf_manager in node.config.bootstrapped_configs.items()}, default=str)
 
 
 @pytest.fixture(scope="session")
@@ -52,6 +108,64 @@ def logs_dir(request):
     return request.config.logs_dir
 
 
+@pytest.hookimpl(trylast=True)
+def pytest_sessionfinish(session):
+    # Every process writes its own timing spans; the main process (which finishes after all xdist workers)
+    # merges them into one performance report in the logs directory
+    config = session.config
+    worker_id = getattr(config, 'workerinput', {}).get('workerid', 'main')
+    if get_spans():
+        write_spans(config.logs_dir, worker_id)
+    if not hasattr(config, 'workerinput'):
+        merge_span_reports(config.logs_dir)
+        remove_session(os.environ[SHARED_DATASET_DIR_ENV])
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_call(item):
+    if not item.config.getoption("profile"):
+        yield
+        return
+    with profile_block(item.nodeid, os.path.join(item.config.logs_dir, 'profiles')):
+        yield
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    # Under xdist the controller runs this after every worker has written its profiles
+    if not config.getoption("profile") or hasattr(config, 'workerinput'):
+        return
+    lines = summarize_profiles(os.path.join(config.logs_dir, 'profiles'), top_n=config.getoption("profile_top"))
+    if lines:
+        terminalreporter.write_sep('=', 'profiling summary')
+        for line in lines:
+            terminalreporter.write_line(line)
+        with open(os.path.join(config.logs_dir, 'profile_summary.txt'), 'w') as summary_file:
+            summary_file.write('\n'.join(lines) + '\n')
+
+
+@pytest.fixture(scope="session")
+def shared_dataset_fixture():
+    registry = SharedDatasetRegistry()
+    yield registry
+    registry.close()
+
+
+@pytest.fixture(autouse=True)
+def perf_table_context(request):
+    """
+    Attribute the timing spans recorded by a table-parametrized test to its table, and enforce the
+    table's optional `memory_budget_mb` from its YAML configuration.
+    """
+    callspec = getattr(request.node, 'callspec', None)
+    table_name = callspec.params.get('table_name') if callspec else None
+    memory_budget_mb = None
+    if table_name and 'config_fixture' in request.fixturenames:
+        table_settings = request.getfixturevalue('config_fixture').settings.get(table_name) or {}
+        memory_budget_mb = table_settings.get('memory_budget_mb')
+    with table_context(table_name, memory_budget_mb=memory_budget_mb):
+        yield
+
+
 def load_configs():
     config_file_path = get_input_params_path() / 'main_conf.json'
     with open(config_file_path, 'r') as file:
@@ -92,6 +206,14 @@ def initialize_configuration(team_key, environment, detect_env_vars, remote_conf
 def pytest_addoption(parser):
     parser.addoption("--table_names", action="store", default=None,
                      help="Comma-separated list of table names for loading YAML configurations")
+    parser.addoption("--profile", action="store_true", default=False,
+                     help="Profile each test; writes cProfile and collapsed-stack files to <logs_dir>/profiles")
+    parser.addoption("--profile_top", action="store", type=int, default=20,
+                     help="Number of hottest functions listed in the profiling summary")
+    parser.addoption("--batch_runner", action="store_true", default=False,
+                     help="Validate the tables through the prefetching batch runner instead of the per-table tests")
+    parser.addoption("--config_init_workers", action="store", type=int, default=DEFAULT_INIT_WORKERS,
+                     help="Number of team configurations initialized at once when the session starts")
 
 
 def pytest_generate_tests(metafunc):
@@ -108,33 +230,54 @@ def pytest_generate_tests(metafunc):
         metafunc.parametrize("table_name", table_names)
 
 
-@pytest.fixture(scope="function", params=load_configs())
-def config_fixture(request):
+def pytest_collection_modifyitems(config, items):
     """
-    Fixture to initialize configuration for different teams and environments.
-    Uses the `initialize_configuration` function to set up the configuration.
+    Run each table through one entry point only: the per-table tests by default, or the tests marked
+    `batch_runner` with --batch_runner. Both download, extract and compare every table.
     """
-    LOGGER.info(f"Initializing config for {request.param['team_key']} - {request.param['environment']}")
+    batch_runner = config.getoption("batch_runner")
+    selected, deselected = [], []
+    for item in items:
+        if 'table_name' in item.fixturenames and (item.get_closest_marker('batch_runner') is None) == batch_runner:
+            deselected.append(item)
+        else:
+            selected.append(item)
+    if deselected:
+        config.hook.pytest_deselected(items=deselected)
+        items[:] = selected
 
-    config = initialize_configuration(
-        team_key=request.param['team_key'],
-        environment=request.param['environment'],
-        detect_env_vars=request.param['detect_env_vars'],
-        remote_config_src_type=request.param['remote_config_src_type'],
-        allow_remote_update=request.param['allow_remote_update']
-    )
+
+def _initialize_team_config(param, table_names_option, table_names=None, bootstrapped_configs=None):
+    """
+    Initialize the configuration of a team and environment and load the YAML settings of its tables:
+    `table_names` if given, else the team's tables from main_conf.json or the `--table_names` option.
+    A copy of the configuration initialized when the session started is used if available.
+    """
+    bootstrapped = (bootstrapped_configs or {}).get(config_key(param['team_key'], param['environment']))
+    if bootstrapped is not None:
+        LOGGER.info(f"Using the session config of {param['team_key']} - {param['environment']}")
+        config = ConfManager.from_settings(bootstrapped.settings)
+    else:
+        LOGGER.info(f"Initializing config for {param['team_key']} - {param['environment']}")
+        config = initialize_configuration(
+            team_key=param['team_key'],
+            environment=param['environment'],
+            detect_env_vars=param['detect_env_vars'],
+            remote_config_src_type=param['remote_config_src_type'],
+            allow_remote_update=param['allow_remote_update']
+        )
 
     # Determine the table name to use
-    table_names = request.param.get('table_names')
+    table_names = table_names or param.get('table_names')
     if not table_names:
-        table_names = request.config.getoption("table_names")
+        table_names = table_names_option.split(',') if table_names_option else None
         if not table_names:
             raise ValueError("Table names must be provided either via command line or JSON configuration")
     config.settings['table_names'] = table_names
 
     # Load additional settings from YAML file
     base_path = get_team_folder_path()
-    team_path, _ = get_team_folder_path_with_key(base_path, request.param['team_key'])
+    team_path, _ = get_team_folder_path_with_key(base_path, param['team_key'])
     for table_name in table_names:
         table_config_path = team_path / 'tables' / f"{table_name}.yaml"
         if file_exists(table_config_path):
@@ -146,12 +289,46 @@ def config_fixture(request):
     # Verify that the configuration is loaded without empty or
     assert config is not None, "Configuration manager should not be None"
     assert hasattr(config, 'settings'), "Configuration manager should have settings attribute"
+    return config
+
+
+@pytest.fixture(scope="function", params=load_configs())
+def config_fixture(request):
+    """
+    Fixture to initialize configuration for different teams and environments.
+    Uses a copy of the configuration initialized when the session started, or the
+    `initialize_configuration` function to set it up when the session did not.
+    """
+    config = _initialize_team_config(request.param, request.config.getoption("table_names"),
+                                     bootstrapped_configs=request.config.bootstrapped_configs)
 
     yield config
 
     LOGGER.info(f"Tearing down config for {request.param['team_key']} - {request.param['environment']}")
 
 
+@pytest.fixture(scope="session", params=load_configs())
+def batch_runner_fixture(request):
+    """
+    Fixture sharing one configuration, S3 client, database engine and `BatchRunner` per team and
+    environment across all table tests of the session, so upcoming tables are fetched while earlier
+    ones are compared. Tables run in the order of `--table_names`, or of main_conf.json.
+    """
+    table_names_option = request.config.getoption("table_names")
+    config = _initialize_team_config(request.param, table_names_option,
+                                     table_names_option.split(',') if table_names_option else None,
+                                     request.config.bootstrapped_configs)
+    table_names = config.settings['table_names']
+    engine = create_db_engine(config.settings['etl_db_engine'], config.settings)
+    runner = BatchRunner.from_settings(config.settings, table_names, get_s3_client(config.settings), engine)
+
+    yield runner
+
+    runner.close()
+    close_db_engine(engine)
+    LOGGER.info(f"Tearing down batch runner for {request.param['team_key']} - {request.param['environment']}")
+
+
 @pytest.fixture(scope='function')
 def etl_db_engine_fixture(config_fixture) -> Engine:
     db_config = config_fixture.settings
@@ -163,6 +340,6 @@ def etl_db_engine_fixture(config_fixture) -> Engine:
 @pytest.fixture(scope='function')
 def stg_client_fixture(config_fixture):
     """
-    Fixture to create and return an S3 client for staging data.
+    Fixture returning the shared S3 client for staging data, created once per process.
     """
     return get_s3_client(config_fixture.settings)
@@ -1,3 +1,4 @@
+import copy
 from typing import Any, Dict, Optional
 from threading import Lock
 
@@ -18,6 +19,21 @@ class ConfManager:
         self.settings: Dict[str, Any] = {}
         self._lock = Lock()
 
+    @classmethod
+    def from_settings(cls, settings: Dict[str, Any]) -> 'ConfManager':
+        """
+        Create a configuration manager holding already resolved settings.
+
+        Args:
+            settings (Dict[str, Any]): The settings; copied, so the manager can be changed independently.
+
+        Returns:
+            ConfManager: The configuration manager.
+        """
+        conf_manager = cls()
+        conf_manager.settings = copy.deepcopy(settings)
+        return conf_manager
+
     def load(self, loader: Any) -> None:
         """
         Load settings using the provided loader and update the settings dictionary.
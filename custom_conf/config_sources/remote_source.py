@@ -2,11 +2,12 @@ import json
 import logging
 from pathlib import Path
 
-import boto3
 import toml
 from hvac import Client as VaultClient
 from typing import Any, Dict, Optional
 
+from utils.commons.cloud_connection import get_aws_client
+
 LOGGER = logging.getLogger(__name__)
 
 
@@ -22,7 +23,8 @@ class RemoteSource:
 
         Parameters:
             source (str): The type of remote source (e.g., 'vault', 'aws_secrets_manager').
-            parameters (Optional[Dict[str, Any]]): Additional parameters for the remote source.
+            parameters (Optional[Dict[str, Any]]): Additional parameters for the remote source; the AWS
+                sources use the shared client of the optional 'region_name' and 'profile_name'.
         """
         self.source = source
         self.parameters = parameters or {}
@@ -50,7 +52,8 @@ class RemoteSource:
         Returns:
             Dict[str, Any]: The secrets retrieved from AWS Secrets Manager.
         """
-        client = boto3.client('secretsmanager')
+        client = get_aws_client('secretsmanager', region=self.parameters.get('region_name'),
+                                profile=self.parameters.get('profile_name'))
         secret_name = self.parameters.get('secret_name')
         response = client.get_secret_value(SecretId=secret_name)
         return json.loads(response['SecretString'])
@@ -62,7 +65,8 @@ class RemoteSource:
         Returns:
             Dict[str, str]: The secrets retrieved from AWS Parameter Store.
         """
-        client = boto3.client('ssm')
+        client = get_aws_client('ssm', region=self.parameters.get('region_name'),
+                                profile=self.parameters.get('profile_name'))
         parameter_name = self.parameters.get('parameter_name')
         response = client.get_parameter(Name=parameter_name, WithDecryption=True)
         return {parameter_name: response['Parameter']['Value']}
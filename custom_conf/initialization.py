@@ -1,7 +1,8 @@
 import logging
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
 from pathlib import Path
 import toml
-from typing import Optional
+from typing import Any, Callable, Dict, List, Optional
 
 from utils.framework import path_util
 from .conf_manager import ConfManager
@@ -14,6 +15,8 @@ from utils.framework.config_util import load_layered_settings
 
 LOGGER = logging.getLogger(__name__)
 
+DEFAULT_INIT_WORKERS = 4
+
 
 def initialize_config(
         team_key: str, environment: str,
@@ -58,6 +61,80 @@ def initialize_config(
     return conf_manager
 
 
+def config_key(team_key: str, environment: str) -> str:
+    """
+    Build the key of a team and environment configuration in the result of `initialize_configs`.
+
+    Args:
+        team_key (str): The team key.
+        environment (str): The environment.
+
+    Returns:
+        str: The key, '<team_key>/<environment>'.
+    """
+    return f"{team_key}/{environment}"
+
+
+def initialize_configs(params: List[Dict[str, Any]], max_workers: int = DEFAULT_INIT_WORKERS,
+                       initialize: Callable[..., ConfManager] = initialize_config) -> Dict[str, ConfManager]:
+    """
+    Initialize the configurations of several teams and environments concurrently, failing on the first error.
+
+    Teams are initialized in parallel by at most `max_workers` threads. The environments of one team run
+    one after another, as they share the team's local secrets file. Once an initialization fails, the
+    ones not yet started are cancelled and the error is raised without waiting for the others.
+
+    Args:
+        params (List[Dict[str, Any]]): One entry per configuration, with the `initialize_config` arguments
+            ('team_key', 'environment', 'detect_env_vars', 'remote_config_src_type', 'allow_remote_update');
+            other keys are ignored.
+        max_workers (int): Maximum number of teams initialized at once.
+        initialize (Callable[..., ConfManager]): The initialization of one configuration.
+
+    Returns:
+        Dict[str, ConfManager]: The configuration managers by `config_key`.
+
+    Raises:
+        RuntimeError: If a configuration cannot be initialized.
+    """
+    teams: Dict[str, List[Dict[str, Any]]] = {}
+    for param in params:
+        team_params = teams.setdefault(param['team_key'], [])
+        if all(param['environment'] != other['environment'] for other in team_params):
+            team_params.append(param)
+
+    def initialize_team(team_params: List[Dict[str, Any]]) -> Dict[str, ConfManager]:
+        team_configs = {}
+        for param in team_params:
+            key = config_key(param['team_key'], param['environment'])
+            try:
+                team_configs[key] = initialize(
+                    team_key=param['team_key'], environment=param['environment'],
+                    detect_env_vars=param.get('detect_env_vars', False),
+                    remote_config_src_type=param.get('remote_config_src_type'),
+                    allow_remote_update=param.get('allow_remote_update', False))
+            except Exception as e:
+                raise RuntimeError(f"Initialization of the {key} configuration failed: {e}") from e
+        return team_configs
+
+    configs: Dict[str, ConfManager] = {}
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(teams) or 1)),
+                                  thread_name_prefix='config-init')
+    try:
+        futures = [executor.submit(initialize_team, team_params) for team_params in teams.values()]
+        # Returns once every team is done, or as soon as one of them fails
+        done, _ = wait(futures, return_when=FIRST_EXCEPTION)
+        for future in done:
+            if future.exception() is not None:
+                raise future.exception()
+        for future in futures:
+            configs.update(future.result())
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    LOGGER.info(f"Initialized {len(configs)} configurations: {sorted(configs)}")
+    return configs
+
+
 def load_local_config(env_manager: EnvironmentsManager, team_path: Path, environment: str) -> None:
     """
     Load local configuration settings.
@@ -0,0 +1,24 @@
+import logging
+
+import pytest
+
+from utils.framework.batch_runner import BatchRunner
+
+LOGGER = logging.getLogger(__name__)
+
+# Selected with --batch_runner, in place of the per-table tests of the other modules
+pytestmark = pytest.mark.batch_runner
+
+
+def test_batch_data_loading(batch_runner_fixture: BatchRunner, table_name):
+    # Tables share one runner per team and environment: the next tables' S3 files and EDWP extracts
+    # are fetched while this one is compared. Run without xdist, or with `--dist loadscope`, so all
+    # tables of this module go through the same runner.
+    outcome = batch_runner_fixture.run_table(table_name)
+
+    if outcome.error is not None:
+        raise outcome.error
+    if outcome.report_path is not None:
+        assert outcome.are_identical, f"DataFrames are not identical: {outcome.message}\n" \
+                                      f"See {outcome.report_path} for details."
+    assert outcome.are_identical, f"DataFrames are not identical: {outcome.message}"
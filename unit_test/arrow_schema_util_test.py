@@ -0,0 +1,27 @@
+import unittest
+import pyarrow as pa
+from utils.commons.arrow_schema_util import compile_arrow_schema, sql_type_to_arrow
+
+
+class TestArrowSchemaUtil(unittest.TestCase):
+
+    def test_sql_type_to_arrow(self):
+        self.assertEqual(sql_type_to_arrow('VARCHAR(100)'), pa.string())
+        self.assertEqual(sql_type_to_arrow('NUMERIC(30, 20)'), pa.decimal128(30, 20))
+        self.assertEqual(sql_type_to_arrow('numeric'), pa.decimal128(18, 0))
+        self.assertEqual(sql_type_to_arrow('DOUBLE PRECISION'), pa.float64())
+        self.assertEqual(sql_type_to_arrow('TIMESTAMP'), pa.timestamp('us'))
+        with self.assertRaises(ValueError):
+            sql_type_to_arrow('GEOMETRY')
+
+    def test_compile_arrow_schema_with_column_map(self):
+        schema = compile_arrow_schema([('col_a', 'VARCHAR(10)'), ('col_b', 'NUMERIC(25, 21)')], ['sku_cd', 'wgt_qty'])
+        self.assertEqual(schema, pa.schema([('sku_cd', pa.string()), ('wgt_qty', pa.decimal128(25, 21))]))
+
+    def test_compile_arrow_schema_length_mismatch(self):
+        with self.assertRaises(ValueError):
+            compile_arrow_schema([('col_a', 'VARCHAR(10)')], ['sku_cd', 'wgt_qty'])
+
+
+if __name__ == "__main__":
+    unittest.main()
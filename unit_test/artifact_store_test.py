@@ -0,0 +1,89 @@
+import io
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+import shutil
+import polars as pl
+from utils.framework.artifact_store import ParquetArtifactStore
+from utils.framework.s3_utils import fetch_parquet_from_s3
+
+
+class TestArtifactStore(unittest.TestCase):
+
+    def setUp(self):
+        self.sandbox = Path(__file__).parent / 'scratch_unittest_folder/artifact_store'
+        self.sandbox.mkdir(parents=True, exist_ok=True)
+        self.store = ParquetArtifactStore(self.sandbox / 'store', max_bytes=10 ** 9)
+
+    def tearDown(self):
+        shutil.rmtree(self.sandbox)
+
+    def write_parquet(self, name, rows=10):
+        file_path = self.sandbox / f"{name}.parquet"
+        pl.DataFrame({'sku_cd': [f"sku{i}" for i in range(rows)]}).write_parquet(file_path)
+        return file_path
+
+    def test_key_depends_on_etag_and_settings(self):
+        key = ParquetArtifactStore.make_key('"abc"', {'delimiter': '|'})
+        self.assertEqual(key, ParquetArtifactStore.make_key('abc', {'delimiter': '|'}))
+        self.assertNotEqual(key, ParquetArtifactStore.make_key('abc', {'delimiter': ','}))
+
+    def test_put_get_and_stats(self):
+        self.assertIsNone(self.store.get('k1'))
+        self.store.put('k1', self.write_parquet('a'), source_bytes=500)
+        artifact_path = self.store.get('k1')
+        self.assertEqual(pl.read_parquet(artifact_path).height, 10)
+        stats = self.store.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['bytes_saved']), (1, 1, 500))
+        self.assertEqual(stats['hit_rate'], 0.5)
+
+    def test_least_recently_used_artifact_is_evicted(self):
+        first = self.write_parquet('a')
+        self.store.max_bytes = first.stat().st_size * 2
+        self.store.put('k1', first)
+        self.store.put('k2', self.write_parquet('b'))
+        self.store.get('k1')
+        self.store.put('k3', self.write_parquet('c'))
+        self.assertIsNotNone(self.store.get('k1'))
+        self.assertIsNone(self.store.get('k2'))
+        self.assertIsNotNone(self.store.get('k3'))
+
+    @patch('utils.framework.s3_utils.get_project_root_path')
+    def test_fetch_parquet_reuses_unchanged_objects(self, mock_root):
+        mock_root.return_value = self.sandbox
+        s3_client = MagicMock()
+        s3_client.get_paginator.return_value.paginate.return_value = [
+            {'Contents': [{'Key': 'stage/part_0.csv', 'ETag': '"e0"', 'Size': 20}]}]
+        s3_client.get_object.side_effect = lambda Bucket, Key, **kwargs: {'Body': io.BytesIO(b"sku_cd\nsku0\n")}
+
+        for _ in range(2):
+            table_path = fetch_parquet_from_s3(s3_client, 'bucket', 'stage/', 't1', self.store)
+            self.assertEqual(pl.read_parquet(table_path / 'part_0.parquet')['sku_cd'].to_list(), ['sku0'])
+
+        self.assertEqual(s3_client.get_object.call_count, 1)
+        self.assertEqual(self.store.stats()['bytes_saved'], 20)
+
+    @patch('utils.framework.s3_utils.get_project_root_path')
+    def test_fetch_parquet_keeps_objects_of_sub_prefixes_apart(self, mock_root):
+        mock_root.return_value = self.sandbox
+        s3_client = MagicMock()
+        s3_client.get_paginator.return_value.paginate.return_value = [
+            {'Contents': [{'Key': 'stage/2024/part.csv', 'ETag': '"e1"', 'Size': 20},
+                          {'Key': 'stage/2025/part.csv', 'ETag': '"e2"', 'Size': 20}]}]
+        s3_client.get_object.side_effect = lambda Bucket, Key, **kwargs: {
+            'Body': io.BytesIO(f"sku_cd\n{Key.split('/')[1]}\n".encode())}
+
+        table_path = fetch_parquet_from_s3(s3_client, 'bucket', 'stage/', 't1', self.store)
+        self.assertEqual(sorted(path.name for path in table_path.glob('*.parquet')),
+                         ['2024__part.parquet', '2025__part.parquet'])
+        self.assertEqual(pl.read_parquet(table_path / '2025__part.parquet')['sku_cd'].to_list(), [2025])
+
+        s3_client.get_paginator.return_value.paginate.return_value = [
+            {'Contents': [{'Key': 'stage/part.csv', 'ETag': '"e3"', 'Size': 20},
+                          {'Key': 'stage/part.csv.gz', 'ETag': '"e4"', 'Size': 20}]}]
+        with self.assertRaises(ValueError):
+            fetch_parquet_from_s3(s3_client, 'bucket', 'stage/', 't1', self.store)
+
+
+if __name__ == "__main__":
+    unittest.main()
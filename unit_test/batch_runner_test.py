@@ -0,0 +1,183 @@
+import importlib.util
+import os
+import threading
+import unittest
+from pathlib import Path
+import shutil
+from unittest.mock import MagicMock, patch
+import polars as pl
+from utils.commons.polars_comp_util import compare_dataframes
+from utils.framework.batch_runner import (BatchRunner, TableInputs, fetch_edwp_extract, normalize_for_comparison,
+                                          validate_table)
+from utils.framework.shared_dataset import SharedDatasetRegistry
+
+STAGE_SETTINGS = {'stage': {'aws_s3': {'stg_s3_bucket': 'bucket', 'stg_s3_path': 'path/'}}}
+SPARK_AVAILABLE = importlib.util.find_spec('pyspark') is not None and bool(os.environ.get('JAVA_HOME')
+                                                                           or shutil.which('java'))
+
+
+class TestBatchRunner(unittest.TestCase):
+
+    def setUp(self):
+        self.sandbox = Path(__file__).parent / 'scratch_unittest_folder/batch_runner'
+        self.sandbox.mkdir(parents=True, exist_ok=True)
+        self.settings = {table: STAGE_SETTINGS for table in ('t1', 't2', 't3')}
+        self.stage_df = pl.DataFrame({'sku_cd': ['a', 'b'], 'qty': ['1', '2']})
+        for table in self.settings:
+            (self.sandbox / table).mkdir(exist_ok=True)
+            self.stage_df.write_parquet(self.sandbox / table / 'part.parquet')
+        self.fetch_log = []
+        self.fetch_lock = threading.Lock()
+
+    def tearDown(self):
+        shutil.rmtree(self.sandbox)
+
+    def fake_stage_fetch(self, settings, table_name, *args):
+        with self.fetch_lock:
+            self.fetch_log.append(('stage', table_name))
+        return self.sandbox / table_name
+
+    def fake_edwp_fetch(self, settings, table_name, engine, query_cache=None):
+        with self.fetch_lock:
+            self.fetch_log.append(('edwp', table_name))
+        qty = ['1', '9'] if table_name == 't2' else ['1', '2']
+        return pl.DataFrame({'sku_cd': ['a', 'b'], 'qty': qty}), {'load_ts': 0}
+
+    def make_runner(self, prefetch_tables=1):
+        return BatchRunner(self.settings, ['t1', 't2', 't3'], MagicMock(), MagicMock(),
+                           prefetch_tables=prefetch_tables, store=MagicMock(), query_cache=MagicMock(),
+                           report_dir=self.sandbox / 'reports', datasets=SharedDatasetRegistry(self.sandbox / 'datasets'))
+
+    def test_tables_are_validated_with_prefetch(self):
+        with patch('utils.framework.batch_runner.fetch_stage_parquet', self.fake_stage_fetch), \
+                patch('utils.framework.batch_runner.fetch_edwp_extract', self.fake_edwp_fetch), \
+                self.make_runner() as runner:
+            first = runner.run_table('t1')
+            # The next table was requested before the first one was compared
+            self.assertIn(('edwp', 't2'), self.fetch_log)
+            self.assertNotIn(('edwp', 't3'), self.fetch_log)
+            second = runner.run_table('t2')
+            third = runner.run_table('t3')
+
+        self.assertTrue(first.are_identical and third.are_identical)
+        self.assertFalse(second.are_identical)
+        self.assertTrue(second.report_path.exists())
+        self.assertEqual(sorted(self.fetch_log), sorted((source, table) for table in ('t1', 't2', 't3')
+                                                        for source in ('stage', 'edwp')))
+
+    def test_stage_data_is_shared_between_runs(self):
+        with patch('utils.framework.batch_runner.fetch_stage_parquet', self.fake_stage_fetch), \
+                patch('utils.framework.batch_runner.fetch_edwp_extract', self.fake_edwp_fetch):
+            for _ in range(2):
+                with self.make_runner() as runner:
+                    self.assertTrue(runner.run_table('t1').are_identical)
+        stats = runner.datasets.stats()
+        self.assertEqual((stats['builds'], stats['hits'], stats['references']), (1, 1, 0))
+
+    def test_fetch_errors_are_reported_per_table(self):
+        def failing_edwp_fetch(settings, table_name, engine, query_cache=None):
+            if table_name == 't1':
+                raise RuntimeError("Failed to execute query")
+            return self.fake_edwp_fetch(settings, table_name, engine)
+
+        with patch('utils.framework.batch_runner.fetch_stage_parquet', self.fake_stage_fetch), \
+                patch('utils.framework.batch_runner.fetch_edwp_extract', failing_edwp_fetch), \
+                self.make_runner(prefetch_tables=0) as runner:
+            failed = runner.run_table('t1')
+            passed = runner.run_table('t3')
+
+        self.assertIsInstance(failed.error, RuntimeError)
+        self.assertIn("Failed to execute query", failed.message)
+        self.assertTrue(passed.are_identical)
+        self.assertNotIn(('edwp', 't2'), self.fetch_log)
+
+    @patch('utils.framework.batch_runner.read_sql_query_cached')
+    def test_edwp_extract_pushes_audit_checks_down(self, mock_read):
+        table_settings = {'stage': {'aws_s3': {'column_map': ['sku_cd', 'qty']}},
+                          'warehouse': {'redshift': {'edwp': {'audit_columns': ['load_ts', 'batch_id']}}}}
+        mock_read.side_effect = [pl.DataFrame({'row_count': [2], 'load_ts_null_count': [0],
+                                               'batch_id_null_count': [1]}),
+                                 pl.DataFrame({'sku_cd': ['a', 'b'], 'qty': ['1', '2']})]
+        edwp_df, null_counts = fetch_edwp_extract({'edwp_schema_name': 'edwp', 't1': table_settings}, 't1',
+                                                  MagicMock(), query_cache=MagicMock())
+
+        self.assertEqual(null_counts, {'load_ts': 0, 'batch_id': 1})
+        self.assertEqual(edwp_df.columns, ['sku_cd', 'qty'])
+        audit_query, extraction_query = (call.args[1] for call in mock_read.call_args_list)
+        self.assertIn("COUNT(*) - COUNT(batch_id) AS batch_id_null_count", audit_query)
+        self.assertEqual(extraction_query, "SELECT\n    sku_cd,\n    qty\nFROM edwp.t1")
+
+    @patch('utils.framework.batch_runner.read_sql_query_cached')
+    def test_edwp_extract_without_audit_columns_finds_them_by_name(self, mock_read):
+        table_settings = {'stage': {'aws_s3': {'column_map': ['sku_cd', 'qty']}}}
+        # The audit columns are not the last ones of the EDWP table
+        mock_read.side_effect = [pl.DataFrame(schema=['a1', 'SKU_CD', 'a2', 'qty']),
+                                 pl.DataFrame({'row_count': [1], 'a1_null_count': [0], 'a2_null_count': [1]}),
+                                 pl.DataFrame({'sku_cd': ['a'], 'qty': ['1']})]
+        edwp_df, null_counts = fetch_edwp_extract({'edwp_schema_name': 'edwp', 't1': table_settings}, 't1',
+                                                  MagicMock(), query_cache=MagicMock())
+
+        self.assertEqual(edwp_df.columns, ['sku_cd', 'qty'])
+        self.assertEqual(null_counts, {'a1': 0, 'a2': 1})
+        discovery_query, audit_query, extraction_query = (call.args[1] for call in mock_read.call_args_list)
+        self.assertEqual(discovery_query, "SELECT * FROM edwp.t1 LIMIT 0;")
+        self.assertIn("COUNT(*) - COUNT(a2) AS a2_null_count", audit_query)
+        self.assertEqual(extraction_query, "SELECT\n    sku_cd,\n    qty\nFROM edwp.t1")
+
+    @patch('utils.framework.batch_runner.read_sql_query_cached')
+    def test_edwp_extract_of_spark_tables_only_checks_audit_columns(self, mock_read):
+        table_settings = {'stage': {'aws_s3': {'column_map': ['sku_cd']}},
+                          'test_info': {'data_processing_core': 'spark'}}
+        mock_read.side_effect = [pl.DataFrame(schema=['sku_cd', 'a1', 'a2', 'a3']),
+                                 pl.DataFrame({'row_count': [2], 'a1_null_count': [0], 'a2_null_count': [1],
+                                               'a3_null_count': [0]})]
+        edwp_df, null_counts = fetch_edwp_extract({'t1': table_settings}, 't1', MagicMock(), query_cache=MagicMock())
+
+        self.assertIsNone(edwp_df)
+        self.assertEqual(null_counts, {'a1': 0, 'a2': 1, 'a3': 0})
+        self.assertEqual(mock_read.call_count, 2)
+
+    @unittest.skipUnless(SPARK_AVAILABLE, "pyspark or a Java runtime is not installed")
+    def test_spark_tables_are_compared_with_spark(self):
+        unload_path = self.sandbox / 'unload'
+        unload_path.mkdir()
+        pl.DataFrame({'sku_cd': ['b', 'a'], 'qty': ['2', '3'], 'load_ts': ['x', 'y']}).write_parquet(
+            unload_path / 'part.parquet')
+        stage_settings = {**STAGE_SETTINGS['stage']['aws_s3'], 'column_map': ['sku_cd', 'qty']}
+        self.settings['t1'] = {'stage': {'aws_s3': stage_settings},
+                               'test_info': {'data_processing_core': 'spark'},
+                               'comparison': {'key_columns': ['sku_cd']},
+                               'warehouse': {'redshift': {'edwp': {'unload_path': str(unload_path)}}}}
+        self.settings['spark_master'] = 'local[2]'
+        inputs = TableInputs(self.sandbox / 't1', None, None, {'load_ts': 0})
+
+        outcome = validate_table(self.settings, 't1', inputs, self.sandbox / 'reports')
+        self.assertFalse(outcome.are_identical)
+        self.assertIn("1 mismatches between stage and edwp", outcome.message)
+        self.assertTrue(outcome.report_path.exists())
+        saved = pl.read_parquet(self.sandbox / 'reports' / 't1' / 'mismatches.parquet')
+        self.assertEqual(saved.select('sku_cd', 'column_name', 'left_value', 'right_value').row(0),
+                         ('a', 'qty', '1', '3'))
+
+    def test_low_cardinality_columns_are_compared_as_categoricals(self):
+        stage_df = pl.DataFrame({'sku_cd': [str(i) for i in range(100)], 'wgt_unit_cd': ['kg', 'lb'] * 50})
+        edwp_df = stage_df.reverse().with_columns(
+            pl.when(pl.col('sku_cd') == '7').then(pl.lit('g')).otherwise(pl.col('wgt_unit_cd')).alias('wgt_unit_cd'))
+        table_settings = {'stage': {'aws_s3': {'external_table_columns': "sku_cd VARCHAR(10), wgt_unit_cd VARCHAR(5)"}},
+                          'comparison': {'mode': 'typed'}}
+        for mode, unit_type in (('typed', pl.Categorical), ('string', pl.Utf8)):
+            table_settings['comparison']['mode'] = mode
+            df1, df2, rules = normalize_for_comparison(table_settings, stage_df, edwp_df)
+            self.assertEqual((df1.schema['wgt_unit_cd'], df1.schema['sku_cd']), (unit_type, pl.Utf8), mode)
+            are_identical, _, mismatch_result = compare_dataframes(df1, df2, key_columns=['sku_cd'], rules=rules)
+            self.assertFalse(are_identical)
+            self.assertEqual(mismatch_result.lazy().collect().select('sku_cd', 'left_value', 'right_value').row(0),
+                             ('7', 'lb', 'g'))
+
+        table_settings['comparison'] = {'mode': 'typed', 'categorical_columns': []}
+        df1, _, _ = normalize_for_comparison(table_settings, stage_df, edwp_df)
+        self.assertEqual(df1.schema['wgt_unit_cd'], pl.Utf8)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import threading
+import unittest
+from unittest.mock import patch
+from utils.commons.cloud_connection import clear_aws_clients, get_aws_client, get_client_config, get_s3_client
+
+SETTINGS = {'parquet_conversion_workers': 4, 's3_transfer': {'max_concurrency': 8},
+            'aws_client': {'connect_timeout': 5, 'read_timeout': 30, 'max_attempts': 3, 'region': 'eu-west-1'}}
+
+
+class TestCloudConnection(unittest.TestCase):
+
+    def setUp(self):
+        clear_aws_clients()
+        patcher = patch('utils.commons.cloud_connection.boto3.session.Session')
+        self.mock_session = patcher.start()
+        self.mock_session.return_value.client.side_effect = lambda service, **kwargs: object()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(clear_aws_clients)
+
+    def test_client_config_is_read_from_settings(self):
+        config = get_client_config(SETTINGS)
+        self.assertEqual((config.connect_timeout, config.read_timeout), (5, 30))
+        self.assertEqual(config.retries, {'mode': 'adaptive', 'max_attempts': 3})
+        self.assertTrue(config.tcp_keepalive)
+        self.assertEqual(config.max_pool_connections, 50)
+        self.assertEqual(get_client_config({**SETTINGS, 'parquet_conversion_workers': 16}).max_pool_connections, 128)
+        self.assertEqual(get_client_config({'aws_client': {'max_pool_connections': 10}}).max_pool_connections, 10)
+
+    def test_clients_are_cached_by_service_region_and_profile(self):
+        s3_client = get_s3_client(SETTINGS)
+        self.assertIs(get_aws_client('s3', region='eu-west-1'), s3_client)
+        self.assertIsNot(get_aws_client('s3', region='us-east-1'), s3_client)
+        self.assertIsNot(get_aws_client('s3', region='eu-west-1', profile='audit'), s3_client)
+        self.assertIsNot(get_aws_client('ssm', region='eu-west-1'), s3_client)
+        self.assertEqual([call.kwargs for call in self.mock_session.call_args_list],
+                         [{'profile_name': None}, {'profile_name': 'audit'}])
+
+    def test_concurrent_callers_share_one_client(self):
+        barrier = threading.Barrier(8)
+        clients = []
+
+        def get_client():
+            barrier.wait()
+            clients.append(get_aws_client('secretsmanager'))
+
+        threads = [threading.Thread(target=get_client) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len({id(client) for client in clients}), 1)
+        self.assertEqual(self.mock_session.return_value.client.call_count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
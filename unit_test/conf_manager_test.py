@@ -24,6 +24,12 @@ class TestConfManager(unittest.TestCase):
         self.conf_manager.clear()
         self.assertIsNone(self.conf_manager.get("key3"))
 
+    def test_from_settings_copies_the_settings(self):
+        settings = {"table": {"columns": ["a"]}}
+        conf_manager = ConfManager.from_settings(settings)
+        conf_manager.get("table")["columns"].append("b")
+        self.assertEqual(settings, {"table": {"columns": ["a"]}})
+
 
 class MockLoader:
     def __init__(self, data):
@@ -0,0 +1,60 @@
+import unittest
+from pathlib import Path
+import shutil
+import polars as pl
+from utils.commons.duckdb_comp_util import compare_parquet_datasets
+
+
+class TestDuckdbCompUtil(unittest.TestCase):
+    sandbox = None
+
+    @classmethod
+    def setUpClass(cls):
+        cls.sandbox = Path(__file__).parent / 'scratch_unittest_folder/duckdb'
+        cls.sandbox.mkdir(parents=True, exist_ok=True)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.sandbox)
+
+    def write_parquet(self, name, data):
+        file_path = TestDuckdbCompUtil.sandbox / f"{name}.parquet"
+        pl.DataFrame(data).write_parquet(file_path)
+        return file_path
+
+    def test_identical_datasets(self):
+        left = self.write_parquet('left_same', {'sku_cd': ['a', 'b'], 'wgt_qty': [1.5, 2.0]})
+        right = self.write_parquet('right_same', {'sku_cd': ['b', 'a'], 'wgt_qty': [2.0, 1.5]})
+        are_identical, _, counts, sample_df = compare_parquet_datasets([left], [right], ['sku_cd', 'wgt_qty'])
+        self.assertTrue(are_identical)
+        self.assertEqual(sample_df.height, 0)
+
+    def test_differences_in_both_directions(self):
+        left = self.write_parquet('left_diff', {'col_0': ['a', 'b', 'c'], 'col_1': [1.0, 2.0, 3.0]})
+        right = self.write_parquet('right_diff', {'sku_cd': ['a', 'b', 'd'], 'wgt_qty': [1.0, 2.5, 4.0]})
+        are_identical, _, counts, sample_df = compare_parquet_datasets(
+            [left], [right], ['sku_cd', 'wgt_qty'], left_relation='qe_local.stage_data',
+            left_column_map=['sku_cd', 'wgt_qty'], sample_size=1, threads=2)
+        self.assertFalse(are_identical)
+        self.assertEqual(counts, {'stage_rows': 3, 'edwp_rows': 3, 'stage_only': 2, 'edwp_only': 2})
+        self.assertEqual(sample_df['diff_direction'].to_list(), ['stage_only', 'edwp_only'])
+
+    def test_duplicate_rows_are_detected(self):
+        left = self.write_parquet('left_dup', {'sku_cd': ['a', 'a']})
+        right = self.write_parquet('right_dup', {'sku_cd': ['a']})
+        are_identical, _, counts, _ = compare_parquet_datasets([left], [right], ['sku_cd'])
+        self.assertFalse(are_identical)
+        self.assertEqual((counts['stage_only'], counts['edwp_only']), (1, 1))
+
+    def test_duplicate_counts_are_compared_with_equal_totals(self):
+        left = self.write_parquet('left_dup_total', {'sku_cd': ['x', 'x', 'y']})
+        right = self.write_parquet('right_dup_total', {'sku_cd': ['x', 'y', 'y']})
+        are_identical, _, counts, sample_df = compare_parquet_datasets([left], [right], ['sku_cd'])
+        self.assertFalse(are_identical)
+        self.assertEqual(counts, {'stage_rows': 3, 'edwp_rows': 3, 'stage_only': 2, 'edwp_only': 2})
+        self.assertEqual(sample_df.sort('diff_direction', 'sku_cd').rows(),
+                         [('x', 1, 'edwp_only'), ('y', 2, 'edwp_only'), ('x', 2, 'stage_only'), ('y', 1, 'stage_only')])
+
+
+if __name__ == "__main__":
+    unittest.main()
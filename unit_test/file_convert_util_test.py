@@ -0,0 +1,74 @@
+import gzip
+import unittest
+from decimal import Decimal
+from pathlib import Path
+import shutil
+import polars as pl
+import pyarrow as pa
+import pyarrow.parquet as pq
+from utils.commons.file_convert_util import convert_to_parquet, stream_csv_to_parquet
+
+
+class TestFileConvertUtil(unittest.TestCase):
+    sandbox = None
+
+    def setUp(self):
+        self.sandbox = Path(__file__).parent / 'scratch_unittest_folder/file_convert'
+        self.sandbox.mkdir(parents=True, exist_ok=True)
+        for i in range(3):
+            (self.sandbox / f"part_{i}.csv").write_text(f"sku_cd|wgt_qty\nsku{i}|{i}.5\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.sandbox)
+
+    def test_convert_directory_in_parallel(self):
+        parquet_paths = convert_to_parquet(self.sandbox, 'csv', delimiter='|', workers=2)
+        self.assertEqual(len(parquet_paths), 3)
+        self.assertEqual(list(self.sandbox.glob('*.csv')), [])
+        df = pl.read_parquet(self.sandbox / 'part_1.parquet')
+        self.assertEqual(df.to_dicts(), [{'sku_cd': 'sku1', 'wgt_qty': 1.5}])
+
+    def test_keep_original_files(self):
+        convert_to_parquet(self.sandbox / 'part_0.csv', 'csv', delete_original=False)
+        self.assertTrue((self.sandbox / 'part_0.csv').exists())
+        self.assertTrue((self.sandbox / 'part_0.parquet').exists())
+
+    def test_bad_file_does_not_abort_others(self):
+        (self.sandbox / 'part_1.csv').write_text("sku_cd|wgt_qty\nsku1|1|extra\n")
+        with self.assertRaises(RuntimeError) as context:
+            convert_to_parquet(self.sandbox, 'csv', workers=2)
+        self.assertIn('part_1.csv: ArrowInvalid: CSV parse error', str(context.exception))
+        self.assertTrue((self.sandbox / 'part_0.parquet').exists())
+        self.assertTrue((self.sandbox / 'part_2.parquet').exists())
+
+    def test_stream_gzip_file_in_row_groups(self):
+        gzip_path = self.sandbox / 'large.csv.gz'
+        with gzip.open(gzip_path, 'wt') as file:
+            file.write("sku_cd|wgt_qty\n" + "".join(f"sku{i}|{i}.25\n" for i in range(1000)))
+        parquet_path = stream_csv_to_parquet(gzip_path, row_group_size=300, block_size=4096, compression='snappy')
+
+        self.assertEqual(parquet_path, self.sandbox / 'large.parquet')
+        metadata = pq.ParquetFile(parquet_path).metadata
+        self.assertEqual(metadata.num_rows, 1000)
+        self.assertGreaterEqual(metadata.num_row_groups, 3)
+        self.assertEqual(metadata.row_group(0).column(0).compression, 'SNAPPY')
+        self.assertTrue(metadata.row_group(0).column(0).is_stats_set)
+
+    def test_convert_directory_includes_gzip_files(self):
+        with gzip.open(self.sandbox / 'part_3.csv.gz', 'wt') as file:
+            file.write("sku_cd|wgt_qty\nsku3|3.5\n")
+        parquet_paths = convert_to_parquet(self.sandbox, 'csv', parquet_options={'compression': 'zstd'})
+        self.assertEqual(len(parquet_paths), 4)
+        self.assertEqual(pl.read_parquet(self.sandbox / 'part_3.parquet')['sku_cd'].to_list(), ['sku3'])
+
+    def test_convert_with_schema(self):
+        (self.sandbox / 'part_0.csv').write_text("a|b\n00123|0.12345678901234567890\n")
+        schema = pa.schema([('sku_cd', pa.string()), ('wgt_qty', pa.decimal128(30, 20))])
+        convert_to_parquet(self.sandbox / 'part_0.csv', 'csv', schema=schema)
+        table = pq.read_table(self.sandbox / 'part_0.parquet')
+        self.assertEqual(table.schema, schema)
+        self.assertEqual(table.to_pylist(), [{'sku_cd': '00123', 'wgt_qty': Decimal('0.12345678901234567890')}])
+
+
+if __name__ == "__main__":
+    unittest.main()
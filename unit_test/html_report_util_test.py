@@ -0,0 +1,78 @@
+import unittest
+from pathlib import Path
+import shutil
+import polars as pl
+from utils.commons.html_report_util import write_mismatch_report
+from utils.commons.mismatch_result import MismatchResult
+from utils.commons.polars_comp_util import compare_dataframes, generate_html_report
+
+
+class TestHtmlReportUtil(unittest.TestCase):
+
+    def setUp(self):
+        self.sandbox = Path(__file__).parent / 'scratch_unittest_folder/html_report'
+        self.sandbox.mkdir(parents=True, exist_ok=True)
+
+    def tearDown(self):
+        shutil.rmtree(self.sandbox)
+
+    def test_report_is_paginated_with_summary(self):
+        left = pl.DataFrame({'sku_cd': [f"sku{i}" for i in range(5)], 'wgt_qty': ['1', '2', '3', '4', None]})
+        right = pl.DataFrame({'sku_cd': [f"sku{i}" for i in range(5)], 'wgt_qty': ['1', '9', '3', '9', '5']})
+        index_path = write_mismatch_report(left, right.lazy(), self.sandbox / 'report.html', 'stage', 'edwp',
+                                           rows_per_page=2)
+
+        pages = sorted((self.sandbox / 'report_pages').glob('*.html'))
+        self.assertEqual([page.name for page in pages], ['page_00001.html', 'page_00002.html', 'page_00003.html'])
+        index_html = index_path.read_text()
+        self.assertIn("5 mismatched rows", index_html)
+        self.assertIn("<tr><td>wgt_qty</td><td>3</td></tr>", index_html)
+        self.assertIn("<tr><td>sku_cd</td><td>0</td></tr>", index_html)
+
+        first_page = pages[0].read_text()
+        self.assertEqual(first_page.count('class="diff"'), 2)
+        self.assertIn('<td class="diff">9</td>', first_page)
+        self.assertIn('next</a>', first_page)
+        self.assertNotIn('next</a>', pages[2].read_text())
+        self.assertIn('<td class="diff null">null</td>', pages[2].read_text())
+
+    def test_misaligned_sides_are_rejected(self):
+        left = pl.DataFrame({'a': ['1', '2', '3']})
+        pl.DataFrame({'a': ['1', '2']}).write_parquet(self.sandbox / 'right.parquet')
+        with self.assertRaises(ValueError):
+            write_mismatch_report(left, pl.scan_parquet(self.sandbox / 'right.parquet'), self.sandbox / 'r.html',
+                                  rows_per_page=2)
+
+    def test_values_are_escaped(self):
+        write_mismatch_report(pl.DataFrame({'a': ['<b>']}), pl.DataFrame({'a': ['&']}), self.sandbox / 'r.html')
+        page = (self.sandbox / 'r_pages/page_00001.html').read_text()
+        self.assertIn('&lt;b&gt;', page)
+        self.assertIn('&amp;', page)
+
+    def test_generate_report_from_comparison(self):
+        df1 = pl.DataFrame({'sku_cd': ['a', 'b'], 'wgt_qty': ['1', '2']})
+        df2 = pl.DataFrame({'sku_cd': ['a', 'c'], 'wgt_qty': ['1', '2']})
+        are_identical, _, mismatch_result = compare_dataframes(df1, df2, 'stage', 'edwp')
+        self.assertFalse(are_identical)
+        generate_html_report(mismatch_result, str(self.sandbox / 'mismatch_report.html'))
+        self.assertIn("<tr><td>sku_cd</td><td>1</td></tr>", (self.sandbox / 'mismatch_report.html').read_text())
+        page = (self.sandbox / 'mismatch_report_pages/page_00001.html').read_text()
+        self.assertIn('<th>column_name</th>', page)
+        self.assertIn('<td class="diff">b</td>', page)
+        self.assertIn('<td class="diff">c</td>', page)
+        self.assertEqual(page.count('class="diff"'), 2)
+
+    def test_generate_report_from_saved_result(self):
+        df1 = pl.DataFrame({'sku_cd': [f"sku{i}" for i in range(5)], 'wgt_qty': ['1', '2', '3', '4', '5']})
+        df2 = df1.with_columns(pl.lit('0').alias('wgt_qty'))
+        _, _, mismatch_result = compare_dataframes(df1, df2, 'stage', 'edwp', key_columns=['sku_cd'])
+        loaded = MismatchResult.load(mismatch_result.save(self.sandbox / 'result'))
+        generate_html_report(loaded, str(self.sandbox / 'saved_report.html'), rows_per_page=2)
+        pages = sorted((self.sandbox / 'saved_report_pages').glob('*.html'))
+        self.assertEqual(len(pages), 3)
+        self.assertIn("5 mismatched rows", (self.sandbox / 'saved_report.html').read_text())
+        self.assertEqual(pages[0].read_text().count('<td class="diff">0</td>'), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,8 +1,11 @@
+import threading
+import time
 import unittest
 from pathlib import Path
 from unittest.mock import patch
 import shutil
-from custom_conf.initialization import load_local_config, load_env_vars, load_remote_secrets
+from custom_conf.initialization import (config_key, initialize_configs, load_local_config, load_env_vars,
+                                        load_remote_secrets)
 from custom_conf.conf_manager import ConfManager
 from custom_conf.environments_manager import EnvironmentsManager
 
@@ -54,5 +57,49 @@ class TestInitialization(unittest.TestCase):
         self.assertEqual(self.conf_manager.get('key3'), 'value3')
 
 
+    def test_initialize_configs_concurrently(self):
+        running, peak, lock = [0], [0], threading.Lock()
+        calls = []
+
+        def initialize(team_key, environment, **kwargs):
+            with lock:
+                calls.append((team_key, environment))
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            time.sleep(0.05)
+            with lock:
+                running[0] -= 1
+            return ConfManager.from_settings({'team': team_key, 'environment': environment})
+
+        params = [{'team_key': team, 'environment': environment} for team in ('a', 'b', 'c')
+                  for environment in ('dev', 'stg')]
+        configs = initialize_configs(params + params[:1], max_workers=2, initialize=initialize)
+
+        self.assertEqual(sorted(configs), sorted(config_key(p['team_key'], p['environment']) for p in params))
+        self.assertEqual(configs['b/stg'].get('environment'), 'stg')
+        self.assertEqual(len(calls), 6)
+        self.assertEqual(peak[0], 2)
+
+    def test_initialize_configs_fails_fast(self):
+        started = []
+
+        def initialize(team_key, environment, **kwargs):
+            started.append(team_key)
+            if team_key == 'a':
+                raise ConnectionError("Vault is unreachable")
+            time.sleep(0.2)
+            return ConfManager()
+
+        params = [{'team_key': team, 'environment': 'stg'} for team in ('a', 'b', 'c', 'd')]
+        start = time.perf_counter()
+        with self.assertRaises(RuntimeError) as context:
+            initialize_configs(params, max_workers=2, initialize=initialize)
+        self.assertIn("a/stg configuration failed: Vault is unreachable", str(context.exception))
+        self.assertLess(time.perf_counter() - start, 0.15)
+        time.sleep(0.3)
+        # Teams waiting for a worker were cancelled
+        self.assertNotIn('d', started)
+
+
 if __name__ == "__main__":
     unittest.main()
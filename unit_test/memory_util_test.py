@@ -0,0 +1,87 @@
+import threading
+import time
+import unittest
+import pyarrow as pa
+from utils.commons.memory_util import MB, MemoryBudgetExceeded, MemoryWatch, current_rss_bytes
+from utils.commons.perf_util import check_memory_budget, get_spans, reset_spans, span, table_context
+
+
+def allocate_in_batches(chunks, steps=100, chunk_mb=8):
+    for _ in range(steps):
+        # Filled, so the pages are resident
+        chunks.append(b'x' * (chunk_mb * MB))
+        check_memory_budget()
+
+
+def sampler_running():
+    return any(thread.name == 'memory-sampler' for thread in threading.enumerate())
+
+
+def wait_for_sampler_exit():
+    for thread in threading.enumerate():
+        if thread.name == 'memory-sampler':
+            thread.join()
+
+
+class TestMemoryUtil(unittest.TestCase):
+
+    def setUp(self):
+        reset_spans()
+
+    def tearDown(self):
+        reset_spans()
+
+    def test_watch_records_peak_rss_and_arrow(self):
+        with MemoryWatch('allocation') as watch:
+            chunk = bytearray(64 * MB)
+            array = pa.array(range(1_000_000))
+            time.sleep(0.05)
+        del chunk, array
+        self.assertGreaterEqual(watch.peak_rss - watch.start_rss, 32 * MB)
+        self.assertGreaterEqual(watch.peak_arrow, 8 * 1_000_000)
+        self.assertFalse(watch.exceeded)
+
+    def test_span_stops_at_the_first_batch_over_the_table_budget(self):
+        budget_mb = current_rss_bytes() / MB + 64
+        chunks = []
+        with table_context('t1', memory_budget_mb=budget_mb):
+            with self.assertRaises(MemoryBudgetExceeded) as context, span('normalize'):
+                allocate_in_batches(chunks)
+        # Stopped at the first batch over the budget, well before allocating the 800 MB of the full loop
+        self.assertLess(len(chunks), 20)
+        chunks.clear()
+        message = str(context.exception)
+        self.assertIn("stage 'normalize' of table t1", message)
+        self.assertIn(f"budget of {budget_mb:.0f} MB", message)
+
+        record = get_spans()[0]
+        self.assertEqual((record['stage'], record['table'], record['status']), ('normalize', 't1', 'error'))
+        self.assertGreater(record['peak_rss_mb'], round(budget_mb, 1) - 0.1)
+
+    def test_spans_within_budget_record_memory(self):
+        with table_context('t1', memory_budget_mb=current_rss_bytes() / MB + 1024):
+            with span('compare'):
+                bytearray(16 * MB)
+        record = get_spans()[0]
+        self.assertEqual(record['status'], 'ok')
+        self.assertIsNotNone(record['peak_rss_mb'])
+        self.assertIsNotNone(record['peak_arrow_mb'])
+
+    def test_peak_released_between_checks_fails_the_span_when_it_ends(self):
+        budget_mb = current_rss_bytes() / MB + 64
+        with table_context('t1', memory_budget_mb=budget_mb):
+            with self.assertRaises(MemoryBudgetExceeded), span('compare'):
+                self.assertTrue(sampler_running())
+                chunk = b'x' * (256 * MB)
+                time.sleep(0.1)
+                del chunk
+        self.assertEqual(get_spans()[0]['status'], 'error')
+
+    def test_sampler_only_runs_for_budgets(self):
+        wait_for_sampler_exit()
+        with span('compare'):
+            self.assertFalse(sampler_running())
+
+
+if __name__ == '__main__':
+    unittest.main()
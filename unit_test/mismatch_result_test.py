@@ -0,0 +1,74 @@
+import unittest
+from pathlib import Path
+import shutil
+import polars as pl
+from utils.commons.mismatch_result import MismatchResult
+from utils.commons.polars_comp_util import compare_dataframes
+
+
+class TestMismatchResult(unittest.TestCase):
+
+    def setUp(self):
+        self.sandbox = Path(__file__).parent / 'scratch_unittest_folder/mismatch_result'
+        self.sandbox.mkdir(parents=True, exist_ok=True)
+        self.stage_df = pl.DataFrame({'sku_cd': ['a', 'b', 'c'], 'wgt_qty': [1.0, 2.0, None], 'uom': ['kg'] * 3})
+        self.edwp_df = pl.DataFrame({'sku_cd': ['d', 'b', 'a'], 'wgt_qty': [1.0, 2.5, 1.0], 'uom': ['kg'] * 3})
+
+    def tearDown(self):
+        shutil.rmtree(self.sandbox)
+
+    def test_keyed_comparison(self):
+        are_identical, message, result = compare_dataframes(self.stage_df, self.edwp_df, 'stage', 'edwp',
+                                                            key_columns=['sku_cd'])
+        self.assertFalse(are_identical)
+        self.assertEqual(result.summary['kind_counts'], {'missing_in_left': 1, 'missing_in_right': 1, 'value': 1})
+        self.assertEqual(result.summary['column_counts'], {'*': 2, 'wgt_qty': 1})
+        self.assertIn("3 mismatches between stage and edwp", message)
+        value_row = result.lazy().filter(pl.col('mismatch_kind') == 'value').collect().row(0, named=True)
+        self.assertEqual(value_row, {'sku_cd': 'b', 'column_name': 'wgt_qty', 'left_value': '2.0',
+                                     'right_value': '2.5', 'mismatch_kind': 'value'})
+
+    def test_keyed_comparison_ignores_row_order(self):
+        are_identical, _, result = compare_dataframes(self.stage_df, self.stage_df.reverse(), key_columns=['sku_cd'])
+        self.assertTrue(are_identical)
+        self.assertTrue(result.is_empty)
+
+    def test_positional_comparison_treats_nulls_as_values(self):
+        are_identical, _, result = compare_dataframes(self.stage_df, self.edwp_df)
+        self.assertFalse(are_identical)
+        self.assertEqual(result.key_columns, ['row_number'])
+        self.assertEqual(result.summary['column_counts'], {'sku_cd': 2, 'wgt_qty': 2})
+
+    def test_column_mismatch_returns_empty_result(self):
+        are_identical, message, result = compare_dataframes(self.stage_df, self.edwp_df.drop('uom'))
+        self.assertFalse(are_identical)
+        self.assertIn("Column mismatch", message)
+        self.assertEqual(len(result), 0)
+
+    def test_save_and_load(self):
+        _, _, result = compare_dataframes(self.stage_df, self.edwp_df, 'stage', 'edwp', key_columns=['sku_cd'])
+        loaded = MismatchResult.load(result.save(self.sandbox / 'result'))
+        self.assertEqual(loaded.summary, result.summary)
+        self.assertEqual(loaded.describe(), result.describe())
+        missing = loaded.lazy().filter(pl.col('column_name') == '*').select('sku_cd').collect()
+        self.assertEqual(sorted(missing['sku_cd'].to_list()), ['c', 'd'])
+
+
+    def test_batches_of_saved_results_span_row_groups_and_files(self):
+        frame = pl.DataFrame({'column_name': [str(i) for i in range(10)], 'left_value': ['1'] * 10,
+                              'right_value': ['2'] * 10, 'mismatch_kind': ['value'] * 10})
+        frame.write_parquet(self.sandbox / 'mismatches.parquet', row_group_size=3)
+        (self.sandbox / 'parts').mkdir()
+        frame.head(5).write_parquet(self.sandbox / 'parts/part-00000.parquet')
+        frame.tail(5).write_parquet(self.sandbox / 'parts/part-00001.parquet')
+        result = MismatchResult(frame, [])
+        saved = MismatchResult(self.sandbox / 'mismatches.parquet', [], summary=result.summary)
+        parts = MismatchResult(self.sandbox / 'parts/*.parquet', [], summary=result.summary)
+        for mismatches in (result, saved, parts):
+            batches = list(mismatches.iter_batches(4))
+            self.assertEqual([batch.height for batch in batches], [4, 4, 2])
+            self.assertTrue(pl.concat(batches).equals(frame))
+
+
+if __name__ == "__main__":
+    unittest.main()
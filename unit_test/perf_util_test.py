@@ -0,0 +1,65 @@
+import json
+import unittest
+from pathlib import Path
+import shutil
+import polars as pl
+from utils.commons.perf_util import (get_spans, merge_span_reports, record_span, reset_spans, span, table_context,
+                                     timed, write_spans)
+
+
+@timed('load')
+def load_frame(rows):
+    return pl.DataFrame({'a': list(range(rows))})
+
+
+class TestPerfUtil(unittest.TestCase):
+
+    def setUp(self):
+        self.sandbox = Path(__file__).parent / 'scratch_unittest_folder/perf_util'
+        self.sandbox.mkdir(parents=True, exist_ok=True)
+        reset_spans()
+
+    def tearDown(self):
+        reset_spans()
+        shutil.rmtree(self.sandbox)
+
+    def test_spans_record_table_rows_and_status(self):
+        with table_context('t1'):
+            with span('s3_download', nbytes=100) as current:
+                current.rows = 5
+            load_frame(3)
+            with self.assertRaises(ValueError), span('compare'):
+                raise ValueError("boom")
+        record_span('csv_to_parquet', 0.5, table='t2', rows=10)
+
+        spans = get_spans()
+        self.assertEqual([(s['stage'], s['table'], s['rows'], s['bytes'], s['status']) for s in spans], [
+            ('s3_download', 't1', 5, 100, 'ok'), ('load', 't1', 3, None, 'ok'), ('compare', 't1', None, None, 'error'),
+            ('csv_to_parquet', 't2', 10, None, 'ok')])
+        self.assertEqual(spans[3]['seconds'], 0.5)
+
+    def test_worker_files_are_merged(self):
+        with table_context('t1'):
+            with span('normalize', rows=10):
+                pass
+        write_spans(self.sandbox, 'gw0')
+        reset_spans()
+        for _ in range(2):
+            with span('normalize', table='t1', rows=20, nbytes=2 * 1024 * 1024):
+                pass
+        write_spans(self.sandbox, 'gw1')
+
+        report_path = merge_span_reports(self.sandbox)
+        summary = json.loads(report_path.read_text())['summary']
+        self.assertEqual(summary['span_count'], 3)
+        stage = summary['stages'][0]
+        self.assertEqual((stage['table'], stage['stage'], stage['calls'], stage['rows'], stage['workers']),
+                         ('t1', 'normalize', 3, 50, ['gw0', 'gw1']))
+        self.assertIn('normalize', (self.sandbox / 'perf_report.txt').read_text())
+
+    def test_no_report_without_spans(self):
+        self.assertIsNone(merge_span_reports(self.sandbox))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+import json
+import unittest
+from pathlib import Path
+import shutil
+import polars as pl
+from decimal import Decimal
+from utils.commons.polars_comp_util import (compare_dataframes, get_inner_join_dataset, get_left_join_dataset,
+                                            get_union_dataset, join_datasets, union_datasets, write_json_rows)
+from utils.commons.polars_util import ColumnRule
+
+
+class TestPolarsCompUtil(unittest.TestCase):
+
+    def setUp(self):
+        self.sandbox = Path(__file__).parent / 'scratch_unittest_folder/polars_comp_util'
+        self.sandbox.mkdir(parents=True, exist_ok=True)
+        self.left = pl.DataFrame({'sku_cd': ['a', 'b', 'b', 'c', None], 'qty': [1, 2, 3, 4, 5]})
+        self.right = pl.DataFrame({'sku_cd': ['b', 'b', 'c', 'd'], 'unit': ['kg', 'lb', 'g', 'oz']})
+
+    def tearDown(self):
+        shutil.rmtree(self.sandbox)
+
+    def test_join_strategies_agree(self):
+        expected = self.left.join(self.right, on='sku_cd', how='inner').sort('sku_cd', 'qty', 'unit')
+        for strategy in ('hash', 'sort_merge'):
+            left = self.left.sort('sku_cd', nulls_last=False)
+            result, stats = join_datasets(left.lazy(), self.right.lazy(), 'sku_cd', strategy=strategy)
+            self.assertTrue(result.sort('sku_cd', 'qty', 'unit').equals(expected), strategy)
+            self.assertEqual(stats['result_rows'], 5)
+
+    def test_join_stats_count_rows_without_scanning_lazy_inputs(self):
+        _, stats = join_datasets(self.left, self.right, 'sku_cd', how='left')
+        self.assertEqual(stats, {'left_rows': 5, 'right_rows': 4, 'result_rows': 7})
+        _, stats = join_datasets(self.left.lazy(), self.right, 'sku_cd', collect=False)
+        self.assertEqual(stats, {'left_rows': None, 'right_rows': 4, 'result_rows': None})
+
+    def test_join_stats_report_fan_out(self):
+        result, stats = join_datasets(self.left, self.right, 'sku_cd', how='left', collect=False, with_fan_out=True)
+        self.assertIsInstance(result, pl.LazyFrame)
+        self.assertEqual(stats, {'left_rows': 5, 'right_rows': 4, 'matched_left_rows': 3, 'max_matches_per_key': 2,
+                                 'result_rows': 7, 'fan_out': 1.4})
+        self.assertEqual(result.collect().height, stats['result_rows'])
+
+    def test_sort_merge_rejects_unsorted_input(self):
+        result, error = join_datasets(self.left.reverse(), self.right, 'sku_cd', strategy='sort_merge')
+        self.assertTrue(result.is_empty())
+        self.assertIn("sorted on sku_cd", error)
+        _, error = join_datasets(self.left, self.right, 'sku_cd', strategy='broadcast')
+        self.assertIn("Unknown join strategy", error)
+
+    def test_missing_key_column(self):
+        result, error = join_datasets(self.left, self.right, 'qty', how='left')
+        self.assertTrue(result.is_empty())
+        self.assertIn("['qty']", error)
+        result, error = get_left_join_dataset(self.left, self.right, 'qty')
+        self.assertTrue(result.is_empty())
+        self.assertEqual(error, "The key column 'qty' is not available in both datasets.")
+
+    def test_eager_helpers_return_json_rows(self):
+        result, rows = get_inner_join_dataset(self.left, self.right, 'sku_cd')
+        self.assertEqual(rows, result.to_dicts())
+        self.assertEqual(len(rows), 5)
+        result, rows = get_left_join_dataset(self.left, self.right, 'sku_cd')
+        self.assertEqual(len(rows), 7)
+        result, rows = get_union_dataset(self.left, self.left)
+        self.assertEqual(sorted(rows, key=str), sorted(self.left.to_dicts(), key=str))
+
+    def test_union_streams_ndjson(self):
+        output_path = self.sandbox / 'union.ndjson'
+        result, stats = union_datasets(self.left.lazy(), self.left.lazy(), collect=False, output_path=output_path)
+        self.assertIsInstance(result, pl.LazyFrame)
+        self.assertEqual(stats, {'left_rows': 5, 'right_rows': 5, 'result_rows': None})
+        rows = [json.loads(line) for line in output_path.read_text().splitlines()]
+        self.assertEqual(len(rows), 5)
+
+    def test_json_array_is_written_in_batches(self):
+        output_path = write_json_rows(self.left, self.sandbox / 'rows.json', batch_size=2)
+        self.assertEqual(json.loads(output_path.read_text()), self.left.to_dicts())
+        write_json_rows(self.left.head(0), output_path)
+        self.assertEqual(json.loads(output_path.read_text()), [])
+
+    def test_compare_within_tolerances(self):
+        schema = {'sku_cd': pl.Utf8, 'amt': pl.Decimal(30, 20), 'rate': pl.Float64}
+        left = pl.DataFrame({'sku_cd': ['a', 'b'], 'amt': [Decimal('1.00000000000000000001'), None],
+                             'rate': [100.0, 2.0]}, schema=schema)
+        right = pl.DataFrame({'sku_cd': ['a', 'b'], 'amt': [Decimal('1.00000000000000000002'), None],
+                              'rate': [100.00001, 2.0]}, schema=schema)
+        rules = {'amt': ColumnRule(abs_tol=1e-19), 'rate': ColumnRule(rel_tol=1e-6)}
+
+        are_identical, message, _ = compare_dataframes(left, right, 'stage', 'edwp', rules=rules)
+        self.assertTrue(are_identical, message)
+        self.assertIn('within the column tolerances', message)
+
+        are_identical, _, mismatch_result = compare_dataframes(left, right, 'stage', 'edwp', key_columns=['sku_cd'],
+                                                               rules={'rate': ColumnRule(rel_tol=1e-9)})
+        self.assertFalse(are_identical)
+        self.assertEqual(sorted(mismatch_result.lazy().collect()['column_name'].to_list()), ['amt', 'rate'])
+
+    def test_null_is_outside_every_tolerance(self):
+        left, right = pl.DataFrame({'rate': [1.0]}), pl.DataFrame({'rate': [None]}, schema={'rate': pl.Float64})
+        are_identical, _, mismatch_result = compare_dataframes(left, right, rules={'rate': ColumnRule(abs_tol=10)})
+        self.assertFalse(are_identical)
+        self.assertEqual(len(mismatch_result), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
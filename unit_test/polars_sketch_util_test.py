@@ -0,0 +1,65 @@
+import unittest
+from pathlib import Path
+import shutil
+import polars as pl
+from utils.commons.polars_sketch_util import (HyperLogLog, TableSketch, build_table_sketch, compare_table_sketches,
+                                              hash_values, probe_row_filter)
+
+
+class TestPolarsSketchUtil(unittest.TestCase):
+    sandbox = None
+
+    @classmethod
+    def setUpClass(cls):
+        cls.sandbox = Path(__file__).parent / 'scratch_unittest_folder/sketches'
+        cls.sandbox.mkdir(parents=True, exist_ok=True)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.sandbox)
+
+    @staticmethod
+    def make_df(n, offset=0):
+        return pl.DataFrame({'sku_cd': [f"sku{i + offset}" for i in range(n)],
+                             'wgt_unit_cd': [f"kg{(i + offset) % 3}" for i in range(n)]})
+
+    def test_hyperloglog_estimate(self):
+        hll = HyperLogLog(12)
+        hll.add_hashes(hash_values(pl.Series([f"v{i}" for i in range(50_000)])))
+        self.assertAlmostEqual(hll.estimate(), 50_000, delta=50_000 * 0.05)
+
+    def test_merged_partial_sketches_match_full_sketch(self):
+        df = self.make_df(1000)
+        params = {'bloom_capacity': 1000, 'cms_width': 64}
+        full = build_table_sketch(df, batch_size=100, **params)
+        part1 = build_table_sketch(df.head(400), **params)
+        part2 = build_table_sketch(df.tail(600), **params)
+        part1.merge(part2)
+        self.assertEqual(compare_table_sketches(full, part1)[0], True)
+
+    def test_serialization_round_trip(self):
+        sketch = build_table_sketch(self.make_df(100), bloom_capacity=100)
+        file_path = TestPolarsSketchUtil.sandbox / 'sketch.npz'
+        sketch.save(file_path)
+        restored = TableSketch.load(file_path)
+        self.assertEqual(restored.columns, sketch.columns)
+        self.assertEqual(restored.row_count, 100)
+        self.assertTrue(compare_table_sketches(sketch, restored)[0])
+
+    def test_compare_detects_differences(self):
+        left = build_table_sketch(self.make_df(100), bloom_capacity=100)
+        right = build_table_sketch(self.make_df(100, offset=3), bloom_capacity=100)
+        possibly_equal, message, details = compare_table_sketches(left, right)
+        self.assertFalse(possibly_equal)
+        self.assertIn('sku_cd', details)
+        self.assertNotIn('wgt_unit_cd', details)
+
+    def test_probe_row_filter(self):
+        sketch = build_table_sketch(self.make_df(100), bloom_capacity=100, bloom_error_rate=0.001)
+        missing_count, sample = probe_row_filter(sketch, self.make_df(100, offset=95))
+        self.assertGreaterEqual(missing_count, 95)
+        self.assertIn('sku194', sample['sku_cd'].to_list())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+import unittest
+from datetime import datetime
+from decimal import Decimal
+import polars as pl
+import pyarrow as pa
+from utils.commons.polars_util import ColumnRule, align_to_schema, convert_df_to_string, encode_categorical, \
+    find_low_cardinality_columns
+
+
+class TestPolarsUtil(unittest.TestCase):
+
+    def test_convert_df_to_string(self):
+        df = pl.DataFrame({'sku_nm': ["B'X", 'a"Y'], 'wgt_qty': [2.50, 1.0], 'fnl_rnk_nbr': [1, 2]})
+        result = convert_df_to_string(df)
+        self.assertEqual(result.schema, {'sku_nm': pl.Utf8, 'wgt_qty': pl.Utf8, 'fnl_rnk_nbr': pl.Utf8})
+        self.assertEqual(result.to_dicts(), [{'sku_nm': 'ay', 'wgt_qty': '1', 'fnl_rnk_nbr': '2'},
+                                             {'sku_nm': 'bx', 'wgt_qty': '2.5', 'fnl_rnk_nbr': '1'}])
+
+    def test_align_to_schema_keeps_native_types(self):
+        schema = pa.schema([pa.field('sku_nm', pa.string()), pa.field('wgt_qty', pa.decimal128(30, 20)),
+                            pa.field('load_ts', pa.timestamp('us')), pa.field('qty', pa.int32())])
+        df = pl.DataFrame({'sku_nm': ['B"x', "A'y"], 'wgt_qty': ['1.00000000000000000001', '2'],
+                           'load_ts': ['2024-01-01 10:00:01.7', '2024-01-01 10:00:00'], 'qty': [' 2', '1']})
+        rules = {'sku_nm': ColumnRule(string_rules=['strip_quotes', 'lowercase']),
+                 'load_ts': ColumnRule(granularity='1s')}
+        result = align_to_schema(df, schema, rules)
+
+        self.assertEqual(result.columns, ['load_ts', 'qty', 'sku_nm', 'wgt_qty'])
+        self.assertEqual(result.schema['wgt_qty'], pl.Decimal(30, 20))
+        self.assertEqual(result.to_dicts(), [
+            {'load_ts': datetime(2024, 1, 1, 10, 0, 0), 'qty': 1, 'sku_nm': 'ay', 'wgt_qty': Decimal('2')},
+            {'load_ts': datetime(2024, 1, 1, 10, 0, 1), 'qty': 2, 'sku_nm': 'bx',
+             'wgt_qty': Decimal('1.00000000000000000001')}])
+
+    def test_align_floats_to_decimals(self):
+        schema = pa.schema([pa.field('amt', pa.decimal128(10, 2))])
+        result = align_to_schema(pl.DataFrame({'amt': [2.5, None]}), schema)
+        self.assertEqual(result['amt'].to_list(), [Decimal('2.5'), None])
+
+    def test_find_low_cardinality_columns(self):
+        df = pl.DataFrame({'wgt_unit_cd': ['kg', 'lb'] * 50, 'sku_cd': [str(i) for i in range(100)],
+                           'qty': list(range(100))})
+        self.assertEqual(find_low_cardinality_columns(df), ['wgt_unit_cd'])
+        self.assertEqual(find_low_cardinality_columns(df, max_categories=1), [])
+        self.assertEqual(find_low_cardinality_columns(df.clear()), [])
+
+    def test_categoricals_share_codes_under_one_string_cache(self):
+        schema = pa.schema([pa.field('wgt_unit_cd', pa.string()), pa.field('qty', pa.int32())])
+        with pl.StringCache():
+            left = align_to_schema(pl.DataFrame({'wgt_unit_cd': ['lb', 'kg', 'g'], 'qty': [1, 2, 3]}), schema,
+                                   categorical_columns=['wgt_unit_cd'])
+            right = align_to_schema(pl.DataFrame({'wgt_unit_cd': ['g', 'lb', 'kg'], 'qty': [3, 1, 2]}), schema,
+                                    categorical_columns=['wgt_unit_cd'])
+            encoded = encode_categorical(pl.DataFrame({'wgt_unit_cd': ['kg'], 'qty': [1]}), ['wgt_unit_cd', 'qty'])
+        self.assertEqual(left.schema['wgt_unit_cd'], pl.Categorical)
+        self.assertTrue(left.equals(right))
+        self.assertEqual(encoded.schema, {'wgt_unit_cd': pl.Categorical, 'qty': pl.Int64})
+        kg_code = left.filter(pl.col('wgt_unit_cd') == 'kg')['wgt_unit_cd'].to_physical()[0]
+        self.assertEqual(encoded['wgt_unit_cd'].to_physical()[0], kg_code)
+
+    def test_invalid_column_rule(self):
+        with self.assertRaises(ValueError):
+            ColumnRule(string_rules=['uppercase'])
+        with self.assertRaises(ValueError):
+            ColumnRule(abs_tol=-1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+import time
+import unittest
+from pathlib import Path
+import shutil
+from utils.commons.profile_util import profile_block, profile_file_stem, summarize_profiles
+
+
+def busy_function(seconds):
+    end = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < end:
+        total += 1
+    return total
+
+
+class TestProfileUtil(unittest.TestCase):
+
+    def setUp(self):
+        self.sandbox = Path(__file__).parent / 'scratch_unittest_folder/profile_util'
+        self.sandbox.mkdir(parents=True, exist_ok=True)
+
+    def tearDown(self):
+        shutil.rmtree(self.sandbox)
+
+    def test_profile_files_are_written(self):
+        with profile_block('tests/test_x.py::test_y[table_a]', self.sandbox, interval=0.001) as paths:
+            busy_function(0.1)
+        profile_path, collapsed_path = paths
+        self.assertEqual(profile_path.name, 'tests_test_x.py_test_y_table_a.prof')
+        self.assertTrue(profile_path.exists())
+
+        stacks = [line.rsplit(' ', 1) for line in collapsed_path.read_text().splitlines()]
+        self.assertTrue(stacks)
+        self.assertTrue(all(count.isdigit() for _, count in stacks))
+        self.assertTrue(any('busy_function (profile_util_test.py:8)' in stack.split(';') for stack, _ in stacks))
+
+    def test_summary_merges_profiles(self):
+        for name in ('first', 'second'):
+            with profile_block(name, self.sandbox):
+                busy_function(0.05)
+        lines = summarize_profiles(self.sandbox, top_n=3)
+        self.assertEqual(len(lines), 5)
+        self.assertIn('across 2 profiled tests', lines[0])
+        self.assertTrue(any('busy_function' in line for line in lines[2:]))
+
+    def test_no_summary_without_profiles(self):
+        self.assertEqual(summarize_profiles(self.sandbox), [])
+        self.assertEqual(profile_file_stem('a/b::c[d e]'), 'a_b_c_d_e')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+import os
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+import shutil
+import polars as pl
+from utils.commons.perf_util import get_spans, reset_spans
+from utils.framework.artifact_store import ParquetArtifactStore
+from utils.framework.query_cache import QueryResultCache, get_referenced_tables, normalize_query
+
+QUERY = "SELECT * FROM ts_eu_pgm_edwp.out_sprint_tl_gb_fact;"
+
+
+class TestQueryCache(unittest.TestCase):
+
+    def setUp(self):
+        self.sandbox = Path(__file__).parent / 'scratch_unittest_folder/query_cache'
+        self.sandbox.mkdir(parents=True, exist_ok=True)
+        self.store = ParquetArtifactStore(self.sandbox / 'store', max_bytes=10 ** 9)
+        self.cache = QueryResultCache(MagicMock(), store=self.store, syslog_unrestricted=True)
+        self.freshness = [{'table_id': 1, 'tbl_rows': 2, 'last_insert': '2026-01-01 00:00:00', 'last_delete': None}]
+        self.result = pl.DataFrame({'sku_cd': ['a', 'b']})
+        reset_spans()
+
+    def tearDown(self):
+        reset_spans()
+        shutil.rmtree(self.sandbox)
+
+    def test_normalize_query_keeps_literals(self):
+        self.assertEqual(normalize_query("SELECT  *\n  FROM t -- all rows\nWHERE a = 'x  y';  "),
+                         "SELECT * FROM t WHERE a = 'x  y'")
+        self.assertEqual(get_referenced_tables("select * from S.A a join s.b on a.k = b.k"), ['s.a', 's.b'])
+
+    @patch('utils.framework.query_cache.read_sql_query_as_df')
+    @patch('utils.framework.query_cache.read_sql_query')
+    def test_unchanged_table_is_served_from_disk(self, mock_probe, mock_query):
+        mock_probe.side_effect = lambda engine, query: self.freshness
+        mock_query.return_value = self.result
+
+        self.assertTrue(self.cache.read(QUERY).equals(self.result))
+        self.assertTrue(self.cache.read(QUERY + "\n").equals(self.result))
+        self.assertEqual(mock_query.call_count, 1)
+        self.assertIn('svv_table_info', mock_probe.call_args[0][1])
+        self.assertIn('query_cache_hit', [record['stage'] for record in get_spans()])
+
+    @patch('utils.framework.query_cache.read_sql_query_as_df')
+    @patch('utils.framework.query_cache.read_sql_query')
+    def test_changed_table_replaces_stale_result(self, mock_probe, mock_query):
+        mock_probe.side_effect = lambda engine, query: self.freshness
+        mock_query.return_value = self.result
+        self.cache.read(QUERY)
+
+        self.freshness = [{**self.freshness[0], 'last_insert': '2026-01-02 00:00:00'}]
+        mock_query.return_value = self.result.head(1)
+        self.assertEqual(self.cache.read(QUERY).height, 1)
+        self.assertEqual(self.cache.read(QUERY).height, 1)
+        self.assertEqual(mock_query.call_count, 2)
+        self.assertEqual(self.store.stats()['artifacts'], 1)
+
+    @patch('utils.framework.query_cache.read_sql_query_as_df')
+    @patch('utils.framework.query_cache.read_sql_query')
+    def test_unprobeable_queries_bypass_the_cache(self, mock_probe, mock_query):
+        mock_query.return_value = self.result
+        self.cache.read("SELECT * FROM unqualified_table")
+        self.cache.read("SELECT 1")
+        mock_probe.return_value = []
+        self.cache.read(QUERY)
+        self.assertEqual(mock_query.call_count, 3)
+        self.assertEqual(self.store.stats()['artifacts'], 0)
+
+
+    @patch('utils.framework.query_cache.read_sql_query_as_df')
+    @patch('utils.framework.query_cache.read_sql_query')
+    def test_cache_is_bypassed_without_syslog_access(self, mock_probe, mock_query):
+        mock_query.return_value = self.result
+        for access in ([{'usesuper': False, 'syslogaccess': 'RESTRICTED'}], [], RuntimeError('permission denied')):
+            mock_probe.reset_mock()
+            mock_probe.side_effect = [access]
+            cache = QueryResultCache(MagicMock(), store=self.store)
+            cache.read(QUERY)
+            cache.read(QUERY)
+            self.assertEqual(mock_probe.call_count, 1)
+        self.assertEqual(self.store.stats()['artifacts'], 0)
+
+        mock_probe.side_effect = lambda engine, query: (
+            [{'usesuper': False, 'syslogaccess': 'UNRESTRICTED'}] if 'svl_user_info' in query else self.freshness)
+        cache = QueryResultCache(MagicMock(), store=self.store)
+        cache.read(QUERY)
+        cache.read(QUERY)
+        self.assertEqual(mock_query.call_count, 7)
+
+    @patch('utils.framework.query_cache.read_sql_query_as_df')
+    @patch('utils.framework.query_cache.read_sql_query')
+    def test_results_older_than_the_ttl_are_refreshed(self, mock_probe, mock_query):
+        mock_probe.side_effect = lambda engine, query: self.freshness
+        mock_query.return_value = self.result
+        cache = QueryResultCache(MagicMock(), store=self.store, ttl_seconds=3600, syslog_unrestricted=True)
+        cache.read(QUERY)
+        cached_path = next(self.store.root.rglob('*.parquet'))
+        stale_time = time.time() - 7200
+        os.utime(cached_path, (stale_time, stale_time))
+        cache.read(QUERY)
+        cache.read(QUERY)
+        self.assertEqual(mock_query.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
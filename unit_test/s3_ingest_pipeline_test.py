@@ -0,0 +1,69 @@
+import io
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+import shutil
+import polars as pl
+from utils.framework.s3_ingest_pipeline import run_ingest_pipeline
+
+
+def make_s3_client(file_count):
+    s3_client = MagicMock()
+    s3_client.get_paginator.return_value.paginate.return_value = [
+        {'Contents': [{'Key': f"stage/part_{i}.csv", 'ETag': f'"e{i}"', 'Size': 20} for i in range(file_count)]
+         + [{'Key': 'stage/_SUCCESS', 'ETag': '"s"', 'Size': 0}]}]
+    s3_client.get_object.side_effect = \
+        lambda Bucket, Key, **kwargs: {'Body': io.BytesIO(f"sku_cd|wgt_qty\n{Path(Key).stem}|1.5\n".encode())}
+    return s3_client
+
+
+@patch('utils.framework.s3_utils.get_project_root_path')
+class TestS3IngestPipeline(unittest.TestCase):
+
+    def setUp(self):
+        self.sandbox = Path(__file__).parent / 'scratch_unittest_folder/s3_ingest'
+        self.sandbox.mkdir(parents=True, exist_ok=True)
+
+    def tearDown(self):
+        shutil.rmtree(self.sandbox)
+
+    def test_pipeline_converts_all_files(self, mock_root):
+        mock_root.return_value = self.sandbox
+        table_path, report = run_ingest_pipeline(make_s3_client(6), 'bucket', 'stage/', 't1',
+                                                 download_concurrency=2, convert_workers=2, queue_size=1)
+
+        df = pl.read_parquet(sorted(table_path.glob('*.parquet')))
+        self.assertEqual(sorted(df['sku_cd'].to_list()), [f"part_{i}" for i in range(6)])
+        self.assertFalse((table_path / '.pending').exists())
+        self.assertEqual(report['files'], 6)
+        for stage in ('list', 'download', 'convert', 'write'):
+            self.assertEqual(report['stages'][stage]['items'], 6)
+            self.assertLessEqual(report['stages'][stage]['utilization'], 1.0)
+        self.assertIn(report['bottleneck'], ('download', 'convert', 'write'))
+
+    def test_stage_failure_is_raised(self, mock_root):
+        mock_root.return_value = self.sandbox
+        s3_client = make_s3_client(3)
+        s3_client.get_object.side_effect = OSError("connection reset")
+        with self.assertRaisesRegex(OSError, "connection reset"):
+            run_ingest_pipeline(s3_client, 'bucket', 'stage/', 't1', convert_workers=1)
+        self.assertFalse((self.sandbox / 'downloads/t1/.pending').exists())
+
+    def test_objects_of_sub_prefixes_are_kept_apart(self, mock_root):
+        mock_root.return_value = self.sandbox
+        s3_client = make_s3_client(0)
+        s3_client.get_paginator.return_value.paginate.return_value = [
+            {'Contents': [{'Key': f"stage/{year}/part.csv", 'ETag': f'"e{year}"', 'Size': 20} for year in (24, 25)]}]
+        table_path, report = run_ingest_pipeline(s3_client, 'bucket', 'stage/', 't1', convert_workers=1)
+        self.assertEqual(sorted(path.name for path in table_path.glob('*.parquet')),
+                         ['24__part.parquet', '25__part.parquet'])
+
+        s3_client.get_paginator.return_value.paginate.return_value = [
+            {'Contents': [{'Key': 'stage/part.csv', 'ETag': '"e1"', 'Size': 20},
+                          {'Key': 'stage/part.csv.gz', 'ETag': '"e2"', 'Size': 20}]}]
+        with self.assertRaisesRegex(ValueError, "part.parquet"):
+            run_ingest_pipeline(s3_client, 'bucket', 'stage/', 't1', convert_workers=1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+import io
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock
+import shutil
+import pyarrow as pa
+import pyarrow.csv as pv
+from botocore.exceptions import ClientError
+from utils.commons.s3_range_util import (AdaptiveRangeThreshold, ObjectChangedError, RangedDownloader,
+                                         plan_byte_ranges, MB)
+
+
+def make_s3_client(content, etag='"v1"'):
+    s3_client = MagicMock()
+    s3_client.etag = etag
+
+    def get_object(Bucket, Key, Range=None, IfMatch=None):
+        if IfMatch is not None and IfMatch != s3_client.etag:
+            raise ClientError({'Error': {'Code': 'PreconditionFailed'}, 'ResponseMetadata': {'HTTPStatusCode': 412}},
+                              'GetObject')
+        if Range is None:
+            return {'Body': io.BytesIO(content)}
+        start, end = (int(value) for value in Range[len('bytes='):].split('-'))
+        return {'Body': io.BytesIO(content[start:end + 1])}
+
+    s3_client.get_object.side_effect = get_object
+    s3_client.head_object.side_effect = lambda Bucket, Key: {'ETag': s3_client.etag}
+    return s3_client
+
+
+class TestS3RangeUtil(unittest.TestCase):
+
+    def setUp(self):
+        self.sandbox = Path(__file__).parent / 'scratch_unittest_folder/s3_range'
+        self.sandbox.mkdir(parents=True, exist_ok=True)
+        self.content = b"sku_cd|wgt_qty\n" + b"".join(f"sku{i}|{i}.5\n".encode() for i in range(5000))
+        self.s3_client = make_s3_client(self.content)
+        self.downloader = RangedDownloader(part_size=4096, max_concurrency=4,
+                                           threshold=AdaptiveRangeThreshold(min_threshold=1024))
+
+    def tearDown(self):
+        shutil.rmtree(self.sandbox)
+
+    def test_plan_byte_ranges(self):
+        self.assertEqual(plan_byte_ranges(10, 4), [(0, 3), (4, 7), (8, 9)])
+        self.assertEqual(plan_byte_ranges(0, 4), [])
+
+    def test_ranged_download_reassembles_file(self):
+        download_path = self.downloader.download(self.s3_client, 'bucket', 'key.csv', self.sandbox / 'key.csv',
+                                                 len(self.content))
+        self.assertEqual(download_path.read_bytes(), self.content)
+        self.assertGreater(self.s3_client.get_object.call_count, 1)
+        self.assertTrue(all(call.kwargs['IfMatch'] == '"v1"' for call in self.s3_client.get_object.call_args_list))
+
+    def test_overwritten_object_fails_the_ranged_download(self):
+        get_object = self.s3_client.get_object.side_effect
+
+        def overwrite_after_first_range(**request):
+            response = get_object(**request)
+            self.s3_client.etag = '"v2"'
+            return response
+
+        self.s3_client.get_object.side_effect = overwrite_after_first_range
+        with self.assertRaises(ObjectChangedError):
+            self.downloader.download(self.s3_client, 'bucket', 'key.csv', self.sandbox / 'key.csv',
+                                     len(self.content))
+        self.assertEqual(list(self.sandbox.iterdir()), [])
+        with self.assertRaises(ObjectChangedError):
+            self.downloader.read_bytes(self.s3_client, 'bucket', 'key.csv', len(self.content), etag='"v1"')
+
+    def test_small_objects_use_single_stream(self):
+        self.downloader.download(self.s3_client, 'bucket', 'key.csv', self.sandbox / 'key.csv', 1000)
+        self.s3_client.get_object.assert_called_once_with(Bucket='bucket', Key='key.csv')
+        self.s3_client.download_file.assert_not_called()
+        self.assertEqual((self.sandbox / 'key.csv').read_bytes(), self.content)
+        self.assertEqual(self.downloader.read_bytes(self.s3_client, 'bucket', 'key.csv', 1000), self.content)
+
+    def test_read_bytes_and_stream_preserve_order(self):
+        self.assertEqual(self.downloader.read_bytes(self.s3_client, 'bucket', 'key.csv', len(self.content)),
+                         self.content)
+        stream = self.downloader.open_stream(self.s3_client, 'bucket', 'key.csv', len(self.content))
+        table = pv.read_csv(pa.PythonFile(stream, mode='r'), parse_options=pv.ParseOptions(delimiter='|'))
+        self.assertEqual(table.num_rows, 5000)
+        self.assertEqual(table['sku_cd'][4999].as_py(), 'sku4999')
+
+    def test_threshold_adapts_to_throughput(self):
+        threshold = AdaptiveRangeThreshold(min_threshold=10 * MB, split_after_seconds=2, smoothing=0.5)
+        self.assertEqual(threshold.threshold, 10 * MB)
+        threshold.record(100 * MB, 1.0)
+        self.assertEqual(threshold.threshold, 200 * MB)
+        threshold.record(20 * MB, 1.0)
+        self.assertEqual(threshold.threshold, 120 * MB)
+        threshold.record(100, 1.0)
+        self.assertEqual(threshold.threshold, 120 * MB)
+
+    def test_from_settings(self):
+        downloader = RangedDownloader.from_settings({'s3_transfer': {'part_size_mb': 16, 'max_concurrency': 2}})
+        self.assertEqual((downloader.part_size, downloader.max_concurrency), (16 * MB, 2))
+
+
+if __name__ == "__main__":
+    unittest.main()
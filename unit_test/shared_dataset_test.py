@@ -0,0 +1,93 @@
+import multiprocessing
+import os
+import unittest
+from decimal import Decimal
+from pathlib import Path
+import shutil
+import polars as pl
+from utils.framework.shared_dataset import SHARED_DATASET_DIR_ENV, SharedDatasetRegistry, create_session_path, \
+    fingerprint_files, get_shared_dataset_path
+
+
+def map_in_child(root, key, queue):
+    def build():
+        raise AssertionError("Dataset rebuilt in a second process")
+    registry = SharedDatasetRegistry(root)
+    df = registry.acquire(key, build)
+    queue.put((df.height, registry.stats()['references']))
+    registry.close()
+
+
+class TestSharedDataset(unittest.TestCase):
+
+    def setUp(self):
+        self.sandbox = Path(__file__).parent / 'scratch_unittest_folder/shared_dataset'
+        self.sandbox.mkdir(parents=True, exist_ok=True)
+        self.registry = SharedDatasetRegistry(self.sandbox)
+        self.df = pl.DataFrame({'sku_cd': ['a', 'b', 'c'], 'amt': [Decimal('1.25'), None, Decimal('3')]},
+                               schema={'sku_cd': pl.Utf8, 'amt': pl.Decimal(10, 2)})
+        self.builds = 0
+
+    def tearDown(self):
+        shutil.rmtree(self.sandbox)
+
+    def build(self):
+        self.builds += 1
+        return self.df
+
+    def test_dataset_is_built_once_and_mapped(self):
+        key = self.registry.make_key('source', {'exact_decimals': True})
+        with self.registry.open(key, self.build) as first, self.registry.open(key, self.build) as second:
+            self.assertTrue(first.equals(self.df))
+            self.assertEqual(second.schema['amt'], pl.Decimal(10, 2))
+            self.assertEqual(self.registry.stats()['references'], 2)
+        self.assertEqual(self.builds, 1)
+        self.assertEqual(self.registry.stats()['references'], 0)
+        self.assertEqual(self.registry.stats()['hits'], 1)
+
+    def test_dataset_is_shared_with_other_processes(self):
+        key = self.registry.make_key('source', {})
+        self.registry.acquire(key, self.build)
+        queue = multiprocessing.get_context('spawn').Queue()
+        child = multiprocessing.get_context('spawn').Process(target=map_in_child, args=(self.sandbox, key, queue))
+        child.start()
+        height, references = queue.get(timeout=60)
+        child.join()
+        # The child saw its own reference and the one held here
+        self.assertEqual((height, references), (3, 2))
+        self.assertEqual(self.registry.stats()['references'], 1)
+        self.registry.close()
+
+    def test_unreferenced_datasets_are_evicted_over_budget(self):
+        registry = SharedDatasetRegistry(self.sandbox, max_bytes=1)
+        held_key, released_key, new_key = (registry.make_key(name, {}) for name in ('held', 'released', 'new'))
+        registry.acquire(held_key, self.build)
+        with registry.open(released_key, self.build):
+            pass
+        registry.acquire(new_key, self.build)
+        self.assertTrue((self.sandbox / f"{held_key}.arrow").exists())
+        self.assertFalse((self.sandbox / f"{released_key}.arrow").exists())
+        self.assertEqual(registry.stats()['datasets'], 2)
+        registry.close()
+        with self.assertRaises(ValueError):
+            registry.release(held_key)
+
+    def test_fingerprint_changes_with_files(self):
+        path = self.sandbox / 'part.parquet'
+        self.df.write_parquet(path)
+        fingerprint = fingerprint_files([path])
+        self.assertEqual(fingerprint, fingerprint_files([path]))
+        os.utime(path, ns=(0, 0))
+        self.assertNotEqual(fingerprint, fingerprint_files([path]))
+
+    def test_sessions_that_ended_are_removed(self):
+        ended_session_path = get_shared_dataset_path() / '20000101_000000_99999999'
+        ended_session_path.mkdir(parents=True)
+        session_path = create_session_path()
+        self.assertFalse(ended_session_path.exists())
+        self.assertTrue(session_path.name.endswith(f"_{os.getpid()}"))
+        if str(session_path) != os.environ.get(SHARED_DATASET_DIR_ENV):
+            shutil.rmtree(session_path)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import importlib.util
+import os
+import shutil
+import unittest
+from decimal import Decimal
+from pathlib import Path
+import polars as pl
+import pyarrow as pa
+from utils.commons.polars_util import ColumnRule, convert_df_to_string as polars_convert_df_to_string
+
+SPARK_AVAILABLE = importlib.util.find_spec('pyspark') is not None and bool(os.environ.get('JAVA_HOME')
+                                                                           or shutil.which('java'))
+if SPARK_AVAILABLE:
+    from utils.commons.spark_comp_util import (align_to_schema, compare_dataframes, convert_df_to_string,
+                                               create_spark_session, spark_df_parquet)
+
+SCHEMA = 'sku_cd string, sku_nm string, prc decimal(10,3)'
+
+
+@unittest.skipUnless(SPARK_AVAILABLE, "pyspark or a Java runtime is not installed")
+class TestSparkCompUtil(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.spark = create_spark_session('local[2]', config={'spark.sql.shuffle.partitions': 4,
+                                                             'spark.ui.enabled': 'false'})
+
+    def setUp(self):
+        self.sandbox = Path(__file__).parent / 'scratch_unittest_folder/spark_comp_util'
+        self.sandbox.mkdir(parents=True, exist_ok=True)
+        self.stage = self.spark.createDataFrame([('a', 'Red "Apple"', Decimal('1.500')), ('b', 'Pear', Decimal('2.000')),
+                                                 ('c', None, None)], SCHEMA)
+
+    def tearDown(self):
+        shutil.rmtree(self.sandbox)
+
+    def test_string_conversion_matches_polars(self):
+        rows = [('b', 'Pear', 2.0), ('a', 'Red "Apple"', 1.5), ('c', None, None), ('a', 'Kiwi', 1.25)]
+        spark_df = convert_df_to_string(self.spark.createDataFrame(rows, 'sku_cd string, sku_nm string, prc double'))
+        polars_df = polars_convert_df_to_string(pl.DataFrame(rows, schema=['sku_cd', 'sku_nm', 'prc'], orient='row'))
+        self.assertEqual(spark_df.columns, polars_df.columns)
+        self.assertEqual([tuple(row) for row in spark_df.collect()], polars_df.rows())
+
+    def test_keyed_diff_returns_the_polars_result_structure(self):
+        edwp = self.spark.createDataFrame([('a', 'red apple', Decimal('1.501')), ('b', 'Pear', Decimal('2.000')),
+                                           ('d', 'Fig', Decimal('3.000'))], SCHEMA)
+        are_identical, message, mismatch_result = compare_dataframes(self.stage, edwp, "stage", "edwp",
+                                                                     key_columns=['sku_cd'],
+                                                                     rules={'prc': ColumnRule(abs_tol=0.001)})
+        self.assertFalse(are_identical)
+        self.assertIn("3 mismatches between stage and edwp", message)
+        mismatches = mismatch_result.lazy().collect().sort('sku_cd')
+        self.assertEqual(mismatches.columns, ['sku_cd', 'column_name', 'left_value', 'right_value', 'mismatch_kind'])
+        self.assertEqual(mismatches.rows(), [('a', 'sku_nm', 'Red "Apple"', 'red apple', 'value'),
+                                             ('c', '*', None, None, 'missing_in_right'),
+                                             ('d', '*', None, None, 'missing_in_left')])
+
+    def test_positional_diff_writes_mismatches_as_parquet(self):
+        output_path = self.sandbox / 'mismatches'
+        edwp = self.stage.withColumn('sku_nm', self.stage.sku_nm.substr(1, 3))
+        df1, df2 = convert_df_to_string(self.stage), convert_df_to_string(edwp)
+        are_identical, message, mismatch_result = compare_dataframes(df1, df1, output_path=output_path)
+        self.assertEqual((are_identical, message), (True, "Datasets are identical."))
+
+        are_identical, _, mismatch_result = compare_dataframes(df1, df2, output_path=output_path)
+        self.assertFalse(are_identical)
+        self.assertTrue(any(output_path.glob('*.parquet')))
+        self.assertEqual(mismatch_result.summary['column_counts'], {'sku_nm': 2})
+        self.assertEqual(mismatch_result.key_columns, ['row_number'])
+
+        are_identical, message, _ = compare_dataframes(df1, df2.limit(2))
+        self.assertFalse(are_identical)
+        self.assertIn("Shape mismatch", message)
+
+    def test_typed_alignment_applies_the_column_rules(self):
+        path = self.sandbox / 'stage.parquet'
+        pl.DataFrame({'a': ['1 ', None], 'b': [' X ', 'y'], 'c': ['2024-01-01 10:00:00.750', '2024-01-02']}
+                     ).write_parquet(path)
+        schema = pa.schema([('qty', pa.int64()), ('sku_nm', pa.string()), ('load_ts', pa.timestamp('us'))])
+        rules = {'load_ts': ColumnRule(granularity='1s'), 'sku_nm': ColumnRule(string_rules=['trim', 'lowercase'])}
+        df = align_to_schema(spark_df_parquet(self.spark, [path], ['qty', 'sku_nm', 'load_ts']), schema, rules)
+        self.assertEqual(df.columns, ['load_ts', 'qty', 'sku_nm'])
+        self.assertEqual([(str(row.load_ts), row.qty, row.sku_nm) for row in df.collect()],
+                         [('2024-01-01 10:00:00', 1, 'x'), ('2024-01-02 00:00:00', None, 'y')])
+
+        with self.assertRaises(ValueError):
+            align_to_schema(df, schema, {'load_ts': ColumnRule(granularity='15m')})
+
+
+if __name__ == '__main__':
+    unittest.main()
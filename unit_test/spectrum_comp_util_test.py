@@ -0,0 +1,101 @@
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+import polars as pl
+from utils.framework.spectrum_comp_util import compare_stage_with_edwp
+
+PG_STANDIN_URL = os.environ.get('SEED_QE_PG_STANDIN_URL')
+
+TABLE_SETTINGS = {
+    'stage': {
+        'aws_s3': {
+            'stg_s3_bucket': 'bucket',
+            'stg_s3_path': 'stage/path/',
+            'delimiter': '|',
+            'external_table_columns': 'sku_cd VARCHAR(100),\n wgt_qty NUMERIC(30, 20)',
+        }
+    }
+}
+
+
+class TestSpectrumCompUtil(unittest.TestCase):
+
+    def setUp(self):
+        self.settings = {'aws_iam_role': 'arn:aws:iam::123:role/qe', 't1': TABLE_SETTINGS}
+
+    @patch('utils.framework.spectrum_comp_util.run_sql_query')
+    @patch('utils.framework.spectrum_comp_util.read_sql_query', return_value=[])
+    @patch('utils.framework.spectrum_comp_util.read_sql_query_as_df')
+    def test_compare_runs_both_directions_and_cleans_up(self, mock_read_df, mock_read, mock_run):
+        mock_read_df.side_effect = [
+            pl.DataFrame({'row_count': [3]}),
+            pl.DataFrame({'row_count': [3]}),
+            pl.DataFrame({'diff_count': [1]}),
+            pl.DataFrame({'sku_cd': ['a'], 'wgt_qty': [1.5]}),
+            pl.DataFrame({'diff_count': [0]}),
+        ]
+        are_identical, message, counts, sample_df = compare_stage_with_edwp(None, self.settings, 't1', sample_size=10)
+
+        self.assertFalse(are_identical)
+        self.assertEqual(counts, {'stage_rows': 3, 'edwp_rows': 3, 'stage_only': 1, 'edwp_only': 0})
+        self.assertEqual(sample_df['diff_direction'].to_list(), ['stage_only'])
+        executed = [call.args[1] for call in mock_run.call_args_list]
+        self.assertTrue(executed[0].startswith('CREATE EXTERNAL SCHEMA IF NOT EXISTS qe_auto_spectrum'))
+        self.assertIn("LOCATION 's3://bucket/stage/path/'", executed[1])
+        self.assertTrue(executed[2].startswith('DROP TABLE IF EXISTS qe_auto_spectrum.t1_'))
+        self.assertEqual(executed[3], 'DROP SCHEMA IF EXISTS qe_auto_spectrum')
+
+    @patch('utils.framework.spectrum_comp_util.run_sql_query')
+    @patch('utils.framework.spectrum_comp_util.read_sql_query', return_value=[{'schemaname': 'qe_auto_spectrum'}])
+    @patch('utils.framework.spectrum_comp_util.read_sql_query_as_df', side_effect=RuntimeError('query failed'))
+    def test_compare_drops_table_on_failure_and_keeps_existing_schema(self, mock_read_df, mock_read, mock_run):
+        with self.assertRaises(RuntimeError):
+            compare_stage_with_edwp(None, self.settings, 't1')
+        executed = [call.args[1] for call in mock_run.call_args_list]
+        self.assertEqual(len(executed), 2)
+        self.assertTrue(executed[1].startswith('DROP TABLE IF EXISTS'))
+
+
+@unittest.skipUnless(PG_STANDIN_URL, "SEED_QE_PG_STANDIN_URL is not set")
+class TestSpectrumCompUtilPostgres(unittest.TestCase):
+    """
+    Runs the comparison against a local PostgreSQL stand-in, e.g. started with
+    `docker run -e POSTGRES_PASSWORD=qe -p 5432:5432 -v /tmp/qe_standin:/tmp/qe_standin postgres`
+    and SEED_QE_PG_STANDIN_URL=postgresql+psycopg2://postgres:qe@localhost:5432/postgres.
+    The stage file must be readable by the server at the same path.
+    """
+
+    def setUp(self):
+        from sqlalchemy import create_engine
+        self.engine = create_engine(PG_STANDIN_URL)
+        self.settings = {'edwp_schema_name': 'edwp', 't1': TABLE_SETTINGS}
+        self.data_dir = Path(os.environ.get('SEED_QE_PG_STANDIN_DATA_DIR', tempfile.gettempdir())) / 'qe_standin'
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        with self.engine.connect() as connection:
+            connection.execution_options(isolation_level="AUTOCOMMIT").execute(
+                "DROP SCHEMA IF EXISTS edwp CASCADE; CREATE SCHEMA edwp; "
+                "CREATE TABLE edwp.t1 (sku_cd VARCHAR(100), wgt_qty NUMERIC(30, 20)); "
+                "INSERT INTO edwp.t1 VALUES ('a', 1.5), ('b', 2.25)")
+
+    def tearDown(self):
+        with self.engine.connect() as connection:
+            connection.execution_options(isolation_level="AUTOCOMMIT").execute("DROP SCHEMA IF EXISTS edwp CASCADE")
+        self.engine.dispose()
+        shutil.rmtree(self.data_dir, ignore_errors=True)
+
+    def test_compare_against_standin(self):
+        stage_file = self.data_dir / 't1.csv'
+        stage_file.write_text("sku_cd|wgt_qty\na|1.5\nc|3\n")
+        are_identical, _, counts, sample_df = compare_stage_with_edwp(
+            self.engine, self.settings, 't1', dialect='postgresql', stage_location=str(stage_file))
+        self.assertFalse(are_identical)
+        self.assertEqual(counts['stage_only'], 1)
+        self.assertEqual(counts['edwp_only'], 1)
+        self.assertEqual(sorted(sample_df['sku_cd'].to_list()), ['b', 'c'])
+
+
+if __name__ == "__main__":
+    unittest.main()
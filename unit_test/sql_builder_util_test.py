@@ -0,0 +1,64 @@
+import unittest
+from utils.commons.sql_builder_util import (build_create_external_table_query, build_create_table_query,
+                                            build_except_count_query, build_except_sample_query,
+                                            build_null_count_query, build_row_occurrence_query,
+                                            build_table_freshness_query, validate_identifier)
+
+
+class TestSqlBuilderUtil(unittest.TestCase):
+
+    def test_except_count_query(self):
+        query = build_except_count_query('stage.t', 'edwp.t', ['a', 'b'])
+        self.assertEqual(query, "SELECT COUNT(*) AS diff_count FROM (\n"
+                                "SELECT\n    a,\n    b,\n    COUNT(*) AS row_occurrences\nFROM stage.t\nGROUP BY a, b\n"
+                                "EXCEPT\n"
+                                "SELECT\n    a,\n    b,\n    COUNT(*) AS row_occurrences\nFROM edwp.t\nGROUP BY a, b\n"
+                                ") AS d")
+
+    def test_row_occurrence_query_rejects_the_count_column(self):
+        with self.assertRaises(ValueError):
+            build_row_occurrence_query('stage.t', ['a', 'ROW_OCCURRENCES'])
+
+    def test_except_sample_query_is_bounded(self):
+        self.assertTrue(build_except_sample_query('l', 'r', ['a'], 25).endswith("LIMIT 25"))
+
+    def test_create_external_table_query(self):
+        query = build_create_external_table_query('qe_auto_spectrum.t', [('wgt_qty', 'NUMERIC(30, 20)')],
+                                                  "s3://bucket/it's/", '|')
+        self.assertIn("wgt_qty NUMERIC(30, 20)", query)
+        self.assertIn("LOCATION 's3://bucket/it''s/'", query)
+        self.assertIn("FIELDS TERMINATED BY '|'", query)
+
+    def test_column_types_are_validated(self):
+        self.assertIn("sku_cd VARCHAR(MAX)", build_create_table_query('edwp.t', [('sku_cd', 'VARCHAR(MAX)')]))
+        for sql_type in ("VARCHAR(10)); DROP TABLE edwp.t; --", "VARCHAR(1; DROP TABLE x)", "GEOMETRY"):
+            with self.assertRaises(ValueError):
+                build_create_external_table_query('qe_auto_spectrum.t', [('sku_cd', sql_type)], 's3://bucket/')
+            with self.assertRaises(ValueError):
+                build_create_table_query('edwp.t', [('sku_cd', sql_type)])
+
+    def test_validate_identifier(self):
+        self.assertEqual(validate_identifier('ts_eu_pgm_edwp.table_1'), 'ts_eu_pgm_edwp.table_1')
+        with self.assertRaises(ValueError):
+            validate_identifier('t; DROP TABLE x')
+
+    def test_table_freshness_query(self):
+        query = build_table_freshness_query('ts_eu_pgm_edwp.table_1')
+        self.assertIn("FROM svv_table_info ti", query)
+        self.assertIn("ti.\"schema\" = 'ts_eu_pgm_edwp' AND ti.\"table\" = 'table_1'", query)
+        self.assertIn("stl_insert", query)
+        with self.assertRaises(ValueError):
+            build_table_freshness_query('table_1')
+
+    def test_null_count_query(self):
+        query = build_null_count_query('edwp.t', ['load_ts', 'batch_id'])
+        self.assertEqual(query, "SELECT\n    COUNT(*) AS row_count,\n"
+                                "    COUNT(*) - COUNT(load_ts) AS load_ts_null_count,\n"
+                                "    COUNT(*) - COUNT(batch_id) AS batch_id_null_count\n"
+                                "FROM edwp.t")
+        with self.assertRaises(ValueError):
+            build_null_count_query('edwp.t', ['load_ts) FROM x --'])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+from pathlib import Path
+import shutil
+import polars as pl
+import pyarrow as pa
+from utils.framework.synthetic_data import build_synthetic_schema, generate_synthetic_table, write_synthetic_dataset
+
+
+class TestSyntheticData(unittest.TestCase):
+
+    def setUp(self):
+        self.sandbox = Path(__file__).parent / 'scratch_unittest_folder/synthetic_data'
+        self.sandbox.mkdir(parents=True, exist_ok=True)
+        self.table_settings = {'stage': {'aws_s3': {
+            'external_table_columns': "sku_cd VARCHAR(100), wgt_qty NUMERIC(30, 20), ship_dt DATE, qty INTEGER",
+            'column_map': ['sku_cd', 'wgt_qty', 'ship_dt', 'qty']}}}
+
+    def tearDown(self):
+        shutil.rmtree(self.sandbox)
+
+    def test_schema_from_table_settings(self):
+        schema = build_synthetic_schema(self.table_settings)
+        self.assertEqual(schema.field('wgt_qty').type, pa.decimal128(30, 20))
+        schema = build_synthetic_schema({'stage': {'aws_s3': {'column_map': ['a', 'b']}}})
+        self.assertEqual(schema.types, [pa.string(), pa.string()])
+
+    def test_generation_is_deterministic_and_chunkable(self):
+        schema = build_synthetic_schema(self.table_settings)
+        table = generate_synthetic_table(schema, 1000, seed=7)
+        self.assertTrue(table.equals(generate_synthetic_table(schema, 1000, seed=7)))
+        self.assertFalse(table.equals(generate_synthetic_table(schema, 1000, seed=8)))
+        self.assertEqual(table['sku_cd'][999].as_py(), 'sku_cd_999')
+        self.assertEqual(table['sku_cd'].null_count, 0)
+        self.assertTrue(table.slice(0, 10).equals(generate_synthetic_table(schema, 10, seed=7)))
+
+    def test_write_csv_and_parquet(self):
+        schema = build_synthetic_schema(self.table_settings)
+        written = write_synthetic_dataset(schema, 2500, self.sandbox, seed=1, rows_per_file=1000, chunk_rows=400)
+        self.assertEqual(len(written['csv']), 3)
+        parquet_df = pl.read_parquet(written['parquet'])
+        csv_df = pl.concat([pl.read_csv(path, separator='|', infer_schema_length=0) for path in written['csv']])
+        self.assertEqual(parquet_df.height, 2500)
+        self.assertEqual(csv_df.columns, schema.names)
+        self.assertEqual(csv_df['sku_cd'].to_list(), parquet_df['sku_cd'].to_list())
+        self.assertEqual(parquet_df['sku_cd'].n_unique(), 2500)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+import unittest
+from utils.framework.table_config_util import POLARS_PROCESSING_CORE, SPARK_PROCESSING_CORE, TYPED_COMPARISON, \
+    get_audit_columns, get_categorical_columns, get_comparison_settings, get_compared_columns, get_edwp_unload_path, \
+    get_external_table_columns, get_key_columns, get_processing_core, parse_column_definitions
+
+
+class TestTableConfigUtil(unittest.TestCase):
+
+    def test_parse_column_definitions(self):
+        ddl = """
+          sku_cd VARCHAR(100),
+          wgt_qty NUMERIC(30, 20),
+          liv_trff_lght_desc varchar(60)
+        """
+        self.assertEqual(parse_column_definitions(ddl), [('sku_cd', 'VARCHAR(100)'),
+                                                         ('wgt_qty', 'NUMERIC(30, 20)'),
+                                                         ('liv_trff_lght_desc', 'VARCHAR(60)')])
+
+    def test_parse_invalid_definition(self):
+        with self.assertRaises(ValueError):
+            parse_column_definitions("sku_cd VARCHAR(100), 1bad")
+
+    def test_missing_external_table_columns(self):
+        with self.assertRaises(KeyError):
+            get_external_table_columns({'stage': {'aws_s3': {}}})
+
+    def test_compared_and_audit_columns(self):
+        table_settings = {'stage': {'aws_s3': {'external_table_columns': "sku_cd VARCHAR(100), qty INT"}}}
+        self.assertEqual(get_compared_columns(table_settings), ['sku_cd', 'qty'])
+        self.assertEqual(get_audit_columns(table_settings), [])
+
+        table_settings['stage']['aws_s3']['column_map'] = ['sku_cd']
+        table_settings['warehouse'] = {'redshift': {'edwp': {'audit_columns': ['load_ts']}}}
+        self.assertEqual(get_compared_columns(table_settings), ['sku_cd'])
+        self.assertEqual(get_audit_columns(table_settings), ['load_ts'])
+
+    def test_comparison_settings(self):
+        table_settings = {'stage': {'aws_s3': {'external_table_columns': "sku_nm VARCHAR(10), amt NUMERIC(20, 15), "
+                                                                          "rate DOUBLE PRECISION, load_ts TIMESTAMP"}},
+                          'warehouse': {'redshift': {'edwp': {'precision_columns': ['amt', 'rate']}}}}
+        self.assertEqual(get_comparison_settings(table_settings), ('string', None, {}))
+
+        table_settings['comparison'] = {'mode': 'typed', 'timestamp_granularity': '1s',
+                                        'columns': {'sku_nm': {'string_rules': ['trim']}, 'rate': {'abs_tol': 0.5}}}
+        mode, schema, rules = get_comparison_settings(table_settings)
+        self.assertEqual((mode, schema.names), (TYPED_COMPARISON, ['sku_nm', 'amt', 'rate', 'load_ts']))
+        self.assertAlmostEqual(rules['amt'].abs_tol, 1e-15)
+        self.assertEqual((rules['rate'].abs_tol, rules['rate'].rel_tol), (0.5, 1e-9))
+        self.assertEqual(rules['load_ts'].granularity, '1s')
+        self.assertEqual(rules['sku_nm'].string_rules, ['trim'])
+
+    def test_invalid_comparison_settings(self):
+        table_settings = {'stage': {'aws_s3': {'external_table_columns': "sku_nm VARCHAR(10)"}},
+                          'comparison': {'mode': 'fuzzy'}}
+        with self.assertRaises(ValueError):
+            get_comparison_settings(table_settings)
+        table_settings['comparison'] = {'mode': 'typed', 'columns': {'sku_nm': {'tolerance': 1}}}
+        with self.assertRaises(ValueError):
+            get_comparison_settings(table_settings)
+        table_settings['warehouse'] = {'redshift': {'edwp': {'precision_columns': ['sku_nm']}}}
+        table_settings['comparison'] = {'mode': 'typed'}
+        with self.assertRaises(ValueError):
+            get_comparison_settings(table_settings)
+
+    def test_categorical_columns(self):
+        self.assertIsNone(get_categorical_columns({}))
+        self.assertEqual(get_categorical_columns({'comparison': {'categorical_columns': ['wgt_unit_cd']}}),
+                         ['wgt_unit_cd'])
+        with self.assertRaises(ValueError):
+            get_categorical_columns({'comparison': {'categorical_columns': 'wgt_unit_cd'}})
+
+    def test_key_columns(self):
+        self.assertIsNone(get_key_columns({'comparison': {'mode': 'typed'}}))
+        self.assertEqual(get_key_columns({'comparison': {'key_columns': ['sku_cd']}}), ['sku_cd'])
+        with self.assertRaises(ValueError):
+            get_key_columns({'comparison': {'key_columns': []}})
+
+    def test_processing_core(self):
+        self.assertEqual(get_processing_core({}), POLARS_PROCESSING_CORE)
+        self.assertEqual(get_processing_core({'test_info': {'data_processing_core': 'redshift'}}),
+                         POLARS_PROCESSING_CORE)
+        self.assertEqual(get_processing_core({'test_info': {'data_processing_core': 'spark'}}), SPARK_PROCESSING_CORE)
+        with self.assertRaises(ValueError):
+            get_processing_core({'test_info': {'data_processing_core': 'dask'}})
+        self.assertIsNone(get_edwp_unload_path({}))
+
+
+if __name__ == "__main__":
+    unittest.main()
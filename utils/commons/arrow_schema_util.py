@@ -0,0 +1,121 @@
+import re
+from typing import List, Optional, Tuple
+
+import pyarrow as pa
+import pyarrow.csv as pv
+
+# Type name and optional parameters, e.g. "NUMERIC(30, 20)" or "VARCHAR(MAX)"
+_SQL_TYPE_PATTERN = re.compile(r'^(?P<name>[A-Z ]+?)\s*(\((?P<params>[A-Z0-9, ]*)\))?$')
+
+_SIMPLE_SQL_TYPES = {
+    'VARCHAR': pa.string(),
+    'CHARACTER VARYING': pa.string(),
+    'NVARCHAR': pa.string(),
+    'CHAR': pa.string(),
+    'CHARACTER': pa.string(),
+    'NCHAR': pa.string(),
+    'BPCHAR': pa.string(),
+    'TEXT': pa.string(),
+    'SMALLINT': pa.int16(),
+    'INT2': pa.int16(),
+    'INT': pa.int32(),
+    'INTEGER': pa.int32(),
+    'INT4': pa.int32(),
+    'BIGINT': pa.int64(),
+    'INT8': pa.int64(),
+    'REAL': pa.float32(),
+    'FLOAT4': pa.float32(),
+    'FLOAT': pa.float64(),
+    'FLOAT8': pa.float64(),
+    'DOUBLE PRECISION': pa.float64(),
+    'BOOLEAN': pa.bool_(),
+    'BOOL': pa.bool_(),
+    'DATE': pa.date32(),
+    'TIMESTAMP': pa.timestamp('us'),
+    'TIMESTAMP WITHOUT TIME ZONE': pa.timestamp('us'),
+    'TIMESTAMPTZ': pa.timestamp('us', tz='UTC'),
+    'TIMESTAMP WITH TIME ZONE': pa.timestamp('us', tz='UTC'),
+}
+
+# Redshift's default precision and scale for NUMERIC/DECIMAL declared without parameters
+DEFAULT_DECIMAL_PRECISION = 18
+DEFAULT_DECIMAL_SCALE = 0
+
+
+def sql_type_to_arrow(sql_type: str) -> pa.DataType:
+    """
+    Convert a Redshift SQL column type into the equivalent Arrow data type.
+
+    Args:
+        sql_type (str): The SQL type, e.g. "VARCHAR(100)" or "NUMERIC(30, 20)".
+
+    Returns:
+        pa.DataType: The Arrow data type. NUMERIC/DECIMAL map to exact decimals at the declared precision and scale.
+
+    Raises:
+        ValueError: If the SQL type is not supported.
+    """
+    match = _SQL_TYPE_PATTERN.match(' '.join(sql_type.upper().split()))
+    if not match:
+        raise ValueError(f"Unsupported SQL type: {sql_type}")
+
+    type_name = match.group('name').strip()
+    if type_name in ('NUMERIC', 'DECIMAL'):
+        params = [int(param) for param in (match.group('params') or '').split(',') if param.strip()]
+        precision = params[0] if params else DEFAULT_DECIMAL_PRECISION
+        scale = params[1] if len(params) > 1 else DEFAULT_DECIMAL_SCALE
+        return pa.decimal128(precision, scale) if precision <= 38 else pa.decimal256(precision, scale)
+
+    if type_name not in _SIMPLE_SQL_TYPES:
+        raise ValueError(f"Unsupported SQL type: {sql_type}")
+    return _SIMPLE_SQL_TYPES[type_name]
+
+
+def compile_arrow_schema(column_definitions: List[Tuple[str, str]],
+                         column_map: Optional[List[str]] = None) -> pa.Schema:
+    """
+    Compile parsed column definitions (e.g. `external_table_columns`) into an Arrow schema.
+
+    Args:
+        column_definitions (List[Tuple[str, str]]): (column name, SQL type) pairs in file column order.
+        column_map (Optional[List[str]]): Column names assigned positionally, like the `column_map` of the
+            table YAML; the definition names are used if None.
+
+    Returns:
+        pa.Schema: The Arrow schema.
+
+    Raises:
+        ValueError: If `column_map` and the column definitions have different lengths.
+    """
+    if column_map is not None and len(column_map) != len(column_definitions):
+        raise ValueError(f"column_map has {len(column_map)} columns but {len(column_definitions)} "
+                         f"column types are declared")
+
+    names = column_map if column_map is not None else [name for name, _ in column_definitions]
+    return pa.schema([pa.field(name, sql_type_to_arrow(sql_type))
+                      for name, (_, sql_type) in zip(names, column_definitions)])
+
+
+def build_csv_options(schema: pa.Schema, delimiter: str = '|', has_header: bool = True,
+                      block_size: Optional[int] = None) -> (pv.ReadOptions, pv.ParseOptions, pv.ConvertOptions):
+    """
+    Build CSV reader options that parse a file directly into the given schema.
+
+    Type inference is skipped, columns are named by the schema (replacing the header line), and
+    decimals are parsed exactly at their declared precision and scale.
+
+    Args:
+        schema (pa.Schema): The target schema, in file column order.
+        delimiter (str): The delimiter used in the file.
+        has_header (bool): Whether the file starts with a header line to skip.
+        block_size (Optional[int]): Number of bytes decoded per CSV block; pyarrow default if None.
+
+    Returns:
+        (pv.ReadOptions, pv.ParseOptions, pv.ConvertOptions): The reader options.
+    """
+    read_options = pv.ReadOptions(column_names=schema.names, skip_rows=1 if has_header else 0)
+    if block_size:
+        read_options.block_size = block_size
+    parse_options = pv.ParseOptions(delimiter=delimiter)
+    convert_options = pv.ConvertOptions(column_types=schema)
+    return read_options, parse_options, convert_options
@@ -1,14 +1,102 @@
 import boto3
 import logging
-from typing import Dict, Any
+import threading
+from typing import Any, Dict, Optional, Tuple
+from botocore.config import Config
 from botocore.exceptions import NoCredentialsError, PartialCredentialsError
 
 LOGGER = logging.getLogger(__name__)
 
+# Defaults of the `aws_client` settings; the pool is also widened to the concurrent S3 range requests
+DEFAULT_MAX_POOL_CONNECTIONS = 50
+DEFAULT_CONNECT_TIMEOUT = 10
+DEFAULT_READ_TIMEOUT = 60
+DEFAULT_MAX_ATTEMPTS = 5
+
+_LOCK = threading.Lock()
+_SESSIONS: Dict[Optional[str], boto3.session.Session] = {}
+_CLIENTS: Dict[Tuple[str, Optional[str], Optional[str]], Any] = {}
+
+
+def get_client_config(settings: Optional[Dict[str, Any]] = None) -> Config:
+    """
+    Build the botocore configuration of the AWS clients from the `aws_client` settings:
+
+        aws_client = { max_pool_connections = 64, connect_timeout = 10, read_timeout = 60, max_attempts = 5 }
+
+    Connections are kept alive and retried in adaptive mode, which also rate-limits the client when AWS
+    throttles it. Without `max_pool_connections` the pool holds at least as many connections as the
+    ranged S3 downloads open at once (`s3_transfer.max_concurrency` per `parquet_conversion_workers`).
+
+    Args:
+        settings (Optional[Dict[str, Any]]): The team settings; the defaults if None.
+
+    Returns:
+        Config: The client configuration.
+    """
+    settings = settings or {}
+    client_settings = settings.get('aws_client') or {}
+    transfer_concurrency = (int((settings.get('s3_transfer') or {}).get('max_concurrency', 1)) *
+                            int(settings.get('parquet_conversion_workers', 1)))
+    max_pool_connections = client_settings.get('max_pool_connections',
+                                               max(DEFAULT_MAX_POOL_CONNECTIONS, transfer_concurrency))
+    return Config(max_pool_connections=int(max_pool_connections),
+                  connect_timeout=client_settings.get('connect_timeout', DEFAULT_CONNECT_TIMEOUT),
+                  read_timeout=client_settings.get('read_timeout', DEFAULT_READ_TIMEOUT),
+                  retries={'mode': 'adaptive',
+                           'max_attempts': int(client_settings.get('max_attempts', DEFAULT_MAX_ATTEMPTS))},
+                  tcp_keepalive=True)
+
+
+def get_aws_client(service: str, region: Optional[str] = None, profile: Optional[str] = None,
+                   settings: Optional[Dict[str, Any]] = None) -> Any:
+    """
+    Get the process-wide client of an AWS service, creating it on first use.
+
+    Clients are cached by service, region and profile and created from one boto3 session per profile, so
+    their connection pools and credentials are reused by every test, download and secret lookup. Creation
+    is serialized because boto3 sessions are not thread-safe; the clients themselves are. The settings
+    only apply to the first creation of each client.
+
+    Args:
+        service (str): The service name, e.g. 's3' or 'secretsmanager'.
+        region (Optional[str]): The region; `aws_client.region` from the settings, else the default chain, if None.
+        profile (Optional[str]): The credentials profile; `aws_client.profile`, else the default chain, if None.
+        settings (Optional[Dict[str, Any]]): The team settings configuring the client (see `get_client_config`).
+
+    Returns:
+        Any: The boto3 client.
+    """
+    client_settings = (settings or {}).get('aws_client') or {}
+    region = region or client_settings.get('region')
+    profile = profile or client_settings.get('profile')
+    key = (service, region, profile)
+    client = _CLIENTS.get(key)
+    if client is not None:
+        return client
+    with _LOCK:
+        client = _CLIENTS.get(key)
+        if client is None:
+            session = _SESSIONS.get(profile)
+            if session is None:
+                session = _SESSIONS[profile] = boto3.session.Session(profile_name=profile)
+            client = _CLIENTS[key] = session.client(service, region_name=region, config=get_client_config(settings))
+            LOGGER.debug(f"Created {service} client for region {region} and profile {profile}")
+    return client
+
+
+def clear_aws_clients() -> None:
+    """
+    Drop the cached clients and sessions, e.g. after the credentials changed.
+    """
+    with _LOCK:
+        _CLIENTS.clear()
+        _SESSIONS.clear()
+
 
 def get_s3_client(config: Dict[str, Any]):
     """
-    Establish a connection to AWS S3 using the provided configuration.
+    Get the shared S3 client configured by the team settings (see `get_aws_client`).
 
     Args:
         config (Dict[str, Any]): Configuration dictionary with S3 connection details.
@@ -17,9 +105,7 @@ def get_s3_client(config: Dict[str, Any]):
         boto3.client: S3 client object.
     """
     try:
-        s3_client = boto3.client(
-            's3'
-        )
+        s3_client = get_aws_client('s3', settings=config)
         LOGGER.debug("S3 client created successfully.")
         return s3_client
     except (NoCredentialsError, PartialCredentialsError) as e:
@@ -30,6 +30,41 @@ def get_db_config(db_name: str, config: Dict[str, Any]) -> URL:
         raise ValueError(f"Unsupported database: {db_name}")
 
 
+def get_jdbc_options(db_name: str, config: Dict[str, Any]) -> Dict[str, str]:
+    """
+    Get the JDBC connection options of a database, e.g. for Spark's JDBC reader.
+
+    Args:
+        db_name (str): 'redshift' or 'aurora'.
+        config (Dict[str, Any]): The settings holding the connection details, as for `get_db_config`.
+
+    Returns:
+        Dict[str, str]: The 'url', 'user', 'password' and 'driver' options.
+
+    Raises:
+        ValueError: If the database is not supported.
+    """
+    if db_name == 'redshift':
+        return {
+            'url': f"jdbc:redshift://{config['redshift_host']}:{config.get('redshift_port', 5439)}/"
+                   f"{config['redshift_database']}",
+            'user': config['redshift_username'],
+            'password': config['redshift_password'],
+            'driver': 'com.amazon.redshift.jdbc42.Driver',
+        }
+    elif db_name == 'aurora':
+        return {
+            'url': f"jdbc:postgresql://{config['aurora_host']}:{config.get('aurora_port', 5432)}/"
+                   f"{config['aurora_database']}?sslmode={config.get('sslmode', 'allow')}",
+            'user': config['aurora_username'],
+            'password': config['aurora_password'],
+            'driver': 'org.postgresql.Driver',
+        }
+    else:
+        LOGGER.error(f"Unsupported database: {db_name}")
+        raise ValueError(f"Unsupported database: {db_name}")
+
+
 def create_db_engine(db_name: str, config: Dict[str, Any]) -> Engine:
     try:
         url = get_db_config(db_name, config)
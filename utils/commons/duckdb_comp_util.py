@@ -0,0 +1,106 @@
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+import duckdb
+import polars as pl
+
+from utils.commons.sql_builder_util import validate_identifier
+from utils.commons.sql_comp_util import run_except_comparison
+
+LOGGER = logging.getLogger(__name__)
+
+
+def create_duckdb_connection(threads: Optional[int] = None, memory_limit: Optional[str] = None,
+                             temp_directory: Optional[Union[Path, str]] = None) -> duckdb.DuckDBPyConnection:
+    """
+    Create an in-memory DuckDB connection for local comparisons.
+
+    DuckDB executes queries multithreaded and spills to `temp_directory` once `memory_limit` is reached,
+    so comparisons larger than memory still complete.
+
+    Args:
+        threads (Optional[int]): Number of worker threads; all cores if None.
+        memory_limit (Optional[str]): Memory limit such as '4GB'; DuckDB's default (80% of RAM) if None.
+        temp_directory (Optional[Union[Path, str]]): Directory used for spilling.
+
+    Returns:
+        duckdb.DuckDBPyConnection: The connection.
+    """
+    connection = duckdb.connect(database=':memory:')
+    if threads:
+        connection.execute(f"SET threads TO {int(threads)}")
+    if memory_limit:
+        connection.execute("SET memory_limit = ?", [memory_limit])
+    if temp_directory:
+        Path(temp_directory).mkdir(parents=True, exist_ok=True)
+        connection.execute("SET temp_directory = ?", [str(temp_directory)])
+    return connection
+
+
+def register_parquet_view(connection: duckdb.DuckDBPyConnection, relation: str, parquet_files: List[Path],
+                          column_map: Optional[List[str]] = None) -> None:
+    """
+    Register Parquet files as a view so they can be queried in place, without loading them into Python.
+
+    Args:
+        connection (duckdb.DuckDBPyConnection): The DuckDB connection.
+        relation (str): The view name; may be schema-qualified (e.g. "ts_eu_pgm_edwp.table") so that
+            the same SQL runs locally and in the warehouse.
+        parquet_files (List[Path]): The Parquet files backing the view.
+        column_map (Optional[List[str]]): Names assigned positionally to the file columns, like the
+            `column_map` of the table YAML.
+    """
+    if not parquet_files:
+        raise ValueError(f"No Parquet files to register for {relation}")
+
+    validate_identifier(relation)
+    if '.' in relation:
+        connection.execute(f"CREATE SCHEMA IF NOT EXISTS {relation.split('.')[0]}")
+
+    file_list = ", ".join("'" + str(file).replace("'", "''") + "'" for file in parquet_files)
+    alias = f" AS t({', '.join(validate_identifier(col) for col in column_map)})" if column_map else ""
+    connection.execute(f"CREATE OR REPLACE VIEW {relation} AS SELECT * FROM read_parquet([{file_list}]){alias}")
+    LOGGER.debug(f"Registered {len(parquet_files)} Parquet files as {relation}")
+
+
+def compare_parquet_datasets(left_files: List[Path], right_files: List[Path], columns: List[str],
+                             left_relation: str = "stage_data", right_relation: str = "edwp_data",
+                             left_column_map: Optional[List[str]] = None,
+                             right_column_map: Optional[List[str]] = None, sample_size: int = 100,
+                             threads: Optional[int] = None, memory_limit: Optional[str] = None,
+                             temp_directory: Optional[Union[Path, str]] = None
+                             ) -> (bool, str, Dict[str, int], pl.DataFrame):
+    """
+    Compare two locally staged Parquet datasets with EXCEPT in both directions inside DuckDB, on how many
+    times each row occurs (see `run_except_comparison`).
+
+    The queries are the ones `compare_stage_with_edwp` runs in Redshift, so one comparison definition
+    can run either locally or in the warehouse.
+
+    Args:
+        left_files (List[Path]): Parquet files of the first dataset, e.g. the converted stage files.
+        right_files (List[Path]): Parquet files of the second dataset, e.g. the EDWP extract.
+        columns (List[str]): The compared columns.
+        left_relation (str): Relation name of the first dataset.
+        right_relation (str): Relation name of the second dataset.
+        left_column_map (Optional[List[str]]): Positional column names for the first dataset.
+        right_column_map (Optional[List[str]]): Positional column names for the second dataset.
+        sample_size (int): Maximum number of differing rows returned per direction.
+        threads (Optional[int]): Number of DuckDB worker threads.
+        memory_limit (Optional[str]): DuckDB memory limit before spilling, e.g. '4GB'.
+        temp_directory (Optional[Union[Path, str]]): Directory used for spilling.
+
+    Returns:
+        (bool, str, Dict[str, int], pl.DataFrame): A tuple containing a boolean indicating if the data is identical,
+                                                   a message, the row and difference counts, and a sample of the
+                                                   differing rows with a `diff_direction` column.
+    """
+    connection = create_duckdb_connection(threads, memory_limit, temp_directory)
+    try:
+        register_parquet_view(connection, left_relation, left_files, left_column_map)
+        register_parquet_view(connection, right_relation, right_files, right_column_map)
+        return run_except_comparison(lambda query: connection.execute(query).pl(), left_relation, right_relation,
+                                     columns, sample_size)
+    finally:
+        connection.close()
@@ -1,50 +1,252 @@
 import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
+import pyarrow as pa
 import pyarrow.csv as pv
 import pyarrow.parquet as pq
-from typing import Union
+from typing import Any, Dict, List, Optional, Union
+
+from utils.commons.arrow_schema_util import build_csv_options
+from utils.commons.memory_util import MemoryBudgetExceeded
+from utils.commons.perf_util import check_memory_budget, span
 
 LOGGER = logging.getLogger(__name__)
 
+DEFAULT_ROW_GROUP_SIZE = 500_000
+DEFAULT_BLOCK_SIZE = 8 * 1024 * 1024
+GZIP_MAGIC = b'\x1f\x8b'
+WORKER_LOG_FORMAT = '%(asctime)s [%(levelname)8s] [%(processName)s] %(message)s (%(filename)s:%(lineno)s)'
+
+
+def _is_gzip_file(file_path: Path) -> bool:
+    """
+    Check whether a file is gzip compressed, by extension or by its magic bytes.
+    """
+    if file_path.suffix == '.gz':
+        return True
+    with file_path.open('rb') as file:
+        return file.read(2) == GZIP_MAGIC
+
+
+def get_parquet_path(file_path: Path) -> Path:
+    """
+    Get the Parquet path written next to a source file, ignoring a trailing '.gz' extension.
+
+    Args:
+        file_path (Path): The source file, e.g. 'part_0.csv' or 'part_0.csv.gz'.
+
+    Returns:
+        Path: The Parquet path, e.g. 'part_0.parquet'.
+    """
+    if file_path.suffix == '.gz':
+        file_path = file_path.with_suffix('')
+    return file_path.with_suffix('.parquet')
+
+
+def stream_csv_to_parquet(file_path: Union[Path, str], parquet_path: Optional[Union[Path, str]] = None,
+                          delimiter: str = '|', compression: str = 'zstd', compression_level: Optional[int] = None,
+                          row_group_size: int = DEFAULT_ROW_GROUP_SIZE, use_dictionary: bool = True,
+                          write_statistics: bool = True, block_size: int = DEFAULT_BLOCK_SIZE,
+                          schema: Optional[pa.Schema] = None) -> Path:
+    """
+    Convert a CSV file to Parquet one block at a time, so memory stays flat regardless of the file size.
+
+    Gzip-compressed input is decompressed transparently while streaming. Batches are buffered up to
+    `row_group_size` rows and written as one row group, with per-column statistics so later scans can
+    skip row groups on predicates. With a `schema` (see `compile_arrow_schema`) the header line is
+    replaced by the schema names and values are parsed straight into the declared types; otherwise
+    column types are inferred from the first block of the file. The memory budget of the current
+    span is checked after each row group.
+
+    Args:
+        file_path (Union[Path, str]): The CSV file, optionally gzip compressed.
+        parquet_path (Optional[Union[Path, str]]): Destination; next to the source file if None.
+        delimiter (str): The delimiter used in the file.
+        compression (str): Parquet compression codec ('zstd', 'snappy', 'gzip', 'lz4' or 'none').
+        compression_level (Optional[int]): Codec compression level; codec default if None.
+        row_group_size (int): Number of rows per Parquet row group.
+        use_dictionary (bool): Whether to dictionary-encode columns.
+        write_statistics (bool): Whether to write min/max/null-count statistics per row group.
+        block_size (int): Number of bytes decoded per CSV block.
+        schema (Optional[pa.Schema]): The file's column names and types, in file column order.
 
-def convert_to_parquet(path: Union[Path, str], file_type: str, delimiter: str = '|') -> None:
+    Returns:
+        Path: The path of the written Parquet file.
+    """
+    file_path = Path(file_path)
+    parquet_path = Path(parquet_path) if parquet_path else get_parquet_path(file_path)
+    temp_path = parquet_path.with_name(f".{parquet_path.name}.tmp")
+
+    source = pa.input_stream(file_path, compression='gzip' if _is_gzip_file(file_path) else None)
+    try:
+        if schema is not None:
+            read_options, parse_options, convert_options = build_csv_options(schema, delimiter,
+                                                                              block_size=block_size)
+        else:
+            read_options = pv.ReadOptions(block_size=block_size)
+            parse_options = pv.ParseOptions(delimiter=delimiter)
+            convert_options = None
+        reader = pv.open_csv(source, read_options=read_options, parse_options=parse_options,
+                             convert_options=convert_options)
+        pending_batches = []
+        pending_rows = 0
+        total_rows = 0
+        with pq.ParquetWriter(temp_path, reader.schema, compression=compression, compression_level=compression_level,
+                              use_dictionary=use_dictionary, write_statistics=write_statistics) as writer:
+            for batch in reader:
+                pending_batches.append(batch)
+                pending_rows += batch.num_rows
+                if pending_rows >= row_group_size:
+                    table = pa.Table.from_batches(pending_batches, schema=reader.schema)
+                    writer.write_table(table, row_group_size=row_group_size)
+                    total_rows += pending_rows
+                    pending_batches, pending_rows = [], 0
+                    check_memory_budget()
+            if pending_batches:
+                writer.write_table(pa.Table.from_batches(pending_batches, schema=reader.schema),
+                                   row_group_size=row_group_size)
+                total_rows += pending_rows
+        temp_path.replace(parquet_path)
+    except Exception:
+        temp_path.unlink(missing_ok=True)
+        raise
+    finally:
+        source.close()
+
+    LOGGER.debug(f"Streamed {total_rows} rows from {file_path} to {parquet_path}")
+    return parquet_path
+
+
+def _convert_file(file_path: Path, file_type: str, delimiter: str, delete_original: bool,
+                  parquet_options: Dict[str, Any], schema: Optional[pa.Schema]) -> Path:
+    """
+    Convert a single file to Parquet next to the original file.
+
+    Runs in the worker processes of `convert_to_parquet`, so it only takes picklable arguments.
+
+    Returns:
+        Path: The path of the written Parquet file.
+    """
+    if file_type == 'csv':
+        parquet_path = stream_csv_to_parquet(file_path, delimiter=delimiter, schema=schema, **parquet_options)
+    else:
+        raise ValueError(f"Unsupported file type: {file_type}")
+
+    LOGGER.info(f"Converted {file_path} to Parquet format at {parquet_path}")
+
+    if delete_original:
+        file_path.unlink()
+        LOGGER.debug(f"Deleted original file at {file_path}")
+    return parquet_path
+
+
+def _configure_worker_logging(level: int) -> None:
+    """
+    Send the logs of a spawned conversion worker to stderr at the parent's level; spawned processes
+    start without the parent's handlers.
+    """
+    logging.basicConfig(level=level, format=WORKER_LOG_FORMAT)
+
+
+def _describe_error(error: Exception) -> str:
+    return f"{type(error).__name__}: {error}"
+
+
+def convert_to_parquet(path: Union[Path, str], file_type: str, delimiter: str = '|', workers: int = 1,
+                       delete_original: bool = True, parquet_options: Optional[Dict[str, Any]] = None,
+                       schema: Optional[pa.Schema] = None) -> List[Path]:
     """
     Convert a single file or multiple files in a directory to Parquet format.
 
+    Each file is streamed to Parquet with `stream_csv_to_parquet`, so gzip-compressed files
+    ('*.csv.gz') are converted as well. With `workers` > 1 the files are converted in parallel in
+    a process pool whose workers log to stderr. A file that fails to convert does not stop the
+    others; all failures are logged and reported together at the end, each with its error.
+
     Args:
         path (Union[Path, str]): The path to the file or directory to be converted.
         file_type (str): The type of the file ('csv' currently supported).
         delimiter (str): The delimiter used in the file.
+        workers (int): Number of worker processes; files are converted in-process when 1.
+        delete_original (bool): Whether to delete each original file after it has been converted.
+        parquet_options (Optional[Dict[str, Any]]): Options passed to `stream_csv_to_parquet`, e.g.
+            compression, row_group_size, use_dictionary and write_statistics.
+        schema (Optional[pa.Schema]): The files' column names and types; inferred per file if None.
+
+    Returns:
+        List[Path]: The paths of the written Parquet files.
 
     Raises:
         ValueError: If the file type is not supported or path is invalid.
+        RuntimeError: If one or more files failed to convert.
+        MemoryBudgetExceeded: If this process went over the memory budget of the current table.
     """
     try:
         path = Path(path)
 
+        if file_type != 'csv':
+            raise ValueError(f"Unsupported file type: {file_type}")
+
         if path.is_file():
             files_to_convert = [path]
         elif path.is_dir():
-            files_to_convert = list(path.glob(f'*.{file_type}'))
+            files_to_convert = list(path.glob(f'*.{file_type}')) + list(path.glob(f'*.{file_type}.gz'))
         else:
             raise ValueError(f"Invalid path: {path}")
 
-        for file_path in files_to_convert:
-            if file_type == 'csv':
-                read_options = pv.ReadOptions()
-                parse_options = pv.ParseOptions(delimiter=delimiter)
-                table = pv.read_csv(file_path, read_options=read_options, parse_options=parse_options)
+        parquet_options = parquet_options or {}
+        total_bytes = sum(file_path.stat().st_size for file_path in files_to_convert)
+        start_time = time.perf_counter()
+        parquet_paths = []
+        failures: Dict[Path, str] = {}
+
+        # The span tracks this process only; spawned workers are bounded by the number of files they convert at once
+        with span('csv_to_parquet', nbytes=total_bytes) as convert_span:
+            if workers > 1 and len(files_to_convert) > 1:
+                # Spawned workers avoid forking a process that already runs Polars/Arrow thread pools
+                with ProcessPoolExecutor(max_workers=min(workers, len(files_to_convert)),
+                                         mp_context=multiprocessing.get_context('spawn'),
+                                         initializer=_configure_worker_logging,
+                                         initargs=(logging.getLogger().getEffectiveLevel(),)) as executor:
+                    futures = {executor.submit(_convert_file, file_path, file_type, delimiter, delete_original,
+                                               parquet_options, schema): file_path
+                               for file_path in files_to_convert}
+                    for future in as_completed(futures):
+                        try:
+                            parquet_paths.append(future.result())
+                        except Exception as e:
+                            failures[futures[future]] = _describe_error(e)
+                        check_memory_budget()
             else:
-                raise ValueError(f"Unsupported file type: {file_type}")
+                for file_path in files_to_convert:
+                    try:
+                        parquet_paths.append(_convert_file(file_path, file_type, delimiter, delete_original,
+                                                           parquet_options, schema))
+                    except MemoryBudgetExceeded:
+                        raise
+                    except Exception as e:
+                        failures[file_path] = _describe_error(e)
+                    check_memory_budget()
 
-            parquet_path = file_path.with_suffix('.parquet')
-            pq.write_table(table, parquet_path)
-            LOGGER.info(f"Converted {file_path} to Parquet format at {parquet_path}")
+            convert_span.rows = sum(pq.read_metadata(file).num_rows for file in parquet_paths)
+            elapsed = max(time.perf_counter() - start_time, 1e-9)
+            LOGGER.info(f"Converted {len(parquet_paths)} of {len(files_to_convert)} files in {elapsed:.2f}s "
+                        f"with {workers} worker(s): {len(parquet_paths) / elapsed:.2f} files/sec, "
+                        f"{total_bytes / elapsed / (1024 * 1024):.2f} MB/sec")
 
-            # Optionally, delete the original file
-            file_path.unlink()
-            LOGGER.debug(f"Deleted original file at {file_path}")
+            if failures:
+                for file_path, error in failures.items():
+                    LOGGER.error(f"Failed to convert {file_path}: {error}")
+                details = '; '.join(f"{file_path}: {failures[file_path]}" for file_path in sorted(failures))
+                raise RuntimeError(f"Failed to convert {len(failures)} of {len(files_to_convert)} files to Parquet: "
+                                   f"{details}")
 
+        return parquet_paths
+
+    except MemoryBudgetExceeded:
+        raise
     except Exception as e:
         LOGGER.error(f"Error converting {path} to Parquet: {e}")
         raise
@@ -0,0 +1,177 @@
+import html
+import logging
+import shutil
+from itertools import zip_longest
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import polars as pl
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_ROWS_PER_PAGE = 1000
+
+_STYLE = """<style>
+body { font-family: sans-serif; font-size: 13px; }
+table { border-collapse: collapse; }
+th, td { border: 1px solid #ccc; padding: 2px 6px; white-space: nowrap; }
+th { background-color: #f0f0f0; }
+td.diff { background-color: #FFDDDD; font-weight: bold; }
+td.null { color: #999; font-style: italic; }
+tr.right td { border-bottom: 2px solid #999; }
+</style>"""
+
+
+def _html_head(title: str) -> str:
+    return (f"<!DOCTYPE html>\n<html>\n<head>\n<meta charset=\"utf-8\">\n<title>{html.escape(title)}</title>\n"
+            f"{_STYLE}\n</head>\n<body>\n")
+
+
+def _format_cell(value: Optional[str], differs: bool) -> str:
+    if value is None:
+        return f'<td class="{"diff " if differs else ""}null">null</td>'
+    return f'<td class="diff">{html.escape(value)}</td>' if differs else f'<td>{html.escape(value)}</td>'
+
+
+def _write_page(page_path: Path, title: str, columns: List[str], left_rows: List[tuple], right_rows: List[tuple],
+                differences: List[tuple], first_row: int, left_name: str, right_name: str,
+                navigation: str) -> None:
+    """
+    Write one page of row pairs, highlighting only the cells that differ.
+    """
+    with page_path.open('w', encoding='utf-8') as page:
+        page.write(_html_head(title))
+        page.write(f"<h2>{html.escape(title)}</h2>\n{navigation}\n<table>\n<tr><th>row</th><th>side</th>")
+        page.write(''.join(f"<th>{html.escape(column)}</th>" for column in columns))
+        page.write("</tr>\n")
+        for offset, (left_row, right_row, row_differences) in enumerate(zip(left_rows, right_rows, differences)):
+            page.write(f'<tr class="left"><th rowspan="2">{first_row + offset}</th><td>{html.escape(left_name)}</td>')
+            page.write(''.join(_format_cell(value, differs) for value, differs in zip(left_row, row_differences)))
+            page.write(f'</tr>\n<tr class="right"><td>{html.escape(right_name)}</td>')
+            page.write(''.join(_format_cell(value, differs) for value, differs in zip(right_row, row_differences)))
+            page.write("</tr>\n")
+        page.write(f"</table>\n{navigation}\n</body>\n</html>\n")
+
+
+def _navigation(index_name: str, page_number: int, has_next: bool) -> str:
+    links = [f'<a href="../{html.escape(index_name)}">index</a>']
+    if page_number > 1:
+        links.append(f'<a href="page_{page_number - 1:05d}.html">previous</a>')
+    if has_next:
+        links.append(f'<a href="page_{page_number + 1:05d}.html">next</a>')
+    return f"<p>{' | '.join(links)}</p>"
+
+
+def _iter_pages(frame: Union[pl.DataFrame, pl.LazyFrame], rows_per_page: int) -> Iterator[pl.DataFrame]:
+    """
+    Iterate over the pages of a frame, collecting a LazyFrame once rather than re-scanning it per page.
+    """
+    if isinstance(frame, pl.LazyFrame):
+        frame = frame.collect(streaming=True)
+    return frame.iter_slices(rows_per_page)
+
+
+def write_mismatch_report(left: Union[pl.DataFrame, pl.LazyFrame], right: Union[pl.DataFrame, pl.LazyFrame],
+                          report_path: Union[Path, str], left_name: str = "df1", right_name: str = "df2",
+                          rows_per_page: int = DEFAULT_ROWS_PER_PAGE, title: str = "Mismatch report",
+                          column_counts: Optional[Dict[str, int]] = None) -> Path:
+    """
+    Write an HTML mismatch report as an index page plus one page per `rows_per_page` row pairs.
+
+    `left` and `right` hold the mismatched rows of both sides, aligned row by row. Each side is collected
+    once and sliced into pages that are rendered directly to disk one at a time, so the time is linear in
+    the number of mismatches and only one page is held as strings. Only the cells whose values differ
+    are highlighted. The index page starts with the per-column mismatch counts and links to every page.
+
+    Args:
+        left (Union[pl.DataFrame, pl.LazyFrame]): The mismatched rows of the first side.
+        right (Union[pl.DataFrame, pl.LazyFrame]): The mismatched rows of the second side, with the same columns.
+        report_path (Union[Path, str]): The index page; the pages are written to '<stem>_pages' next to it.
+        left_name (str): Name of the first side for reporting.
+        right_name (str): Name of the second side for reporting.
+        rows_per_page (int): Maximum number of row pairs per page.
+        title (str): Title of the report.
+        column_counts (Optional[Dict[str, int]]): Mismatch counts per compared column for the index page, for
+            inputs whose rows are mismatches rather than rows of the compared datasets (see `MismatchResult`);
+            counted from the differing cells if None.
+
+    Returns:
+        Path: The index page of the report.
+    """
+    pages = zip_longest(_iter_pages(left, rows_per_page), _iter_pages(right, rows_per_page))
+    return write_paged_mismatch_report(pages, report_path, left_name, right_name, rows_per_page, title,
+                                       column_counts)
+
+
+def write_paged_mismatch_report(page_pairs: Iterable[Tuple[Optional[pl.DataFrame], Optional[pl.DataFrame]]],
+                                report_path: Union[Path, str], left_name: str = "df1", right_name: str = "df2",
+                                rows_per_page: int = DEFAULT_ROWS_PER_PAGE, title: str = "Mismatch report",
+                                column_counts: Optional[Dict[str, int]] = None) -> Path:
+    """
+    Write the HTML mismatch report of `write_mismatch_report` from pages produced by the caller, e.g.
+    read batch by batch from a saved result, so the mismatches are never held in memory at once.
+
+    Args:
+        page_pairs (Iterable[Tuple[Optional[pl.DataFrame], Optional[pl.DataFrame]]]): The pages of both sides,
+            aligned row by row, with `rows_per_page` rows each except the last.
+        report_path (Union[Path, str]): The index page; the pages are written to '<stem>_pages' next to it.
+        left_name (str): Name of the first side for reporting.
+        right_name (str): Name of the second side for reporting.
+        rows_per_page (int): Number of row pairs per page.
+        title (str): Title of the report.
+        column_counts (Optional[Dict[str, int]]): Mismatch counts per compared column for the index page;
+            counted from the differing cells if None.
+
+    Returns:
+        Path: The index page of the report.
+
+    Raises:
+        ValueError: If the pages of both sides are not aligned.
+    """
+    report_path = Path(report_path)
+    pages_path = report_path.with_name(f"{report_path.stem}_pages")
+    shutil.rmtree(pages_path, ignore_errors=True)
+    pages_path.mkdir(parents=True)
+
+    columns: List[str] = []
+    mismatch_counts: Dict[str, int] = {}
+    total_rows = 0
+    page_number = 0
+    pages = iter(page_pairs)
+    next_pages = next(pages, None)
+    while next_pages is not None:
+        page_number += 1
+        left_page, right_page = next_pages
+        if (left_page is None or right_page is None or left_page.columns != right_page.columns
+                or left_page.height != right_page.height):
+            raise ValueError(f"Rows {total_rows + 1} to {total_rows + rows_per_page} of {left_name} and "
+                             f"{right_name} are not aligned")
+        left_page = left_page.select(pl.all().cast(pl.Utf8))
+        right_page = right_page.select(pl.all().cast(pl.Utf8))
+        columns = left_page.columns
+        differences = pl.DataFrame([left_page[column].ne_missing(right_page[column]) for column in columns])
+        for column, count in zip(columns, differences.sum().row(0)):
+            mismatch_counts[column] = mismatch_counts.get(column, 0) + count
+
+        # Look one page ahead so the last page knows it has no successor
+        next_pages = next(pages, None)
+        _write_page(pages_path / f"page_{page_number:05d}.html", f"{title} - page {page_number}", columns,
+                    left_page.rows(), right_page.rows(), differences.rows(), total_rows + 1, left_name, right_name,
+                    _navigation(report_path.name, page_number, next_pages is not None))
+        total_rows += left_page.height
+
+    if column_counts is not None:
+        mismatch_counts = column_counts
+    summary_rows = ''.join(f"<tr><td>{html.escape(column)}</td><td>{count}</td></tr>"
+                           for column, count in sorted(mismatch_counts.items(), key=lambda item: -item[1]))
+    page_links = ''.join(f'<li><a href="{pages_path.name}/page_{number:05d}.html">page {number}</a> '
+                         f'(rows {(number - 1) * rows_per_page + 1} to {min(number * rows_per_page, total_rows)})</li>'
+                         for number in range(1, page_number + 1))
+    body = (f"<h1>{html.escape(title)}</h1>\n<p>{total_rows} mismatched rows between {html.escape(left_name)} and "
+            f"{html.escape(right_name)}.</p>\n<h2>Mismatches per column</h2>\n<table>\n"
+            f"<tr><th>column</th><th>mismatched rows</th></tr>\n{summary_rows}\n</table>\n"
+            f"<h2>Pages</h2>\n<ul>\n{page_links}\n</ul>")
+    report_path.write_text(f"{_html_head(title)}{body}\n</body>\n</html>\n", encoding='utf-8')
+
+    LOGGER.info(f"Generated HTML report {report_path} with {total_rows} mismatched rows on {page_number} pages")
+    return report_path
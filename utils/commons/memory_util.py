@@ -0,0 +1,172 @@
+import logging
+import os
+import threading
+import time
+from typing import Optional, Set
+
+import pyarrow as pa
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_SAMPLE_INTERVAL = 0.02
+MB = 1024 * 1024
+
+
+class MemoryBudgetExceeded(MemoryError):
+    """
+    Raised when the process memory goes over the memory budget of the table being processed.
+    """
+
+
+def current_rss_bytes() -> Optional[int]:
+    """
+    Get the resident set size of this process.
+
+    Returns:
+        Optional[int]: The RSS in bytes, or None where /proc is not available.
+    """
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def arrow_allocated_bytes() -> int:
+    """
+    Get the bytes currently allocated by Arrow's memory pool, which also backs Polars' Arrow buffers
+    created through pyarrow.
+
+    Returns:
+        int: The allocated bytes.
+    """
+    return pa.total_allocated_bytes()
+
+
+class MemoryWatch:
+    """
+    Peak memory of a block of code, with an optional budget checked while the block runs.
+
+    The process RSS and Arrow allocations are sampled when the watch starts and stops and at every
+    `check()`. With a budget, a shared background thread also samples them between checks, so a peak
+    reached inside native Polars/Arrow code is recorded even if it is released before the next check.
+    The budget is enforced by the watched code itself: `check()`, called at batch and row-group
+    boundaries, and `stop()` raise `MemoryBudgetExceeded` once a sample went over it, so the test fails
+    with a clear message before the OS kills the worker. Use `stop()` (or the watch as a context
+    manager) when the block ends.
+
+    The RSS is that of the whole process, so memory used by other threads at the same time counts
+    against the budget too.
+
+    Attributes:
+        description (str): What is being watched, used in messages.
+        budget_bytes (Optional[int]): The RSS budget; no budget if None.
+        start_rss (Optional[int]): RSS when the watch started.
+        peak_rss (Optional[int]): Highest RSS sampled.
+        peak_arrow (int): Highest Arrow allocation sampled.
+        exceeded (bool): Whether the budget was exceeded.
+    """
+
+    def __init__(self, description: str, budget_bytes: Optional[int] = None) -> None:
+        self.description = description
+        self.budget_bytes = budget_bytes
+        self.start_rss = current_rss_bytes()
+        self.peak_rss = self.start_rss
+        self.peak_arrow = arrow_allocated_bytes()
+        self.exceeded = False
+        self._stopped = False
+        if budget_bytes is not None:
+            _SAMPLER.register(self)
+
+    def update(self, rss: Optional[int], arrow_bytes: int) -> None:
+        """
+        Record a sample and flag the budget violation, if any; called under the sampler's lock.
+        """
+        if rss is not None:
+            self.peak_rss = max(self.peak_rss or 0, rss)
+        self.peak_arrow = max(self.peak_arrow, arrow_bytes)
+        if self.budget_bytes is not None and rss is not None and rss > self.budget_bytes and not self.exceeded:
+            self.exceeded = True
+            LOGGER.error(self.message)
+
+    @property
+    def message(self) -> str:
+        """
+        str: Description of the budget violation.
+        """
+        return (f"Memory budget exceeded in {self.description}: RSS reached {(self.peak_rss or 0) / MB:.0f} MB, "
+                f"over the budget of {(self.budget_bytes or 0) / MB:.0f} MB "
+                f"(Arrow allocations {self.peak_arrow / MB:.0f} MB)")
+
+    def check(self) -> None:
+        """
+        Take a sample and raise if the budget was exceeded since the watch started.
+
+        Raises:
+            MemoryBudgetExceeded: If a sample went over the budget.
+        """
+        _SAMPLER.sample(self)
+        if self.exceeded:
+            raise MemoryBudgetExceeded(self.message)
+
+    def stop(self) -> None:
+        """
+        Take a final sample and stop watching.
+        """
+        if self._stopped:
+            return
+        self._stopped = True
+        if self.budget_bytes is not None:
+            _SAMPLER.unregister(self)
+        _SAMPLER.sample(self)
+
+    def __enter__(self) -> 'MemoryWatch':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> bool:
+        self.stop()
+        if exc_type is None and self.exceeded:
+            raise MemoryBudgetExceeded(self.message)
+        return False
+
+
+class _MemorySampler:
+    """
+    Background thread sampling memory for the open watches that have a budget; it runs only while
+    such watches are open, and only records samples on them.
+    """
+
+    def __init__(self, interval: float = DEFAULT_SAMPLE_INTERVAL) -> None:
+        self.interval = interval
+        self._watches: Set[MemoryWatch] = set()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def register(self, watch: MemoryWatch) -> None:
+        with self._lock:
+            self._watches.add(watch)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='memory-sampler', daemon=True)
+                self._thread.start()
+
+    def unregister(self, watch: MemoryWatch) -> None:
+        with self._lock:
+            self._watches.discard(watch)
+
+    def sample(self, watch: MemoryWatch) -> None:
+        with self._lock:
+            watch.update(current_rss_bytes(), arrow_allocated_bytes())
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                if not self._watches:
+                    self._thread = None
+                    return
+                rss, arrow_bytes = current_rss_bytes(), arrow_allocated_bytes()
+                for watch in list(self._watches):
+                    watch.update(rss, arrow_bytes)
+            time.sleep(self.interval)
+
+
+_SAMPLER = _MemorySampler()
@@ -0,0 +1,208 @@
+import json
+import logging
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+import polars as pl
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+LOGGER = logging.getLogger(__name__)
+
+MISMATCHES_FILE_NAME = 'mismatches.parquet'
+SUMMARY_FILE_NAME = 'summary.json'
+
+# Kinds of mismatch recorded in the `mismatch_kind` column
+VALUE_MISMATCH = 'value'
+MISSING_IN_LEFT = 'missing_in_left'
+MISSING_IN_RIGHT = 'missing_in_right'
+
+# Column name recorded for rows that exist on one side only
+ROW_COLUMN_NAME = '*'
+
+
+class MismatchResult:
+    """
+    Columnar result of a dataset comparison: one row per differing cell or missing row.
+
+    Mismatches are held as an Arrow-backed Polars frame (or a Parquet file once saved) with the key
+    columns followed by `column_name`, `left_value`, `right_value` and `mismatch_kind`. Values are
+    stored as strings so columns of any type share one layout. A small JSON-serializable summary with
+    per-column and per-kind counts is computed once, so reports and assertion messages never have to
+    scan the mismatches again.
+
+    Attributes:
+        key_columns (List[str]): Columns identifying a row on both sides.
+        left_name (str): Name of the first dataset for reporting.
+        right_name (str): Name of the second dataset for reporting.
+        summary (Dict[str, Any]): Counts of mismatches in total, per column and per kind.
+    """
+
+    def __init__(self, mismatches: Union[pl.DataFrame, Path, str], key_columns: List[str], left_name: str = "df1",
+                 right_name: str = "df2", summary: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Initialize the result.
+
+        Args:
+            mismatches (Union[pl.DataFrame, Path, str]): The mismatch rows, or a Parquet file holding them.
+            key_columns (List[str]): Columns identifying a row on both sides.
+            left_name (str): Name of the first dataset for reporting.
+            right_name (str): Name of the second dataset for reporting.
+            summary (Optional[Dict[str, Any]]): A previously computed summary; computed from the mismatches if None.
+        """
+        self._mismatches = mismatches if isinstance(mismatches, pl.DataFrame) else Path(mismatches)
+        self.key_columns = list(key_columns)
+        self.left_name = left_name
+        self.right_name = right_name
+        self.summary = summary if summary is not None else self._summarize()
+
+    @staticmethod
+    def schema(key_columns: List[str]) -> Dict[str, pl.PolarsDataType]:
+        """
+        Get the layout of the mismatch rows.
+
+        Args:
+            key_columns (List[str]): Columns identifying a row on both sides.
+
+        Returns:
+            Dict[str, pl.PolarsDataType]: Column names and types of the mismatch rows.
+        """
+        return {**{column: pl.Utf8 for column in key_columns}, 'column_name': pl.Utf8, 'left_value': pl.Utf8,
+                'right_value': pl.Utf8, 'mismatch_kind': pl.Utf8}
+
+    @classmethod
+    def empty(cls, key_columns: Optional[List[str]] = None, left_name: str = "df1",
+              right_name: str = "df2") -> 'MismatchResult':
+        """
+        Create a result without mismatches.
+
+        Returns:
+            MismatchResult: The empty result.
+        """
+        key_columns = key_columns or []
+        return cls(pl.DataFrame(schema=cls.schema(key_columns)), key_columns, left_name, right_name)
+
+    def lazy(self) -> pl.LazyFrame:
+        """
+        Get the mismatches as a LazyFrame, scanning the Parquet file of a saved result.
+
+        Returns:
+            pl.LazyFrame: The mismatch rows, ready to be filtered without loading them all.
+        """
+        if isinstance(self._mismatches, pl.DataFrame):
+            return self._mismatches.lazy()
+        return pl.scan_parquet(self._mismatches)
+
+    def iter_batches(self, batch_size: int) -> Iterator[pl.DataFrame]:
+        """
+        Iterate over the mismatches in batches of `batch_size` rows (the last one may be shorter), slicing
+        an in-memory result and reading a saved one batch by batch, so only one batch is held at a time.
+
+        Args:
+            batch_size (int): Number of rows per batch.
+
+        Returns:
+            Iterator[pl.DataFrame]: The batches, in order.
+        """
+        if isinstance(self._mismatches, pl.DataFrame):
+            yield from self._mismatches.iter_slices(batch_size)
+            return
+
+        # A Spark result is a glob over its part files. Batches read from Parquet end at row group and file
+        # boundaries, so they are regrouped to full batches.
+        files = (sorted(self._mismatches.parent.glob(self._mismatches.name)) if '*' in self._mismatches.name
+                 else [self._mismatches])
+        buffered: List[pa.RecordBatch] = []
+        buffered_rows = 0
+        batches = (batch for file in files for batch in pq.ParquetFile(file).iter_batches(batch_size=batch_size))
+        for batch in batches:
+            buffered.append(batch)
+            buffered_rows += batch.num_rows
+            while buffered_rows >= batch_size:
+                table = pa.Table.from_batches(buffered)
+                yield pl.from_arrow(table.slice(0, batch_size))
+                rest = table.slice(batch_size)
+                buffered, buffered_rows = rest.to_batches(), rest.num_rows
+        if buffered_rows:
+            yield pl.from_arrow(pa.Table.from_batches(buffered))
+
+    def __len__(self) -> int:
+        return self.summary['mismatch_count']
+
+    @property
+    def is_empty(self) -> bool:
+        """
+        bool: True if the compared datasets are identical.
+        """
+        return len(self) == 0
+
+    def _summarize(self) -> Dict[str, Any]:
+        counts = self.lazy().group_by('column_name', 'mismatch_kind').agg(pl.len().alias('count')).collect()
+        column_counts: Dict[str, int] = {}
+        kind_counts: Dict[str, int] = {}
+        for column_name, mismatch_kind, count in counts.iter_rows():
+            column_counts[column_name] = column_counts.get(column_name, 0) + count
+            kind_counts[mismatch_kind] = kind_counts.get(mismatch_kind, 0) + count
+        return {
+            'left_name': self.left_name,
+            'right_name': self.right_name,
+            'key_columns': self.key_columns,
+            'mismatch_count': sum(column_counts.values()),
+            'column_counts': dict(sorted(column_counts.items(), key=lambda item: (-item[1], item[0]))),
+            'kind_counts': dict(sorted(kind_counts.items())),
+        }
+
+    def describe(self, max_columns: int = 10) -> str:
+        """
+        Describe the mismatches in a few lines, e.g. for an assertion message.
+
+        Args:
+            max_columns (int): Maximum number of columns listed with their mismatch counts.
+
+        Returns:
+            str: The description.
+        """
+        if self.is_empty:
+            return "Datasets are identical."
+        kinds = ", ".join(f"{kind}: {count}" for kind, count in self.summary['kind_counts'].items())
+        columns = list(self.summary['column_counts'].items())
+        listed = ", ".join(f"{column} ({count})" for column, count in columns[:max_columns])
+        more = f" and {len(columns) - max_columns} more" if len(columns) > max_columns else ""
+        return (f"{len(self)} mismatches between {self.left_name} and {self.right_name} ({kinds}). "
+                f"Mismatched columns: {listed}{more}.")
+
+    def save(self, directory: Union[Path, str]) -> Path:
+        """
+        Persist the mismatches as Parquet plus the summary as JSON.
+
+        Args:
+            directory (Union[Path, str]): The folder to write 'mismatches.parquet' and 'summary.json' to.
+
+        Returns:
+            Path: The folder.
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        parquet_path = directory / MISMATCHES_FILE_NAME
+        temp_path = parquet_path.with_name(f".{parquet_path.name}.tmp")
+        self.lazy().collect().write_parquet(temp_path, compression='zstd')
+        temp_path.replace(parquet_path)
+        (directory / SUMMARY_FILE_NAME).write_text(json.dumps(self.summary, indent=2))
+        LOGGER.info(f"Saved {len(self)} mismatches to {directory}")
+        return directory
+
+    @classmethod
+    def load(cls, directory: Union[Path, str]) -> 'MismatchResult':
+        """
+        Load a saved result; the mismatches stay on disk until they are collected.
+
+        Args:
+            directory (Union[Path, str]): The folder written by `save`.
+
+        Returns:
+            MismatchResult: The result, backed by the saved Parquet file.
+        """
+        directory = Path(directory)
+        summary = json.loads((directory / SUMMARY_FILE_NAME).read_text())
+        return cls(directory / MISMATCHES_FILE_NAME, summary['key_columns'], summary['left_name'],
+                   summary['right_name'], summary=summary)
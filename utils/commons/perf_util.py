@@ -0,0 +1,336 @@
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Union
+
+from utils.commons.memory_util import MB, MemoryBudgetExceeded, MemoryWatch
+
+LOGGER = logging.getLogger(__name__)
+
+SPAN_FILE_PREFIX = 'perf_spans_'
+REPORT_FILE_NAME = 'perf_report'
+
+_current_table: ContextVar[Optional[str]] = ContextVar('perf_current_table', default=None)
+_current_memory_budget: ContextVar[Optional[float]] = ContextVar('perf_current_memory_budget', default=None)
+_current_watch: ContextVar[Optional[MemoryWatch]] = ContextVar('perf_current_watch', default=None)
+_spans: List[Dict[str, Any]] = []
+_spans_lock = threading.Lock()
+
+
+class Span:
+    """
+    Timing record of one execution of a stage.
+
+    Attributes:
+        stage (str): Name of the stage, e.g. 's3_download' or 'compare'.
+        table (Optional[str]): Table being processed, from `table_context` unless given explicitly.
+        rows (Optional[int]): Number of rows processed; may be set inside the span.
+        nbytes (Optional[int]): Number of bytes processed; may be set inside the span.
+    """
+
+    def __init__(self, stage: str, table: Optional[str] = None, rows: Optional[int] = None,
+                 nbytes: Optional[int] = None) -> None:
+        self.stage = stage
+        self.table = table if table is not None else _current_table.get()
+        self.rows = rows
+        self.nbytes = nbytes
+
+    def to_dict(self, start: float, duration: float, status: str,
+                memory: Optional[MemoryWatch] = None) -> Dict[str, Any]:
+        record = {'stage': self.stage, 'table': self.table, 'start': start, 'seconds': duration, 'rows': self.rows,
+                  'bytes': self.nbytes, 'status': status, 'pid': os.getpid(),
+                  'peak_rss_mb': None, 'rss_delta_mb': None, 'peak_arrow_mb': None}
+        if memory is not None:
+            if memory.peak_rss is not None:
+                record['peak_rss_mb'] = round(memory.peak_rss / MB, 1)
+                record['rss_delta_mb'] = round((memory.peak_rss - memory.start_rss) / MB, 1)
+            record['peak_arrow_mb'] = round(memory.peak_arrow / MB, 1)
+        return record
+
+
+@contextmanager
+def table_context(table_name: Optional[str], memory_budget_mb: Optional[float] = None) -> Iterator[None]:
+    """
+    Attribute the spans recorded inside the block (in this thread or task) to a table.
+
+    Args:
+        table_name (Optional[str]): The table being processed.
+        memory_budget_mb (Optional[float]): The table's memory budget: a span fails with
+            `MemoryBudgetExceeded` at its next `check_memory_budget` or when it ends, once the process
+            RSS went over it. No budget if None.
+    """
+    token = _current_table.set(table_name)
+    budget_token = _current_memory_budget.set(memory_budget_mb)
+    try:
+        yield
+    finally:
+        _current_memory_budget.reset(budget_token)
+        _current_table.reset(token)
+
+
+def check_memory_budget() -> None:
+    """
+    Check the memory budget of the innermost span of this thread or task; called at batch and row-group
+    boundaries of long stages so they stop at the first boundary after going over the budget.
+
+    Raises:
+        MemoryBudgetExceeded: If the process RSS went over the table's memory budget during the span.
+    """
+    watch = _current_watch.get()
+    if watch is not None:
+        watch.check()
+
+
+def memory_watch(stage: str, table: Optional[str] = None) -> MemoryWatch:
+    """
+    Start watching the memory of a stage, enforcing the memory budget of the current `table_context`.
+
+    Args:
+        stage (str): Name of the stage.
+        table (Optional[str]): Table being processed; the current `table_context` if None.
+
+    Returns:
+        MemoryWatch: The running watch; call `stop()` when the stage ends.
+    """
+    table = table if table is not None else _current_table.get()
+    budget_mb = _current_memory_budget.get()
+    return MemoryWatch(f"stage '{stage}' of table {table or '-'}",
+                       budget_bytes=int(budget_mb * MB) if budget_mb is not None else None)
+
+
+@contextmanager
+def span(stage: str, table: Optional[str] = None, rows: Optional[int] = None,
+         nbytes: Optional[int] = None) -> Iterator[Span]:
+    """
+    Time a block as one execution of a stage and track its peak memory.
+
+    The yielded `Span` lets the block set `rows` and `nbytes` once they are known. A span that
+    raises is recorded with status 'error'. The peak RSS and Arrow allocation of the block are
+    recorded with the span and logged; when the RSS goes over the memory budget of the current
+    `table_context`, the block fails with `MemoryBudgetExceeded` at its next `check_memory_budget`,
+    or when it ends.
+
+    Args:
+        stage (str): Name of the stage.
+        table (Optional[str]): Table being processed; the current `table_context` if None.
+        rows (Optional[int]): Number of rows processed, if known up front.
+        nbytes (Optional[int]): Number of bytes processed, if known up front.
+
+    Yields:
+        Span: The span being recorded.
+
+    Raises:
+        MemoryBudgetExceeded: If the process RSS went over the table's memory budget.
+    """
+    current = Span(stage, table, rows, nbytes)
+    watch = memory_watch(stage, current.table)
+    watch_token = _current_watch.set(watch)
+    start_wall, start = time.time(), time.perf_counter()
+    status = 'ok'
+    try:
+        yield current
+    except BaseException:
+        status = 'error'
+        raise
+    finally:
+        _current_watch.reset(watch_token)
+        watch.stop()
+        if watch.exceeded:
+            status = 'error'
+        _record(current.to_dict(start_wall, time.perf_counter() - start, status, watch))
+    if watch.exceeded:
+        raise MemoryBudgetExceeded(watch.message)
+
+
+def _record(record: Dict[str, Any]) -> None:
+    with _spans_lock:
+        _spans.append(record)
+    if record['peak_rss_mb'] is not None:
+        LOGGER.info(f"Stage {record['stage']} [{record['table'] or '-'}] took {record['seconds']:.2f}s, "
+                    f"peak RSS {record['peak_rss_mb']:.0f} MB ({record['rss_delta_mb']:+.0f} MB), "
+                    f"Arrow allocations {record['peak_arrow_mb']:.0f} MB")
+
+
+def record_span(stage: str, seconds: float, table: Optional[str] = None, rows: Optional[int] = None,
+                nbytes: Optional[int] = None, status: str = 'ok', memory: Optional[MemoryWatch] = None) -> None:
+    """
+    Record a stage execution that was timed by the caller, ending now.
+
+    Args:
+        stage (str): Name of the stage.
+        seconds (float): Duration of the execution.
+        table (Optional[str]): Table being processed; the current `table_context` if None.
+        rows (Optional[int]): Number of rows processed.
+        nbytes (Optional[int]): Number of bytes processed.
+        status (str): 'ok', or 'error' if the execution failed.
+        memory (Optional[MemoryWatch]): The stopped watch of the execution, from `memory_watch`, if any.
+    """
+    _record(Span(stage, table, rows, nbytes).to_dict(time.time() - seconds, seconds, status, memory))
+
+
+def timed(stage: str, rows: Optional[Callable[[Any], Optional[int]]] = None) -> Callable:
+    """
+    Decorator recording every call of a function as a span of a stage.
+
+    Args:
+        stage (str): Name of the stage.
+        rows (Optional[Callable[[Any], Optional[int]]]): Derives the number of rows from the return value;
+            by default the `height` of a returned DataFrame, if any.
+
+    Returns:
+        Callable: The decorator.
+    """
+    def decorator(function: Callable) -> Callable:
+        @functools.wraps(function)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with span(stage) as current:
+                result = function(*args, **kwargs)
+                current.rows = rows(result) if rows is not None else getattr(result, 'height', None)
+                return result
+        return wrapper
+    return decorator
+
+
+def get_spans() -> List[Dict[str, Any]]:
+    """
+    Get the spans recorded in this process.
+
+    Returns:
+        List[Dict[str, Any]]: Copies of the recorded spans.
+    """
+    with _spans_lock:
+        return [dict(record) for record in _spans]
+
+
+def reset_spans() -> None:
+    """
+    Discard the spans recorded in this process.
+    """
+    with _spans_lock:
+        _spans.clear()
+
+
+def write_spans(directory: Union[Path, str], worker_id: str) -> Path:
+    """
+    Write the spans of this process as JSON lines, one file per worker, tagging each span with the worker.
+
+    Args:
+        directory (Union[Path, str]): The session's logs folder.
+        worker_id (str): The xdist worker id, or 'main'.
+
+    Returns:
+        Path: The written file.
+    """
+    span_path = Path(directory) / f"{SPAN_FILE_PREFIX}{worker_id}.jsonl"
+    with span_path.open('w') as span_file:
+        for record in get_spans():
+            span_file.write(json.dumps({**record, 'worker': worker_id}) + '\n')
+    return span_path
+
+
+def summarize_spans(spans: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Aggregate spans per table and stage.
+
+    Args:
+        spans (List[Dict[str, Any]]): Spans of one or more workers.
+
+    Returns:
+        Dict[str, Any]: Per table and stage: calls, errors, total/max seconds, rows, bytes, throughput and
+        peak RSS/Arrow memory, plus the session's wall-clock span and the total time per stage.
+    """
+    stages: Dict[tuple, Dict[str, Any]] = {}
+    for record in spans:
+        entry = stages.setdefault((record['table'] or '-', record['stage']), {
+            'table': record['table'] or '-', 'stage': record['stage'], 'calls': 0, 'errors': 0,
+            'total_seconds': 0.0, 'max_seconds': 0.0, 'rows': 0, 'bytes': 0, 'peak_rss_mb': None,
+            'peak_arrow_mb': None, 'workers': set()})
+        entry['calls'] += 1
+        entry['errors'] += record['status'] != 'ok'
+        entry['total_seconds'] += record['seconds']
+        entry['max_seconds'] = max(entry['max_seconds'], record['seconds'])
+        entry['rows'] += record['rows'] or 0
+        entry['bytes'] += record['bytes'] or 0
+        for memory_key in ('peak_rss_mb', 'peak_arrow_mb'):
+            if record.get(memory_key) is not None:
+                entry[memory_key] = max(entry[memory_key] or 0.0, record[memory_key])
+        entry['workers'].add(record.get('worker', 'main'))
+
+    rows = []
+    for entry in sorted(stages.values(), key=lambda item: (item['table'], -item['total_seconds'])):
+        seconds = max(entry['total_seconds'], 1e-9)
+        entry['workers'] = sorted(entry['workers'])
+        entry['total_seconds'] = round(entry['total_seconds'], 4)
+        entry['max_seconds'] = round(entry['max_seconds'], 4)
+        entry['rows_per_sec'] = round(entry['rows'] / seconds, 1) if entry['rows'] else None
+        entry['mb_per_sec'] = round(entry['bytes'] / seconds / (1024 * 1024), 2) if entry['bytes'] else None
+        rows.append(entry)
+
+    stage_totals: Dict[str, float] = {}
+    for entry in rows:
+        stage_totals[entry['stage']] = round(stage_totals.get(entry['stage'], 0.0) + entry['total_seconds'], 4)
+    wall_seconds = (max(record['start'] + record['seconds'] for record in spans)
+                    - min(record['start'] for record in spans)) if spans else 0.0
+    return {'span_count': len(spans), 'wall_seconds': round(wall_seconds, 3),
+            'stage_totals': dict(sorted(stage_totals.items(), key=lambda item: -item[1])), 'stages': rows}
+
+
+def format_span_report(summary: Dict[str, Any]) -> str:
+    """
+    Format a span summary as a plain-text table.
+
+    Args:
+        summary (Dict[str, Any]): The output of `summarize_spans`.
+
+    Returns:
+        str: The report.
+    """
+    header = f"{'table':<36} {'stage':<18} {'calls':>6} {'errors':>6} {'total s':>10} {'max s':>9} " \
+             f"{'rows':>12} {'MB':>10} {'rows/s':>12} {'MB/s':>9} {'peak RSS':>9} {'Arrow':>8}"
+    lines = [f"Performance report: {summary['span_count']} spans over {summary['wall_seconds']}s", '', header,
+             '-' * len(header)]
+    for entry in summary['stages']:
+        lines.append(f"{entry['table'][:36]:<36} {entry['stage'][:18]:<18} {entry['calls']:>6} {entry['errors']:>6} "
+                     f"{entry['total_seconds']:>10.3f} {entry['max_seconds']:>9.3f} {entry['rows']:>12} "
+                     f"{entry['bytes'] / (1024 * 1024):>10.2f} {entry['rows_per_sec'] or '':>12} "
+                     f"{entry['mb_per_sec'] or '':>9} {_format_mb(entry['peak_rss_mb']):>9} "
+                     f"{_format_mb(entry['peak_arrow_mb']):>8}")
+    lines += ['', 'Total seconds per stage:']
+    lines += [f"  {stage:<18} {seconds:>10.3f}" for stage, seconds in summary['stage_totals'].items()]
+    return '\n'.join(lines) + '\n'
+
+
+def _format_mb(value: Optional[float]) -> str:
+    return f"{value:.0f}" if value is not None else ''
+
+
+def merge_span_reports(directory: Union[Path, str]) -> Optional[Path]:
+    """
+    Merge the span files of all workers in a logs folder into 'perf_report.json' and 'perf_report.txt'.
+
+    Args:
+        directory (Union[Path, str]): The session's logs folder.
+
+    Returns:
+        Optional[Path]: The JSON report, or None if no spans were recorded.
+    """
+    directory = Path(directory)
+    spans = []
+    for span_path in sorted(directory.glob(f"{SPAN_FILE_PREFIX}*.jsonl")):
+        with span_path.open() as span_file:
+            spans.extend(json.loads(line) for line in span_file if line.strip())
+    if not spans:
+        return None
+
+    summary = summarize_spans(spans)
+    report_path = directory / f"{REPORT_FILE_NAME}.json"
+    report_path.write_text(json.dumps({'summary': summary, 'spans': spans}, indent=2))
+    (directory / f"{REPORT_FILE_NAME}.txt").write_text(format_span_report(summary))
+    LOGGER.info(f"Wrote performance report with {len(spans)} spans to {report_path}")
+    return report_path
@@ -4,18 +4,26 @@ from boto3 import client
 from io import BytesIO
 import pyarrow.csv as pv
 import pyarrow.parquet as pq
+from typing import Optional
+
+from utils.commons.s3_range_util import RangedDownloader
 
 LOGGER = logging.getLogger(__name__)
 
 
-def read_s3_path_to_polars(s3_client: client, bucket_name: str, s3_path: str) -> pl.DataFrame:
+def read_s3_path_to_polars(s3_client: client, bucket_name: str, s3_path: str,
+                           downloader: Optional[RangedDownloader] = None) -> pl.DataFrame:
     """
     Read all files from an S3 path, convert them to Parquet, and combine them into a single Polars DataFrame.
 
+    Large files are fetched as concurrent byte-range GETs and reassembled in order.
+
     Args:
         s3_client (boto3.client): S3 client object.
         bucket_name (str): Name of the S3 bucket.
         s3_path (str): Path in the S3 bucket where the files are located.
+        downloader (Optional[RangedDownloader]): Splits large objects into byte ranges; a default
+            `RangedDownloader` if None.
 
     Returns:
         pl.DataFrame: Combined Polars DataFrame containing the data from all files.
@@ -24,14 +32,14 @@ def read_s3_path_to_polars(s3_client: client, bucket_name: str, s3_path: str) ->
         paginator = s3_client.get_paginator('list_objects_v2')
         pages = paginator.paginate(Bucket=bucket_name, Prefix=s3_path)
 
+        downloader = downloader or RangedDownloader()
         dataframes = []
 
         for page in pages:
             for obj in page.get('Contents', []):
                 s3_key = obj['Key']
                 LOGGER.debug(f"Reading file from S3: {s3_key}")
-                s3_object = s3_client.get_object(Bucket=bucket_name, Key=s3_key)
-                file_content = s3_object['Body'].read()
+                file_content = downloader.read_bytes(s3_client, bucket_name, s3_key, obj['Size'], obj.get('ETag'))
 
                 # Decode file content with ANSI encoding, handling errors by replacing problematic characters
                 decoded_content = file_content.decode('windows-1252', errors='replace')
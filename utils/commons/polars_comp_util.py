@@ -1,9 +1,23 @@
 import logging
-import pandas
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
 import polars as pl
 
+from utils.commons.html_report_util import DEFAULT_ROWS_PER_PAGE, write_paged_mismatch_report
+from utils.commons.mismatch_result import (MISSING_IN_LEFT, MISSING_IN_RIGHT, ROW_COLUMN_NAME, VALUE_MISMATCH,
+                                           MismatchResult)
+from utils.commons.perf_util import span
+from utils.commons.polars_util import ColumnRule
+
 LOGGER = logging.getLogger(__name__)
 
+# Key of positional mismatches when no key columns are given
+ROW_NUMBER_COLUMN = 'row_number'
+JOIN_STRATEGIES = ('hash', 'sort_merge')
+DEFAULT_JSON_BATCH_ROWS = 100_000
+
+FrameLike = Union[pl.DataFrame, pl.LazyFrame]
+
 
 def sort_dataframe_columns(df: pl.DataFrame) -> pl.DataFrame:
     """
@@ -19,69 +33,341 @@ def sort_dataframe_columns(df: pl.DataFrame) -> pl.DataFrame:
     return df.select(sorted_columns)
 
 
-def compare_dataframes(df1: pl.DataFrame, df2: pl.DataFrame, df1_name: str = "df1", df2_name: str = "df2") -> (bool, str, pl.DataFrame):
+def _differs(left: pl.Expr, right: pl.Expr, rule: Optional[ColumnRule]) -> pl.Expr:
+    """
+    Build the expression flagging the rows where two columns differ, within the tolerances of the rule.
+    """
+    if rule is None or not rule.has_tolerance:
+        return left.ne_missing(right)
+    # Decimals are subtracted exactly before the difference is compared as a float
+    difference = (left - right).abs().cast(pl.Float64)
+    allowed = pl.lit(rule.abs_tol) + rule.rel_tol * right.cast(pl.Float64).abs()
+    return left.is_null().ne(right.is_null()) | (difference > allowed).fill_null(False)
+
+
+def _value_mismatches(joined: pl.LazyFrame, key_columns: List[str], value_columns: List[str],
+                      left_suffix: str, right_suffix: str, present: pl.Expr,
+                      rules: Optional[Dict[str, ColumnRule]] = None) -> List[pl.LazyFrame]:
+    """
+    Build one lazy mismatch frame per value column of a frame with both sides side by side.
+    """
+    rules = rules or {}
+    keys = [pl.col(column).cast(pl.Utf8) for column in key_columns]
+    return [joined.filter(present & _differs(pl.col(f"{column}{left_suffix}"), pl.col(f"{column}{right_suffix}"),
+                                             rules.get(column)))
+            .select(*keys, pl.lit(column).alias('column_name'),
+                    pl.col(f"{column}{left_suffix}").cast(pl.Utf8).alias('left_value'),
+                    pl.col(f"{column}{right_suffix}").cast(pl.Utf8).alias('right_value'),
+                    pl.lit(VALUE_MISMATCH).alias('mismatch_kind'))
+            for column in value_columns]
+
+
+def compare_dataframes(df1: pl.DataFrame, df2: pl.DataFrame, df1_name: str = "df1", df2_name: str = "df2",
+                       key_columns: Optional[List[str]] = None,
+                       rules: Optional[Dict[str, ColumnRule]] = None) -> (bool, str, MismatchResult):
     """
     Compare two dataframes and return if they are identical, a message describing the comparison result,
-    and a DataFrame containing the mismatched rows.
+    and a columnar result with one row per mismatched cell.
+
+    Without `key_columns` the rows are compared by position and both dataframes must have the same
+    shape; the row number is then the key of each mismatch. With `key_columns` the rows are matched
+    on those columns, so the dataframes may be ordered differently, and rows present on one side only
+    are reported as `missing_in_left` / `missing_in_right`. Key values should be unique on each side.
+
+    Values are compared exactly, except in the columns whose rule has an absolute or relative tolerance
+    (typed comparisons of frames aligned with `align_to_schema`).
 
     Args:
         df1 (pl.DataFrame): First dataframe to compare.
         df2 (pl.DataFrame): Second dataframe to compare.
         df1_name (str): Name of the first dataframe for reporting.
         df2_name (str): Name of the second dataframe for reporting.
+        key_columns (Optional[List[str]]): Columns identifying a row on both sides; rows are matched by position if None.
+        rules (Optional[Dict[str, ColumnRule]]): The comparison rule of each column that needs one.
 
     Returns:
-        (bool, str, pl.DataFrame): A tuple containing a boolean indicating if the dataframes are identical,
-                                   a message, and a DataFrame with mismatched rows.
+        (bool, str, MismatchResult): A tuple containing a boolean indicating if the dataframes are identical,
+                                     a message, and the mismatches.
     """
+    with span('compare', rows=df1.height) as compare_span:
+        are_identical, message, mismatch_result = _compare_dataframes(df1, df2, df1_name, df2_name, key_columns,
+                                                                      rules)
+        compare_span.nbytes = df1.estimated_size() + df2.estimated_size()
+    return are_identical, message, mismatch_result
+
+
+def _compare_dataframes(df1: pl.DataFrame, df2: pl.DataFrame, df1_name: str, df2_name: str,
+                        key_columns: Optional[List[str]],
+                        rules: Optional[Dict[str, ColumnRule]] = None) -> (bool, str, MismatchResult):
+    result_keys = key_columns or [ROW_NUMBER_COLUMN]
+    empty_result = MismatchResult.empty(result_keys, df1_name, df2_name)
     try:
 
         if df1.equals(df2):
-            return True, "Datasets are identical.", pl.DataFrame()
+            return True, "Datasets are identical.", empty_result
 
         if df1.columns != df2.columns:
             cols1, cols2 = set(df1.columns), set(df2.columns)
             missing_in_df1 = cols2 - cols1
             missing_in_df2 = cols1 - cols2
-            return False, f"Column mismatch: Missing in {df1_name}: {missing_in_df1}, Missing in {df2_name}: {missing_in_df2}", pl.DataFrame()
+            return False, f"Column mismatch: Missing in {df1_name}: {missing_in_df1}, Missing in {df2_name}: {missing_in_df2}", empty_result
+
+        left_suffix, right_suffix = f"__{df1_name}", f"__{df2_name}"
+        if key_columns:
+            missing_keys = [column for column in key_columns if column not in df1.columns]
+            if missing_keys:
+                return False, f"Key columns {missing_keys} are not available in both datasets.", empty_result
+            value_columns = [column for column in df1.columns if column not in key_columns]
+            left = df1.lazy().with_columns(pl.lit(True).alias(f"_present{left_suffix}"))
+            right = df2.lazy().with_columns(pl.lit(True).alias(f"_present{right_suffix}"))
+            joined = left.rename({column: f"{column}{left_suffix}" for column in value_columns}).join(
+                right.rename({column: f"{column}{right_suffix}" for column in value_columns}),
+                on=key_columns, how='outer_coalesce')
+            in_left = pl.col(f"_present{left_suffix}").is_not_null()
+            in_right = pl.col(f"_present{right_suffix}").is_not_null()
+            keys = [pl.col(column).cast(pl.Utf8) for column in key_columns]
+            missing_rows = [joined.filter(~in_left).select(*keys, pl.lit(ROW_COLUMN_NAME).alias('column_name'),
+                                                           pl.lit(None, pl.Utf8).alias('left_value'),
+                                                           pl.lit(None, pl.Utf8).alias('right_value'),
+                                                           pl.lit(MISSING_IN_LEFT).alias('mismatch_kind')),
+                            joined.filter(~in_right).select(*keys, pl.lit(ROW_COLUMN_NAME).alias('column_name'),
+                                                            pl.lit(None, pl.Utf8).alias('left_value'),
+                                                            pl.lit(None, pl.Utf8).alias('right_value'),
+                                                            pl.lit(MISSING_IN_RIGHT).alias('mismatch_kind'))]
+            frames = missing_rows + _value_mismatches(joined, key_columns, value_columns, left_suffix, right_suffix,
+                                                      in_left & in_right, rules)
+        else:
+            if df1.shape != df2.shape:
+                return False, f"Shape mismatch: {df1_name} shape: {df1.shape}, {df2_name} shape: {df2.shape}", empty_result
+            joined = pl.concat([df1.lazy().select(pl.all().name.suffix(left_suffix)),
+                                df2.lazy().select(pl.all().name.suffix(right_suffix))],
+                               how='horizontal').with_row_index(ROW_NUMBER_COLUMN)
+            frames = _value_mismatches(joined, [ROW_NUMBER_COLUMN], df1.columns, left_suffix, right_suffix,
+                                       pl.lit(True), rules)
+
+        mismatches = pl.concat(frames).collect() if frames else pl.DataFrame(schema=MismatchResult.schema(result_keys))
+        mismatch_result = MismatchResult(mismatches, result_keys, df1_name, df2_name)
+
+        if not mismatch_result.is_empty:
+            return False, f"Data is not identical. {mismatch_result.describe()}", mismatch_result
+
+        if key_columns and df1.height == df2.height:
+            return True, "Datasets are identical when rows are matched on the key columns.", mismatch_result
+        if key_columns:
+            return False, f"Duplicate key values: {df1_name} has {df1.height} rows, {df2_name} has {df2.height} rows.", mismatch_result
+        if any(rule.has_tolerance for rule in (rules or {}).values()):
+            return True, "Datasets are identical within the column tolerances.", mismatch_result
+        return False, "DataFrames have the same schema and shape but differ in content.", mismatch_result
+
+    except Exception as error:
+        return False, f"Error while comparing dataframes: {error}", empty_result
 
-        if df1.shape != df2.shape:
-            return False, f"Shape mismatch: {df1_name} shape: {df1.shape}, {df2_name} shape: {df2.shape}", pl.DataFrame()
 
-        mismatched_rows = []
-        for col in df1.columns:
-            mismatch_indices = (df1[col] != df2[col]).to_numpy().nonzero()[0]
-            for index in mismatch_indices[:2]:  # Get up to 2 mismatched rows
-                mismatched_rows.append((df1.row(index), df2.row(index)))
+def generate_html_report(mismatch_result: MismatchResult, file_name: str,
+                         rows_per_page: int = DEFAULT_ROWS_PER_PAGE) -> None:
+    """
+    Generate a paginated HTML report of the mismatches.
+
+    Each page lists the key columns and compared column of the mismatches with the value on each side
+    highlighted, rendered one page at a time from a single pass over the mismatches (see
+    `write_paged_mismatch_report`): a saved result is read from its Parquet file page by page and an
+    in-memory one is sliced, so the mismatches are never loaded or copied at once. The index page starts
+    with the per-column mismatch counts of the result's summary.
+
+    Args:
+        mismatch_result (MismatchResult): The mismatches returned by `compare_dataframes`.
+        file_name (str): Name of the HTML index file to save the report.
+        rows_per_page (int): Maximum number of mismatches per page.
+    """
+    try:
+        identifying_columns = mismatch_result.key_columns + ['column_name', 'mismatch_kind']
+        with span('report', rows=len(mismatch_result)):
+            pages = ((page.select(*identifying_columns, pl.col('left_value').alias('value')),
+                      page.select(*identifying_columns, pl.col('right_value').alias('value')))
+                     for page in mismatch_result.iter_batches(rows_per_page))
+            write_paged_mismatch_report(pages, file_name, left_name=mismatch_result.left_name,
+                                        right_name=mismatch_result.right_name, rows_per_page=rows_per_page,
+                                        column_counts=mismatch_result.summary['column_counts'])
+    except Exception as e:
+        LOGGER.error(f"Error generating HTML report: {e}")
+        raise
 
-        if mismatched_rows:
-            mismatched_df = pl.DataFrame(mismatched_rows, schema=[f"{df1_name}_row", f"{df2_name}_row"])
-            return False, "Data is not identical. See mismatched rows.", mismatched_df
 
-        return False, "DataFrames have the same schema and shape but differ in content.", pl.DataFrame()
+def write_json_rows(frame: FrameLike, output_path: Union[Path, str], batch_size: int = DEFAULT_JSON_BATCH_ROWS) -> Path:
+    """
+    Serialize the rows of a frame as JSON without building Python objects.
+
+    Files ending in '.json' get a JSON array of row objects, written slice by slice; any other suffix
+    (e.g. '.ndjson' or '.jsonl') gets one object per line, streamed straight from a LazyFrame.
+
+    Args:
+        frame (FrameLike): The rows to write.
+        output_path (Union[Path, str]): The output file.
+        batch_size (int): Rows serialized at a time for JSON arrays.
+
+    Returns:
+        Path: The written file.
+    """
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    if output_path.suffix != '.json':
+        if isinstance(frame, pl.LazyFrame):
+            frame.sink_ndjson(output_path)
+        else:
+            frame.write_ndjson(output_path)
+        return output_path
+
+    df = frame.collect(streaming=True) if isinstance(frame, pl.LazyFrame) else frame
+    with output_path.open('w') as json_file:
+        json_file.write('[')
+        for index, batch in enumerate(df.iter_slices(batch_size)):
+            rows = batch.write_ndjson().rstrip('\n').replace('\n', ',\n')
+            json_file.write((',\n' if index else '\n') + rows)
+        json_file.write('\n]\n')
+    return output_path
+
+
+def _join_stats(left: pl.LazyFrame, right: pl.LazyFrame, on: List[str], how: str) -> Dict[str, Any]:
+    """
+    Compute the row counts and fan-out of a join from per-key counts, without running the join. This
+    groups both sides by key, which costs about as much as the join itself.
+    """
+    left_counts = left.group_by(on).agg(pl.len().alias('left_count'))
+    right_counts = right.group_by(on).agg(pl.len().alias('right_count'))
+    key_stats = left_counts.join(right_counts, on=on, how='left').select(
+        pl.col('left_count').sum().alias('left_rows'),
+        pl.col('left_count').filter(pl.col('right_count').is_not_null()).sum().alias('matched_left_rows'),
+        (pl.col('left_count') * pl.col('right_count')).sum().alias('inner_rows'),
+        pl.col('right_count').max().alias('max_matches_per_key'))
+    key_stats, right_rows = pl.collect_all([key_stats, right.select(pl.len().alias('right_rows'))])
+    stats = {**key_stats.row(0, named=True), **right_rows.row(0, named=True)}
+
+    result_rows = stats.pop('inner_rows')
+    if how == 'left':
+        result_rows += stats['left_rows'] - stats['matched_left_rows']
+    stats['result_rows'] = result_rows
+    stats['max_matches_per_key'] = stats['max_matches_per_key'] or 0
+    stats['fan_out'] = round(result_rows / stats['left_rows'], 4) if stats['left_rows'] else None
+    return stats
+
+
+def _finish(result: pl.LazyFrame, collect: bool, streaming: bool,
+            output_path: Optional[Union[Path, str]]) -> Union[pl.DataFrame, pl.LazyFrame]:
+    """
+    Collect and/or serialize a lazy result; a result that stays lazy is streamed to the output file.
+    """
+    if not collect:
+        if output_path is not None:
+            write_json_rows(result, output_path)
+        return result
+    df = result.collect(streaming=streaming)
+    if output_path is not None:
+        write_json_rows(df, output_path)
+    return df
+
+
+def union_datasets(df1: FrameLike, df2: FrameLike, collect: bool = True, streaming: bool = False,
+                   output_path: Optional[Union[Path, str]] = None
+                   ) -> Tuple[Union[pl.DataFrame, pl.LazyFrame], Union[Dict[str, Any], str]]:
+    """
+    Get the union (distinct rows) of two datasets lazily, without converting rows to Python objects;
+    the lazy counterpart of `get_union_dataset`.
+
+    Args:
+        df1 (FrameLike): First dataset, eager or lazy.
+        df2 (FrameLike): Second dataset, eager or lazy.
+        collect (bool): Whether to return a DataFrame; the LazyFrame of the union if False.
+        streaming (bool): Whether to collect with the streaming engine.
+        output_path (Optional[Union[Path, str]]): Also serialize the rows to this file, see `write_json_rows`.
+
+    Returns:
+        (Union[pl.DataFrame, pl.LazyFrame], Union[Dict[str, Any], str]): The union and its row counts
+        ('left_rows', 'right_rows' and, once collected, 'result_rows'), or an empty DataFrame and an
+        error message.
+    """
+    try:
+        left, right = df1.lazy(), df2.lazy()
+        left_rows, right_rows = (frame.item() for frame in pl.collect_all([left.select(pl.len()),
+                                                                         right.select(pl.len())]))
+        result = _finish(pl.concat([left, right]).unique(), collect, streaming, output_path)
+        stats = {'left_rows': left_rows, 'right_rows': right_rows,
+                 'result_rows': result.height if collect else None}
+        return result, stats
 
     except Exception as error:
-        return False, f"Error while comparing dataframes: {error}", pl.DataFrame()
+        return pl.DataFrame(), f"Error while performing union on dataframes: {error}"
 
 
-def generate_html_report(mismatched_df: pl.DataFrame, file_name: str) -> None:
+def join_datasets(df1: FrameLike, df2: FrameLike, col: Union[str, List[str]], how: str = 'inner',
+                  strategy: str = 'hash', collect: bool = True, streaming: bool = False,
+                  output_path: Optional[Union[Path, str]] = None, with_fan_out: bool = False
+                  ) -> Tuple[Union[pl.DataFrame, pl.LazyFrame], Union[Dict[str, Any], str]]:
     """
-    Generate an HTML report for the mismatched rows.
+    Join two datasets lazily, without converting rows to Python objects; the lazy counterpart of
+    `get_inner_join_dataset` and `get_left_join_dataset`.
+
+    Strategies:
+        'hash': Polars' default hash join.
+        'sort_merge': Merge join for datasets already sorted on the (first) key column; the order is
+            checked with one cheap pass.
+
+    The statistics hold the row counts 'left_rows' and 'right_rows' of eager inputs and the 'result_rows'
+    of a collected join, None where unknown, so lazy inputs are not scanned twice. With `with_fan_out`,
+    all three are derived from per-key counts of both sides instead, along with 'matched_left_rows',
+    'max_matches_per_key' and 'fan_out' (result rows per left row); this groups both inputs by key, which
+    costs about as much as the join.
 
     Args:
-        mismatched_df (pl.DataFrame): DataFrame containing the mismatched rows.
-        file_name (str): Name of the HTML file to save the report.
+        df1 (FrameLike): First (left) dataset, eager or lazy.
+        df2 (FrameLike): Second dataset, eager or lazy.
+        col (Union[str, List[str]]): Column name(s) to join on.
+        how (str): 'inner' or 'left'.
+        strategy (str): One of `JOIN_STRATEGIES`.
+        collect (bool): Whether to return a DataFrame; the LazyFrame of the join if False.
+        streaming (bool): Whether to collect with the streaming engine.
+        output_path (Optional[Union[Path, str]]): Also serialize the rows to this file, see `write_json_rows`.
+        with_fan_out (bool): Whether to compute the per-key fan-out statistics.
+
+    Returns:
+        (Union[pl.DataFrame, pl.LazyFrame], Union[Dict[str, Any], str]): The join and its statistics, or an
+        empty DataFrame and an error message.
     """
     try:
-        # Highlight mismatches
-        html_content = mismatched_df.to_pandas().to_html().replace('<td>', '<td style="background-color: #FFDDDD;">')
+        on = [col] if isinstance(col, str) else list(col)
+        left, right = df1.lazy(), df2.lazy()
+        left_columns, right_columns = left.columns, right.columns
+        missing = [key for key in on if key not in left_columns or key not in right_columns]
+        if missing:
+            return pl.DataFrame(), f"The key column(s) {missing} are not available in both datasets."
+        if how not in ('inner', 'left'):
+            raise ValueError(f"Unsupported join type '{how}', expected 'inner' or 'left'")
+        if strategy not in JOIN_STRATEGIES:
+            raise ValueError(f"Unknown join strategy '{strategy}', expected one of {JOIN_STRATEGIES}")
+
+        if strategy == 'sort_merge':
+            # The sorted flags let Polars merge the inputs instead of hashing one side; a wrong flag
+            # would silently drop matches, so the order is checked first
+            sorted_check = [frame.select((pl.col(on[0]) >= pl.col(on[0]).shift(1)).all()) for frame in (left, right)]
+            if not all(check.item() for check in pl.collect_all(sorted_check)):
+                raise ValueError(f"The 'sort_merge' strategy needs both datasets sorted on {on[0]}")
+            left, right = left.set_sorted(on[0]), right.set_sorted(on[0])
+
+        result = _finish(left.join(right, on=on, how=how), collect, streaming, output_path)
+        if with_fan_out:
+            stats = _join_stats(left, right, on, how)
+            LOGGER.info(f"{how.capitalize()} join on {on} ({strategy}): {stats['left_rows']} x "
+                        f"{stats['right_rows']} rows -> {stats['result_rows']} rows, fan-out {stats['fan_out']}, "
+                        f"max {stats['max_matches_per_key']} matches per key")
+        else:
+            stats = {'left_rows': len(df1) if isinstance(df1, pl.DataFrame) else None,
+                     'right_rows': len(df2) if isinstance(df2, pl.DataFrame) else None,
+                     'result_rows': result.height if collect else None}
+            LOGGER.info(f"{how.capitalize()} join on {on} ({strategy}): {stats['left_rows']} x "
+                        f"{stats['right_rows']} rows -> {stats['result_rows']} rows")
+        return result, stats
 
-        with open(file_name, "w") as file:
-            file.write(html_content)
-        LOGGER.info(f"Generated HTML report: {file_name}")
-    except Exception as e:
-        LOGGER.error(f"Error generating HTML report: {e}")
-        raise
+    except Exception as error:
+        return pl.DataFrame(), f"Error while performing {how} join on dataframes: {error}"
 
 
 def get_union_dataset(df1: pl.DataFrame, df2: pl.DataFrame) -> (pl.DataFrame, list):
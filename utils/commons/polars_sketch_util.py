@@ -0,0 +1,660 @@
+import io
+import json
+import logging
+import math
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+import polars as pl
+import pyarrow.parquet as pq
+
+LOGGER = logging.getLogger(__name__)
+
+# Fixed seeds so that sketches built in different processes (or runs) hash values identically
+HASH_SEEDS = (0x5EED, 0x0A11, 0x7E57, 0xC0DE)
+DEFAULT_BATCH_SIZE = 100_000
+
+_UINT64_ONE = np.uint64(1)
+
+
+def hash_rows(df: pl.DataFrame) -> np.ndarray:
+    """
+    Hash every row of a DataFrame into a 64-bit value using the fixed sketch seeds.
+
+    Args:
+        df (pl.DataFrame): The DataFrame to hash.
+
+    Returns:
+        np.ndarray: An array of uint64 row hashes.
+    """
+    return df.hash_rows(*HASH_SEEDS).to_numpy()
+
+
+def hash_values(series: pl.Series) -> np.ndarray:
+    """
+    Hash every value of a Series into a 64-bit value using the fixed sketch seeds.
+
+    Args:
+        series (pl.Series): The Series to hash.
+
+    Returns:
+        np.ndarray: An array of uint64 value hashes.
+    """
+    return series.hash(*HASH_SEEDS).to_numpy()
+
+
+def _pack(kind: str, params: Dict[str, Any], arrays: Dict[str, np.ndarray]) -> bytes:
+    """
+    Serialize sketch parameters and state arrays into a single npz payload.
+    """
+    header = {'kind': kind, 'polars_version': pl.__version__, **params}
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, header=np.frombuffer(json.dumps(header).encode('utf-8'), dtype=np.uint8), **arrays)
+    return buffer.getvalue()
+
+
+def _unpack(payload: bytes, kind: str) -> Tuple[Dict[str, Any], Dict[str, np.ndarray]]:
+    """
+    Deserialize a payload written by `_pack` and validate its kind and hashing compatibility.
+    """
+    with np.load(io.BytesIO(payload), allow_pickle=False) as data:
+        header = json.loads(data['header'].tobytes().decode('utf-8'))
+        arrays = {name: data[name] for name in data.files if name != 'header'}
+
+    if header.get('kind') != kind:
+        raise ValueError(f"Expected a serialized {kind}, got {header.get('kind')}")
+    if header.get('polars_version') != pl.__version__:
+        LOGGER.warning(f"{kind} was built with polars {header.get('polars_version')} but polars {pl.__version__} "
+                       f"is installed; value hashes may not be comparable")
+    return header, arrays
+
+
+class HyperLogLog:
+    """
+    HyperLogLog sketch estimating the number of distinct values in fixed memory.
+
+    Attributes:
+        precision (int): Number of index bits; the sketch holds 2 ** precision one-byte registers.
+        registers (np.ndarray): The register array.
+    """
+
+    def __init__(self, precision: int = 14) -> None:
+        """
+        Initialize an empty HyperLogLog sketch.
+
+        Args:
+            precision (int): Number of index bits (4-18). Standard error is about 1.04 / sqrt(2 ** precision).
+        """
+        if not 4 <= precision <= 18:
+            raise ValueError(f"HyperLogLog precision must be between 4 and 18, got {precision}")
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def add_hashes(self, hashes: np.ndarray) -> None:
+        """
+        Add a batch of 64-bit hashes to the sketch.
+
+        Args:
+            hashes (np.ndarray): Array of uint64 hashes.
+        """
+        if len(hashes) == 0:
+            return
+        p = np.uint64(self.precision)
+        index = (hashes >> (np.uint64(64) - p)).astype(np.intp)
+        # Shift out the index bits and add a sentinel bit so the rank is bounded by 64 - precision + 1
+        remainder = (hashes << p) | (_UINT64_ONE << (p - _UINT64_ONE))
+
+        leading_zeros = np.zeros(len(remainder), dtype=np.uint8)
+        for shift in (32, 16, 8, 4, 2, 1):
+            top_bits_zero = remainder < (_UINT64_ONE << np.uint64(64 - shift))
+            leading_zeros[top_bits_zero] += shift
+            remainder[top_bits_zero] <<= np.uint64(shift)
+
+        np.maximum.at(self.registers, index, leading_zeros + 1)
+
+    def merge(self, other: 'HyperLogLog') -> None:
+        """
+        Merge another sketch into this one, giving the sketch of the union of both inputs.
+
+        Args:
+            other (HyperLogLog): The sketch to merge. Must use the same precision.
+        """
+        if other.precision != self.precision:
+            raise ValueError(f"Cannot merge HyperLogLog sketches with precision {self.precision} and {other.precision}")
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def estimate(self) -> int:
+        """
+        Estimate the number of distinct values added to the sketch.
+
+        Returns:
+            int: The estimated distinct count.
+        """
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw_estimate = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int32)))
+
+        empty_registers = int(np.count_nonzero(self.registers == 0))
+        if raw_estimate <= 2.5 * m and empty_registers:
+            # Small range correction (linear counting)
+            return int(round(m * math.log(m / empty_registers)))
+        return int(round(raw_estimate))
+
+    def to_bytes(self) -> bytes:
+        """
+        Serialize the sketch.
+
+        Returns:
+            bytes: The serialized sketch.
+        """
+        return _pack('HyperLogLog', {'precision': self.precision}, {'registers': self.registers})
+
+    @classmethod
+    def from_bytes(cls, payload: bytes) -> 'HyperLogLog':
+        """
+        Deserialize a sketch written by `to_bytes`.
+
+        Args:
+            payload (bytes): The serialized sketch.
+
+        Returns:
+            HyperLogLog: The restored sketch.
+        """
+        header, arrays = _unpack(payload, 'HyperLogLog')
+        sketch = cls(header['precision'])
+        sketch.registers = arrays['registers']
+        return sketch
+
+
+class BloomFilter:
+    """
+    Bloom filter answering "definitely absent" or "possibly present" for 64-bit hashes in fixed memory.
+
+    Attributes:
+        num_bits (int): Size of the bit array.
+        num_hashes (int): Number of bit positions set per added hash.
+        bits (np.ndarray): The packed bit array.
+    """
+
+    def __init__(self, num_bits: int, num_hashes: int) -> None:
+        """
+        Initialize an empty Bloom filter.
+
+        Args:
+            num_bits (int): Size of the bit array.
+            num_hashes (int): Number of bit positions set per added hash.
+        """
+        if num_bits <= 0 or num_hashes <= 0:
+            raise ValueError("Bloom filter size and hash count must be positive")
+        self.num_bits = num_bits
+        self.num_hashes = num_hashes
+        self.bits = np.zeros((num_bits + 7) // 8, dtype=np.uint8)
+
+    @classmethod
+    def for_capacity(cls, capacity: int, error_rate: float = 0.01) -> 'BloomFilter':
+        """
+        Create a Bloom filter sized for the expected number of entries and false positive rate.
+
+        Args:
+            capacity (int): Expected number of distinct entries.
+            error_rate (float): Target false positive rate at capacity.
+
+        Returns:
+            BloomFilter: An empty, appropriately sized filter.
+        """
+        capacity = max(capacity, 1)
+        num_bits = int(math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        num_hashes = max(1, int(round(num_bits / capacity * math.log(2))))
+        return cls(num_bits, num_hashes)
+
+    def _positions(self, hashes: np.ndarray) -> Iterator[np.ndarray]:
+        """
+        Yield the bit positions for each hash function using double hashing.
+        """
+        h1 = hashes & np.uint64(0xFFFFFFFF)
+        h2 = (hashes >> np.uint64(32)) | _UINT64_ONE
+        num_bits = np.uint64(self.num_bits)
+        for i in range(self.num_hashes):
+            yield ((h1 + np.uint64(i) * h2) % num_bits).astype(np.intp)
+
+    def add_hashes(self, hashes: np.ndarray) -> None:
+        """
+        Add a batch of 64-bit hashes to the filter.
+
+        Args:
+            hashes (np.ndarray): Array of uint64 hashes.
+        """
+        for positions in self._positions(hashes):
+            np.bitwise_or.at(self.bits, positions >> 3, (1 << (positions & 7)).astype(np.uint8))
+
+    def contains_hashes(self, hashes: np.ndarray) -> np.ndarray:
+        """
+        Probe a batch of 64-bit hashes.
+
+        Args:
+            hashes (np.ndarray): Array of uint64 hashes.
+
+        Returns:
+            np.ndarray: Boolean array; False means the hash was definitely never added.
+        """
+        result = np.ones(len(hashes), dtype=bool)
+        for positions in self._positions(hashes):
+            result &= (self.bits[positions >> 3] & (1 << (positions & 7))).astype(bool)
+        return result
+
+    def merge(self, other: 'BloomFilter') -> None:
+        """
+        Merge another filter into this one, giving the filter of the union of both inputs.
+
+        Args:
+            other (BloomFilter): The filter to merge. Must use the same size and hash count.
+        """
+        if (other.num_bits, other.num_hashes) != (self.num_bits, self.num_hashes):
+            raise ValueError("Cannot merge Bloom filters with different sizes or hash counts")
+        np.bitwise_or(self.bits, other.bits, out=self.bits)
+
+    def to_bytes(self) -> bytes:
+        """
+        Serialize the filter.
+
+        Returns:
+            bytes: The serialized filter.
+        """
+        return _pack('BloomFilter', {'num_bits': self.num_bits, 'num_hashes': self.num_hashes}, {'bits': self.bits})
+
+    @classmethod
+    def from_bytes(cls, payload: bytes) -> 'BloomFilter':
+        """
+        Deserialize a filter written by `to_bytes`.
+
+        Args:
+            payload (bytes): The serialized filter.
+
+        Returns:
+            BloomFilter: The restored filter.
+        """
+        header, arrays = _unpack(payload, 'BloomFilter')
+        bloom = cls(header['num_bits'], header['num_hashes'])
+        bloom.bits = arrays['bits']
+        return bloom
+
+
+class CountMinSketch:
+    """
+    Count-min sketch estimating value frequencies in fixed memory.
+
+    Attributes:
+        width (int): Number of counters per row.
+        depth (int): Number of rows (independent hash functions).
+        table (np.ndarray): The (depth, width) counter table.
+    """
+
+    def __init__(self, width: int = 2048, depth: int = 4) -> None:
+        """
+        Initialize an empty count-min sketch.
+
+        Args:
+            width (int): Number of counters per row. Over-estimation is bounded by about e / width of the total.
+            depth (int): Number of rows. The bound holds with probability 1 - exp(-depth).
+        """
+        if width <= 0 or depth <= 0:
+            raise ValueError("Count-min sketch width and depth must be positive")
+        self.width = width
+        self.depth = depth
+        self.table = np.zeros((depth, width), dtype=np.uint64)
+
+    def _columns(self, hashes: np.ndarray) -> Iterator[Tuple[int, np.ndarray]]:
+        """
+        Yield the counter column for each row using double hashing.
+        """
+        h1 = hashes & np.uint64(0xFFFFFFFF)
+        h2 = (hashes >> np.uint64(32)) | _UINT64_ONE
+        width = np.uint64(self.width)
+        for row in range(self.depth):
+            yield row, ((h1 + np.uint64(row) * h2) % width).astype(np.intp)
+
+    def add_hashes(self, hashes: np.ndarray) -> None:
+        """
+        Count a batch of 64-bit value hashes.
+
+        Args:
+            hashes (np.ndarray): Array of uint64 hashes.
+        """
+        for row, columns in self._columns(hashes):
+            self.table[row] += np.bincount(columns, minlength=self.width).astype(np.uint64)
+
+    def estimate_hashes(self, hashes: np.ndarray) -> np.ndarray:
+        """
+        Estimate the frequency of each hashed value. Estimates never undercount.
+
+        Args:
+            hashes (np.ndarray): Array of uint64 hashes.
+
+        Returns:
+            np.ndarray: Estimated counts.
+        """
+        estimates = np.full(len(hashes), np.iinfo(np.uint64).max, dtype=np.uint64)
+        for row, columns in self._columns(hashes):
+            np.minimum(estimates, self.table[row, columns], out=estimates)
+        return estimates
+
+    def merge(self, other: 'CountMinSketch') -> None:
+        """
+        Merge another sketch into this one, giving the sketch of both inputs combined.
+
+        Args:
+            other (CountMinSketch): The sketch to merge. Must use the same width and depth.
+        """
+        if (other.width, other.depth) != (self.width, self.depth):
+            raise ValueError("Cannot merge count-min sketches with different widths or depths")
+        self.table += other.table
+
+    def to_bytes(self) -> bytes:
+        """
+        Serialize the sketch.
+
+        Returns:
+            bytes: The serialized sketch.
+        """
+        return _pack('CountMinSketch', {'width': self.width, 'depth': self.depth}, {'table': self.table})
+
+    @classmethod
+    def from_bytes(cls, payload: bytes) -> 'CountMinSketch':
+        """
+        Deserialize a sketch written by `to_bytes`.
+
+        Args:
+            payload (bytes): The serialized sketch.
+
+        Returns:
+            CountMinSketch: The restored sketch.
+        """
+        header, arrays = _unpack(payload, 'CountMinSketch')
+        sketch = cls(header['width'], header['depth'])
+        sketch.table = arrays['table']
+        return sketch
+
+
+class TableSketch:
+    """
+    Fixed-memory summary of a table: a row count, a Bloom filter over row hashes, and per-column
+    HyperLogLog and count-min sketches.
+
+    Attributes:
+        columns (List[str]): The sketched columns, in the order they are hashed.
+        row_count (int): Number of rows added.
+        row_filter (BloomFilter): Bloom filter over row hashes.
+        distinct (Dict[str, HyperLogLog]): Per-column distinct count sketches.
+        frequencies (Dict[str, CountMinSketch]): Per-column value frequency sketches.
+    """
+
+    def __init__(self, columns: List[str], hll_precision: int = 14, bloom_capacity: int = 10_000_000,
+                 bloom_error_rate: float = 0.01, cms_width: int = 2048, cms_depth: int = 4) -> None:
+        """
+        Initialize an empty table sketch. Memory use is fixed by the parameters, not by the data volume.
+
+        Args:
+            columns (List[str]): The columns to sketch.
+            hll_precision (int): HyperLogLog precision per column.
+            bloom_capacity (int): Expected number of rows for the row Bloom filter.
+            bloom_error_rate (float): Target false positive rate of the row Bloom filter.
+            cms_width (int): Count-min sketch width per column.
+            cms_depth (int): Count-min sketch depth per column.
+        """
+        self.columns = list(columns)
+        self.row_count = 0
+        self.row_filter = BloomFilter.for_capacity(bloom_capacity, bloom_error_rate)
+        self.distinct = {col: HyperLogLog(hll_precision) for col in self.columns}
+        self.frequencies = {col: CountMinSketch(cms_width, cms_depth) for col in self.columns}
+
+    def update(self, df: pl.DataFrame) -> None:
+        """
+        Add a batch of rows to the sketch.
+
+        Args:
+            df (pl.DataFrame): The batch. Must contain all sketched columns.
+        """
+        batch = df.select(self.columns)
+        self.row_count += batch.height
+        self.row_filter.add_hashes(hash_rows(batch))
+        for col in self.columns:
+            value_hashes = hash_values(batch[col])
+            self.distinct[col].add_hashes(value_hashes)
+            self.frequencies[col].add_hashes(value_hashes)
+
+    def merge(self, other: 'TableSketch') -> None:
+        """
+        Merge a sketch of another part of the same table into this one.
+
+        Args:
+            other (TableSketch): The sketch to merge. Must cover the same columns with the same parameters.
+        """
+        if other.columns != self.columns:
+            raise ValueError(f"Cannot merge table sketches over different columns: {self.columns} vs {other.columns}")
+        self.row_count += other.row_count
+        self.row_filter.merge(other.row_filter)
+        for col in self.columns:
+            self.distinct[col].merge(other.distinct[col])
+            self.frequencies[col].merge(other.frequencies[col])
+
+    def to_bytes(self) -> bytes:
+        """
+        Serialize the table sketch.
+
+        Returns:
+            bytes: The serialized table sketch.
+        """
+        params = {'columns': self.columns, 'row_count': self.row_count,
+                  'row_filter': {'num_bits': self.row_filter.num_bits, 'num_hashes': self.row_filter.num_hashes}}
+        if self.columns:
+            first = self.columns[0]
+            params['hll_precision'] = self.distinct[first].precision
+            params['cms_width'] = self.frequencies[first].width
+            params['cms_depth'] = self.frequencies[first].depth
+        arrays = {'row_filter': self.row_filter.bits}
+        for i, col in enumerate(self.columns):
+            arrays[f'hll_{i}'] = self.distinct[col].registers
+            arrays[f'cms_{i}'] = self.frequencies[col].table
+        return _pack('TableSketch', params, arrays)
+
+    @classmethod
+    def from_bytes(cls, payload: bytes) -> 'TableSketch':
+        """
+        Deserialize a table sketch written by `to_bytes`.
+
+        Args:
+            payload (bytes): The serialized table sketch.
+
+        Returns:
+            TableSketch: The restored table sketch.
+        """
+        header, arrays = _unpack(payload, 'TableSketch')
+        sketch = cls([], bloom_capacity=1)
+        sketch.columns = header['columns']
+        sketch.row_count = header['row_count']
+        sketch.row_filter = BloomFilter(header['row_filter']['num_bits'], header['row_filter']['num_hashes'])
+        sketch.row_filter.bits = arrays['row_filter']
+        for i, col in enumerate(sketch.columns):
+            hll = HyperLogLog(header['hll_precision'])
+            hll.registers = arrays[f'hll_{i}']
+            cms = CountMinSketch(header['cms_width'], header['cms_depth'])
+            cms.table = arrays[f'cms_{i}']
+            sketch.distinct[col] = hll
+            sketch.frequencies[col] = cms
+        return sketch
+
+    def save(self, file_path: Union[str, Path]) -> None:
+        """
+        Write the serialized table sketch to a file.
+
+        Args:
+            file_path (Union[str, Path]): Destination file path.
+        """
+        Path(file_path).write_bytes(self.to_bytes())
+        LOGGER.debug(f"Saved table sketch to {file_path}")
+
+    @classmethod
+    def load(cls, file_path: Union[str, Path]) -> 'TableSketch':
+        """
+        Read a table sketch written by `save`.
+
+        Args:
+            file_path (Union[str, Path]): Source file path.
+
+        Returns:
+            TableSketch: The restored table sketch.
+        """
+        return cls.from_bytes(Path(file_path).read_bytes())
+
+
+def iter_parquet_batches(parquet_files: List[Path], batch_size: int = DEFAULT_BATCH_SIZE,
+                         columns: Optional[List[str]] = None) -> Iterator[pl.DataFrame]:
+    """
+    Stream Parquet files as Polars DataFrame batches without loading any file completely.
+
+    Args:
+        parquet_files (List[Path]): Paths to the Parquet files.
+        batch_size (int): Maximum number of rows per batch.
+        columns (Optional[List[str]]): Columns to read; all columns if None.
+
+    Yields:
+        pl.DataFrame: The next batch of rows.
+    """
+    for file_path in parquet_files:
+        parquet_file = pq.ParquetFile(file_path)
+        for record_batch in parquet_file.iter_batches(batch_size=batch_size, columns=columns):
+            yield pl.from_arrow(record_batch)
+
+
+def _iter_batches(data: Union[pl.DataFrame, Iterable[pl.DataFrame]], batch_size: int) -> Iterator[pl.DataFrame]:
+    """
+    Normalize a DataFrame or an iterable of DataFrames into an iterator of bounded batches.
+    """
+    if isinstance(data, pl.DataFrame):
+        yield from data.iter_slices(batch_size)
+    else:
+        for df in data:
+            yield from df.iter_slices(batch_size)
+
+
+def build_table_sketch(data: Union[pl.DataFrame, Iterable[pl.DataFrame]], columns: Optional[List[str]] = None,
+                       batch_size: int = DEFAULT_BATCH_SIZE, **sketch_params: Any) -> TableSketch:
+    """
+    Build a table sketch in a single streaming pass.
+
+    Both sides of a comparison must be sketched with the same column dtypes (e.g. after
+    `convert_df_to_string`), since value hashes depend on the dtype.
+
+    Args:
+        data (Union[pl.DataFrame, Iterable[pl.DataFrame]]): A DataFrame or an iterable of batches,
+            e.g. from `iter_parquet_batches`.
+        columns (Optional[List[str]]): Columns to sketch; taken from the first batch if None.
+        batch_size (int): Maximum number of rows hashed at once.
+        **sketch_params (Any): Parameters passed to `TableSketch`.
+
+    Returns:
+        TableSketch: The populated table sketch.
+    """
+    sketch = None
+    for batch in _iter_batches(data, batch_size):
+        if sketch is None:
+            sketch = TableSketch(columns or batch.columns, **sketch_params)
+        sketch.update(batch)
+
+    if sketch is None:
+        sketch = TableSketch(columns or [], **sketch_params)
+    LOGGER.info(f"Built table sketch over {sketch.row_count} rows and {len(sketch.columns)} columns")
+    return sketch
+
+
+def probe_row_filter(sketch: TableSketch, data: Union[pl.DataFrame, Iterable[pl.DataFrame]],
+                     batch_size: int = DEFAULT_BATCH_SIZE) -> Tuple[int, pl.DataFrame]:
+    """
+    Probe the rows of one side against the row Bloom filter built from the other side.
+
+    Args:
+        sketch (TableSketch): The sketch of the other side.
+        data (Union[pl.DataFrame, Iterable[pl.DataFrame]]): The rows to probe.
+        batch_size (int): Maximum number of rows probed at once.
+
+    Returns:
+        (int, pl.DataFrame): The number of rows definitely missing from the other side, and up to
+                             `batch_size` of those rows as a sample.
+    """
+    missing_count = 0
+    samples = []
+    sample_rows = 0
+    for batch in _iter_batches(data, batch_size):
+        batch = batch.select(sketch.columns)
+        missing_mask = ~sketch.row_filter.contains_hashes(hash_rows(batch))
+        batch_missing = int(missing_mask.sum())
+        missing_count += batch_missing
+        if batch_missing and sample_rows < batch_size:
+            sample = batch.filter(pl.Series(missing_mask)).head(batch_size - sample_rows)
+            samples.append(sample)
+            sample_rows += sample.height
+
+    return missing_count, pl.concat(samples) if samples else pl.DataFrame()
+
+
+def _sketch_params(sketch: TableSketch) -> Tuple:
+    """
+    Return the sizing parameters that must match for two table sketches to be comparable.
+    """
+    first = sketch.columns[0] if sketch.columns else None
+    return (sketch.row_filter.num_bits, sketch.row_filter.num_hashes,
+            sketch.distinct[first].precision if first else None,
+            (sketch.frequencies[first].width, sketch.frequencies[first].depth) if first else None)
+
+
+def compare_table_sketches(sketch1: TableSketch, sketch2: TableSketch, df1_name: str = "df1",
+                           df2_name: str = "df2") -> (bool, str, Dict[str, Any]):
+    """
+    Compare two table sketches and tell whether the underlying tables could possibly be equal.
+
+    Sketches of identical tables are always identical, so any difference proves the tables differ.
+    Identical sketches only mean the tables are probably equal.
+
+    Args:
+        sketch1 (TableSketch): Sketch of the first table.
+        sketch2 (TableSketch): Sketch of the second table.
+        df1_name (str): Name of the first table for reporting.
+        df2_name (str): Name of the second table for reporting.
+
+    Returns:
+        (bool, str, Dict[str, Any]): A tuple containing a boolean indicating if the tables could be equal,
+                                     a message, and per-column details for the columns that differ.
+    """
+    if sketch1.columns != sketch2.columns:
+        cols1, cols2 = set(sketch1.columns), set(sketch2.columns)
+        return False, (f"Column mismatch: Missing in {df1_name}: {cols2 - cols1}, "
+                       f"Missing in {df2_name}: {cols1 - cols2}"), {}
+
+    if _sketch_params(sketch1) != _sketch_params(sketch2):
+        raise ValueError(f"Cannot compare table sketches built with different parameters: "
+                         f"{_sketch_params(sketch1)} vs {_sketch_params(sketch2)}")
+
+    if sketch1.row_count != sketch2.row_count:
+        return False, (f"Row count mismatch: {df1_name} rows: {sketch1.row_count}, "
+                       f"{df2_name} rows: {sketch2.row_count}"), {}
+
+    column_details = {}
+    for col in sketch1.columns:
+        distinct_differs = not np.array_equal(sketch1.distinct[col].registers, sketch2.distinct[col].registers)
+        frequencies_differ = not np.array_equal(sketch1.frequencies[col].table, sketch2.frequencies[col].table)
+        if distinct_differs or frequencies_differ:
+            column_details[col] = {
+                'distinct_values_differ': distinct_differs,
+                'value_frequencies_differ': frequencies_differ,
+                f'{df1_name}_distinct_estimate': sketch1.distinct[col].estimate(),
+                f'{df2_name}_distinct_estimate': sketch2.distinct[col].estimate(),
+            }
+
+    if column_details:
+        return False, f"Data is not identical. Column values differ in: {sorted(column_details)}", column_details
+
+    if not np.array_equal(sketch1.row_filter.bits, sketch2.row_filter.bits):
+        return False, "Data is not identical. Column values match but rows are combined differently.", {}
+
+    return True, "Datasets are probably identical.", {}
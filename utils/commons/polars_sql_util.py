@@ -2,7 +2,10 @@ import polars as pl
 from sqlalchemy.engine import Engine
 from typing import List, Dict
 
+from utils.commons.perf_util import timed
 
+
+@timed('redshift_query')
 def read_sql_query_as_df(engine: Engine, query: str) -> pl.DataFrame:
     """
     Execute a SQL query using the provided SQLAlchemy engine and return the result as a Polars DataFrame.
@@ -1,24 +1,79 @@
 import logging
 from pathlib import Path
-from typing import List
+from typing import Dict, List, Optional
 import polars as pl
+import pyarrow as pa
+
+from utils.commons.perf_util import check_memory_budget, span, timed
 
 LOGGER = logging.getLogger(__name__)
 
+# Value rewrites applied to string columns that ask for them in the typed comparison mode
+STRING_RULES = {
+    'lowercase': lambda expr: expr.str.to_lowercase(),
+    'strip_quotes': lambda expr: expr.str.replace_all(r"[\"']", ''),
+    'trim': lambda expr: expr.str.strip_chars(),
+}
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S%.f'
+# String columns with at most this many distinct values, and at most this fraction of the rows, are
+# encoded as categoricals
+DEFAULT_MAX_CATEGORIES = 10_000
+DEFAULT_MAX_UNIQUE_RATIO = 0.05
+_TRUE_STRINGS = ['true', 't', '1', 'y', 'yes']
+
+
+class ColumnRule:
+    """
+    How one column is normalized and compared in the typed comparison mode.
 
-def polars_df_parquet(parquet_files: List[Path]) -> pl.DataFrame:
+    Attributes:
+        abs_tol (float): Largest absolute difference between two numbers considered equal.
+        rel_tol (float): Largest difference between two numbers considered equal, relative to the right value.
+        granularity (Optional[str]): Polars duration (e.g. '1s', '1d') timestamps are truncated to.
+        string_rules (List[str]): Names of the `STRING_RULES` applied to string values, in order.
+    """
+
+    def __init__(self, abs_tol: float = 0.0, rel_tol: float = 0.0, granularity: Optional[str] = None,
+                 string_rules: Optional[List[str]] = None) -> None:
+        unknown_rules = [rule for rule in string_rules or [] if rule not in STRING_RULES]
+        if unknown_rules:
+            raise ValueError(f"Unknown string rules {unknown_rules}; expected some of {sorted(STRING_RULES)}")
+        if abs_tol < 0 or rel_tol < 0:
+            raise ValueError("Tolerances must not be negative")
+        self.abs_tol = abs_tol
+        self.rel_tol = rel_tol
+        self.granularity = granularity
+        self.string_rules = list(string_rules or [])
+
+    @property
+    def has_tolerance(self) -> bool:
+        return bool(self.abs_tol or self.rel_tol)
+
+    def __repr__(self) -> str:
+        return (f"ColumnRule(abs_tol={self.abs_tol}, rel_tol={self.rel_tol}, granularity={self.granularity!r}, "
+                f"string_rules={self.string_rules})")
+
+
+def polars_df_parquet(parquet_files: List[Path], exact_decimals: bool = False) -> pl.DataFrame:
     """
     Read multiple Parquet files and combine them into a single Polars DataFrame.
 
     Args:
         parquet_files (List[Path]): A list of paths to Parquet files.
+        exact_decimals (bool): Load decimal columns as exact Polars decimals instead of Float64.
 
     Returns:
         pl.DataFrame: A single Polars DataFrame containing data from all the Parquet files.
     """
     try:
-        dataframes = [pl.read_parquet(file) for file in parquet_files]
-        combined_df = pl.concat(dataframes)
+        with span('parquet_load', nbytes=sum(Path(file).stat().st_size for file in parquet_files)) as load_span, \
+                pl.Config(activate_decimals=exact_decimals):
+            dataframes = []
+            for file in parquet_files:
+                dataframes.append(pl.read_parquet(file))
+                check_memory_budget()
+            combined_df = pl.concat(dataframes)
+            load_span.rows = combined_df.height
         LOGGER.info(f"Combined {len(parquet_files)} Parquet files into a single DataFrame")
         return combined_df
     except Exception as e:
@@ -26,6 +81,7 @@ def polars_df_parquet(parquet_files: List[Path]) -> pl.DataFrame:
         raise
 
 
+@timed('normalize')
 def convert_df_to_string(df: pl.DataFrame) -> pl.DataFrame:
     """
     Convert all columns in the DataFrame to string type, order columns alphabetically,
@@ -65,9 +121,8 @@ def convert_df_to_string(df: pl.DataFrame) -> pl.DataFrame:
 
         str_columns = [col for col in df.columns if df[col].dtype in [pl.String]]
 
-        # Convert all columns to string type
-        for column in df.columns:
-            df = df.with_columns([pl.col(column).cast(pl.Utf8)])
+        # Convert all columns to string type in a single pass
+        df = df.with_columns(pl.all().cast(pl.Utf8))
 
         # Apply the function to each float column
         for col in float_or_decimal_columns:
@@ -85,12 +140,144 @@ def convert_df_to_string(df: pl.DataFrame) -> pl.DataFrame:
         for col in sorted_columns:
             df = df.sort([col], maintain_order=True)
 
-        # Convert all columns to string type
-        for column in df.columns:
-            df = df.with_columns([pl.col(column).cast(pl.Utf8)])
-
         LOGGER.info("Converted all columns to string type, ordered alphabetically")
         return df
     except Exception as e:
         LOGGER.error(f"Error processing DataFrame: {e}")
-        raise
\ No newline at end of file
+        raise
+
+
+def arrow_type_to_polars(arrow_type: pa.DataType) -> pl.DataType:
+    """
+    Convert an Arrow data type into the Polars data type holding it without loss.
+
+    Args:
+        arrow_type (pa.DataType): The Arrow type, e.g. from `compile_arrow_schema`.
+
+    Returns:
+        pl.DataType: The Polars type; decimals stay exact decimals at their precision and scale.
+    """
+    if pa.types.is_decimal(arrow_type):
+        return pl.Decimal(arrow_type.precision, arrow_type.scale)
+    if pa.types.is_timestamp(arrow_type):
+        # Polars has no second resolution
+        return pl.Datetime('us' if arrow_type.unit == 's' else arrow_type.unit, arrow_type.tz)
+    return pl.from_arrow(pa.array([], arrow_type)).dtype
+
+
+def _cast_expr(column: str, source: pl.DataType, target: pl.DataType) -> pl.Expr:
+    expr = pl.col(column)
+    if source == target:
+        return expr
+    if source == pl.Utf8:
+        if target == pl.Datetime:
+            return expr.str.strip_chars().str.to_datetime(TIMESTAMP_FORMAT, time_unit=target.time_unit,
+                                                          time_zone=target.time_zone)
+        if target == pl.Date:
+            return expr.str.strip_chars().str.to_date()
+        if target == pl.Boolean:
+            return pl.when(expr.is_null()).then(None).otherwise(
+                expr.str.strip_chars().str.to_lowercase().is_in(_TRUE_STRINGS))
+        if target != pl.Utf8:
+            return expr.str.strip_chars().cast(target)
+    if target == pl.Decimal and source in (pl.Float32, pl.Float64):
+        # Polars does not cast floats to decimals directly; the shortest round-trip string does
+        return expr.cast(pl.Utf8).cast(target)
+    return expr.cast(target)
+
+
+def find_low_cardinality_columns(df: pl.DataFrame, max_categories: int = DEFAULT_MAX_CATEGORIES,
+                                 max_unique_ratio: float = DEFAULT_MAX_UNIQUE_RATIO) -> List[str]:
+    """
+    Find the string columns of a DataFrame with few distinct values, worth encoding as categoricals.
+
+    Distinct values are estimated with HyperLogLog, in one pass over the string columns.
+
+    Args:
+        df (pl.DataFrame): The DataFrame.
+        max_categories (int): Largest number of distinct values of a low-cardinality column.
+        max_unique_ratio (float): Largest ratio of distinct values to rows of a low-cardinality column.
+
+    Returns:
+        List[str]: The low-cardinality string columns, in DataFrame order.
+    """
+    string_columns = [column for column, dtype in df.schema.items() if dtype == pl.Utf8]
+    if not string_columns or df.is_empty():
+        return []
+    distinct_counts = df.select(pl.col(string_columns).approx_n_unique()).row(0, named=True)
+    limit = min(max_categories, max_unique_ratio * df.height)
+    return [column for column in string_columns if distinct_counts[column] <= limit]
+
+
+def encode_categorical(df: pl.DataFrame, columns: List[str]) -> pl.DataFrame:
+    """
+    Encode string columns as categoricals.
+
+    Encode both sides of a comparison under one `pl.StringCache()`, so equal strings get equal codes and
+    the columns compare and sort as integers.
+
+    Args:
+        df (pl.DataFrame): The DataFrame.
+        columns (List[str]): The columns to encode; columns that are missing or not strings are skipped.
+
+    Returns:
+        pl.DataFrame: The DataFrame with the columns encoded.
+    """
+    columns = [column for column in columns if df.schema.get(column) == pl.Utf8]
+    return df.with_columns(pl.col(columns).cast(pl.Categorical)) if columns else df
+
+
+@timed('normalize')
+def align_to_schema(df: pl.DataFrame, schema: pa.Schema, rules: Optional[Dict[str, ColumnRule]] = None,
+                    categorical_columns: Optional[List[str]] = None) -> pl.DataFrame:
+    """
+    Cast the columns of a DataFrame to the types of a schema for a typed comparison, order the columns
+    alphabetically and sort the rows.
+
+    Numbers stay numbers (decimals at their declared precision and scale), timestamps are truncated to the
+    `granularity` of their rule and strings are only rewritten by the `string_rules` of their rule. Rows are
+    sorted on the columns without a tolerance first, so both sides of a comparison line up even when
+    toleranced values differ slightly. Columns missing from the schema are kept as they are.
+
+    String columns in `categorical_columns` are encoded as categoricals before the sort; align both sides
+    of a comparison under one `pl.StringCache()` so their codes, and therefore their row order, agree.
+
+    Args:
+        df (pl.DataFrame): The DataFrame to align.
+        schema (pa.Schema): The target column types, e.g. compiled from `external_table_columns`.
+        rules (Optional[Dict[str, ColumnRule]]): The rule of each column that needs one.
+        categorical_columns (Optional[List[str]]): The string columns to encode as categoricals.
+
+    Returns:
+        pl.DataFrame: The aligned DataFrame.
+
+    Raises:
+        pl.ComputeError: If a value cannot be cast to its column type.
+    """
+    rules = rules or {}
+    categorical = set(categorical_columns or [])
+    expressions = []
+    for field in schema:
+        if field.name not in df.columns:
+            continue
+        target = arrow_type_to_polars(field.type)
+        expr = _cast_expr(field.name, df.schema[field.name], target)
+        rule = rules.get(field.name)
+        if rule is not None and rule.granularity and target == pl.Datetime:
+            expr = expr.dt.truncate(rule.granularity)
+        if rule is not None and target == pl.Utf8:
+            for string_rule in rule.string_rules:
+                expr = STRING_RULES[string_rule](expr)
+        if target == pl.Utf8 and field.name in categorical:
+            expr = expr.cast(pl.Categorical)
+        expressions.append(expr.alias(field.name))
+
+    sorted_columns = sorted(df.columns)
+    toleranced = {column for column, rule in rules.items() if rule.has_tolerance}
+    sort_columns = ([column for column in sorted_columns if column not in toleranced] +
+                    [column for column in sorted_columns if column in toleranced])
+    df = df.with_columns(expressions).select(sorted_columns)
+    if sort_columns:
+        df = df.sort(sort_columns, nulls_last=True, maintain_order=True)
+    LOGGER.info(f"Aligned {len(expressions)} columns to their declared types")
+    return df
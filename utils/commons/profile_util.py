@@ -0,0 +1,152 @@
+import cProfile
+import logging
+import pstats
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple, Union
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_SAMPLE_INTERVAL = 0.005
+PROFILE_SUFFIX = '.prof'
+COLLAPSED_SUFFIX = '.collapsed'
+
+
+def profile_file_stem(name: str) -> str:
+    """
+    Turn a test id (or any name) into a safe file name stem.
+
+    Args:
+        name (str): The name, e.g. 'tests/test_x.py::test_y[table]'.
+
+    Returns:
+        str: The name with every run of unsafe characters replaced by '_'.
+    """
+    return re.sub(r'[^\w.-]+', '_', name).strip('_')[:200]
+
+
+class StackSampler:
+    """
+    Samples the Python stack of one thread at a fixed interval and counts the collapsed stacks.
+
+    The counts are written in the collapsed-stack format ('root;caller;callee count') read by
+    flame-graph tools such as flamegraph.pl and speedscope.
+
+    Attributes:
+        thread_id (int): The sampled thread.
+        interval (float): Seconds between samples.
+        stacks (Counter): Number of samples per stack, root frame first.
+    """
+
+    def __init__(self, thread_id: Optional[int] = None, interval: float = DEFAULT_SAMPLE_INTERVAL) -> None:
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def write(self, path: Union[Path, str]) -> Path:
+        """
+        Write the sampled stacks in the collapsed-stack format.
+
+        Args:
+            path (Union[Path, str]): The output file.
+
+        Returns:
+            Path: The written file.
+        """
+        path = Path(path)
+        with path.open('w') as collapsed_file:
+            for stack, count in self.stacks.most_common():
+                collapsed_file.write(f"{stack} {count}\n")
+        return path
+
+
+@contextmanager
+def profile_block(name: str, output_dir: Union[Path, str],
+                  interval: float = DEFAULT_SAMPLE_INTERVAL) -> Iterator[Tuple[Path, Path]]:
+    """
+    Profile a block deterministically with cProfile while sampling its stacks.
+
+    Writes '<name>.prof' (pstats format, e.g. for snakeviz) and '<name>.collapsed' (for flame graphs)
+    into the output folder when the block ends, even if it raises.
+
+    Args:
+        name (str): Name of the profile, made file-safe with `profile_file_stem`.
+        output_dir (Union[Path, str]): The folder receiving the profile files.
+        interval (float): Seconds between stack samples.
+
+    Yields:
+        Tuple[Path, Path]: The paths of the pstats and collapsed-stack files.
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    stem = profile_file_stem(name)
+    profile_path, collapsed_path = output_dir / f"{stem}{PROFILE_SUFFIX}", output_dir / f"{stem}{COLLAPSED_SUFFIX}"
+
+    profiler = cProfile.Profile()
+    sampler = StackSampler(interval=interval)
+    start_time = time.perf_counter()
+    sampler.start()
+    profiler.enable()
+    try:
+        yield profile_path, collapsed_path
+    finally:
+        profiler.disable()
+        sampler.stop()
+        profiler.dump_stats(str(profile_path))
+        sampler.write(collapsed_path)
+        LOGGER.info(f"Profiled {name} in {time.perf_counter() - start_time:.2f}s: {profile_path}, {collapsed_path}")
+
+
+def summarize_profiles(directory: Union[Path, str], top_n: int = 20) -> List[str]:
+    """
+    Merge the cProfile files in a folder and list the hottest functions by own time.
+
+    Args:
+        directory (Union[Path, str]): The folder of '.prof' files.
+        top_n (int): Number of functions to list.
+
+    Returns:
+        List[str]: A header and one line per function, or an empty list without profiles.
+    """
+    profile_paths = sorted(Path(directory).glob(f"*{PROFILE_SUFFIX}"))
+    if not profile_paths:
+        return []
+    stats = pstats.Stats(str(profile_paths[0]))
+    for profile_path in profile_paths[1:]:
+        stats.add(str(profile_path))
+
+    hottest = sorted(stats.stats.items(), key=lambda item: -item[1][2])[:top_n]
+    lines = [f"Hottest {len(hottest)} functions across {len(profile_paths)} profiled tests (by own time):",
+             f"{'own s':>10} {'cumulative s':>13} {'calls':>10}  function"]
+    for (file_name, line, function_name), (_, calls, own_time, cumulative_time, _) in hottest:
+        # Built-in functions have no source location
+        location = f" ({Path(file_name).name}:{line})" if line else ''
+        lines.append(f"{own_time:>10.3f} {cumulative_time:>13.3f} {calls:>10}  {function_name}{location}")
+    return lines
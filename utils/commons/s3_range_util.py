@@ -0,0 +1,376 @@
+import io
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+from botocore.exceptions import ClientError
+
+LOGGER = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+DEFAULT_PART_SIZE = 64 * MB
+DEFAULT_MAX_CONCURRENCY = 8
+DEFAULT_MIN_THRESHOLD = 256 * MB
+DEFAULT_SPLIT_AFTER_SECONDS = 10.0
+DEFAULT_THROUGHPUT_SMOOTHING = 0.3
+COPY_CHUNK_SIZE = MB
+
+
+class ObjectChangedError(RuntimeError):
+    """
+    Raised when an S3 object no longer has the ETag it is being downloaded at, i.e. it was overwritten.
+    """
+
+
+def plan_byte_ranges(size: int, part_size: int) -> List[Tuple[int, int]]:
+    """
+    Split an object into consecutive inclusive byte ranges.
+
+    Args:
+        size (int): Size of the object in bytes.
+        part_size (int): Size of each range in bytes; the last range may be shorter.
+
+    Returns:
+        List[Tuple[int, int]]: (first byte, last byte) pairs covering the object in order.
+    """
+    if part_size <= 0:
+        raise ValueError(f"part_size must be positive, got {part_size}")
+    return [(start, min(start + part_size, size) - 1) for start in range(0, size, part_size)]
+
+
+def _get_object(s3_client: Any, bucket: str, key: str, etag: Optional[str] = None,
+                byte_range: Optional[Tuple[int, int]] = None) -> Dict[str, Any]:
+    """
+    GET an S3 object, or one inclusive byte range of it, only if it still has the given ETag.
+    """
+    request = {'Bucket': bucket, 'Key': key}
+    if byte_range is not None:
+        request['Range'] = f"bytes={byte_range[0]}-{byte_range[1]}"
+    if etag is not None:
+        request['IfMatch'] = etag
+    try:
+        return s3_client.get_object(**request)
+    except ClientError as e:
+        if e.response.get('ResponseMetadata', {}).get('HTTPStatusCode') == 412 or \
+                e.response.get('Error', {}).get('Code') == 'PreconditionFailed':
+            raise ObjectChangedError(f"s3://{bucket}/{key} was overwritten while being downloaded; it no longer "
+                                     f"has ETag {etag}") from e
+        raise
+
+
+def _get_range(s3_client: Any, bucket: str, key: str, byte_range: Tuple[int, int], etag: Optional[str]) -> bytes:
+    """
+    Fetch one inclusive byte range of an S3 object at the given ETag.
+    """
+    return _get_object(s3_client, bucket, key, etag, byte_range)['Body'].read()
+
+
+def get_object_etag(s3_client: Any, bucket: str, key: str) -> str:
+    """
+    Get the current ETag of an S3 object.
+
+    Args:
+        s3_client (Any): The S3 client object.
+        bucket (str): The name of the S3 bucket.
+        key (str): The object key.
+
+    Returns:
+        str: The ETag, as returned by S3 (quoted).
+    """
+    return s3_client.head_object(Bucket=bucket, Key=key)['ETag']
+
+
+def iter_object_ranges(s3_client: Any, bucket: str, key: str, size: int, part_size: int = DEFAULT_PART_SIZE,
+                       max_concurrency: int = DEFAULT_MAX_CONCURRENCY, etag: Optional[str] = None) -> Iterator[bytes]:
+    """
+    Yield an S3 object's content in order, fetched as concurrent byte-range GETs.
+
+    At most `max_concurrency` ranges are in flight, so memory is bounded by
+    `max_concurrency * part_size` however large the object is. Every range is requested with
+    `IfMatch` on the object's ETag, so ranges of two versions of an overwritten object are never mixed.
+
+    Args:
+        s3_client (Any): The S3 client object.
+        bucket (str): The name of the S3 bucket.
+        key (str): The object key.
+        size (int): Size of the object in bytes.
+        part_size (int): Size of each range in bytes.
+        max_concurrency (int): Maximum number of concurrent range requests.
+        etag (Optional[str]): The ETag of the object version to read; its current ETag if None.
+
+    Yields:
+        bytes: The object's ranges, in object order.
+
+    Raises:
+        ObjectChangedError: If the object does not have the ETag (any more).
+    """
+    etag = etag or get_object_etag(s3_client, bucket, key)
+    byte_ranges = plan_byte_ranges(size, part_size)
+    with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(byte_ranges)))) as executor:
+        in_flight = deque()
+        next_range = 0
+        try:
+            while in_flight or next_range < len(byte_ranges):
+                while next_range < len(byte_ranges) and len(in_flight) < max_concurrency:
+                    in_flight.append(executor.submit(_get_range, s3_client, bucket, key, byte_ranges[next_range],
+                                                     etag))
+                    next_range += 1
+                yield in_flight.popleft().result()
+        finally:
+            for future in in_flight:
+                future.cancel()
+
+
+class RangedObjectStream(io.RawIOBase):
+    """
+    Read-only file object over an S3 object fetched as concurrent byte-range GETs.
+
+    It can be handed to streaming parsers such as `pyarrow.csv.open_csv` (through `pa.input_stream`),
+    which then parse ranges while later ranges are still being downloaded.
+    """
+
+    def __init__(self, s3_client: Any, bucket: str, key: str, size: int, part_size: int = DEFAULT_PART_SIZE,
+                 max_concurrency: int = DEFAULT_MAX_CONCURRENCY, etag: Optional[str] = None) -> None:
+        super().__init__()
+        self._parts = iter_object_ranges(s3_client, bucket, key, size, part_size, max_concurrency, etag)
+        self._buffer = memoryview(b'')
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._buffer:
+            part = next(self._parts, None)
+            if part is None:
+                return 0
+            self._buffer = memoryview(part)
+        count = min(len(buffer), len(self._buffer))
+        buffer[:count] = self._buffer[:count]
+        self._buffer = self._buffer[count:]
+        return count
+
+    def close(self) -> None:
+        if not self.closed:
+            self._parts.close()
+        super().close()
+
+
+class AdaptiveRangeThreshold:
+    """
+    Size threshold above which objects are split into byte ranges, adapted to measured throughput.
+
+    Throughput of single-stream downloads (one plain GET per object) is tracked as an exponentially
+    weighted moving average. An object is split once a single stream would need more than `split_after_seconds` to fetch it,
+    so fast links split fewer objects and slow links split more; the threshold never drops below
+    `min_threshold`.
+
+    Attributes:
+        min_threshold (int): Smallest object size, in bytes, that is ever split.
+        split_after_seconds (float): Expected single-stream download time above which objects are split.
+        smoothing (float): Weight of the newest throughput sample in the moving average.
+        throughput (Optional[float]): Smoothed single-stream throughput in bytes/sec; None until measured.
+    """
+
+    def __init__(self, min_threshold: int = DEFAULT_MIN_THRESHOLD,
+                 split_after_seconds: float = DEFAULT_SPLIT_AFTER_SECONDS,
+                 smoothing: float = DEFAULT_THROUGHPUT_SMOOTHING) -> None:
+        self.min_threshold = min_threshold
+        self.split_after_seconds = split_after_seconds
+        self.smoothing = smoothing
+        self.throughput: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def record(self, size: int, elapsed: float) -> None:
+        """
+        Record a single-stream download.
+
+        Args:
+            size (int): Number of bytes downloaded.
+            elapsed (float): Duration of the download in seconds.
+        """
+        # Tiny objects are dominated by request latency and would understate the stream's throughput
+        if size < MB or elapsed <= 0:
+            return
+        sample = size / elapsed
+        with self._lock:
+            self.throughput = sample if self.throughput is None else \
+                self.smoothing * sample + (1 - self.smoothing) * self.throughput
+
+    @property
+    def threshold(self) -> int:
+        """
+        int: Current object size, in bytes, above which objects are split into byte ranges.
+        """
+        if self.throughput is None:
+            return self.min_threshold
+        return max(self.min_threshold, int(self.throughput * self.split_after_seconds))
+
+
+class RangedDownloader:
+    """
+    Download S3 objects, splitting large ones into concurrent byte-range GETs.
+
+    Objects above the adaptive threshold are fetched as `part_size` ranges with up to `max_concurrency`
+    requests in flight and written into place at their offsets; smaller objects use a single GET
+    stream, whose measured throughput adapts the threshold. Objects are read at one ETag: the one
+    listed by the caller, else the current one from `head_object`. An object overwritten meanwhile
+    fails the download with `ObjectChangedError` instead of mixing two versions.
+
+    Attributes:
+        part_size (int): Size of each range in bytes.
+        max_concurrency (int): Maximum number of concurrent range requests per object.
+        threshold (AdaptiveRangeThreshold): Decides which objects are split.
+    """
+
+    def __init__(self, part_size: int = DEFAULT_PART_SIZE, max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                 threshold: Optional[AdaptiveRangeThreshold] = None) -> None:
+        self.part_size = part_size
+        self.max_concurrency = max_concurrency
+        self.threshold = threshold or AdaptiveRangeThreshold()
+
+    @classmethod
+    def from_settings(cls, settings: Dict[str, Any]) -> 'RangedDownloader':
+        """
+        Build a downloader from the `s3_transfer` settings of the team configuration.
+
+        Args:
+            settings (Dict[str, Any]): The team settings; the optional `s3_transfer` table may define
+                part_size_mb, max_concurrency, min_threshold_mb and split_after_seconds.
+
+        Returns:
+            RangedDownloader: The configured downloader.
+        """
+        transfer_settings = settings.get('s3_transfer') or {}
+        threshold = AdaptiveRangeThreshold(
+            min_threshold=int(transfer_settings.get('min_threshold_mb', DEFAULT_MIN_THRESHOLD / MB) * MB),
+            split_after_seconds=float(transfer_settings.get('split_after_seconds', DEFAULT_SPLIT_AFTER_SECONDS)))
+        return cls(part_size=int(transfer_settings.get('part_size_mb', DEFAULT_PART_SIZE / MB) * MB),
+                   max_concurrency=int(transfer_settings.get('max_concurrency', DEFAULT_MAX_CONCURRENCY)),
+                   threshold=threshold)
+
+    def should_split(self, size: int) -> bool:
+        """
+        Check whether an object of the given size is fetched as byte ranges.
+
+        Args:
+            size (int): Size of the object in bytes.
+
+        Returns:
+            bool: True if the object is split into concurrent range requests.
+        """
+        return self.max_concurrency > 1 and size > max(self.threshold.threshold, self.part_size)
+
+    def download(self, s3_client: Any, bucket: str, key: str, download_path: Union[Path, str], size: int,
+                 etag: Optional[str] = None) -> Path:
+        """
+        Download an object to a local file.
+
+        Args:
+            s3_client (Any): The S3 client object.
+            bucket (str): The name of the S3 bucket.
+            key (str): The object key.
+            download_path (Union[Path, str]): The destination file.
+            size (int): Size of the object in bytes, as listed by `list_objects_v2`.
+            etag (Optional[str]): The ETag listed by `list_objects_v2`; the current one if None.
+
+        Returns:
+            Path: The downloaded file.
+
+        Raises:
+            ObjectChangedError: If the object does not have the ETag (any more).
+        """
+        download_path = Path(download_path)
+        temp_path = download_path.with_name(f".{download_path.name}.{uuid.uuid4().hex}.tmp")
+        start_time = time.perf_counter()
+        if not self.should_split(size):
+            try:
+                body = _get_object(s3_client, bucket, key, etag)['Body']
+                with temp_path.open('wb') as file:
+                    shutil.copyfileobj(body, file, COPY_CHUNK_SIZE)
+                os.replace(temp_path, download_path)
+            except Exception:
+                temp_path.unlink(missing_ok=True)
+                raise
+            self.threshold.record(size, time.perf_counter() - start_time)
+            return download_path
+
+        etag = etag or get_object_etag(s3_client, bucket, key)
+        byte_ranges = plan_byte_ranges(size, self.part_size)
+        try:
+            file_descriptor = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+            try:
+                os.ftruncate(file_descriptor, size)
+
+                def fetch_part(byte_range: Tuple[int, int]) -> None:
+                    os.pwrite(file_descriptor, _get_range(s3_client, bucket, key, byte_range, etag), byte_range[0])
+
+                # Parts are written at their offsets, so they may complete in any order
+                with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(byte_ranges))) as executor:
+                    for _ in executor.map(fetch_part, byte_ranges):
+                        pass
+            finally:
+                os.close(file_descriptor)
+            os.replace(temp_path, download_path)
+        except Exception:
+            temp_path.unlink(missing_ok=True)
+            raise
+
+        elapsed = max(time.perf_counter() - start_time, 1e-9)
+        LOGGER.info(f"Downloaded {key} as {len(byte_ranges)} ranges with {self.max_concurrency} connections: "
+                    f"{size / elapsed / MB:.2f} MB/sec")
+        return download_path
+
+    def read_bytes(self, s3_client: Any, bucket: str, key: str, size: int, etag: Optional[str] = None) -> bytes:
+        """
+        Read an object into memory, fetching large objects as concurrent byte ranges.
+
+        Args:
+            s3_client (Any): The S3 client object.
+            bucket (str): The name of the S3 bucket.
+            key (str): The object key.
+            size (int): Size of the object in bytes.
+            etag (Optional[str]): The ETag listed by `list_objects_v2`; the current one if None.
+
+        Returns:
+            bytes: The object's content.
+
+        Raises:
+            ObjectChangedError: If the object does not have the ETag (any more).
+        """
+        start_time = time.perf_counter()
+        if not self.should_split(size):
+            content = _get_object(s3_client, bucket, key, etag)['Body'].read()
+            self.threshold.record(size, time.perf_counter() - start_time)
+            return content
+
+        content = bytearray(size)
+        for offset, part in zip(range(0, size, self.part_size),
+                                iter_object_ranges(s3_client, bucket, key, size, self.part_size,
+                                                   self.max_concurrency, etag)):
+            content[offset:offset + len(part)] = part
+        return bytes(content)
+
+    def open_stream(self, s3_client: Any, bucket: str, key: str, size: int,
+                    etag: Optional[str] = None) -> io.RawIOBase:
+        """
+        Open an object as a file object for streaming parsers.
+
+        Args:
+            s3_client (Any): The S3 client object.
+            bucket (str): The name of the S3 bucket.
+            key (str): The object key.
+            size (int): Size of the object in bytes.
+            etag (Optional[str]): The ETag listed by `list_objects_v2`; the current one if None.
+
+        Returns:
+            io.RawIOBase: A ranged stream for large objects, otherwise the single GET's body.
+        """
+        if self.should_split(size):
+            return RangedObjectStream(s3_client, bucket, key, size, self.part_size, self.max_concurrency, etag)
+        return _get_object(s3_client, bucket, key, etag)['Body']
@@ -0,0 +1,351 @@
+import logging
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+import polars as pl
+import pyarrow as pa
+from pyspark.sql import Column, DataFrame, SparkSession
+from pyspark.sql import functions as F
+from pyspark.sql import types as T
+
+from utils.commons.mismatch_result import (MISSING_IN_LEFT, MISSING_IN_RIGHT, ROW_COLUMN_NAME, VALUE_MISMATCH,
+                                           MismatchResult)
+from utils.commons.perf_util import span
+from utils.commons.polars_comp_util import ROW_NUMBER_COLUMN
+from utils.commons.polars_util import ColumnRule
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_MASTER = 'local[*]'
+DEFAULT_APP_NAME = 'data-validation'
+DEFAULT_JDBC_FETCH_SIZE = 10_000
+# Session settings both sides of a comparison depend on; timestamps are read and cast in UTC
+DEFAULT_SPARK_CONFIG = {
+    'spark.sql.session.timeZone': 'UTC',
+    'spark.sql.execution.arrow.pyspark.enabled': 'true',
+}
+# Spark versions of the `polars_util.STRING_RULES`
+STRING_RULES = {
+    'lowercase': lambda column: F.lower(column),
+    'strip_quotes': lambda column: F.regexp_replace(column, r"[\"']", ''),
+    'trim': lambda column: F.trim(column),
+}
+# `date_trunc` units of the Polars durations accepted as timestamp granularity
+TRUNCATION_UNITS = {'1us': 'microsecond', '1ms': 'millisecond', '1s': 'second', '1m': 'minute', '1h': 'hour',
+                    '1d': 'day', '1w': 'week', '1mo': 'month', '1q': 'quarter', '1y': 'year'}
+
+
+def create_spark_session(master: str = DEFAULT_MASTER, app_name: str = DEFAULT_APP_NAME,
+                         config: Optional[Dict[str, Any]] = None) -> SparkSession:
+    """
+    Get the Spark session of the process, creating it on first use.
+
+    Args:
+        master (str): The Spark master, e.g. 'local[*]' or 'spark://host:7077'.
+        app_name (str): Name of the application in the Spark UI.
+        config (Optional[Dict[str, Any]]): Spark settings added to `DEFAULT_SPARK_CONFIG`, e.g. the
+            JDBC driver package in 'spark.jars.packages'.
+
+    Returns:
+        SparkSession: The session.
+    """
+    builder = SparkSession.builder.master(master).appName(app_name)
+    for key, value in {**DEFAULT_SPARK_CONFIG, **(config or {})}.items():
+        builder = builder.config(key, str(value))
+    spark = builder.getOrCreate()
+    LOGGER.info(f"Spark session {spark.sparkContext.applicationId} running on {spark.sparkContext.master}")
+    return spark
+
+
+def spark_df_parquet(spark: SparkSession, parquet_files: List[Union[Path, str]],
+                     column_map: Optional[List[str]] = None) -> DataFrame:
+    """
+    Read Parquet files, e.g. the converted stage files or a Redshift UNLOAD, into one Spark DataFrame.
+
+    Decimal columns keep their exact precision and scale.
+
+    Args:
+        spark (SparkSession): The session.
+        parquet_files (List[Union[Path, str]]): Local paths or URIs (e.g. 's3a://') of the Parquet files or folders.
+        column_map (Optional[List[str]]): Column names assigned positionally, if not applied at parse time.
+
+    Returns:
+        DataFrame: The combined data.
+    """
+    df = spark.read.parquet(*[str(file) for file in parquet_files])
+    if column_map:
+        df = df.toDF(*column_map)
+    LOGGER.info(f"Reading {len(parquet_files)} Parquet files into a Spark DataFrame")
+    return df
+
+
+def read_jdbc_query(spark: SparkSession, jdbc_options: Dict[str, str], query: str,
+                    fetch_size: int = DEFAULT_JDBC_FETCH_SIZE) -> DataFrame:
+    """
+    Read the result of a query over JDBC.
+
+    Args:
+        spark (SparkSession): The session; its classpath must hold the JDBC driver.
+        jdbc_options (Dict[str, str]): The 'url', 'user', 'password' and 'driver' options,
+            e.g. from `db_connection.get_jdbc_options`.
+        query (str): The query, without a trailing semicolon.
+        fetch_size (int): Rows fetched per round trip.
+
+    Returns:
+        DataFrame: The query result.
+    """
+    return (spark.read.format('jdbc').options(**jdbc_options)
+            .option('query', query).option('fetchsize', str(fetch_size)).load())
+
+
+def _sorted_by(df: DataFrame, columns: List[Column]) -> DataFrame:
+    return df.orderBy(*columns) if columns else df
+
+
+def convert_df_to_string(df: DataFrame) -> DataFrame:
+    """
+    Spark version of `polars_util.convert_df_to_string`: cast all columns to strings, strip trailing zeros
+    of float and decimal values, remove quotes from and lowercase string values, and sort the rows.
+
+    The columns keep their order and the rows end up in the same order as with the Polars version,
+    which sorts successively on each column in alphabetical order: the last one decides first, nulls first.
+
+    Args:
+        df (DataFrame): The DataFrame to convert.
+
+    Returns:
+        DataFrame: The converted DataFrame.
+    """
+    expressions = []
+    for column in df.columns:
+        field_type = df.schema[column].dataType
+        value = F.col(column).cast('string')
+        if isinstance(field_type, (T.FloatType, T.DoubleType, T.DecimalType)):
+            value = F.when(value.contains('.') & ~value.contains('E'),
+                           F.regexp_replace(value, r'\.?0+$', '')).otherwise(value)
+        elif isinstance(field_type, T.StringType):
+            value = F.lower(STRING_RULES['strip_quotes'](value))
+        expressions.append(value.alias(column))
+    sorted_columns = sorted(df.columns)
+    LOGGER.info(f"Converting {len(df.columns)} columns to strings: {sorted_columns}")
+    return _sorted_by(df.select(expressions), [F.col(column).asc_nulls_first() for column in reversed(sorted_columns)])
+
+
+def arrow_type_to_spark(arrow_type: pa.DataType) -> T.DataType:
+    """
+    Convert an Arrow data type into the Spark data type holding it without loss.
+
+    Args:
+        arrow_type (pa.DataType): The Arrow type, e.g. from `compile_arrow_schema`.
+
+    Returns:
+        T.DataType: The Spark type; timestamps without a time zone become `TimestampNTZType`.
+
+    Raises:
+        ValueError: If Spark has no equivalent type.
+    """
+    if pa.types.is_decimal(arrow_type):
+        return T.DecimalType(arrow_type.precision, arrow_type.scale)
+    if pa.types.is_timestamp(arrow_type):
+        return T.TimestampType() if arrow_type.tz else T.TimestampNTZType()
+    simple_types = [(pa.types.is_boolean, T.BooleanType), (pa.types.is_int8, T.ByteType),
+                    (pa.types.is_int16, T.ShortType), (pa.types.is_int32, T.IntegerType),
+                    (pa.types.is_int64, T.LongType), (pa.types.is_float32, T.FloatType),
+                    (pa.types.is_float64, T.DoubleType), (pa.types.is_date, T.DateType),
+                    (pa.types.is_string, T.StringType), (pa.types.is_large_string, T.StringType)]
+    for is_type, spark_type in simple_types:
+        if is_type(arrow_type):
+            return spark_type()
+    raise ValueError(f"No Spark type for Arrow type {arrow_type}")
+
+
+def align_to_schema(df: DataFrame, schema: pa.Schema, rules: Optional[Dict[str, ColumnRule]] = None) -> DataFrame:
+    """
+    Spark version of `polars_util.align_to_schema`: cast the columns to the types of a schema, apply the
+    granularity and string rules of the columns, order the columns alphabetically and sort the rows on
+    the columns without a tolerance first.
+
+    Strings need no categorical encoding here: Spark sorts and compares them in its binary row format.
+
+    Args:
+        df (DataFrame): The DataFrame to align.
+        schema (pa.Schema): The target column types, e.g. compiled from `external_table_columns`.
+        rules (Optional[Dict[str, ColumnRule]]): The rule of each column that needs one.
+
+    Returns:
+        DataFrame: The aligned DataFrame.
+
+    Raises:
+        ValueError: If a granularity has no `date_trunc` unit.
+    """
+    rules = rules or {}
+    declared_types = {field.name: arrow_type_to_spark(field.type) for field in schema}
+    expressions = []
+    for column in df.columns:
+        target = declared_types.get(column)
+        if target is None:
+            expressions.append(F.col(column))
+            continue
+        source = df.schema[column].dataType
+        value = F.col(column)
+        if isinstance(source, T.StringType) and not isinstance(target, T.StringType):
+            value = F.trim(value)
+        value = value.cast(target) if source != target else value
+        rule = rules.get(column)
+        if rule is not None and rule.granularity and isinstance(target, (T.TimestampType, T.TimestampNTZType)):
+            if rule.granularity not in TRUNCATION_UNITS:
+                raise ValueError(f"Unsupported timestamp granularity {rule.granularity!r} for Spark; "
+                                 f"expected one of {sorted(TRUNCATION_UNITS)}")
+            value = F.date_trunc(TRUNCATION_UNITS[rule.granularity], value).cast(target)
+        if rule is not None and isinstance(target, T.StringType):
+            for string_rule in rule.string_rules:
+                value = STRING_RULES[string_rule](value)
+        expressions.append(value.alias(column))
+
+    sorted_columns = sorted(df.columns)
+    toleranced = {column for column, rule in rules.items() if rule.has_tolerance}
+    sort_columns = ([column for column in sorted_columns if column not in toleranced] +
+                    [column for column in sorted_columns if column in toleranced])
+    LOGGER.info(f"Aligning {len(declared_types)} columns to their declared types")
+    return _sorted_by(df.select(expressions).select(sorted_columns),
+                      [F.col(column).asc_nulls_last() for column in sort_columns])
+
+
+def _differs(left: Column, right: Column, rule: Optional[ColumnRule]) -> Column:
+    """
+    Build the condition flagging the rows where two columns differ, within the tolerances of the rule.
+    """
+    if rule is None or not rule.has_tolerance:
+        return ~left.eqNullSafe(right)
+    # Decimals are subtracted exactly before the difference is compared as a double
+    difference = F.abs(left - right).cast('double')
+    allowed = F.lit(rule.abs_tol) + F.lit(rule.rel_tol) * F.abs(right.cast('double'))
+    return (left.isNull() != right.isNull()) | F.coalesce(difference > allowed, F.lit(False))
+
+
+def _with_row_number(df: DataFrame) -> DataFrame:
+    """
+    Number the rows of a DataFrame in its current order without moving them to a single partition.
+    """
+    schema = T.StructType(df.schema.fields + [T.StructField(ROW_NUMBER_COLUMN, T.LongType(), False)])
+    return df.rdd.zipWithIndex().map(lambda row_index: (*row_index[0], row_index[1])).toDF(schema)
+
+
+def _mismatch_frame(joined: DataFrame, key_columns: List[str], value_columns: List[str], left_suffix: str,
+                    right_suffix: str, rules: Dict[str, ColumnRule]) -> DataFrame:
+    """
+    Build the mismatch rows of a full outer join of both sides in one pass: missing rows, then one row
+    per differing cell.
+    """
+    in_left = F.col(f"_present{left_suffix}").isNotNull()
+    in_right = F.col(f"_present{right_suffix}").isNotNull()
+    keys = [F.col(column).cast('string').alias(column) for column in key_columns]
+    missing_row = F.struct(F.lit(ROW_COLUMN_NAME).alias('column_name'), F.lit(None).cast('string').alias('left_value'),
+                           F.lit(None).cast('string').alias('right_value'))
+    cells = [F.when(_differs(F.col(f"{column}{left_suffix}"), F.col(f"{column}{right_suffix}"), rules.get(column)),
+                    F.struct(F.lit(column).alias('column_name'),
+                             F.col(f"{column}{left_suffix}").cast('string').alias('left_value'),
+                             F.col(f"{column}{right_suffix}").cast('string').alias('right_value'),
+                             F.lit(VALUE_MISMATCH).alias('mismatch_kind')))
+             for column in value_columns]
+    # A frame of key columns only has no cells, but the array still needs the entry type
+    cells = cells or [F.when(F.lit(False), missing_row.withField('mismatch_kind', F.lit(VALUE_MISMATCH)))]
+    # Rows present on one side yield a single missing-row entry, others one entry per differing cell
+    entries = (F.when(~in_left, F.array(missing_row.withField('mismatch_kind', F.lit(MISSING_IN_LEFT))))
+               .when(~in_right, F.array(missing_row.withField('mismatch_kind', F.lit(MISSING_IN_RIGHT))))
+               .otherwise(F.filter(F.array(*cells), lambda entry: entry.isNotNull())))
+    return (joined.select(*keys, F.explode(entries).alias('mismatch'))
+            .select(*key_columns, 'mismatch.column_name', 'mismatch.left_value', 'mismatch.right_value',
+                    'mismatch.mismatch_kind'))
+
+
+def _to_mismatch_result(mismatches: DataFrame, key_columns: List[str], df1_name: str, df2_name: str,
+                        output_path: Optional[Path]) -> MismatchResult:
+    """
+    Write the mismatches to Parquet from the executors, or collect them through Arrow without an output path.
+    """
+    if output_path is None:
+        collected = pl.from_pandas(mismatches.toPandas(), schema_overrides=MismatchResult.schema(key_columns))
+        return MismatchResult(collected, key_columns, df1_name, df2_name)
+    mismatches.write.mode('overwrite').parquet(str(output_path))
+    return MismatchResult(Path(output_path) / '*.parquet', key_columns, df1_name, df2_name)
+
+
+def compare_dataframes(df1: DataFrame, df2: DataFrame, df1_name: str = "df1", df2_name: str = "df2",
+                       key_columns: Optional[List[str]] = None, rules: Optional[Dict[str, ColumnRule]] = None,
+                       output_path: Optional[Union[Path, str]] = None) -> (bool, str, MismatchResult):
+    """
+    Spark version of `polars_comp_util.compare_dataframes`, returning the same messages and `MismatchResult`.
+
+    Both sides are diffed with one distributed full outer join on the key columns, or on the row number
+    of each side in its current order (e.g. sorted by `convert_df_to_string` or `align_to_schema`) if no
+    key columns are given. The mismatches are computed by the executors and written as Parquet to
+    `output_path`, so only their summary reaches the driver; without an output path they are collected.
+
+    Args:
+        df1 (DataFrame): First dataframe to compare.
+        df2 (DataFrame): Second dataframe to compare.
+        df1_name (str): Name of the first dataframe for reporting.
+        df2_name (str): Name of the second dataframe for reporting.
+        key_columns (Optional[List[str]]): Columns identifying a row on both sides; rows are matched by position if None.
+        rules (Optional[Dict[str, ColumnRule]]): The comparison rule of each column that needs one.
+        output_path (Optional[Union[Path, str]]): Folder the mismatch Parquet files are written to.
+
+    Returns:
+        (bool, str, MismatchResult): A tuple containing a boolean indicating if the dataframes are identical,
+                                     a message, and the mismatches.
+    """
+    with span('compare') as compare_span:
+        are_identical, message, mismatch_result, rows = _compare_dataframes(
+            df1, df2, df1_name, df2_name, key_columns, rules or {}, Path(output_path) if output_path else None)
+        compare_span.rows = rows
+    return are_identical, message, mismatch_result
+
+
+def _compare_dataframes(df1: DataFrame, df2: DataFrame, df1_name: str, df2_name: str,
+                        key_columns: Optional[List[str]], rules: Dict[str, ColumnRule],
+                        output_path: Optional[Path]) -> (bool, str, MismatchResult, Optional[int]):
+    result_keys = key_columns or [ROW_NUMBER_COLUMN]
+    empty_result = MismatchResult.empty(result_keys, df1_name, df2_name)
+    try:
+        if df1.columns != df2.columns:
+            cols1, cols2 = set(df1.columns), set(df2.columns)
+            missing_in_df1 = cols2 - cols1
+            missing_in_df2 = cols1 - cols2
+            return False, f"Column mismatch: Missing in {df1_name}: {missing_in_df1}, Missing in {df2_name}: {missing_in_df2}", empty_result, None
+
+        height1, height2 = df1.count(), df2.count()
+        if key_columns:
+            missing_keys = [column for column in key_columns if column not in df1.columns]
+            if missing_keys:
+                return False, f"Key columns {missing_keys} are not available in both datasets.", empty_result, height1
+        else:
+            if height1 != height2:
+                shape1, shape2 = (height1, len(df1.columns)), (height2, len(df2.columns))
+                return False, f"Shape mismatch: {df1_name} shape: {shape1}, {df2_name} shape: {shape2}", empty_result, height1
+            df1, df2 = _with_row_number(df1), _with_row_number(df2)
+
+        join_keys = key_columns or [ROW_NUMBER_COLUMN]
+        value_columns = [column for column in df1.columns if column not in join_keys]
+        left_suffix, right_suffix = f"__{df1_name}", f"__{df2_name}"
+        left = df1.select(*join_keys, *[F.col(column).alias(f"{column}{left_suffix}") for column in value_columns],
+                          F.lit(True).alias(f"_present{left_suffix}"))
+        right = df2.select(*join_keys, *[F.col(column).alias(f"{column}{right_suffix}") for column in value_columns],
+                           F.lit(True).alias(f"_present{right_suffix}"))
+        joined = left.join(right, on=join_keys, how='full_outer')
+        mismatches = _mismatch_frame(joined, join_keys, value_columns, left_suffix, right_suffix, rules)
+        mismatch_result = _to_mismatch_result(mismatches, result_keys, df1_name, df2_name, output_path)
+
+        if not mismatch_result.is_empty:
+            return False, f"Data is not identical. {mismatch_result.describe()}", mismatch_result, height1
+
+        if key_columns and height1 == height2:
+            return True, "Datasets are identical when rows are matched on the key columns.", mismatch_result, height1
+        if key_columns:
+            return False, f"Duplicate key values: {df1_name} has {height1} rows, {df2_name} has {height2} rows.", mismatch_result, height1
+        if any(rule.has_tolerance for rule in rules.values()):
+            return True, "Datasets are identical within the column tolerances.", mismatch_result, height1
+        return True, "Datasets are identical.", mismatch_result, height1
+
+    except Exception as error:
+        return False, f"Error while comparing dataframes: {error}", empty_result, None
@@ -0,0 +1,366 @@
+import re
+from typing import List, Tuple
+
+from utils.commons.arrow_schema_util import sql_type_to_arrow
+
+_IDENTIFIER_PATTERN = re.compile(r'^[A-Za-z_][A-Za-z0-9_$]*$')
+# Column of `build_row_occurrence_query` holding how many times a row occurs
+ROW_OCCURRENCES_COLUMN = 'row_occurrences'
+
+
+def validate_identifier(identifier: str) -> str:
+    """
+    Validate a (possibly schema-qualified) SQL identifier before it is interpolated into a query.
+
+    Args:
+        identifier (str): The identifier, e.g. "ts_eu_pgm_edwp.out_trff_lght_mstr_rdx_gb_fact".
+
+    Returns:
+        str: The identifier, unchanged.
+
+    Raises:
+        ValueError: If any part of the identifier is not a plain SQL identifier.
+    """
+    if not all(_IDENTIFIER_PATTERN.match(part) for part in identifier.split('.')):
+        raise ValueError(f"Invalid SQL identifier: {identifier}")
+    return identifier
+
+
+def validate_sql_type(sql_type: str) -> str:
+    """
+    Validate a column type from the table configuration before it is interpolated into DDL.
+
+    Args:
+        sql_type (str): The SQL type, e.g. "NUMERIC(30, 20)".
+
+    Returns:
+        str: The type, unchanged.
+
+    Raises:
+        ValueError: If the type is not one of the supported types of `sql_type_to_arrow`.
+    """
+    sql_type_to_arrow(sql_type)
+    return sql_type
+
+
+def _quote_literal(value: str) -> str:
+    """
+    Quote a string literal for interpolation into a query.
+    """
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def build_select_query(relation: str, columns: List[str]) -> str:
+    """
+    Build a SELECT of the given columns from a relation.
+
+    Args:
+        relation (str): The table or view to select from.
+        columns (List[str]): The columns to select, in order.
+
+    Returns:
+        str: The SELECT statement (without a trailing semicolon).
+    """
+    column_list = ",\n    ".join(validate_identifier(col) for col in columns)
+    return f"SELECT\n    {column_list}\nFROM {validate_identifier(relation)}"
+
+
+def build_row_count_query(relation: str) -> str:
+    """
+    Build a query counting the rows of a relation.
+
+    Args:
+        relation (str): The table or view to count.
+
+    Returns:
+        str: A query returning a single `row_count` column.
+    """
+    return f"SELECT COUNT(*) AS row_count FROM {validate_identifier(relation)}"
+
+
+def build_null_count_query(relation: str, columns: List[str]) -> str:
+    """
+    Build an aggregate counting the rows of a relation and the nulls of each given column, so
+    completeness checks run in the warehouse instead of on extracted data.
+
+    Args:
+        relation (str): The table or view to check.
+        columns (List[str]): The columns whose nulls are counted.
+
+    Returns:
+        str: A query returning one row with `row_count` and a `<column>_null_count` per column.
+    """
+    null_counts = ",\n    ".join(f"COUNT(*) - COUNT({validate_identifier(col)}) AS {col}_null_count"
+                                  for col in columns)
+    return f"SELECT\n    COUNT(*) AS row_count,\n    {null_counts}\nFROM {validate_identifier(relation)}"
+
+
+def build_row_occurrence_query(relation: str, columns: List[str]) -> str:
+    """
+    Build an aggregate returning each distinct row of a relation with the number of times it occurs.
+
+    Args:
+        relation (str): The table or view to aggregate.
+        columns (List[str]): The columns making up a row.
+
+    Returns:
+        str: The GROUP BY query (without a trailing semicolon), with a `row_occurrences` column after the
+        given columns.
+
+    Raises:
+        ValueError: If a column is named like the occurrence count.
+    """
+    if ROW_OCCURRENCES_COLUMN in (col.lower() for col in columns):
+        raise ValueError(f"Column name {ROW_OCCURRENCES_COLUMN} is reserved for the row occurrence count")
+    select_list = ",\n    ".join(validate_identifier(col) for col in columns)
+    return (f"SELECT\n    {select_list},\n    COUNT(*) AS {ROW_OCCURRENCES_COLUMN}\n"
+            f"FROM {validate_identifier(relation)}\nGROUP BY {', '.join(columns)}")
+
+
+def build_except_query(left_relation: str, right_relation: str, columns: List[str]) -> str:
+    """
+    Build a query returning the rows of the left relation that do not occur as many times in the right
+    relation. Both sides are grouped with `build_row_occurrence_query` before the EXCEPT, since EXCEPT
+    alone compares distinct rows and would ignore differing duplicates.
+
+    Args:
+        left_relation (str): The relation whose extra rows are returned.
+        right_relation (str): The relation subtracted from the left one.
+        columns (List[str]): The compared columns.
+
+    Returns:
+        str: The EXCEPT query (without a trailing semicolon), returning each differing row once with its
+        `row_occurrences` in the left relation.
+    """
+    return (f"{build_row_occurrence_query(left_relation, columns)}\nEXCEPT\n"
+            f"{build_row_occurrence_query(right_relation, columns)}")
+
+
+def build_except_count_query(left_relation: str, right_relation: str, columns: List[str]) -> str:
+    """
+    Build a query counting the distinct rows of the left relation that do not occur as many times in the
+    right relation (see `build_except_query`).
+
+    Args:
+        left_relation (str): The relation whose extra rows are counted.
+        right_relation (str): The relation subtracted from the left one.
+        columns (List[str]): The compared columns.
+
+    Returns:
+        str: A query returning a single `diff_count` column.
+    """
+    return f"SELECT COUNT(*) AS diff_count FROM (\n{build_except_query(left_relation, right_relation, columns)}\n) AS d"
+
+
+def build_except_sample_query(left_relation: str, right_relation: str, columns: List[str], limit: int) -> str:
+    """
+    Build a query returning a bounded sample of the rows of the left relation that do not occur as many times
+    in the right relation (see `build_except_query`).
+
+    Args:
+        left_relation (str): The relation whose extra rows are sampled.
+        right_relation (str): The relation subtracted from the left one.
+        columns (List[str]): The compared columns.
+        limit (int): Maximum number of rows returned.
+
+    Returns:
+        str: The sample query.
+    """
+    return (f"SELECT * FROM (\n{build_except_query(left_relation, right_relation, columns)}\n) AS d "
+            f"LIMIT {int(limit)}")
+
+
+def build_external_schema_exists_query(schema_name: str) -> str:
+    """
+    Build a query listing the Redshift external schema with the given name, if it exists.
+
+    Args:
+        schema_name (str): The external schema name.
+
+    Returns:
+        str: The lookup query.
+    """
+    return f"SELECT schemaname FROM svv_external_schemas WHERE schemaname = {_quote_literal(schema_name)}"
+
+
+def build_create_external_schema_query(schema_name: str, glue_database: str, iam_role: str) -> str:
+    """
+    Build the DDL creating a Redshift Spectrum external schema over a Glue data catalog database.
+
+    Args:
+        schema_name (str): The external schema name.
+        glue_database (str): The Glue data catalog database.
+        iam_role (str): The IAM role ARN Redshift assumes to read the catalog and S3.
+
+    Returns:
+        str: The CREATE EXTERNAL SCHEMA statement.
+    """
+    return (f"CREATE EXTERNAL SCHEMA IF NOT EXISTS {validate_identifier(schema_name)}\n"
+            f"FROM DATA CATALOG\n"
+            f"DATABASE {_quote_literal(glue_database)}\n"
+            f"IAM_ROLE {_quote_literal(iam_role)}")
+
+
+def build_create_external_table_query(relation: str, column_definitions: List[Tuple[str, str]], s3_uri: str,
+                                      delimiter: str = '|', skip_header_lines: int = 1) -> str:
+    """
+    Build the DDL creating a Redshift Spectrum external table over delimited text files in S3.
+
+    Args:
+        relation (str): The schema-qualified external table name.
+        column_definitions (List[Tuple[str, str]]): (column name, SQL type) pairs.
+        s3_uri (str): The S3 location of the files.
+        delimiter (str): The field delimiter.
+        skip_header_lines (int): Number of header lines to skip per file.
+
+    Returns:
+        str: The CREATE EXTERNAL TABLE statement.
+    """
+    columns = ",\n  ".join(f"{validate_identifier(name)} {validate_sql_type(sql_type)}"
+                            for name, sql_type in column_definitions)
+    return (f"CREATE EXTERNAL TABLE {validate_identifier(relation)} (\n  {columns}\n)\n"
+            f"ROW FORMAT DELIMITED\n"
+            f"FIELDS TERMINATED BY {_quote_literal(delimiter)}\n"
+            f"STORED AS TEXTFILE\n"
+            f"LOCATION {_quote_literal(s3_uri)}\n"
+            f"TABLE PROPERTIES ('skip.header.line.count'={_quote_literal(str(skip_header_lines))}, "
+            f"'serialization.encoding'='UTF-8')")
+
+
+def build_drop_external_table_query(relation: str) -> str:
+    """
+    Build the DDL dropping a Redshift Spectrum external table.
+
+    Args:
+        relation (str): The schema-qualified external table name.
+
+    Returns:
+        str: The DROP TABLE statement.
+    """
+    return f"DROP TABLE IF EXISTS {validate_identifier(relation)}"
+
+
+def build_drop_schema_query(schema_name: str) -> str:
+    """
+    Build the DDL dropping a schema. For external schemas the Glue database is kept.
+
+    Args:
+        schema_name (str): The schema name.
+
+    Returns:
+        str: The DROP SCHEMA statement.
+    """
+    return f"DROP SCHEMA IF EXISTS {validate_identifier(schema_name)}"
+
+
+def build_schema_exists_query(schema_name: str) -> str:
+    """
+    Build a query listing the (non-external) schema with the given name, if it exists.
+
+    Args:
+        schema_name (str): The schema name.
+
+    Returns:
+        str: The lookup query.
+    """
+    return (f"SELECT schema_name AS schemaname FROM information_schema.schemata "
+            f"WHERE schema_name = {_quote_literal(schema_name)}")
+
+
+def build_create_schema_query(schema_name: str) -> str:
+    """
+    Build the DDL creating a regular schema.
+
+    Args:
+        schema_name (str): The schema name.
+
+    Returns:
+        str: The CREATE SCHEMA statement.
+    """
+    return f"CREATE SCHEMA IF NOT EXISTS {validate_identifier(schema_name)}"
+
+
+def build_create_table_query(relation: str, column_definitions: List[Tuple[str, str]]) -> str:
+    """
+    Build the DDL creating a regular table.
+
+    Args:
+        relation (str): The schema-qualified table name.
+        column_definitions (List[Tuple[str, str]]): (column name, SQL type) pairs.
+
+    Returns:
+        str: The CREATE TABLE statement.
+
+    Raises:
+        ValueError: If a column name or type is not valid.
+    """
+    columns = ",\n  ".join(f"{validate_identifier(name)} {validate_sql_type(sql_type)}"
+                            for name, sql_type in column_definitions)
+    return f"CREATE TABLE {validate_identifier(relation)} (\n  {columns}\n)"
+
+
+def build_copy_from_file_query(relation: str, file_path: str, delimiter: str = '|') -> str:
+    """
+    Build a PostgreSQL server-side COPY loading a delimited file with a header line into a table.
+
+    Args:
+        relation (str): The schema-qualified table name.
+        file_path (str): Path of the file on the database server.
+        delimiter (str): The field delimiter.
+
+    Returns:
+        str: The COPY statement.
+    """
+    return (f"COPY {validate_identifier(relation)} FROM {_quote_literal(file_path)} "
+            f"WITH (FORMAT csv, DELIMITER {_quote_literal(delimiter)}, HEADER true)")
+
+
+def build_table_freshness_query(relation: str) -> str:
+    """
+    Build a cheap Redshift probe of a table's modification state from the system views: its table id,
+    row count (including deleted rows not vacuumed yet) and the end time of its latest insert and
+    delete still in the STL logs. An UPDATE is logged as a delete plus an insert. The STL views only
+    show other users' loads to superusers and users with SYSLOG ACCESS UNRESTRICTED (see
+    `build_syslog_access_query`).
+
+    Args:
+        relation (str): The schema-qualified table.
+
+    Returns:
+        str: A query returning one row with `table_id`, `tbl_rows`, `last_insert` and `last_delete`,
+        or no row if the table is unknown or empty.
+    """
+    schema_name, table_name = validate_identifier(relation).split('.')
+    return (f"SELECT ti.table_id, ti.tbl_rows,\n"
+            f"    (SELECT MAX(i.endtime) FROM stl_insert i WHERE i.tbl = ti.table_id) AS last_insert,\n"
+            f"    (SELECT MAX(d.endtime) FROM stl_delete d WHERE d.tbl = ti.table_id) AS last_delete\n"
+            f"FROM svv_table_info ti\n"
+            f"WHERE ti.\"schema\" = {_quote_literal(schema_name)} AND ti.\"table\" = {_quote_literal(table_name)}")
+
+
+def build_syslog_access_query() -> str:
+    """
+    Build a Redshift query telling whether the current user sees the STL rows of every user's queries,
+    as a superuser or with SYSLOG ACCESS UNRESTRICTED. Other users only see their own queries there.
+
+    Returns:
+        str: A query returning one row with `usesuper` and `syslogaccess`, or no row if the user cannot
+        read `svl_user_info`.
+    """
+    return "SELECT usesuper, syslogaccess FROM svl_user_info WHERE usename = CURRENT_USER"
+
+
+def build_postgres_table_freshness_query(relation: str) -> str:
+    """
+    Build the PostgreSQL stand-in of `build_table_freshness_query` from the statistics collector's
+    cumulative tuple counters.
+
+    Args:
+        relation (str): The schema-qualified table.
+
+    Returns:
+        str: A query returning one row with the table's insert, update and delete counters.
+    """
+    schema_name, table_name = validate_identifier(relation).split('.')
+    return (f"SELECT relid AS table_id, n_tup_ins, n_tup_upd, n_tup_del FROM pg_stat_user_tables "
+            f"WHERE schemaname = {_quote_literal(schema_name)} AND relname = {_quote_literal(table_name)}")
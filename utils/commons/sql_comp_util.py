@@ -0,0 +1,55 @@
+import logging
+from typing import Callable, Dict, List
+
+import polars as pl
+
+from utils.commons.sql_builder_util import build_except_count_query, build_except_sample_query, build_row_count_query
+
+LOGGER = logging.getLogger(__name__)
+
+
+def run_except_comparison(execute_query: Callable[[str], pl.DataFrame], left_relation: str, right_relation: str,
+                          columns: List[str], sample_size: int = 100, left_label: str = "stage",
+                          right_label: str = "edwp") -> (bool, str, Dict[str, int], pl.DataFrame):
+    """
+    Compare two relations with EXCEPT in both directions on whichever SQL engine `execute_query` targets.
+
+    The same generated SQL runs in the warehouse (Redshift) and in the local backend, so one
+    comparison definition can be evaluated in either place. Each side is grouped into its distinct rows
+    and how many times they occur before the EXCEPT, so rows duplicated a different number of times on
+    each side are reported as differences, in both directions.
+
+    Args:
+        execute_query (Callable[[str], pl.DataFrame]): Runs a query and returns its result as a Polars DataFrame.
+        left_relation (str): The first relation, e.g. the stage table.
+        right_relation (str): The second relation, e.g. the EDWP table.
+        columns (List[str]): The compared columns.
+        sample_size (int): Maximum number of differing rows returned per direction.
+        left_label (str): Name of the first relation for counts and reporting.
+        right_label (str): Name of the second relation for counts and reporting.
+
+    Returns:
+        (bool, str, Dict[str, int], pl.DataFrame): A tuple containing a boolean indicating if the data is identical,
+                                                   a message, the row counts and the counts of distinct differing
+                                                   rows, and a sample of the differing rows with their
+                                                   `row_occurrences` and a `diff_direction` column.
+    """
+    counts = {}
+    for label, relation in ((left_label, left_relation), (right_label, right_relation)):
+        counts[f"{label}_rows"] = int(execute_query(build_row_count_query(relation))['row_count'][0])
+
+    samples = []
+    for direction, left, right in ((f"{left_label}_only", left_relation, right_relation),
+                                   (f"{right_label}_only", right_relation, left_relation)):
+        counts[direction] = int(execute_query(build_except_count_query(left, right, columns))['diff_count'][0])
+        if counts[direction] and sample_size > 0:
+            sample_df = execute_query(build_except_sample_query(left, right, columns, sample_size))
+            samples.append(sample_df.with_columns(pl.lit(direction).alias('diff_direction')))
+
+    sample_df = pl.concat(samples, how="vertical_relaxed") if samples else pl.DataFrame()
+    message = (f"{left_label} rows: {counts[f'{left_label}_rows']}, {right_label} rows: {counts[f'{right_label}_rows']}, "
+               f"{left_label} rows not matched in {right_label}: {counts[f'{left_label}_only']}, "
+               f"{right_label} rows not matched in {left_label}: {counts[f'{right_label}_only']}")
+    are_identical = counts[f"{left_label}_only"] == 0 and counts[f"{right_label}_only"] == 0
+    LOGGER.info(message)
+    return are_identical, message, counts, sample_df
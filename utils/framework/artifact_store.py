@@ -0,0 +1,206 @@
+import argparse
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Union
+
+from utils.framework.path_util import get_project_root_path
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 10 * 1024 ** 3
+# Bump when the conversion output changes so artifacts of older conversions are not reused
+ARTIFACT_FORMAT_VERSION = 1
+
+
+def get_artifact_store_path() -> Path:
+    """
+    Get the default root folder of the Parquet artifact store.
+
+    Returns:
+        Path: The artifact store folder in the project root.
+    """
+    return get_project_root_path() / 'artifact_store'
+
+
+class ParquetArtifactStore:
+    """
+    Local content-addressed store for converted Parquet artifacts, bounded by a disk budget.
+
+    Artifacts are keyed by the source object's ETag plus the conversion settings, written atomically,
+    and evicted least-recently-used first once the store exceeds `max_bytes`. The index is guarded by a
+    file lock so several pytest-xdist workers can share one store.
+
+    Attributes:
+        root (Path): Root folder of the store.
+        max_bytes (int): Disk budget for the stored artifacts.
+    """
+
+    def __init__(self, root: Optional[Union[Path, str]] = None, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        """
+        Initialize the store, creating its folder if needed.
+
+        Args:
+            root (Optional[Union[Path, str]]): Root folder of the store; `get_artifact_store_path()` if None.
+            max_bytes (int): Disk budget for the stored artifacts.
+        """
+        self.root = Path(root) if root else get_artifact_store_path()
+        self.max_bytes = max_bytes
+        self._objects_path = self.root / 'objects'
+        self._index_path = self.root / 'index.json'
+        self._lock_path = self.root / '.lock'
+        self._thread_lock = threading.Lock()
+        self._objects_path.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def make_key(source_etag: str, settings: Dict[str, Any]) -> str:
+        """
+        Build the content address of an artifact.
+
+        Args:
+            source_etag (str): The ETag of the source S3 object.
+            settings (Dict[str, Any]): The conversion settings (delimiter, schema, codec, ...).
+
+        Returns:
+            str: The hex digest identifying the artifact.
+        """
+        payload = json.dumps({'etag': source_etag.strip('"'), 'settings': settings,
+                              'version': ARTIFACT_FORMAT_VERSION}, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _artifact_path(self, key: str) -> Path:
+        return self._objects_path / key[:2] / f"{key}.parquet"
+
+    @contextmanager
+    def _locked_index(self) -> Iterator[Dict[str, Any]]:
+        """
+        Load the index under an exclusive lock and write it back when the block exits.
+        """
+        with self._thread_lock, open(self._lock_path, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                index = {'entries': {}, 'hits': 0, 'misses': 0, 'bytes_saved': 0}
+                if self._index_path.exists():
+                    index.update(json.loads(self._index_path.read_text()))
+                yield index
+                temp_path = self._index_path.with_name(f".index.{uuid.uuid4().hex}.tmp")
+                temp_path.write_text(json.dumps(index))
+                temp_path.replace(self._index_path)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def get(self, key: str) -> Optional[Path]:
+        """
+        Look up an artifact and record the hit or miss.
+
+        Args:
+            key (str): The artifact key from `make_key`.
+
+        Returns:
+            Optional[Path]: The stored artifact, or None if it is not in the store.
+        """
+        with self._locked_index() as index:
+            entry = index['entries'].get(key)
+            artifact_path = self._artifact_path(key)
+            if entry is None or not artifact_path.exists():
+                index['entries'].pop(key, None)
+                index['misses'] += 1
+                return None
+            entry['last_access'] = time.time()
+            index['hits'] += 1
+            index['bytes_saved'] += entry.get('source_bytes', 0)
+            return artifact_path
+
+    def put(self, key: str, parquet_path: Union[Path, str], source_bytes: int = 0,
+            group: Optional[str] = None) -> Path:
+        """
+        Store an artifact atomically and evict older artifacts if the disk budget is exceeded.
+
+        Args:
+            key (str): The artifact key from `make_key`.
+            parquet_path (Union[Path, str]): The converted Parquet file to store (it is copied).
+            source_bytes (int): Size of the source object, counted as saved on every later hit.
+            group (Optional[str]): Artifacts that are versions of the same thing share a group; storing
+                one removes the other (stale) versions right away.
+
+        Returns:
+            Path: The stored artifact.
+        """
+        artifact_path = self._artifact_path(key)
+        artifact_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = artifact_path.with_name(f".{key}.{uuid.uuid4().hex}.tmp")
+        shutil.copyfile(parquet_path, temp_path)
+        os.replace(temp_path, artifact_path)
+
+        with self._locked_index() as index:
+            now = time.time()
+            if group is not None:
+                for stale_key in [other for other, entry in index['entries'].items()
+                                  if entry.get('group') == group and other != key]:
+                    self._artifact_path(stale_key).unlink(missing_ok=True)
+                    del index['entries'][stale_key]
+                    LOGGER.debug(f"Removed stale artifact {stale_key} of group {group}")
+            index['entries'][key] = {'size': artifact_path.stat().st_size, 'source_bytes': source_bytes,
+                                     'created': now, 'last_access': now, 'group': group}
+            self._evict(index, keep=key)
+        LOGGER.debug(f"Stored Parquet artifact {key}")
+        return artifact_path
+
+    def _evict(self, index: Dict[str, Any], keep: Optional[str] = None) -> None:
+        """
+        Remove least-recently-used artifacts until the store fits its disk budget.
+        """
+        total_bytes = sum(entry['size'] for entry in index['entries'].values())
+        for key, entry in sorted(index['entries'].items(), key=lambda item: item[1]['last_access']):
+            if total_bytes <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            self._artifact_path(key).unlink(missing_ok=True)
+            del index['entries'][key]
+            total_bytes -= entry['size']
+            LOGGER.debug(f"Evicted Parquet artifact {key}")
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report the store's size, hit rate and bytes saved.
+
+        Returns:
+            Dict[str, Any]: The store statistics.
+        """
+        with self._locked_index() as index:
+            lookups = index['hits'] + index['misses']
+            return {
+                'artifacts': len(index['entries']),
+                'total_bytes': sum(entry['size'] for entry in index['entries'].values()),
+                'max_bytes': self.max_bytes,
+                'hits': index['hits'],
+                'misses': index['misses'],
+                'hit_rate': index['hits'] / lookups if lookups else 0.0,
+                'bytes_saved': index['bytes_saved'],
+            }
+
+
+def main() -> None:
+    """
+    Command line entry point: `python -m utils.framework.artifact_store stats [--root PATH]`.
+    """
+    parser = argparse.ArgumentParser(description="Inspect the local Parquet artifact store.")
+    parser.add_argument('command', choices=['stats'])
+    parser.add_argument('--root', default=None, help="Root folder of the store (default: <project>/artifact_store)")
+    args = parser.parse_args()
+
+    if args.command == 'stats':
+        print(json.dumps(ParquetArtifactStore(args.root).stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,417 @@
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import polars as pl
+import pyarrow as pa
+from sqlalchemy.engine import Engine
+
+from utils.commons.arrow_schema_util import compile_arrow_schema
+from utils.commons.perf_util import table_context
+from utils.commons.polars_comp_util import compare_dataframes, generate_html_report
+from utils.commons.polars_util import (ColumnRule, align_to_schema, convert_df_to_string,
+                                       find_low_cardinality_columns, polars_df_parquet)
+from utils.commons.s3_range_util import RangedDownloader
+from utils.commons.sql_builder_util import build_null_count_query, build_select_query
+from utils.framework.artifact_store import ParquetArtifactStore
+from utils.framework.path_util import get_project_root_path
+from utils.framework.query_cache import QueryResultCache, read_sql_query_cached
+from utils.framework.s3_utils import fetch_parquet_from_s3
+from utils.framework.shared_dataset import SharedDatasetRegistry, fingerprint_files
+from utils.framework.spectrum_comp_util import DEFAULT_EDWP_SCHEMA
+from utils.framework.table_config_util import (SPARK_PROCESSING_CORE, TYPED_COMPARISON, get_audit_columns,
+                                               get_categorical_columns, get_comparison_settings, get_compared_columns,
+                                               get_external_table_columns, get_key_columns, get_processing_core)
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_PREFETCH_TABLES = 1
+
+
+class TableInputs:
+    """
+    The fetched inputs of a table: its stage files as Parquet and its EDWP extract.
+
+    Attributes:
+        stage_path (Path): The table's download folder with one Parquet file per stage object.
+        schema (Optional[pa.Schema]): The schema the stage files were parsed with, if configured.
+        edwp_df (Optional[pl.DataFrame]): The compared columns of the EDWP table; None for tables compared
+            with Spark, which reads them itself.
+        audit_null_counts (Dict[str, int]): Number of nulls per EDWP audit column.
+    """
+
+    def __init__(self, stage_path: Path, schema: Optional[pa.Schema], edwp_df: Optional[pl.DataFrame],
+                 audit_null_counts: Dict[str, int]) -> None:
+        self.stage_path = stage_path
+        self.schema = schema
+        self.edwp_df = edwp_df
+        self.audit_null_counts = audit_null_counts
+
+
+class TableOutcome:
+    """
+    The validation result of one table.
+
+    Attributes:
+        table_name (str): The table.
+        are_identical (bool): Whether the stage data and the EDWP table match.
+        message (str): Description of the result.
+        report_path (Optional[Path]): The HTML mismatch report, if mismatches were found.
+        error (Optional[BaseException]): The error that stopped the validation, if any.
+    """
+
+    def __init__(self, table_name: str, are_identical: bool, message: str, report_path: Optional[Path] = None,
+                 error: Optional[BaseException] = None) -> None:
+        self.table_name = table_name
+        self.are_identical = are_identical
+        self.message = message
+        self.report_path = report_path
+        self.error = error
+
+
+def get_stage_schema(settings: Dict[str, Any], table_name: str) -> Optional[pa.Schema]:
+    """
+    Get the schema the stage files of a table are parsed with, if the table declares its columns.
+
+    Args:
+        settings (Dict[str, Any]): The configuration settings, including the table configuration under `table_name`.
+        table_name (str): The table.
+
+    Returns:
+        Optional[pa.Schema]: The schema, or None to infer it.
+    """
+    stage_settings = settings[table_name]['stage']['aws_s3']
+    if 'external_table_columns' not in stage_settings:
+        return None
+    return compile_arrow_schema(get_external_table_columns(settings[table_name]), stage_settings.get('column_map'))
+
+
+def fetch_stage_parquet(settings: Dict[str, Any], table_name: str, s3_client: Any, store: ParquetArtifactStore,
+                        downloader: Optional[RangedDownloader] = None) -> Path:
+    """
+    Materialize the stage files of a table as Parquet, reusing stored artifacts of unchanged objects.
+
+    Args:
+        settings (Dict[str, Any]): The configuration settings, including the table configuration under `table_name`.
+        table_name (str): The table.
+        s3_client (Any): The S3 client object.
+        store (ParquetArtifactStore): The artifact store.
+        downloader (Optional[RangedDownloader]): The downloader; configured from `settings` if None.
+
+    Returns:
+        Path: The table's download folder.
+    """
+    stage_settings = settings[table_name]['stage']['aws_s3']
+    LOGGER.info(f"Fetching stage files of {table_name} from {stage_settings['stg_s3_bucket']}/"
+                f"{stage_settings['stg_s3_path']}")
+    return fetch_parquet_from_s3(s3_client, stage_settings['stg_s3_bucket'], stage_settings['stg_s3_path'],
+                                 table_name, store, delimiter=stage_settings.get('delimiter', '|'),
+                                 schema=get_stage_schema(settings, table_name),
+                                 parquet_options=stage_settings.get('parquet_options'),
+                                 workers=settings.get('parquet_conversion_workers', 1),
+                                 downloader=downloader or RangedDownloader.from_settings(settings))
+
+
+def find_edwp_audit_columns(settings: Dict[str, Any], table_name: str, engine: Engine,
+                            query_cache: Optional[QueryResultCache] = None) -> List[str]:
+    """
+    Get the audit columns of a table's EDWP table: the configured `warehouse.redshift.edwp.audit_columns`,
+    else the columns of the EDWP table that are not compared (see `get_compared_columns`), matched by
+    name from the result columns of a `LIMIT 0` query.
+
+    Args:
+        settings (Dict[str, Any]): The configuration settings, including the table configuration under `table_name`.
+        table_name (str): The table.
+        engine (Engine): SQLAlchemy engine connected to Redshift.
+        query_cache (Optional[QueryResultCache]): The query cache; created from `settings` if None.
+
+    Returns:
+        List[str]: The audit columns, in EDWP table order when discovered.
+    """
+    audit_columns = get_audit_columns(settings[table_name])
+    if audit_columns:
+        return audit_columns
+    query_cache = query_cache or QueryResultCache.from_settings(settings, engine)
+    relation = f"{settings.get('edwp_schema_name', DEFAULT_EDWP_SCHEMA)}.{table_name}"
+    compared_columns = {col.lower() for col in get_compared_columns(settings[table_name])}
+    columns = read_sql_query_cached(engine, f"SELECT * FROM {relation} LIMIT 0;", cache=query_cache).columns
+    audit_columns = [col for col in columns if col.lower() not in compared_columns]
+    LOGGER.info(f"No audit_columns configured for {table_name}; found {audit_columns} in {relation}")
+    return audit_columns
+
+
+def fetch_edwp_extract(settings: Dict[str, Any], table_name: str, engine: Engine,
+                       query_cache: Optional[QueryResultCache] = None,
+                       extract: Optional[bool] = None) -> Tuple[Optional[pl.DataFrame], Dict[str, int]]:
+    """
+    Extract the compared columns of a table's EDWP table from Redshift and count the nulls of its audit
+    columns, served from the query cache while the table is unchanged.
+
+    Only the compared columns (see `get_compared_columns`) are selected, and the audit columns (see
+    `find_edwp_audit_columns`) are checked server side with one `COUNT(*) - COUNT(col)` aggregate.
+
+    Without `extract` (tables compared with Spark, which reads the extract itself) only the audit
+    columns are checked.
+
+    Args:
+        settings (Dict[str, Any]): The configuration settings, including the table configuration under `table_name`.
+        table_name (str): The table.
+        engine (Engine): SQLAlchemy engine connected to Redshift.
+        query_cache (Optional[QueryResultCache]): The query cache; created from `settings` if None.
+        extract (Optional[bool]): Whether to extract the compared columns; only for tables not compared with
+            Spark if None.
+
+    Returns:
+        Tuple[Optional[pl.DataFrame], Dict[str, int]]: The compared columns (None without `extract`) and the
+            number of nulls per audit column.
+    """
+    query_cache = query_cache or QueryResultCache.from_settings(settings, engine)
+    relation = f"{settings.get('edwp_schema_name', DEFAULT_EDWP_SCHEMA)}.{table_name}"
+    if extract is None:
+        extract = get_processing_core(settings[table_name]) != SPARK_PROCESSING_CORE
+
+    audit_columns = find_edwp_audit_columns(settings, table_name, engine, query_cache)
+    if audit_columns:
+        null_counts = read_sql_query_cached(engine, build_null_count_query(relation, audit_columns),
+                                            cache=query_cache).row(0, named=True)
+        null_counts = {col: null_counts[f"{col}_null_count"] for col in audit_columns}
+    else:
+        LOGGER.warning(f"No audit columns found in {relation}")
+        null_counts = {}
+    if not extract:
+        return None, null_counts
+
+    extraction_query = build_select_query(relation, get_compared_columns(settings[table_name]))
+    return read_sql_query_cached(engine, extraction_query, cache=query_cache), null_counts
+
+
+def normalize_for_comparison(table_settings: Dict[str, Any], stage_df: pl.DataFrame,
+                             edwp_df: pl.DataFrame) -> Tuple[pl.DataFrame, pl.DataFrame, Dict[str, ColumnRule]]:
+    """
+    Normalize the stage data and the EDWP extract of a table for `compare_dataframes`, in the comparison
+    mode of its `comparison` block (see `get_comparison_settings`).
+
+    In string mode both sides are converted with `convert_df_to_string`, which sorts them as Utf8, so they
+    are compared as strings. In typed mode they are aligned to the declared column types with
+    `align_to_schema`, keeping numbers and timestamps native; the `comparison.categorical_columns` of the
+    table, or else the low-cardinality string columns of the stage data, are encoded as categoricals on
+    both sides under one string cache before the sort, so they are sorted and compared as integers.
+
+    Args:
+        table_settings (Dict[str, Any]): The table configuration loaded from the table YAML.
+        stage_df (pl.DataFrame): The stage data, with its final column names.
+        edwp_df (pl.DataFrame): The EDWP extract.
+
+    Returns:
+        Tuple[pl.DataFrame, pl.DataFrame, Dict[str, ColumnRule]]: Both normalized sides and the column rules
+            to compare them with.
+    """
+    mode, schema, rules = get_comparison_settings(table_settings)
+    if mode == TYPED_COMPARISON:
+        categorical_columns = get_categorical_columns(table_settings)
+        if categorical_columns is None:
+            string_columns = [field.name for field in schema
+                              if pa.types.is_string(field.type) and field.name in stage_df.columns]
+            categorical_columns = find_low_cardinality_columns(stage_df.select(string_columns))
+        LOGGER.info(f"Encoding columns as categoricals: {categorical_columns}")
+        with pl.StringCache():
+            return (align_to_schema(stage_df, schema, rules, categorical_columns),
+                    align_to_schema(edwp_df, schema, rules, categorical_columns), rules)
+
+    # Encoding after the Utf8 sort of `convert_df_to_string` only adds work, so string mode compares strings
+    return convert_df_to_string(stage_df), convert_df_to_string(edwp_df), rules
+
+
+@contextmanager
+def open_stage_frame(stage_files: List[Path], column_map: Optional[List[str]] = None, exact_decimals: bool = False,
+                     datasets: Optional[SharedDatasetRegistry] = None) -> Iterator[pl.DataFrame]:
+    """
+    Load the stage Parquet files of a table into one DataFrame, through the shared dataset registry if given.
+
+    With a registry the frame is built once per session by whichever test or xdist worker needs it first,
+    and memory-mapped by every other one; a reference is held on it for the duration of the block.
+
+    Args:
+        stage_files (List[Path]): The stage Parquet files.
+        column_map (Optional[List[str]]): Column names assigned positionally, if not applied at parse time.
+        exact_decimals (bool): Load decimal columns as exact Polars decimals.
+        datasets (Optional[SharedDatasetRegistry]): The registry; the files are read privately if None.
+
+    Yields:
+        pl.DataFrame: The stage data.
+    """
+    def build() -> pl.DataFrame:
+        df = polars_df_parquet(stage_files, exact_decimals=exact_decimals)
+        if column_map:
+            df.columns = column_map
+        return df
+
+    if datasets is None:
+        yield build()
+        return
+    key = datasets.make_key(fingerprint_files(stage_files), {'column_map': column_map,
+                                                             'exact_decimals': exact_decimals})
+    with datasets.open(key, build) as df:
+        yield df
+
+
+def validate_table(settings: Dict[str, Any], table_name: str, inputs: TableInputs,
+                   report_dir: Optional[Path] = None,
+                   datasets: Optional[SharedDatasetRegistry] = None) -> TableOutcome:
+    """
+    Compare the fetched stage data of a table with its EDWP extract; the compute part of a validation.
+
+    The EDWP audit columns must be fully populated; both sides are then normalized (see
+    `normalize_for_comparison`) and compared, on the rows matched by `comparison.key_columns` if
+    configured. Tables whose `test_info.data_processing_core` is 'spark' are loaded, normalized and
+    compared with Spark instead (see `spark_runner.compare_table_spark`). Mismatches are saved with an
+    HTML report under `report_dir`.
+
+    Args:
+        settings (Dict[str, Any]): The configuration settings, including the table configuration under `table_name`.
+        table_name (str): The table.
+        inputs (TableInputs): The fetched inputs.
+        report_dir (Optional[Path]): Folder of the mismatch reports; 'mismatch_report' in the project if None.
+        datasets (Optional[SharedDatasetRegistry]): Registry sharing the loaded stage data between tests and
+            workers; the stage files are read privately if None.
+
+    Returns:
+        TableOutcome: The result.
+    """
+    for col, null_count in inputs.audit_null_counts.items():
+        if null_count:
+            return TableOutcome(table_name, False, f"Column {col} contains {null_count} null values")
+
+    table_settings = settings[table_name]
+    report_dir = report_dir or Path(get_project_root_path()) / "mismatch_report"
+    if get_processing_core(table_settings) == SPARK_PROCESSING_CORE:
+        # Imported on demand: only Spark tables need pyspark and a JVM
+        from utils.framework.spark_runner import compare_table_spark
+        are_identical, message, mismatch_result = compare_table_spark(settings, table_name, inputs,
+                                                                      report_dir / table_name / 'spark_mismatches')
+    else:
+        typed = get_comparison_settings(table_settings)[0] == TYPED_COMPARISON
+        column_map = table_settings['stage']['aws_s3'].get('column_map') if inputs.schema is None else None
+        with open_stage_frame(sorted(inputs.stage_path.glob('*.parquet')), column_map, typed, datasets) as df1:
+            df1, df2, rules = normalize_for_comparison(table_settings, df1, inputs.edwp_df)
+            are_identical, message, mismatch_result = compare_dataframes(df1, df2, "stage", "edwp",
+                                                                         key_columns=get_key_columns(table_settings),
+                                                                         rules=rules)
+    LOGGER.info(f"{table_name}: {message}")
+    if are_identical:
+        return TableOutcome(table_name, True, message)
+
+    mismatch_result.save(report_dir / table_name)
+    report_path = report_dir / f"{table_name}.html"
+    generate_html_report(mismatch_result, str(report_path))
+    return TableOutcome(table_name, False, message, report_path=report_path)
+
+
+class BatchRunner:
+    """
+    Validates a list of tables as a pipeline: while one table is being compared, the S3 stage files and
+    the EDWP extract of the next tables are fetched in background threads.
+
+    The S3 client, database engine, artifact store, query cache, shared dataset registry and downloader are
+    shared by all tables. Tables are
+    validated in the calling thread, one `run_table` call at a time, normally in list order; a table
+    requested out of order is fetched on demand. Prefetched inputs are held until their table runs, so
+    `prefetch_tables` bounds the extra memory (the EDWP extracts) and disk in use.
+
+    Attributes:
+        settings (Dict[str, Any]): The configuration settings, including the configuration of every table.
+        table_names (List[str]): The tables, in the order they will be validated.
+        prefetch_tables (int): Number of upcoming tables fetched ahead of the current one.
+    """
+
+    def __init__(self, settings: Dict[str, Any], table_names: List[str], s3_client: Any, engine: Engine,
+                 prefetch_tables: int = DEFAULT_PREFETCH_TABLES, store: Optional[ParquetArtifactStore] = None,
+                 query_cache: Optional[QueryResultCache] = None, report_dir: Optional[Path] = None,
+                 datasets: Optional[SharedDatasetRegistry] = None) -> None:
+        self.settings = settings
+        self.table_names = list(table_names)
+        self.prefetch_tables = prefetch_tables
+        self.s3_client = s3_client
+        self.engine = engine
+        self.store = store or ParquetArtifactStore(
+            max_bytes=int(settings.get('artifact_store_max_gb', 10) * 1024 ** 3))
+        self.downloader = RangedDownloader.from_settings(settings)
+        self.query_cache = query_cache or QueryResultCache.from_settings(settings, engine)
+        self.report_dir = report_dir
+        self.datasets = datasets or SharedDatasetRegistry.from_settings(settings)
+        # One thread per source of each fetched table
+        self._executor = ThreadPoolExecutor(max_workers=2 * (prefetch_tables + 1), thread_name_prefix='batch-io')
+        self._fetches: Dict[str, Tuple[Future, Future]] = {}
+
+    @classmethod
+    def from_settings(cls, settings: Dict[str, Any], table_names: List[str], s3_client: Any,
+                      engine: Engine) -> 'BatchRunner':
+        """
+        Create a runner with the `batch_prefetch_tables` setting (default `DEFAULT_PREFETCH_TABLES`).
+        """
+        return cls(settings, table_names, s3_client, engine,
+                   prefetch_tables=settings.get('batch_prefetch_tables', DEFAULT_PREFETCH_TABLES))
+
+    def _budget(self, table_name: str) -> Optional[float]:
+        return (self.settings.get(table_name) or {}).get('memory_budget_mb')
+
+    def _fetch_in_context(self, table_name: str, fetch, *args) -> Any:
+        # The budget is only checked while the table is validated: the RSS is that of the whole process,
+        # so a fetch running ahead would be charged for the memory of the table being compared
+        with table_context(table_name):
+            return fetch(self.settings, table_name, *args)
+
+    def _prefetch(self, table_name: str) -> None:
+        if table_name in self._fetches:
+            return
+        LOGGER.debug(f"Prefetching inputs of {table_name}")
+        self._fetches[table_name] = (
+            self._executor.submit(self._fetch_in_context, table_name, fetch_stage_parquet, self.s3_client,
+                                  self.store, self.downloader),
+            self._executor.submit(self._fetch_in_context, table_name, fetch_edwp_extract, self.engine,
+                                  self.query_cache))
+
+    def run_table(self, table_name: str) -> TableOutcome:
+        """
+        Validate a table, starting the prefetch of the tables after it.
+
+        Args:
+            table_name (str): The table.
+
+        Returns:
+            TableOutcome: The result; fetch and validation errors are returned in `error`.
+        """
+        self._prefetch(table_name)
+        if table_name in self.table_names:
+            position = self.table_names.index(table_name)
+            for upcoming in self.table_names[position + 1:position + 1 + self.prefetch_tables]:
+                self._prefetch(upcoming)
+
+        stage_future, edwp_future = self._fetches.pop(table_name)
+        try:
+            inputs = TableInputs(stage_future.result(), get_stage_schema(self.settings, table_name),
+                                 *edwp_future.result())
+            with table_context(table_name, memory_budget_mb=self._budget(table_name)):
+                return validate_table(self.settings, table_name, inputs, self.report_dir, self.datasets)
+        except Exception as e:
+            LOGGER.error(f"Validation of {table_name} failed: {e}")
+            return TableOutcome(table_name, False, f"Validation of {table_name} failed: {e}", error=e)
+
+    def close(self) -> None:
+        """
+        Cancel the fetches that have not started, wait for the running ones and release the shared datasets.
+        """
+        for stage_future, edwp_future in self._fetches.values():
+            stage_future.cancel()
+            edwp_future.cancel()
+        self._fetches.clear()
+        self._executor.shutdown(wait=True)
+        self.datasets.close()
+
+    def __enter__(self) -> 'BatchRunner':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
@@ -0,0 +1,244 @@
+import hashlib
+import json
+import logging
+import re
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import polars as pl
+from sqlalchemy.engine import Engine
+
+from utils.commons.perf_util import span
+from utils.commons.polars_sql_util import read_sql_query, read_sql_query_as_df
+from utils.commons.sql_builder_util import (build_postgres_table_freshness_query, build_syslog_access_query,
+                                            build_table_freshness_query)
+from utils.framework.artifact_store import ParquetArtifactStore
+from utils.framework.path_util import get_project_root_path
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 5 * 1024 ** 3
+# Age after which a cached result is refreshed even if the probe is unchanged
+DEFAULT_TTL_HOURS = 24
+FRESHNESS_QUERY_BUILDERS = {'redshift': build_table_freshness_query,
+                            'postgresql': build_postgres_table_freshness_query}
+_TABLE_REFERENCE_PATTERN = re.compile(r'\b(?:from|join)\s+([A-Za-z_][\w$]*(?:\.[A-Za-z_][\w$]*)?)', re.IGNORECASE)
+
+
+def get_query_cache_path() -> Path:
+    """
+    Get the default root folder of the query result cache.
+
+    Returns:
+        Path: The query cache folder in the project root.
+    """
+    return get_project_root_path() / 'query_cache'
+
+
+def normalize_query(query: str) -> str:
+    """
+    Normalize a query for use in a cache key: line comments are removed, whitespace is collapsed and
+    trailing semicolons are dropped, leaving string literals untouched.
+
+    Args:
+        query (str): The SQL query.
+
+    Returns:
+        str: The normalized query.
+    """
+    segments = query.split("'")
+    # Even segments are outside string literals
+    for position in range(0, len(segments), 2):
+        segments[position] = re.sub(r'\s+', ' ', re.sub(r'--[^\n]*', ' ', segments[position]))
+    return "'".join(segments).strip().rstrip(';').strip()
+
+
+def get_referenced_tables(query: str) -> List[str]:
+    """
+    List the relations a query reads, from its FROM and JOIN clauses.
+
+    Args:
+        query (str): The SQL query.
+
+    Returns:
+        List[str]: The sorted, lower-cased relation names.
+    """
+    return sorted({match.lower() for match in _TABLE_REFERENCE_PATTERN.findall(normalize_query(query))})
+
+
+class QueryResultCache:
+    """
+    Local Parquet cache of query results, keyed by the normalized query text and a freshness probe of
+    every table the query reads.
+
+    The probe reads each table's row count and latest insert/delete times from the Redshift system views
+    (see `build_table_freshness_query`), which is far cheaper than the query itself. A result is served
+    from disk while the probe is unchanged and the result is younger than the TTL; once a table changes,
+    the next read misses, runs the query and replaces the stale result. Results live in a
+    `ParquetArtifactStore`, so the cache is bounded by a disk budget and shared by xdist workers.
+
+    The STL views only show the loads of other users (e.g. the ETL pipeline's) to superusers and users
+    with SYSLOG ACCESS UNRESTRICTED; for anyone else a reload keeping the row count would go unnoticed.
+    The cache is therefore bypassed on Redshift unless the user has that access, and the TTL bounds the
+    age of a result in any case. Queries whose tables cannot be probed (unqualified names, missing system
+    view access) bypass the cache too.
+
+    Hits, probes and misses are recorded as the 'query_cache_hit', 'query_cache_probe' and
+    'redshift_query' stages of the performance report.
+
+    Attributes:
+        engine (Engine): SQLAlchemy engine running the probes and queries.
+        store (ParquetArtifactStore): The store holding the results.
+        dialect (str): 'redshift', or 'postgresql' for the local stand-in.
+        ttl_seconds (Optional[float]): Maximum age of a served result; unbounded if None.
+        syslog_unrestricted (Optional[bool]): Whether the user sees every user's STL rows; checked with
+            `build_syslog_access_query` on first use if None.
+    """
+
+    def __init__(self, engine: Engine, store: Optional[ParquetArtifactStore] = None, dialect: str = 'redshift',
+                 max_bytes: int = DEFAULT_MAX_BYTES, ttl_seconds: Optional[float] = DEFAULT_TTL_HOURS * 3600,
+                 syslog_unrestricted: Optional[bool] = None) -> None:
+        if dialect not in FRESHNESS_QUERY_BUILDERS:
+            raise ValueError(f"Unsupported dialect: {dialect}")
+        self.engine = engine
+        self.store = store or ParquetArtifactStore(get_query_cache_path(), max_bytes=max_bytes)
+        self.dialect = dialect
+        self.ttl_seconds = ttl_seconds
+        # The PostgreSQL statistics collector counts the changes of every user
+        self.syslog_unrestricted = True if dialect == 'postgresql' else syslog_unrestricted
+
+    @classmethod
+    def from_settings(cls, settings: Dict[str, Any], engine: Engine) -> 'QueryResultCache':
+        """
+        Create a cache bounded by the `query_cache_max_gb` and `query_cache_ttl_hours` settings, for the
+        `etl_db_engine` dialect. `query_cache_syslog_unrestricted = true` declares the user's SYSLOG ACCESS
+        UNRESTRICTED when `svl_user_info` cannot be read to check it.
+
+        Args:
+            settings (Dict[str, Any]): The team settings.
+            engine (Engine): SQLAlchemy engine connected to the warehouse.
+
+        Returns:
+            QueryResultCache: The cache.
+        """
+        dialect = settings.get('etl_db_engine', 'redshift')
+        ttl_hours = settings.get('query_cache_ttl_hours', DEFAULT_TTL_HOURS)
+        return cls(engine, dialect=dialect if dialect in FRESHNESS_QUERY_BUILDERS else 'redshift',
+                   max_bytes=int(settings.get('query_cache_max_gb', DEFAULT_MAX_BYTES / 1024 ** 3) * 1024 ** 3),
+                   ttl_seconds=ttl_hours * 3600 if ttl_hours is not None else None,
+                   syslog_unrestricted=settings.get('query_cache_syslog_unrestricted'))
+
+    def _sees_all_loads(self) -> bool:
+        """
+        Tell whether the freshness probe sees the loads of every user, checking the access once.
+        """
+        if self.syslog_unrestricted is None:
+            try:
+                rows = read_sql_query(self.engine, build_syslog_access_query())
+            except (ValueError, RuntimeError) as e:
+                LOGGER.debug(f"Cannot check the SYSLOG ACCESS of the user: {e}")
+                rows = []
+            self.syslog_unrestricted = bool(rows) and (bool(rows[0]['usesuper']) or
+                                                       str(rows[0]['syslogaccess']).upper() == 'UNRESTRICTED')
+            if not self.syslog_unrestricted:
+                LOGGER.warning("Query cache disabled: the freshness probe needs a superuser or SYSLOG ACCESS "
+                               "UNRESTRICTED to see the loads of other users")
+        return self.syslog_unrestricted
+
+    def probe(self, query: str) -> Optional[Dict[str, Any]]:
+        """
+        Probe the modification state of every table a query reads.
+
+        Args:
+            query (str): The SQL query.
+
+        Returns:
+            Optional[Dict[str, Any]]: The state per table, or None if any table cannot be probed or the probe
+            would miss the loads of other users.
+        """
+        tables = get_referenced_tables(query)
+        if not tables or not self._sees_all_loads():
+            return None
+        state = {}
+        with span('query_cache_probe'):
+            for table in tables:
+                try:
+                    rows = read_sql_query(self.engine, FRESHNESS_QUERY_BUILDERS[self.dialect](table))
+                except (ValueError, RuntimeError) as e:
+                    LOGGER.info(f"Not caching query on {table}: its freshness cannot be probed ({e})")
+                    return None
+                if not rows:
+                    LOGGER.info(f"Not caching query on {table}: no freshness information")
+                    return None
+                state[table] = rows[0]
+        return state
+
+    def read(self, query: str) -> pl.DataFrame:
+        """
+        Get the result of a query, from the cache while the tables it reads are unchanged.
+
+        Args:
+            query (str): The SQL query.
+
+        Returns:
+            pl.DataFrame: The query result.
+        """
+        state = self.probe(query)
+        if state is None:
+            return read_sql_query_as_df(self.engine, query)
+
+        normalized_query = normalize_query(query)
+        key = self.store.make_key(json.dumps(state, sort_keys=True, default=str),
+                                  {'query': normalized_query, 'dialect': self.dialect})
+        cached_path = self.store.get(key)
+        if cached_path is not None and self.ttl_seconds is not None:
+            try:
+                age = time.time() - cached_path.stat().st_mtime
+            except FileNotFoundError:
+                age = 0.0
+            if age > self.ttl_seconds:
+                LOGGER.info(f"Cached result {key} is {age / 3600:.1f} hours old; running the query")
+                cached_path = None
+        if cached_path is not None:
+            try:
+                with span('query_cache_hit', nbytes=cached_path.stat().st_size) as hit_span:
+                    df = pl.read_parquet(cached_path)
+                    hit_span.rows = df.height
+                LOGGER.info(f"Query cache hit for {', '.join(state)}: {df.height} rows from {cached_path}")
+                return df
+            except FileNotFoundError:
+                LOGGER.debug(f"Cached result {key} was evicted concurrently; running the query")
+
+        df = read_sql_query_as_df(self.engine, query)
+        self._put(key, df, group=hashlib.sha256(f"{self.dialect}:{normalized_query}".encode('utf-8')).hexdigest())
+        LOGGER.info(f"Query cache miss for {', '.join(state)}: stored {df.height} rows")
+        return df
+
+    def _put(self, key: str, df: pl.DataFrame, group: str) -> None:
+        temp_path = self.store.root / f".result.{uuid.uuid4().hex}.parquet"
+        try:
+            df.write_parquet(temp_path)
+            self.store.put(key, temp_path, source_bytes=int(df.estimated_size()), group=group)
+        finally:
+            temp_path.unlink(missing_ok=True)
+
+
+def read_sql_query_cached(engine: Engine, query: str, cache: Optional[QueryResultCache] = None,
+                          settings: Optional[Dict[str, Any]] = None) -> pl.DataFrame:
+    """
+    Drop-in replacement of `read_sql_query_as_df` serving unchanged results from the query cache.
+
+    Args:
+        engine (Engine): SQLAlchemy engine to use for the database connection.
+        query (str): SQL query to execute.
+        cache (Optional[QueryResultCache]): The cache; created from `settings` (or the defaults) if None.
+        settings (Optional[Dict[str, Any]]): The team settings used to create the cache.
+
+    Returns:
+        pl.DataFrame: Polars DataFrame containing the query results.
+    """
+    cache = cache or QueryResultCache.from_settings(settings or {}, engine)
+    return cache.read(query)
+
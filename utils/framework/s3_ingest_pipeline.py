@@ -0,0 +1,247 @@
+import asyncio
+import logging
+import multiprocessing
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import pyarrow as pa
+
+from utils.commons.file_convert_util import get_parquet_path, stream_csv_to_parquet
+from utils.commons.s3_range_util import RangedDownloader
+from utils.framework.s3_utils import CSV_SUFFIXES, get_local_file_name, get_table_download_path
+
+LOGGER = logging.getLogger(__name__)
+
+_END_OF_STAGE = None
+
+
+class StageStats:
+    """
+    Busy time and throughput of one pipeline stage.
+
+    Attributes:
+        name (str): Name of the stage.
+        workers (int): Number of concurrent workers in the stage.
+        items (int): Number of items the stage has processed.
+        bytes (int): Number of source bytes the stage has processed.
+        busy_seconds (float): Summed time the stage's workers spent processing items.
+        wait_seconds (float): Summed time the stage's workers spent blocked on a full downstream queue.
+    """
+
+    def __init__(self, name: str, workers: int) -> None:
+        self.name = name
+        self.workers = workers
+        self.items = 0
+        self.bytes = 0
+        self.busy_seconds = 0.0
+        self.wait_seconds = 0.0
+
+    def to_dict(self, elapsed: float) -> Dict[str, Any]:
+        """
+        Summarize the stage over the pipeline's run time.
+
+        Args:
+            elapsed (float): Wall-clock duration of the pipeline in seconds.
+
+        Returns:
+            Dict[str, Any]: Items, bytes, busy and blocked seconds, and utilization, the fraction of the
+            stage's worker capacity spent processing items.
+        """
+        capacity = max(elapsed * self.workers, 1e-9)
+        return {'workers': self.workers, 'items': self.items, 'bytes': self.bytes,
+                'busy_seconds': round(self.busy_seconds, 3), 'blocked_seconds': round(self.wait_seconds, 3),
+                'utilization': round(min(self.busy_seconds / capacity, 1.0), 3)}
+
+
+async def _put(queue: asyncio.Queue, item: Any, stats: StageStats) -> None:
+    """
+    Put an item on a bounded queue, recording the time spent waiting for space as backpressure.
+    """
+    start_time = time.perf_counter()
+    await queue.put(item)
+    stats.wait_seconds += time.perf_counter() - start_time
+
+
+async def ingest_s3_to_parquet(s3_client: Any, bucket: str, path: str, table_name: str, delimiter: str = '|',
+                               schema: Optional[pa.Schema] = None, parquet_options: Optional[Dict[str, Any]] = None,
+                               download_concurrency: int = 4, convert_workers: int = 2, queue_size: int = 4,
+                               downloader: Optional[RangedDownloader] = None) -> (Path, Dict[str, Any]):
+    """
+    Download the CSV files under an S3 path and convert them to Parquet as an overlapping pipeline.
+
+    Listing feeds a bounded download queue, downloads feed a bounded queue for a process pool that
+    parses and converts the files, and conversions feed a writer that moves each Parquet file into the
+    table's download folder. Because the queues are bounded, a fast stage blocks once `queue_size`
+    items wait downstream, so at most a fixed number of files is on disk or in flight at a time while
+    the network and CPU stages run concurrently. Files are named after the object keys relative to
+    `path` (see `get_local_file_name`).
+
+    Args:
+        s3_client (Any): The S3 client object.
+        bucket (str): The name of the S3 bucket.
+        path (str): The S3 path where the CSV files are located.
+        table_name (str): The name of the table to create a subfolder for the Parquet files.
+        delimiter (str): The delimiter used in the files.
+        schema (Optional[pa.Schema]): The files' column names and types; inferred if None.
+        parquet_options (Optional[Dict[str, Any]]): Options passed to `stream_csv_to_parquet`.
+        download_concurrency (int): Number of concurrent downloads.
+        convert_workers (int): Number of worker processes converting files.
+        queue_size (int): Capacity of each queue between stages.
+        downloader (Optional[RangedDownloader]): Splits large objects into concurrent byte-range GETs;
+            a default `RangedDownloader` if None.
+
+    Returns:
+        (Path, Dict[str, Any]): The table's download folder and the per-stage statistics.
+
+    Raises:
+        ValueError: If two objects map to the same Parquet file, e.g. 'part.csv' and 'part.csv.gz'.
+        Exception: The first error raised by any stage; the remaining stages are cancelled.
+    """
+    loop = asyncio.get_running_loop()
+    downloader = downloader or RangedDownloader()
+    parquet_options = parquet_options or {}
+
+    table_download_path = get_table_download_path(table_name)
+    for stale_file in table_download_path.glob('*.parquet'):
+        stale_file.unlink()
+    pending_path = table_download_path / '.pending'
+    shutil.rmtree(pending_path, ignore_errors=True)
+    pending_path.mkdir()
+
+    download_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    convert_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    write_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    stats = {name: StageStats(name, workers) for name, workers in
+             (('list', 1), ('download', download_concurrency), ('convert', convert_workers), ('write', 1))}
+    written_files: List[Path] = []
+
+    async def list_objects() -> None:
+        def list_pages() -> List[Dict[str, Any]]:
+            paginator = s3_client.get_paginator('list_objects_v2')
+            return [obj for page in paginator.paginate(Bucket=bucket, Prefix=path)
+                    for obj in page.get('Contents', []) if obj['Key'].endswith(CSV_SUFFIXES)]
+
+        start_time = time.perf_counter()
+        objects = await loop.run_in_executor(io_executor, list_pages)
+        stats['list'].busy_seconds += time.perf_counter() - start_time
+        target_keys: Dict[str, str] = {}
+        for obj in objects:
+            target_name = get_parquet_path(Path(get_local_file_name(obj['Key'], path))).name
+            if target_name in target_keys:
+                raise ValueError(f"S3 objects {target_keys[target_name]} and {obj['Key']} would both be stored "
+                                 f"as {target_name}")
+            target_keys[target_name] = obj['Key']
+        for obj in objects:
+            stats['list'].items += 1
+            stats['list'].bytes += obj['Size']
+            await _put(download_queue, obj, stats['list'])
+
+    async def download_objects() -> None:
+        while (obj := await download_queue.get()) is not _END_OF_STAGE:
+            download_path = pending_path / get_local_file_name(obj['Key'], path)
+            start_time = time.perf_counter()
+            await loop.run_in_executor(io_executor, downloader.download, s3_client, bucket, obj['Key'],
+                                       download_path, obj['Size'], obj.get('ETag'))
+            stats['download'].busy_seconds += time.perf_counter() - start_time
+            stats['download'].items += 1
+            stats['download'].bytes += obj['Size']
+            LOGGER.debug(f"Downloaded {obj['Key']} to {download_path}")
+            await _put(convert_queue, (download_path, obj['Size']), stats['download'])
+
+    async def convert_files() -> None:
+        while (item := await convert_queue.get()) is not _END_OF_STAGE:
+            download_path, source_bytes = item
+            start_time = time.perf_counter()
+            parquet_path = await loop.run_in_executor(cpu_executor, _convert_pending_file, download_path,
+                                                      delimiter, schema, parquet_options)
+            stats['convert'].busy_seconds += time.perf_counter() - start_time
+            stats['convert'].items += 1
+            stats['convert'].bytes += source_bytes
+            await _put(write_queue, (parquet_path, source_bytes), stats['convert'])
+
+    async def write_files() -> None:
+        while (item := await write_queue.get()) is not _END_OF_STAGE:
+            parquet_path, source_bytes = item
+            start_time = time.perf_counter()
+            target_path = table_download_path / parquet_path.name
+            parquet_path.replace(target_path)
+            written_files.append(target_path)
+            stats['write'].busy_seconds += time.perf_counter() - start_time
+            stats['write'].items += 1
+            stats['write'].bytes += source_bytes
+            LOGGER.info(f"Wrote {target_path}")
+
+    async def run_stage(workers: List[asyncio.Task], next_queue: Optional[asyncio.Queue],
+                        next_workers: int) -> None:
+        # Once all workers of a stage are done, tell each worker of the next stage to stop
+        await asyncio.gather(*workers)
+        if next_queue is not None:
+            for _ in range(next_workers):
+                await next_queue.put(_END_OF_STAGE)
+
+    start_time = time.perf_counter()
+    io_executor = ThreadPoolExecutor(max_workers=download_concurrency + 1, thread_name_prefix='s3-ingest')
+    # Spawned workers avoid forking a process that already runs Polars/Arrow thread pools
+    cpu_executor = ProcessPoolExecutor(max_workers=convert_workers, mp_context=multiprocessing.get_context('spawn'))
+    try:
+        stages = [
+            run_stage([asyncio.create_task(list_objects())], download_queue, download_concurrency),
+            run_stage([asyncio.create_task(download_objects()) for _ in range(download_concurrency)],
+                      convert_queue, convert_workers),
+            run_stage([asyncio.create_task(convert_files()) for _ in range(convert_workers)], write_queue, 1),
+            run_stage([asyncio.create_task(write_files())], None, 0),
+        ]
+        stage_tasks = [asyncio.ensure_future(stage) for stage in stages]
+        try:
+            await asyncio.gather(*stage_tasks)
+        except Exception:
+            for task in stage_tasks:
+                task.cancel()
+            await asyncio.gather(*stage_tasks, return_exceptions=True)
+            raise
+    finally:
+        io_executor.shutdown(wait=True, cancel_futures=True)
+        cpu_executor.shutdown(wait=True, cancel_futures=True)
+        shutil.rmtree(pending_path, ignore_errors=True)
+
+    elapsed = max(time.perf_counter() - start_time, 1e-9)
+    report = {'elapsed_seconds': round(elapsed, 3), 'files': len(written_files),
+              'stages': {name: stage.to_dict(elapsed) for name, stage in stats.items()}}
+    bottleneck = max(('download', 'convert', 'write'), key=lambda name: report['stages'][name]['utilization'])
+    report['bottleneck'] = bottleneck
+    LOGGER.info(f"Ingested {len(written_files)} files for {table_name} in {elapsed:.2f}s; "
+                f"busiest stage: {bottleneck} ({report['stages'][bottleneck]['utilization']:.0%} utilized)")
+    return table_download_path, report
+
+
+def _convert_pending_file(download_path: Path, delimiter: str, schema: Optional[pa.Schema],
+                          parquet_options: Dict[str, Any]) -> Path:
+    """
+    Convert a downloaded file to Parquet and delete it.
+
+    Runs in the worker processes of `ingest_s3_to_parquet`, so it only takes picklable arguments.
+    """
+    parquet_path = stream_csv_to_parquet(download_path, get_parquet_path(download_path), delimiter=delimiter,
+                                         schema=schema, **parquet_options)
+    download_path.unlink()
+    return parquet_path
+
+
+def run_ingest_pipeline(s3_client: Any, bucket: str, path: str, table_name: str,
+                        **kwargs: Any) -> (Path, Dict[str, Any]):
+    """
+    Run `ingest_s3_to_parquet` from synchronous code, such as a pytest test.
+
+    Args:
+        s3_client (Any): The S3 client object.
+        bucket (str): The name of the S3 bucket.
+        path (str): The S3 path where the CSV files are located.
+        table_name (str): The name of the table to create a subfolder for the Parquet files.
+        **kwargs (Any): Further arguments of `ingest_s3_to_parquet`.
+
+    Returns:
+        (Path, Dict[str, Any]): The table's download folder and the per-stage statistics.
+    """
+    return asyncio.run(ingest_s3_to_parquet(s3_client, bucket, path, table_name, **kwargs))
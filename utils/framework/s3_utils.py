@@ -1,14 +1,58 @@
 import logging
+import os
+import shutil
 from pathlib import Path
-from typing import Any, List
+from typing import Any, Dict, List, Optional
+import pyarrow as pa
 from botocore.exceptions import NoCredentialsError, PartialCredentialsError
 
+from utils.commons.file_convert_util import convert_to_parquet, get_parquet_path
+from utils.commons.perf_util import span
+from utils.commons.s3_range_util import RangedDownloader
+from utils.framework.artifact_store import ParquetArtifactStore
 from utils.framework.path_util import get_project_root_path
 
 LOGGER = logging.getLogger(__name__)
 
+CSV_SUFFIXES = ('.csv', '.csv.gz')
 
-def download_csv_from_s3(s3_client: Any, bucket: str, path: str, table_name: str) -> Path:
+
+def get_table_download_path(table_name: str) -> Path:
+    """
+    Get the team's download folder for a table, creating it if needed.
+
+    Args:
+        table_name (str): The name of the table.
+
+    Returns:
+        Path: The table's download folder.
+    """
+    table_download_path = get_project_root_path() / 'downloads' / table_name
+    if not table_download_path.exists():
+        table_download_path.mkdir(parents=True, exist_ok=True)
+        LOGGER.debug(f"Created table download directory at {table_download_path}")
+    return table_download_path
+
+
+def get_local_file_name(key: str, prefix: str) -> str:
+    """
+    Get the local file name of an S3 object from its key relative to the listed prefix, so objects with
+    the same name in different sub-prefixes get different files: 'stage/2024/part.csv' listed under
+    'stage/' becomes '2024__part.csv'.
+
+    Args:
+        key (str): The object key.
+        prefix (str): The prefix the object was listed under.
+
+    Returns:
+        str: The file name.
+    """
+    relative_key = key[len(prefix):] if key.startswith(prefix) else key
+    return relative_key.strip('/').replace('/', '__')
+
+
+def download_csv_from_s3(s3_client: Any, bucket: str, path: str, table_name: str,
+                         downloader: Optional[RangedDownloader] = None) -> Path:
     """
     Download CSV files from the given S3 bucket and path into the team's specific downloads folder.
 
@@ -17,34 +61,29 @@ def download_csv_from_s3(s3_client: Any, bucket: str, path: str, table_name: str
         bucket (str): The name of the S3 bucket.
         path (str): The S3 path where the CSV files are located.
         table_name (str): The name of the table to create a subfolder for the downloaded files.
+        downloader (Optional[RangedDownloader]): Splits large objects into concurrent byte-range GETs;
+            a default `RangedDownloader` if None.
 
     Returns:
         List[Path]: A list of paths to the downloaded CSV files.
     """
     try:
-        project_root = get_project_root_path()
-        downloads_path = project_root / 'downloads'
-        table_download_path = downloads_path / table_name
-
         # Ensure the download directory and subdirectory exist
-        if not downloads_path.exists():
-            downloads_path.mkdir(parents=True, exist_ok=True)
-            LOGGER.debug(f"Created downloads directory at {downloads_path}")
-
-        if not table_download_path.exists():
-            table_download_path.mkdir(parents=True, exist_ok=True)
-            LOGGER.debug(f"Created table download directory at {table_download_path}")
+        table_download_path = get_table_download_path(table_name)
+        downloader = downloader or RangedDownloader()
 
         downloaded_files = []
 
-        # List and download CSV files
+        # List and download CSV files, plain or gzip compressed
         paginator = s3_client.get_paginator('list_objects_v2')
         for page in paginator.paginate(Bucket=bucket, Prefix=path):
             for obj in page.get('Contents', []):
-                if obj['Key'].endswith('.csv'):
+                if obj['Key'].endswith(CSV_SUFFIXES):
                     file_name = obj['Key'].split('/')[-1]
                     download_path = table_download_path / file_name
-                    s3_client.download_file(bucket, obj['Key'], str(download_path))
+                    with span('s3_download', nbytes=obj['Size']):
+                        downloader.download(s3_client, bucket, obj['Key'], download_path, obj['Size'],
+                                            obj.get('ETag'))
                     LOGGER.info(f"Downloaded {file_name} to {download_path}")
                     downloaded_files.append(download_path)
 
@@ -56,3 +95,113 @@ def download_csv_from_s3(s3_client: Any, bucket: str, path: str, table_name: str
     except Exception as e:
         LOGGER.error("Error downloading files from S3: %s", e)
         raise
+
+
+def fetch_parquet_from_s3(s3_client: Any, bucket: str, path: str, table_name: str, store: ParquetArtifactStore,
+                          delimiter: str = '|', schema: Optional[pa.Schema] = None,
+                          parquet_options: Optional[Dict[str, Any]] = None, workers: int = 1,
+                          downloader: Optional[RangedDownloader] = None) -> Path:
+    """
+    Materialize the CSV files under an S3 path as Parquet files in the table's download folder,
+    reusing converted artifacts from the store for objects that have not changed.
+
+    Only objects whose ETag and conversion settings have no stored artifact are downloaded and
+    converted; every other file is linked from the store without downloading or parsing it. Files are
+    named after the object keys relative to `path` (see `get_local_file_name`).
+
+    Args:
+        s3_client (Any): The S3 client object.
+        bucket (str): The name of the S3 bucket.
+        path (str): The S3 path where the CSV files are located.
+        table_name (str): The name of the table to create a subfolder for the Parquet files.
+        store (ParquetArtifactStore): The artifact store.
+        delimiter (str): The delimiter used in the files.
+        schema (Optional[pa.Schema]): The files' column names and types; inferred if None.
+        parquet_options (Optional[Dict[str, Any]]): Options passed to `stream_csv_to_parquet`.
+        workers (int): Number of worker processes converting the files that are not in the store.
+        downloader (Optional[RangedDownloader]): Splits large objects into concurrent byte-range GETs;
+            a default `RangedDownloader` if None.
+
+    Returns:
+        Path: The table's download folder, containing one Parquet file per source object.
+
+    Raises:
+        ValueError: If two objects map to the same Parquet file, e.g. 'part.csv' and 'part.csv.gz'.
+    """
+    try:
+        table_download_path = get_table_download_path(table_name)
+        downloader = downloader or RangedDownloader()
+        for stale_file in table_download_path.glob('*.parquet'):
+            stale_file.unlink()
+
+        pending_path = table_download_path / '.pending'
+        shutil.rmtree(pending_path, ignore_errors=True)
+        pending_path.mkdir()
+
+        conversion_settings = {'delimiter': delimiter, 'schema': schema.to_string() if schema is not None else None,
+                               'parquet_options': parquet_options or {}}
+        pending_objects = {}
+        target_keys: Dict[str, str] = {}
+        hits = 0
+
+        paginator = s3_client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=bucket, Prefix=path):
+            for obj in page.get('Contents', []):
+                if not obj['Key'].endswith(CSV_SUFFIXES):
+                    continue
+                file_name = get_local_file_name(obj['Key'], path)
+                artifact_key = store.make_key(obj['ETag'], conversion_settings)
+                target_path = get_parquet_path(table_download_path / file_name)
+                if target_path.name in target_keys:
+                    raise ValueError(f"S3 objects {target_keys[target_path.name]} and {obj['Key']} would both be "
+                                     f"stored as {target_path.name}")
+                target_keys[target_path.name] = obj['Key']
+
+                artifact_path = store.get(artifact_key)
+                if artifact_path is not None:
+                    try:
+                        _link_or_copy(artifact_path, target_path)
+                        hits += 1
+                        LOGGER.info(f"Reused stored Parquet artifact for {obj['Key']}")
+                        continue
+                    except FileNotFoundError:
+                        LOGGER.debug(f"Artifact for {obj['Key']} was evicted concurrently; converting it again")
+
+                download_path = pending_path / file_name
+                with span('s3_download', nbytes=obj['Size']):
+                    downloader.download(s3_client, bucket, obj['Key'], download_path, obj['Size'],
+                                        obj.get('ETag'))
+                LOGGER.info(f"Downloaded {file_name} to {download_path}")
+                pending_objects[get_parquet_path(download_path)] = (artifact_key, obj['Size'])
+
+        if pending_objects:
+            convert_to_parquet(pending_path, 'csv', delimiter=delimiter, workers=workers,
+                               parquet_options=parquet_options, schema=schema)
+            for parquet_path, (artifact_key, source_bytes) in pending_objects.items():
+                store.put(artifact_key, parquet_path, source_bytes=source_bytes)
+                parquet_path.replace(table_download_path / parquet_path.name)
+
+        shutil.rmtree(pending_path, ignore_errors=True)
+        LOGGER.info(f"Materialized {hits + len(pending_objects)} Parquet files for {table_name}: "
+                    f"{hits} reused from the artifact store, {len(pending_objects)} converted")
+        return table_download_path
+
+    except (NoCredentialsError, PartialCredentialsError) as e:
+        LOGGER.error("Error with AWS credentials: %s", e)
+        raise
+    except Exception as e:
+        LOGGER.error("Error fetching Parquet files from S3: %s", e)
+        raise
+
+
+def _link_or_copy(source_path: Path, target_path: Path) -> None:
+    """
+    Hard-link a stored artifact into place, copying it when linking is not possible (e.g. across devices).
+    """
+    target_path.unlink(missing_ok=True)
+    try:
+        os.link(source_path, target_path)
+    except OSError as e:
+        if isinstance(e, FileNotFoundError):
+            raise
+        shutil.copyfile(source_path, target_path)
@@ -0,0 +1,322 @@
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Union
+
+import polars as pl
+
+from utils.commons.perf_util import span
+from utils.framework.path_util import get_project_root_path
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 20 * 1024 ** 3
+# Set by the pytest controller to the session folder shared by all its xdist workers
+SHARED_DATASET_DIR_ENV = 'SHARED_DATASET_DIR'
+DATASET_SUFFIX = '.arrow'
+
+
+def get_shared_dataset_path() -> Path:
+    """
+    Get the root folder of the shared dataset sessions.
+
+    Returns:
+        Path: The shared dataset folder in the project root.
+    """
+    return get_project_root_path() / 'shared_datasets'
+
+
+def create_session_path() -> Path:
+    """
+    Create the shared dataset folder of a new pytest session, and remove the folders of earlier sessions
+    whose process is no longer running.
+
+    Returns:
+        Path: The session folder, named after the time and process id of the session.
+    """
+    root = get_shared_dataset_path()
+    root.mkdir(parents=True, exist_ok=True)
+    for session_path in root.iterdir():
+        owner_pid = session_path.name.rsplit('_', 1)[-1]
+        if session_path.is_dir() and owner_pid.isdigit() and not _is_running(int(owner_pid)):
+            shutil.rmtree(session_path, ignore_errors=True)
+            LOGGER.info(f"Removed shared datasets of ended session {session_path.name}")
+    session_path = root / f"{time.strftime('%Y%m%d_%H%M%S')}_{os.getpid()}"
+    session_path.mkdir(exist_ok=True)
+    return session_path
+
+
+def fingerprint_files(paths: List[Path]) -> str:
+    """
+    Identify the current content of a set of files by their paths, sizes and modification times.
+
+    Args:
+        paths (List[Path]): The files.
+
+    Returns:
+        str: A fingerprint that changes whenever a file is added, removed or rewritten.
+    """
+    return json.dumps(sorted((str(path.resolve()), path.stat().st_size, path.stat().st_mtime_ns) for path in paths))
+
+
+def _is_running(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class SharedDatasetRegistry:
+    """
+    Session-wide store of DataFrames shared between tests and pytest-xdist workers as memory-mapped
+    Arrow IPC files.
+
+    A dataset is built once, by the first process asking for its key, and written uncompressed in Polars'
+    own IPC layout. Every process then maps the file instead of reading it: the OS page cache holds one
+    physical copy for all workers and the mapped columns are used by Polars without copying.
+
+    Processes hold references on the datasets they use (`acquire` / `release`, or `open`). Unreferenced
+    datasets are evicted least-recently-used first once the registry exceeds `max_bytes`, references of
+    processes that ended are dropped, and the whole session folder is removed when the session ends.
+    The index is guarded by a file lock like the `ParquetArtifactStore` index.
+
+    Attributes:
+        root (Path): Folder of the datasets.
+        max_bytes (int): Disk (and page cache) budget for the datasets.
+    """
+
+    def __init__(self, root: Optional[Union[Path, str]] = None, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        """
+        Initialize the registry, creating its folder if needed.
+
+        Args:
+            root (Optional[Union[Path, str]]): Folder of the datasets; the session folder in
+                `SHARED_DATASET_DIR`, else '<project>/shared_datasets/default', if None.
+            max_bytes (int): Disk budget for the datasets.
+        """
+        self.root = Path(root or os.environ.get(SHARED_DATASET_DIR_ENV) or get_shared_dataset_path() / 'default')
+        self.max_bytes = max_bytes
+        self._index_path = self.root / 'index.json'
+        self._lock_path = self.root / '.lock'
+        self._thread_lock = threading.Lock()
+        self._held: Dict[str, int] = {}
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    @classmethod
+    def from_settings(cls, settings: Dict[str, Any]) -> 'SharedDatasetRegistry':
+        """
+        Create a registry bounded by the `shared_dataset_max_gb` setting.
+
+        Args:
+            settings (Dict[str, Any]): The team settings.
+
+        Returns:
+            SharedDatasetRegistry: The registry of the current session.
+        """
+        return cls(max_bytes=int(settings.get('shared_dataset_max_gb', DEFAULT_MAX_BYTES / 1024 ** 3) * 1024 ** 3))
+
+    @staticmethod
+    def make_key(source_fingerprint: str, settings: Dict[str, Any]) -> str:
+        """
+        Build the key of a dataset.
+
+        Args:
+            source_fingerprint (str): Identity of the source data, e.g. from `fingerprint_files`.
+            settings (Dict[str, Any]): The settings the dataset is built with.
+
+        Returns:
+            str: The hex digest identifying the dataset.
+        """
+        payload = json.dumps({'source': source_fingerprint, 'settings': settings}, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _dataset_path(self, key: str) -> Path:
+        return self.root / f"{key}{DATASET_SUFFIX}"
+
+    @contextmanager
+    def _locked_index(self) -> Iterator[Dict[str, Any]]:
+        """
+        Load the index under an exclusive lock and write it back when the block exits.
+        """
+        with self._thread_lock, open(self._lock_path, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                index = {'datasets': {}, 'hits': 0, 'builds': 0}
+                if self._index_path.exists():
+                    index.update(json.loads(self._index_path.read_text()))
+                yield index
+                temp_path = self._index_path.with_name(f".index.{uuid.uuid4().hex}.tmp")
+                temp_path.write_text(json.dumps(index))
+                temp_path.replace(self._index_path)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _add_reference(self, index: Dict[str, Any], key: str) -> bool:
+        entry = index['datasets'].get(key)
+        if entry is None or not self._dataset_path(key).exists():
+            index['datasets'].pop(key, None)
+            return False
+        holder = str(os.getpid())
+        entry['refs'][holder] = entry['refs'].get(holder, 0) + 1
+        entry['last_access'] = time.time()
+        self._held[key] = self._held.get(key, 0) + 1
+        return True
+
+    def acquire(self, key: str, build: Callable[[], pl.DataFrame]) -> pl.DataFrame:
+        """
+        Get a dataset, building it if no process has yet, and hold a reference on it until `release`.
+
+        Args:
+            key (str): The dataset key from `make_key`.
+            build (Callable[[], pl.DataFrame]): Builds the dataset; called by at most one process per key.
+
+        Returns:
+            pl.DataFrame: The dataset, memory-mapped from its IPC file.
+        """
+        with self._locked_index() as index:
+            found = self._add_reference(index, key)
+            if found:
+                index['hits'] += 1
+
+        if not found:
+            # Concurrent builders of the same key wait for the first one and then map its file
+            with open(self.root / f".{key}.build.lock", 'a') as build_lock:
+                fcntl.flock(build_lock, fcntl.LOCK_EX)
+                try:
+                    self._build(key, build)
+                finally:
+                    fcntl.flock(build_lock, fcntl.LOCK_UN)
+
+        dataset_path = self._dataset_path(key)
+        with span('shared_dataset_map', nbytes=dataset_path.stat().st_size) as map_span, \
+                pl.Config(activate_decimals=True):
+            df = pl.read_ipc(dataset_path, memory_map=True)
+            map_span.rows = df.height
+        LOGGER.info(f"Mapped shared dataset {key[:12]} ({df.height} rows) from {dataset_path}")
+        return df
+
+    def _build(self, key: str, build: Callable[[], pl.DataFrame]) -> None:
+        with self._locked_index() as index:
+            if self._add_reference(index, key):
+                index['hits'] += 1
+                return
+
+        df = build()
+        dataset_path = self._dataset_path(key)
+        temp_path = dataset_path.with_name(f".{key}.{uuid.uuid4().hex}.tmp")
+        with span('shared_dataset_write', rows=df.height):
+            # Polars' own layout (string views, ...) is mapped back without conversion
+            df.write_ipc(temp_path, compression='uncompressed', future=True)
+        os.replace(temp_path, dataset_path)
+
+        with self._locked_index() as index:
+            now = time.time()
+            index['datasets'][key] = {'size': dataset_path.stat().st_size, 'rows': df.height, 'created': now,
+                                      'last_access': now, 'refs': {}}
+            index['builds'] += 1
+            self._add_reference(index, key)
+            self._evict(index)
+        LOGGER.info(f"Built shared dataset {key[:12]} ({df.height} rows)")
+
+    def release(self, key: str) -> None:
+        """
+        Release a reference taken with `acquire`. The DataFrame stays usable while the process keeps it.
+
+        Args:
+            key (str): The dataset key.
+        """
+        with self._locked_index() as index:
+            if not self._held.get(key):
+                raise ValueError(f"No reference held on shared dataset {key}")
+            self._held[key] -= 1
+            entry = index['datasets'].get(key)
+            holder = str(os.getpid())
+            if entry is not None and entry['refs'].get(holder):
+                entry['refs'][holder] -= 1
+                if not entry['refs'][holder]:
+                    del entry['refs'][holder]
+
+    @contextmanager
+    def open(self, key: str, build: Callable[[], pl.DataFrame]) -> Iterator[pl.DataFrame]:
+        """
+        Hold a reference on a dataset for the duration of a block (see `acquire`).
+
+        Args:
+            key (str): The dataset key from `make_key`.
+            build (Callable[[], pl.DataFrame]): Builds the dataset if needed.
+
+        Yields:
+            pl.DataFrame: The memory-mapped dataset.
+        """
+        df = self.acquire(key, build)
+        try:
+            yield df
+        finally:
+            self.release(key)
+
+    def _evict(self, index: Dict[str, Any]) -> None:
+        """
+        Drop the references of ended processes and remove least-recently-used unreferenced datasets until
+        the registry fits its budget.
+        """
+        for entry in index['datasets'].values():
+            entry['refs'] = {holder: count for holder, count in entry['refs'].items() if _is_running(int(holder))}
+        total_bytes = sum(entry['size'] for entry in index['datasets'].values())
+        for key, entry in sorted(index['datasets'].items(), key=lambda item: item[1]['last_access']):
+            if total_bytes <= self.max_bytes:
+                break
+            if entry['refs']:
+                continue
+            # Processes that mapped the file keep their mapping after the unlink
+            self._dataset_path(key).unlink(missing_ok=True)
+            del index['datasets'][key]
+            total_bytes -= entry['size']
+            LOGGER.debug(f"Evicted shared dataset {key}")
+
+    def close(self) -> None:
+        """
+        Release every reference still held by this process.
+        """
+        for key, count in list(self._held.items()):
+            for _ in range(count):
+                self.release(key)
+        self._held.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report the registry's datasets, size, references and reuse.
+
+        Returns:
+            Dict[str, Any]: The registry statistics.
+        """
+        with self._locked_index() as index:
+            return {
+                'datasets': len(index['datasets']),
+                'total_bytes': sum(entry['size'] for entry in index['datasets'].values()),
+                'max_bytes': self.max_bytes,
+                'references': sum(sum(entry['refs'].values()) for entry in index['datasets'].values()),
+                'hits': index['hits'],
+                'builds': index['builds'],
+            }
+
+
+def remove_session(session_path: Union[Path, str]) -> None:
+    """
+    Remove the shared datasets of a session once all its processes are done.
+
+    Args:
+        session_path (Union[Path, str]): The session folder from `create_session_path`.
+    """
+    shutil.rmtree(session_path, ignore_errors=True)
+    LOGGER.info(f"Removed shared datasets of session {Path(session_path).name}")
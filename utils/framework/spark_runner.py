@@ -0,0 +1,87 @@
+import logging
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from pyspark.sql import DataFrame, SparkSession
+
+from utils.commons.db_connection import get_jdbc_options
+from utils.commons.mismatch_result import MismatchResult
+from utils.commons.spark_comp_util import (DEFAULT_MASTER, align_to_schema, compare_dataframes, convert_df_to_string,
+                                           create_spark_session, read_jdbc_query, spark_df_parquet)
+from utils.commons.sql_builder_util import build_select_query
+from utils.framework.batch_runner import TableInputs
+from utils.framework.spectrum_comp_util import DEFAULT_EDWP_SCHEMA
+from utils.framework.table_config_util import (TYPED_COMPARISON, get_comparison_settings, get_compared_columns,
+                                               get_edwp_unload_path, get_key_columns)
+
+LOGGER = logging.getLogger(__name__)
+
+
+def get_spark_session(settings: Dict[str, Any]) -> SparkSession:
+    """
+    Get the Spark session configured by the `spark_master` and `spark_config` settings.
+
+    Args:
+        settings (Dict[str, Any]): The team settings.
+
+    Returns:
+        SparkSession: The session of the process.
+    """
+    return create_spark_session(settings.get('spark_master', DEFAULT_MASTER), config=settings.get('spark_config'))
+
+
+def read_edwp_extract_spark(settings: Dict[str, Any], table_name: str, spark: SparkSession) -> DataFrame:
+    """
+    Read the compared columns of a table's EDWP table into Spark, from its Parquet UNLOAD if
+    `warehouse.redshift.edwp.unload_path` is configured, else with a JDBC query on the `etl_db_engine`.
+
+    Args:
+        settings (Dict[str, Any]): The configuration settings, including the table configuration under `table_name`.
+        table_name (str): The table.
+        spark (SparkSession): The session.
+
+    Returns:
+        DataFrame: The compared columns of the EDWP table.
+    """
+    table_settings = settings[table_name]
+    compared_columns = get_compared_columns(table_settings)
+    unload_path = get_edwp_unload_path(table_settings)
+    if unload_path:
+        LOGGER.info(f"Reading the EDWP extract of {table_name} from {unload_path}")
+        df = spark_df_parquet(spark, [unload_path])
+    else:
+        relation = f"{settings.get('edwp_schema_name', DEFAULT_EDWP_SCHEMA)}.{table_name}"
+        LOGGER.info(f"Reading the EDWP extract of {table_name} over JDBC")
+        df = read_jdbc_query(spark, get_jdbc_options(settings['etl_db_engine'], settings),
+                             build_select_query(relation, compared_columns))
+    return df.select(compared_columns)
+
+
+def compare_table_spark(settings: Dict[str, Any], table_name: str, inputs: TableInputs,
+                        output_path: Optional[Path] = None) -> (bool, str, MismatchResult):
+    """
+    Spark counterpart of the comparison in `validate_table`: load the stage files and the EDWP extract
+    into Spark, normalize both sides in the table's comparison mode and diff them on the executors.
+
+    Args:
+        settings (Dict[str, Any]): The configuration settings, including the table configuration under `table_name`.
+        table_name (str): The table.
+        inputs (TableInputs): The fetched inputs, without an EDWP extract.
+        output_path (Optional[Path]): Folder the mismatch Parquet files are written to; collected if None.
+
+    Returns:
+        (bool, str, MismatchResult): Whether both sides are identical, a message, and the mismatches.
+    """
+    spark = get_spark_session(settings)
+    table_settings = settings[table_name]
+    column_map = table_settings['stage']['aws_s3'].get('column_map') if inputs.schema is None else None
+    stage_df = spark_df_parquet(spark, sorted(inputs.stage_path.glob('*.parquet')), column_map)
+    edwp_df = read_edwp_extract_spark(settings, table_name, spark)
+
+    mode, schema, rules = get_comparison_settings(table_settings)
+    if mode == TYPED_COMPARISON:
+        stage_df, edwp_df = align_to_schema(stage_df, schema, rules), align_to_schema(edwp_df, schema, rules)
+    else:
+        stage_df, edwp_df = convert_df_to_string(stage_df), convert_df_to_string(edwp_df)
+    return compare_dataframes(stage_df, edwp_df, "stage", "edwp", key_columns=get_key_columns(table_settings),
+                              rules=rules, output_path=output_path)
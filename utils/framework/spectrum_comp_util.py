@@ -0,0 +1,135 @@
+import logging
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+import polars as pl
+from sqlalchemy.engine import Engine
+
+from utils.commons.polars_sql_util import read_sql_query, read_sql_query_as_df, run_sql_query
+from utils.commons.sql_builder_util import (build_copy_from_file_query, build_create_external_schema_query,
+                                            build_create_external_table_query, build_create_schema_query,
+                                            build_create_table_query, build_drop_external_table_query,
+                                            build_drop_schema_query, build_external_schema_exists_query,
+                                            build_schema_exists_query)
+from utils.commons.sql_comp_util import run_except_comparison
+from utils.framework.table_config_util import get_external_table_columns, get_stage_settings
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_EXTERNAL_SCHEMA = "qe_auto_spectrum"
+DEFAULT_GLUE_DATABASE = "qe_auto_glue_test_db"
+DEFAULT_EDWP_SCHEMA = "ts_eu_pgm_edwp"
+DEFAULT_SAMPLE_SIZE = 100
+SUPPORTED_DIALECTS = ('redshift', 'postgresql')
+
+
+def _ensure_stage_schema(engine: Engine, dialect: str, schema_name: str, glue_database: str,
+                         iam_role: Optional[str]) -> bool:
+    """
+    Create the schema holding the temporary stage table if it does not exist yet.
+
+    Returns:
+        bool: True if the schema was created by this call and must be dropped afterwards.
+    """
+    exists_query = (build_external_schema_exists_query(schema_name) if dialect == 'redshift'
+                    else build_schema_exists_query(schema_name))
+    if read_sql_query(engine, exists_query):
+        LOGGER.info(f"Reusing existing schema {schema_name}")
+        return False
+
+    if dialect == 'redshift':
+        if not iam_role:
+            raise ValueError("aws_iam_role must be configured to create a Spectrum external schema")
+        create_query = build_create_external_schema_query(schema_name, glue_database, iam_role)
+    else:
+        create_query = build_create_schema_query(schema_name)
+    LOGGER.debug(f"Executing query: {create_query}")
+    run_sql_query(engine, create_query)
+    LOGGER.info(f"Created schema {schema_name}")
+    return True
+
+
+def _create_stage_table(engine: Engine, dialect: str, relation: str, column_definitions: List[Tuple[str, str]],
+                        location: str, delimiter: str) -> None:
+    """
+    Create the temporary stage table: an external table over S3 on Redshift, or a table loaded
+    from a server-side file on the PostgreSQL stand-in.
+    """
+    if dialect == 'redshift':
+        queries = [build_create_external_table_query(relation, column_definitions, location, delimiter)]
+    else:
+        queries = [build_create_table_query(relation, column_definitions),
+                   build_copy_from_file_query(relation, location, delimiter)]
+    for query in queries:
+        LOGGER.debug(f"Executing query: {query}")
+        run_sql_query(engine, query)
+    LOGGER.info(f"Created stage table {relation} over {location}")
+
+
+def _drop_quietly(engine: Engine, query: str) -> None:
+    """
+    Run a cleanup statement, logging instead of raising so the original error is not masked.
+    """
+    try:
+        run_sql_query(engine, query)
+    except Exception as e:
+        LOGGER.error(f"Failed to clean up with query: {query}. Error: {e}")
+
+
+def compare_stage_with_edwp(engine: Engine, settings: Dict[str, Any], table_name: str,
+                            sample_size: int = DEFAULT_SAMPLE_SIZE, dialect: str = 'redshift',
+                            stage_location: Optional[str] = None) -> (bool, str, Dict[str, int], pl.DataFrame):
+    """
+    Compare the staged S3 data of a table with its EDWP table inside the warehouse.
+
+    An external table is generated from the table's `external_table_columns` over the stage S3 path,
+    both EXCEPT directions are evaluated server side by `run_except_comparison`, and the temporary
+    objects are dropped afterwards. Only counts and a bounded sample of differing rows leave the warehouse.
+
+    Args:
+        engine (Engine): SQLAlchemy engine connected to Redshift (or the PostgreSQL stand-in).
+        settings (Dict[str, Any]): The configuration settings, including the table configuration under `table_name`.
+        table_name (str): The table to compare.
+        sample_size (int): Maximum number of differing rows returned per direction.
+        dialect (str): 'redshift', or 'postgresql' to run against a local PostgreSQL stand-in.
+        stage_location (Optional[str]): Overrides the stage location; on 'postgresql' this is the path
+            of the delimited file on the database server.
+
+    Returns:
+        (bool, str, Dict[str, int], pl.DataFrame): A tuple containing a boolean indicating if the data is identical,
+                                                   a message, the row and difference counts, and a sample of the
+                                                   differing rows with a `diff_direction` column.
+    """
+    if dialect not in SUPPORTED_DIALECTS:
+        raise ValueError(f"Unsupported dialect: {dialect}")
+
+    table_settings = settings[table_name]
+    stage_settings = get_stage_settings(table_settings)
+    spectrum_settings = stage_settings.get('spectrum', {})
+    column_definitions = get_external_table_columns(table_settings)
+    columns = [name for name, _ in column_definitions]
+
+    schema_name = spectrum_settings.get('external_schema', DEFAULT_EXTERNAL_SCHEMA)
+    glue_database = spectrum_settings.get('glue_database', DEFAULT_GLUE_DATABASE)
+    location = stage_location or f"s3://{stage_settings['stg_s3_bucket']}/{stage_settings['stg_s3_path']}"
+    stage_relation = f"{schema_name}.{table_name}_{uuid.uuid4().hex[:8]}"
+    edwp_relation = f"{settings.get('edwp_schema_name', DEFAULT_EDWP_SCHEMA)}.{table_name}"
+
+    LOGGER.info(f"Comparing {location} with {edwp_relation} using {dialect} EXCEPT pushdown")
+
+    schema_created = _ensure_stage_schema(engine, dialect, schema_name, glue_database, settings.get('aws_iam_role'))
+    table_created = False
+    try:
+        _create_stage_table(engine, dialect, stage_relation, column_definitions, location,
+                            stage_settings.get('delimiter', '|'))
+        table_created = True
+
+        are_identical, message, counts, sample_df = run_except_comparison(
+            lambda query: read_sql_query_as_df(engine, query), stage_relation, edwp_relation, columns, sample_size)
+    finally:
+        if table_created:
+            _drop_quietly(engine, build_drop_external_table_query(stage_relation))
+        if schema_created:
+            _drop_quietly(engine, build_drop_schema_query(schema_name))
+
+    return are_identical, message, counts, sample_df
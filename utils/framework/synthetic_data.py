@@ -0,0 +1,193 @@
+import logging
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pv
+import pyarrow.parquet as pq
+
+from utils.commons.arrow_schema_util import compile_arrow_schema
+from utils.framework.table_config_util import get_external_table_columns, get_stage_settings
+
+LOGGER = logging.getLogger(__name__)
+
+# Rows drawn from one random stream; chunks that are multiples of it generate no surplus rows
+BLOCK_ROWS = 100_000
+DEFAULT_CHUNK_ROWS = 500_000
+DEFAULT_NULL_FRACTION = 0.01
+# Distinct values per string column, like the category and unit columns of the real tables
+DEFAULT_STRING_CARDINALITY = 5_000
+DATASET_SIZES = {'10k': 10_000, '1m': 1_000_000, '10m': 10_000_000}
+
+
+def build_synthetic_schema(table_settings: Dict[str, Any]) -> pa.Schema:
+    """
+    Build the schema of a synthetic dataset from a table configuration.
+
+    The declared `external_table_columns` types are used when present; otherwise every column of
+    the `column_map` is a string, as it is when the stage CSV files are parsed without a schema.
+
+    Args:
+        table_settings (Dict[str, Any]): The table configuration loaded from the table YAML.
+
+    Returns:
+        pa.Schema: The dataset schema, named by the `column_map` if it is declared.
+
+    Raises:
+        KeyError: If the table declares neither `external_table_columns` nor a `column_map`.
+    """
+    stage_settings = get_stage_settings(table_settings)
+    column_map = stage_settings.get('column_map')
+    if 'external_table_columns' in stage_settings:
+        return compile_arrow_schema(get_external_table_columns(table_settings), column_map)
+    if column_map:
+        return pa.schema([pa.field(column, pa.string()) for column in column_map])
+    raise KeyError("Table configuration declares neither external_table_columns nor column_map")
+
+
+def _generate_column(field: pa.Field, rng: np.random.Generator, rows: int, null_fraction: float,
+                     string_cardinality: int) -> pa.Array:
+    """
+    Generate the random values of one column.
+    """
+    mask = rng.random(rows) < null_fraction if null_fraction else None
+    data_type = field.type
+
+    if pa.types.is_string(data_type) or pa.types.is_large_string(data_type):
+        codes = pa.array(rng.integers(0, string_cardinality, rows).astype('int32'), mask=mask)
+        dictionary = pa.array([f"{field.name}_{code}" for code in range(string_cardinality)])
+        return pa.DictionaryArray.from_arrays(codes, dictionary).cast(data_type)
+    if pa.types.is_decimal(data_type):
+        # Exact values with up to 4 decimal places, built from integers to avoid float rounding noise
+        scale = min(data_type.scale, 4)
+        upper = min(10 ** (data_type.precision - data_type.scale), 1_000_000) * 10 ** scale
+        units = pa.array(rng.integers(0, upper, rows), mask=mask).cast(pa.decimal128(19, 0))
+        step = pa.scalar(Decimal(1).scaleb(-scale), pa.decimal128(scale + 1, scale))
+        return pc.multiply(units, step).cast(data_type)
+    if pa.types.is_integer(data_type):
+        upper = min(np.iinfo(data_type.to_pandas_dtype()).max, 1_000_000)
+        return pa.array(rng.integers(0, upper, rows), mask=mask).cast(data_type)
+    if pa.types.is_floating(data_type):
+        return pa.array(rng.random(rows) * 1_000, mask=mask).cast(data_type)
+    if pa.types.is_boolean(data_type):
+        return pa.array(rng.random(rows) < 0.5, mask=mask)
+    if pa.types.is_date(data_type):
+        # Days between 2020-01-01 and 2024-12-31
+        return pa.array(rng.integers(18_262, 20_089, rows).astype('int32'), mask=mask).cast(data_type)
+    if pa.types.is_timestamp(data_type):
+        seconds = rng.integers(1_577_836_800, 1_735_603_200, rows)
+        return pa.array(seconds * 1_000_000, mask=mask).cast(pa.timestamp('us')).cast(data_type)
+    raise ValueError(f"Unsupported column type for synthetic data: {field.name} {data_type}")
+
+
+def _generate_block(schema: pa.Schema, block_number: int, seed: int, null_fraction: float,
+                    string_cardinality: int) -> pa.Table:
+    """
+    Generate one fixed-size block of rows; every block has its own random stream.
+    """
+    rng = np.random.default_rng([seed, block_number])
+    row_ids = np.arange(block_number * BLOCK_ROWS, (block_number + 1) * BLOCK_ROWS)
+    columns = []
+    for index, field in enumerate(schema):
+        if index == 0 and (pa.types.is_string(field.type) or pa.types.is_large_string(field.type)):
+            row_numbers = pa.array(row_ids).cast(pa.string())
+            columns.append(pc.binary_join_element_wise(f"{field.name}_", row_numbers, '').cast(field.type))
+        else:
+            columns.append(_generate_column(field, rng, BLOCK_ROWS, null_fraction if index else 0.0,
+                                            string_cardinality))
+    return pa.Table.from_arrays(columns, schema=schema)
+
+
+def generate_synthetic_table(schema: pa.Schema, rows: int, seed: int = 0, offset: int = 0,
+                             null_fraction: float = DEFAULT_NULL_FRACTION,
+                             string_cardinality: int = DEFAULT_STRING_CARDINALITY) -> pa.Table:
+    """
+    Generate rows of a synthetic dataset deterministically.
+
+    The first column is a unique row identifier ('<column>_<row number>'), so the rows can be matched
+    as keys; the other columns hold seeded random values with a fraction of nulls. Rows are drawn in
+    fixed blocks of `BLOCK_ROWS`, so row n has the same values for a given seed however the dataset
+    is split into chunks or files.
+
+    Args:
+        schema (pa.Schema): The dataset schema, e.g. from `build_synthetic_schema`.
+        rows (int): Number of rows to generate.
+        seed (int): Seed of the random values.
+        offset (int): Number of the first row, for generating a dataset in chunks.
+        null_fraction (float): Fraction of nulls in every column but the first.
+        string_cardinality (int): Number of distinct values per string column.
+
+    Returns:
+        pa.Table: The generated rows.
+    """
+    first_block, last_block = offset // BLOCK_ROWS, (offset + rows - 1) // BLOCK_ROWS
+    blocks = [_generate_block(schema, block_number, seed, null_fraction, string_cardinality)
+              for block_number in range(first_block, last_block + 1)] if rows > 0 else []
+    if not blocks:
+        return schema.empty_table()
+    table = pa.concat_tables(blocks)
+    return table.slice(offset - first_block * BLOCK_ROWS, rows).combine_chunks()
+
+
+def write_synthetic_dataset(schema: pa.Schema, rows: int, output_path: Union[Path, str], seed: int = 0,
+                            formats: tuple = ('csv', 'parquet'), delimiter: str = '|',
+                            rows_per_file: Optional[int] = None,
+                            chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Dict[str, List[Path]]:
+    """
+    Write a synthetic dataset as pipe-delimited CSV part files and/or Parquet part files.
+
+    Rows are generated and written one chunk at a time, so memory stays bounded for 10M-row datasets.
+    The CSV files have a plain header line like the stage exports.
+
+    Args:
+        schema (pa.Schema): The dataset schema, e.g. from `build_synthetic_schema`.
+        rows (int): Total number of rows.
+        output_path (Union[Path, str]): Folder to write 'csv/part_<n>.csv' and 'parquet/part_<n>.parquet' into.
+        seed (int): Seed of the random values.
+        formats (tuple): Formats to write, 'csv' and/or 'parquet'.
+        delimiter (str): CSV delimiter.
+        rows_per_file (Optional[int]): Rows per part file; a single part file if None.
+        chunk_rows (int): Rows generated and written at a time.
+
+    Returns:
+        Dict[str, List[Path]]: The written part files per format.
+    """
+    output_path = Path(output_path)
+    rows_per_file = rows_per_file or max(rows, 1)
+    written: Dict[str, List[Path]] = {file_format: [] for file_format in formats}
+    for file_format in formats:
+        (output_path / file_format).mkdir(parents=True, exist_ok=True)
+
+    for part_number, file_offset in enumerate(range(0, rows, rows_per_file)):
+        file_rows = min(rows_per_file, rows - file_offset)
+        csv_file = parquet_writer = None
+        try:
+            if 'csv' in formats:
+                csv_path = output_path / 'csv' / f"part_{part_number}.csv"
+                csv_file = csv_path.open('wb')
+                csv_file.write((delimiter.join(schema.names) + '\n').encode('utf-8'))
+                written['csv'].append(csv_path)
+            if 'parquet' in formats:
+                parquet_path = output_path / 'parquet' / f"part_{part_number}.parquet"
+                parquet_writer = pq.ParquetWriter(parquet_path, schema, compression='zstd')
+                written['parquet'].append(parquet_path)
+
+            for chunk_offset in range(file_offset, file_offset + file_rows, chunk_rows):
+                chunk = generate_synthetic_table(schema, min(chunk_rows, file_offset + file_rows - chunk_offset),
+                                                 seed=seed, offset=chunk_offset)
+                if csv_file is not None:
+                    pv.write_csv(chunk, csv_file, pv.WriteOptions(include_header=False, delimiter=delimiter,
+                                                                   quoting_style='none'))
+                if parquet_writer is not None:
+                    parquet_writer.write_table(chunk)
+        finally:
+            if csv_file is not None:
+                csv_file.close()
+            if parquet_writer is not None:
+                parquet_writer.close()
+
+    LOGGER.info(f"Wrote {rows} synthetic rows as {', '.join(formats)} to {output_path}")
+    return written
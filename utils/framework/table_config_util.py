@@ -0,0 +1,278 @@
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+import pyarrow as pa
+
+from utils.commons.arrow_schema_util import compile_arrow_schema
+from utils.commons.polars_util import ColumnRule
+
+STRING_COMPARISON = 'string'
+TYPED_COMPARISON = 'typed'
+COMPARISON_MODES = (STRING_COMPARISON, TYPED_COMPARISON)
+# Relative tolerance of float precision columns, whose declared type has no scale
+DEFAULT_FLOAT_REL_TOL = 1e-9
+_COLUMN_RULE_KEYS = ('abs_tol', 'rel_tol', 'granularity', 'string_rules')
+# Engines comparing a table, from `test_info.data_processing_core`: the warehouse extract is compared on
+# one node with Polars ('redshift' is the older name of this default), or distributed with Spark
+POLARS_PROCESSING_CORE = 'polars'
+SPARK_PROCESSING_CORE = 'spark'
+PROCESSING_CORES = (POLARS_PROCESSING_CORE, 'redshift', SPARK_PROCESSING_CORE)
+
+_COLUMN_DEFINITION_PATTERN = re.compile(r'^\s*"?(?P<name>[A-Za-z_][A-Za-z0-9_]*)"?\s+(?P<type>.+?)\s*$')
+
+
+def get_stage_settings(table_settings: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Get the S3 stage block of a table configuration.
+
+    Args:
+        table_settings (Dict[str, Any]): The table configuration loaded from the table YAML.
+
+    Returns:
+        Dict[str, Any]: The `stage.aws_s3` settings.
+
+    Raises:
+        KeyError: If the table configuration has no S3 stage block.
+    """
+    try:
+        return table_settings['stage']['aws_s3']
+    except KeyError as e:
+        raise KeyError(f"Table configuration has no stage.aws_s3 block: {e}")
+
+
+def parse_column_definitions(ddl: str) -> List[Tuple[str, str]]:
+    """
+    Parse a column definition block such as `external_table_columns` into column names and SQL types.
+
+    Commas inside type parameters (e.g. `NUMERIC(30, 20)`) are not treated as separators.
+
+    Args:
+        ddl (str): The column definition block, e.g. "sku_cd VARCHAR(100),\\n wgt_qty NUMERIC(30, 20)".
+
+    Returns:
+        List[Tuple[str, str]]: (column name, upper-cased SQL type) pairs in declaration order.
+
+    Raises:
+        ValueError: If a definition cannot be parsed.
+    """
+    definitions = []
+    depth = 0
+    current = []
+    for char in ddl:
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        if char == ',' and depth == 0:
+            definitions.append(''.join(current))
+            current = []
+        else:
+            current.append(char)
+    definitions.append(''.join(current))
+
+    columns = []
+    for definition in definitions:
+        if not definition.strip():
+            continue
+        match = _COLUMN_DEFINITION_PATTERN.match(' '.join(definition.split()))
+        if not match:
+            raise ValueError(f"Unable to parse column definition: {definition.strip()}")
+        columns.append((match.group('name').lower(), match.group('type').upper()))
+    return columns
+
+
+def get_external_table_columns(table_settings: Dict[str, Any]) -> List[Tuple[str, str]]:
+    """
+    Get the parsed `external_table_columns` of a table configuration.
+
+    Args:
+        table_settings (Dict[str, Any]): The table configuration loaded from the table YAML.
+
+    Returns:
+        List[Tuple[str, str]]: (column name, SQL type) pairs in declaration order.
+
+    Raises:
+        KeyError: If the table configuration does not declare `external_table_columns`.
+    """
+    stage_settings = get_stage_settings(table_settings)
+    if 'external_table_columns' not in stage_settings:
+        raise KeyError("Table configuration does not declare stage.aws_s3.external_table_columns")
+    return parse_column_definitions(stage_settings['external_table_columns'])
+
+
+def get_compared_columns(table_settings: Dict[str, Any]) -> List[str]:
+    """
+    Get the columns compared between the stage files and the EDWP table: the `column_map` if defined,
+    else the names in `external_table_columns`.
+
+    Args:
+        table_settings (Dict[str, Any]): The table configuration loaded from the table YAML.
+
+    Returns:
+        List[str]: The column names in stage file order.
+
+    Raises:
+        KeyError: If the table configuration declares neither.
+    """
+    column_map = get_stage_settings(table_settings).get('column_map')
+    if column_map:
+        return list(column_map)
+    return [name for name, _ in get_external_table_columns(table_settings)]
+
+
+def _get_edwp_settings(table_settings: Dict[str, Any]) -> Dict[str, Any]:
+    return ((table_settings.get('warehouse') or {}).get('redshift') or {}).get('edwp') or {}
+
+
+def get_audit_columns(table_settings: Dict[str, Any]) -> List[str]:
+    """
+    Get the audit columns of the EDWP table, which the EDWP load adds to the stage columns.
+
+    Args:
+        table_settings (Dict[str, Any]): The table configuration loaded from the table YAML.
+
+    Returns:
+        List[str]: The `warehouse.redshift.edwp.audit_columns`, or an empty list if not configured.
+    """
+    return list(_get_edwp_settings(table_settings).get('audit_columns') or [])
+
+
+def get_edwp_unload_path(table_settings: Dict[str, Any]) -> Optional[str]:
+    """
+    Get the location of a Parquet UNLOAD of the EDWP table, read by the Spark core instead of a JDBC query.
+
+    Args:
+        table_settings (Dict[str, Any]): The table configuration loaded from the table YAML.
+
+    Returns:
+        Optional[str]: The `warehouse.redshift.edwp.unload_path` (e.g. an 's3a://' URI), or None if not configured.
+    """
+    return _get_edwp_settings(table_settings).get('unload_path') or None
+
+
+def _precision_rule(name: str, arrow_type: pa.DataType) -> ColumnRule:
+    if pa.types.is_decimal(arrow_type):
+        # One unit in the last declared decimal place
+        return ColumnRule(abs_tol=10.0 ** -arrow_type.scale)
+    if pa.types.is_floating(arrow_type):
+        return ColumnRule(rel_tol=DEFAULT_FLOAT_REL_TOL)
+    raise ValueError(f"Precision column {name} is declared as {arrow_type}, not as a number")
+
+
+def get_comparison_settings(table_settings: Dict[str, Any]) -> Tuple[str, Optional[pa.Schema], Dict[str, ColumnRule]]:
+    """
+    Get how the stage data and the EDWP extract of a table are compared, from its `comparison` block:
+
+        comparison:
+          mode: "typed"                  # or "string" (default): compare normalized strings
+          timestamp_granularity: "1s"    # Polars duration every TIMESTAMP column is truncated to
+          columns:
+            list_prc_ext_amt: {rel_tol: 1.0e-9}
+            sku_nm: {string_rules: ["trim", "lowercase"]}
+
+    In typed mode both sides are aligned to the types declared in `external_table_columns`. The
+    `warehouse.redshift.edwp.precision_columns` are compared within one unit of their last declared
+    decimal place (or `DEFAULT_FLOAT_REL_TOL` for floats) unless their column rule says otherwise.
+
+    Args:
+        table_settings (Dict[str, Any]): The table configuration loaded from the table YAML.
+
+    Returns:
+        Tuple[str, Optional[pa.Schema], Dict[str, ColumnRule]]: The comparison mode, the declared schema
+            (None in string mode) and the rule of each column that needs one.
+
+    Raises:
+        KeyError: If typed mode is requested without `external_table_columns`.
+        ValueError: If the mode or a column rule is invalid.
+    """
+    comparison_settings = table_settings.get('comparison') or {}
+    mode = comparison_settings.get('mode', STRING_COMPARISON)
+    if mode not in COMPARISON_MODES:
+        raise ValueError(f"Unsupported comparison mode {mode!r}; expected one of {COMPARISON_MODES}")
+    if mode == STRING_COMPARISON:
+        return mode, None, {}
+
+    schema = compile_arrow_schema(get_external_table_columns(table_settings),
+                                  get_stage_settings(table_settings).get('column_map'))
+    declared_types = {field.name: field.type for field in schema}
+    rules = {}
+    for name in _get_edwp_settings(table_settings).get('precision_columns') or []:
+        if name not in declared_types:
+            raise ValueError(f"Precision column {name} is not declared in external_table_columns")
+        rules[name] = _precision_rule(name, declared_types[name])
+    granularity = comparison_settings.get('timestamp_granularity')
+    if granularity:
+        for name, arrow_type in declared_types.items():
+            if pa.types.is_timestamp(arrow_type):
+                rules[name] = ColumnRule(granularity=granularity)
+    for name, column_settings in (comparison_settings.get('columns') or {}).items():
+        if name not in declared_types:
+            raise ValueError(f"Comparison rule for undeclared column {name}")
+        unknown_keys = set(column_settings) - set(_COLUMN_RULE_KEYS)
+        if unknown_keys:
+            raise ValueError(f"Unknown comparison settings {sorted(unknown_keys)} for column {name}")
+        rule = rules.get(name) or ColumnRule()
+        rules[name] = ColumnRule(**{**{key: getattr(rule, key) for key in _COLUMN_RULE_KEYS}, **column_settings})
+    return mode, schema, rules
+
+
+def get_categorical_columns(table_settings: Dict[str, Any]) -> Optional[List[str]]:
+    """
+    Get the string columns encoded as categoricals for the comparison, from `comparison.categorical_columns`.
+
+    Args:
+        table_settings (Dict[str, Any]): The table configuration loaded from the table YAML.
+
+    Returns:
+        Optional[List[str]]: The configured columns (an empty list disables the encoding), or None to
+            detect low-cardinality columns from the data.
+
+    Raises:
+        ValueError: If the setting is not a list of column names.
+    """
+    categorical_columns = (table_settings.get('comparison') or {}).get('categorical_columns')
+    if categorical_columns is None:
+        return None
+    if isinstance(categorical_columns, str) or not all(isinstance(column, str) for column in categorical_columns):
+        raise ValueError(f"comparison.categorical_columns must be a list of column names, not {categorical_columns!r}")
+    return list(categorical_columns)
+
+
+def get_key_columns(table_settings: Dict[str, Any]) -> Optional[List[str]]:
+    """
+    Get the columns matching the rows of the stage data and the EDWP extract, from `comparison.key_columns`.
+
+    Args:
+        table_settings (Dict[str, Any]): The table configuration loaded from the table YAML.
+
+    Returns:
+        Optional[List[str]]: The key columns, or None to compare the sorted rows by position.
+
+    Raises:
+        ValueError: If the setting is not a non-empty list of column names.
+    """
+    key_columns = (table_settings.get('comparison') or {}).get('key_columns')
+    if key_columns is None:
+        return None
+    if isinstance(key_columns, str) or not key_columns or not all(isinstance(column, str) for column in key_columns):
+        raise ValueError(f"comparison.key_columns must be a non-empty list of column names, not {key_columns!r}")
+    return list(key_columns)
+
+
+def get_processing_core(table_settings: Dict[str, Any]) -> str:
+    """
+    Get the engine comparing a table, from `test_info.data_processing_core`.
+
+    Args:
+        table_settings (Dict[str, Any]): The table configuration loaded from the table YAML.
+
+    Returns:
+        str: `SPARK_PROCESSING_CORE`, or `POLARS_PROCESSING_CORE` (the default).
+
+    Raises:
+        ValueError: If the core is not one of `PROCESSING_CORES`.
+    """
+    core = (table_settings.get('test_info') or {}).get('data_processing_core', POLARS_PROCESSING_CORE)
+    if core not in PROCESSING_CORES:
+        raise ValueError(f"Unsupported data_processing_core {core!r}; expected one of {PROCESSING_CORES}")
+    return SPARK_PROCESSING_CORE if core == SPARK_PROCESSING_CORE else POLARS_PROCESSING_CORE